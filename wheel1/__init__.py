@@ -1,19 +1,27 @@
-"""
-Wheel系统 - 初始化文件
-"""
-
-# 版本信息
-__version__ = "1.0.0"
-__author__ = "Wheel Team"
-__email__ = "team@wheel.ai"
-
-# 导出核心类
-from wheel1 import WheelSystem, WheelSystemConfig
-from core.modes import ProcessingMode, ModeConfig
-
-__all__ = [
-    "WheelSystem",
-    "WheelSystemConfig",
-    "ProcessingMode",
-    "ModeConfig",
-]
+"""
+Wheel系统 - 初始化文件
+"""
+
+# 版本信息
+__version__ = "1.0.0"
+__author__ = "Wheel Team"
+__email__ = "team@wheel.ai"
+
+import sys
+from pathlib import Path
+
+# 作为包导入时（如pytest收集测试），模块间的绝对导入以本目录为根
+_PROJECT_ROOT = str(Path(__file__).resolve().parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+# 导出核心类（包名与wheel1.py同名，需以相对导入取模块）
+from .wheel1 import WheelSystem, WheelSystemConfig
+from core.modes import ProcessingMode, ModeConfig
+
+__all__ = [
+    "WheelSystem",
+    "WheelSystemConfig",
+    "ProcessingMode",
+    "ModeConfig",
+]
@@ -1,292 +1,516 @@
-"""
-FastAPI应用主程序
-提供RESTful API接口
-"""
-
-import logging
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query, BackgroundTasks
-from fastapi.responses import JSONResponse, StreamingResponse
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-import tempfile
-import asyncio
-
-from core.modes import ProcessingMode
-
-logger = logging.getLogger(__name__)
-
-
-# ============ 数据模型 ============
-
-class DocumentUploadRequest(BaseModel):
-    """文档上传请求"""
-    metadata: Optional[Dict[str, Any]] = Field(default=None, description="文档元数据")
-    mode: ProcessingMode = Field(default=ProcessingMode.BALANCED, description="处理模式")
-
-
-class QueryRequest(BaseModel):
-    """查询请求"""
-    query: str = Field(..., description="查询文本")
-    top_k: int = Field(default=5, ge=1, le=50, description="返回结果数")
-    mode: Optional[ProcessingMode] = Field(default=None, description="处理模式（可覆盖系统默认）")
-    use_reranking: Optional[bool] = Field(default=None, description="是否使用重排")
-    explain: bool = Field(default=False, description="是否返回推理过程")
-
-
-class QueryResponse(BaseModel):
-    """查询响应"""
-    query: str
-    results: List[Dict[str, Any]]
-    count: int
-    latency_ms: float
-    mode: str
-    from_cache: bool = False
-    explanation: Optional[str] = None
-
-
-class ModeConfig(BaseModel):
-    """模式配置"""
-    mode: ProcessingMode
-    description: str
-    use_cases: List[str]
-    metrics: Dict[str, Any]
-
-
-class HealthResponse(BaseModel):
-    """健康检查响应"""
-    status: str
-    components: Dict[str, bool]
-    timestamp: datetime
-
-
-# ============ 创建FastAPI应用 ============
-
-def create_app(wheel_system: Any) -> FastAPI:
-    """创建FastAPI应用"""
-    
-    app = FastAPI(
-        title="Wheel系统 - 企业级RAG平台",
-        description="支持多模态数据处理和知识检索的企业级AI系统",
-        version="1.0.0"
-    )
-    
-    # ============ 健康检查端点 ============
-    
-    @app.get("/health", response_model=HealthResponse, tags=["System"])
-    async def health_check():
-        """系统健康检查"""
-        is_healthy, components = wheel_system.health_check()
-        
-        return HealthResponse(
-            status="healthy" if is_healthy else "degraded",
-            components=components,
-            timestamp=datetime.now()
-        )
-    
-    # ============ 文档处理端点 ============
-    
-    @app.post("/api/v1/documents/upload", tags=["Documents"])
-    async def upload_document(
-        file: UploadFile = File(...),
-        mode: ProcessingMode = Query(ProcessingMode.BALANCED),
-        background_tasks: BackgroundTasks = None
-    ):
-        """
-        上传和处理文档
-        
-        支持格式: PDF, DOCX, TXT, 图像(JPG/PNG), 视频(MP4/AVI)
-        """
-        try:
-            # 保存临时文件
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".tmp") as tmp:
-                content = await file.read()
-                tmp.write(content)
-                tmp_path = tmp.name
-            
-            # 切换模式（如需要）
-            if mode != wheel_system.mode:
-                wheel_system.switch_mode(mode)
-            
-            # 异步处理文档
-            if background_tasks:
-                background_tasks.add_task(
-                    wheel_system.process_document,
-                    tmp_path,
-                    {"filename": file.filename, "uploaded_at": datetime.now().isoformat()}
-                )
-            else:
-                result = wheel_system.process_document(
-                    tmp_path,
-                    {"filename": file.filename}
-                )
-            
-            return {
-                "status": "processing" if background_tasks else result.get("status"),
-                "document_id": result.get("document_id") if not background_tasks else None,
-                "message": "文档已上传并开始处理"
-            }
-        
-        except Exception as e:
-            logger.error(f"文档上传失败: {e}")
-            raise HTTPException(status_code=400, detail=str(e))
-    
-    # ============ 查询端点 ============
-    
-    @app.post("/api/v1/query", response_model=QueryResponse, tags=["Query"])
-    async def query(request: QueryRequest):
-        """
-        执行查询
-        
-        支持三种处理模式:
-        - efficiency: 快速模式 (100-300ms)
-        - balanced: 平衡模式 (500ms-2s)  
-        - precision: 精确模式 (2-10s)
-        """
-        try:
-            # 切换模式（如指定）
-            if request.mode and request.mode != wheel_system.mode:
-                wheel_system.switch_mode(request.mode)
-            
-            # 执行查询
-            result = wheel_system.query(
-                query_text=request.query,
-                top_k=request.top_k,
-                use_reranking=request.use_reranking,
-                explain=request.explain
-            )
-            
-            return QueryResponse(**result)
-        
-        except Exception as e:
-            logger.error(f"查询执行失败: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-    
-    @app.post("/api/v1/query/stream", tags=["Query"])
-    async def query_stream(request: QueryRequest):
-        """流式查询响应"""
-        async def stream_results():
-            try:
-                result = wheel_system.query(
-                    query_text=request.query,
-                    top_k=request.top_k,
-                    explain=request.explain
-                )
-                
-                # 流式返回结果
-                yield f"data: {result}\n\n"
-            
-            except Exception as e:
-                yield f"error: {str(e)}\n\n"
-        
-        return StreamingResponse(stream_results(), media_type="text/event-stream")
-    
-    # ============ 模式管理端点 ============
-    
-    @app.get("/api/v1/modes", tags=["Modes"])
-    async def get_modes():
-        """获取所有可用模式"""
-        from core.modes import ModeConfig
-        
-        modes = {}
-        for mode in ProcessingMode:
-            config = ModeConfig.get_config(mode)
-            modes[mode.value] = {
-                "name": config['name'],
-                "description": config['description'],
-                "use_cases": config['target_use_cases'],
-                "metrics": config['metrics']
-            }
-        
-        return modes
-    
-    @app.post("/api/v1/mode/switch", tags=["Modes"])
-    async def switch_mode(mode: ProcessingMode):
-        """切换处理模式"""
-        try:
-            wheel_system.switch_mode(mode)
-            return {
-                "status": "success",
-                "current_mode": mode.value,
-                "message": f"已切换到 {mode.value} 模式"
-            }
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=str(e))
-    
-    @app.get("/api/v1/mode/current", tags=["Modes"])
-    async def get_current_mode():
-        """获取当前模式"""
-        return {
-            "current_mode": wheel_system.mode.value,
-            "config": {
-                k: v for k, v in vars(wheel_system.config).items()
-                if k != 'mode_configs'
-            }
-        }
-    
-    # ============ 监控端点 ============
-    
-    @app.get("/api/v1/metrics", tags=["Monitoring"])
-    async def get_metrics():
-        """获取系统性能指标"""
-        return wheel_system.get_metrics()
-    
-    @app.get("/api/v1/metrics/summary", tags=["Monitoring"])
-    async def get_metrics_summary():
-        """获取指标摘要"""
-        metrics = wheel_system.get_metrics()
-        return {
-            "timestamp": datetime.now().isoformat(),
-            "summary": metrics
-        }
-    
-    # ============ 配置端点 ============
-    
-    @app.get("/api/v1/config", tags=["Config"])
-    async def get_config():
-        """获取系统配置"""
-        return {
-            "mode": wheel_system.mode.value,
-            "llm_provider": wheel_system.config.llm_provider,
-            "llm_model": wheel_system.config.llm_model,
-            "vector_db": wheel_system.config.vector_db_type,
-            "cache_enabled": wheel_system.config.enable_cache,
-            "monitoring_enabled": wheel_system.config.enable_monitoring
-        }
-    
-    # ============ 管理端点 ============
-    
-    @app.post("/api/v1/admin/clear-cache", tags=["Admin"])
-    async def clear_cache():
-        """清除缓存"""
-        try:
-            wheel_system.cache.client.flushdb() if wheel_system.cache.client else None
-            return {"status": "success", "message": "缓存已清除"}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-    
-    @app.get("/api/v1/admin/stats", tags=["Admin"])
-    async def get_stats():
-        """获取系统统计信息"""
-        return {
-            "mode": wheel_system.mode.value,
-            "health": wheel_system.health_check(),
-            "metrics": wheel_system.get_metrics(),
-            "timestamp": datetime.now().isoformat()
-        }
-    
-    # ============ 根端点 ============
-    
-    @app.get("/", tags=["System"])
-    async def root():
-        """系统信息"""
-        return {
-            "name": "Wheel系统",
-            "version": "1.0.0",
-            "status": "running",
-            "current_mode": wheel_system.mode.value,
-            "docs": "/docs",
-            "api_base": "/api/v1"
-        }
-    
-    return app
+"""
+FastAPI应用主程序
+提供RESTful API接口
+"""
+
+import logging
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+import hashlib
+import os
+import tempfile
+import asyncio
+
+from core.modes import ProcessingMode
+from core.pipeline import DataProcessingPipeline
+from core.job_queue import JobStatus
+
+logger = logging.getLogger(__name__)
+
+# 上传文件分块读取大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def save_upload(
+    file: UploadFile,
+    max_bytes: Optional[int] = None
+) -> Tuple[str, str, int]:
+    """
+    将上传文件分块流式写入临时文件，同时计算内容哈希
+    
+    临时文件保留原始扩展名，以便后续按格式选择提取器。
+    
+    Args:
+        file: 上传的文件
+        max_bytes: 文件大小上限（超出返回413）
+    
+    Returns:
+        (临时文件路径, 内容SHA-256, 文件字节数)
+    """
+    suffix = Path(file.filename or "").suffix.lower()
+    digest = hashlib.sha256()
+    size = 0
+    
+    fd, tmp_path = tempfile.mkstemp(prefix="wheel_upload_", suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"文件超过大小限制: {max_bytes} bytes"
+                    )
+                
+                digest.update(chunk)
+                await run_in_threadpool(tmp.write, chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    
+    return tmp_path, digest.hexdigest(), size
+
+
+# ============ 数据模型 ============
+
+class DocumentUploadRequest(BaseModel):
+    """文档上传请求"""
+    metadata: Optional[Dict[str, Any]] = Field(default=None, description="文档元数据")
+    mode: ProcessingMode = Field(default=ProcessingMode.BALANCED, description="处理模式")
+
+
+class QueryRequest(BaseModel):
+    """查询请求"""
+    query: str = Field(..., description="查询文本")
+    top_k: int = Field(default=5, ge=1, le=50, description="返回结果数")
+    mode: Optional[ProcessingMode] = Field(default=None, description="本次查询的处理模式（不切换系统当前模式）")
+    use_reranking: Optional[bool] = Field(default=None, description="是否使用重排")
+    explain: bool = Field(default=False, description="是否返回推理过程")
+    trace: bool = Field(default=False, description="调试：返回各检索阶段耗时的span树")
+    user_id: Optional[str] = Field(default=None, description="A/B实验分流单元（用户或会话ID，默认按查询文本）")
+
+
+class QueryResponse(BaseModel):
+    """查询响应"""
+    query: str
+    results: List[Dict[str, Any]]
+    count: int
+    latency_ms: float
+    mode: str
+    from_cache: bool = False
+    explanation: Optional[str] = None
+    trace: Optional[Dict[str, Any]] = None
+    experiment: Optional[Dict[str, str]] = None
+
+
+class ExperimentRequest(BaseModel):
+    """A/B实验创建请求"""
+    name: str = Field(..., description="实验名称")
+    control: Dict[str, Any] = Field(default_factory=dict, description="对照组查询配置（mode, strategy, use_reranking, top_k）")
+    treatment: Dict[str, Any] = Field(..., description="处理组查询配置")
+    traffic_fraction: float = Field(default=0.1, gt=0, le=1, description="进入实验的流量比例")
+    treatment_weight: float = Field(default=0.5, gt=0, lt=1, description="处理组在实验流量中的比例")
+    primary_metric: str = Field(default="latency_ms", description="主指标（latency_ms, error_rate或质量信号名）")
+    higher_is_better: bool = Field(default=False, description="主指标是否越大越好")
+    alpha: float = Field(default=0.05, gt=0, lt=1, description="显著性水平")
+    min_samples: int = Field(default=100, ge=2, description="每组开始检验前的最少样本数")
+    max_samples: Optional[int] = Field(default=None, ge=2, description="每组样本上限")
+    duration_hours: float = Field(default=168, gt=0, description="实验最长持续时间（小时）")
+
+
+class ExperimentFeedback(BaseModel):
+    """A/B实验质量反馈"""
+    arm: str = Field(..., description="实验组（查询响应的experiment.arm）")
+    signals: Dict[str, float] = Field(..., description="质量信号（如clicked、rating）")
+
+
+class ModeConfig(BaseModel):
+    """模式配置"""
+    mode: ProcessingMode
+    description: str
+    use_cases: List[str]
+    metrics: Dict[str, Any]
+
+
+class HealthResponse(BaseModel):
+    """健康检查响应"""
+    status: str
+    components: Dict[str, bool]
+    timestamp: datetime
+
+
+# ============ 创建FastAPI应用 ============
+
+def create_app(wheel_system: Any) -> FastAPI:
+    """创建FastAPI应用"""
+    
+    app = FastAPI(
+        title="Wheel系统 - 企业级RAG平台",
+        description="支持多模态数据处理和知识检索的企业级AI系统",
+        version="1.0.0"
+    )
+    
+    # ============ 生命周期 ============
+    
+    @app.on_event("startup")
+    async def start_ingest_workers():
+        """启动摄取工作池"""
+        await run_in_threadpool(wheel_system.start_ingest_workers)
+    
+    @app.on_event("shutdown")
+    async def stop_ingest_workers():
+        """停止摄取工作池并关闭数据库连接池"""
+        await run_in_threadpool(wheel_system.stop_ingest_workers)
+        if wheel_system.is_initialized('db'):
+            await wheel_system.db.aclose()
+            await run_in_threadpool(wheel_system.db.close)
+    
+    # ============ 健康检查端点 ============
+    
+    @app.get("/health", response_model=HealthResponse, tags=["System"])
+    async def health_check():
+        """系统健康检查"""
+        # 健康检查会借出数据库连接，放到线程池中执行，不阻塞事件循环
+        is_healthy, components = await run_in_threadpool(wheel_system.health_check)
+        
+        return HealthResponse(
+            status="healthy" if is_healthy else "degraded",
+            components=components,
+            timestamp=datetime.now()
+        )
+    
+    # ============ 文档处理端点 ============
+    
+    @app.post("/api/v1/documents/upload", status_code=202, tags=["Documents"])
+    async def upload_document(
+        file: UploadFile = File(...),
+        mode: ProcessingMode = Query(ProcessingMode.BALANCED),
+        source_key: Optional[str] = Query(
+            None, min_length=1, description="文档来源标识（同一标识的再次上传视为该文档的新版本）"
+        )
+    ):
+        """
+        上传文档并加入摄取队列
+        
+        文件按块流式写入磁盘（不整体读入内存），由摄取工作池在独立进程中处理，
+        可通过返回的job_id查询进度。
+        
+        文档ID由客户端提供的source_key决定；未提供时按内容哈希确定，
+        不同来源的同名文件不会互相覆盖。
+        
+        支持格式: PDF, DOCX, TXT, 图像(JPG/PNG), 视频(MP4)
+        """
+        suffix = Path(file.filename or "").suffix.lower()
+        if suffix not in DataProcessingPipeline.ALLOWED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail=f"不支持的文件格式: {suffix}")
+        
+        try:
+            # 流式保存临时文件
+            tmp_path, content_hash, size = await save_upload(
+                file,
+                max_bytes=wheel_system.config.max_upload_bytes
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"文档上传失败: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            await file.close()
+        
+        # 未指定来源标识时以内容哈希作为标识（同名的不同文件互不影响）
+        document_key = f"upload:{source_key}" if source_key else f"sha256:{content_hash}"
+        
+        # 写入持久化任务队列（任务携带处理模式，不切换系统当前模式）
+        job_id = await run_in_threadpool(
+            wheel_system.submit_document,
+            tmp_path,
+            {
+                "filename": file.filename,
+                "source_file": file.filename,
+                "source_key": document_key,
+                "content_hash": content_hash,
+                "uploaded_at": datetime.now().isoformat()
+            },
+            delete_after=True,
+            mode=mode
+        )
+        
+        return {
+            "status": "queued",
+            "job_id": job_id,
+            "document_id": DataProcessingPipeline.document_id_for(document_key),
+            "content_hash": content_hash,
+            "size": size,
+            "message": "文档已上传并加入摄取队列"
+        }
+    
+    # ============ 摄取任务端点 ============
+    
+    @app.get("/api/v1/jobs", tags=["Jobs"])
+    async def list_jobs(
+        status: Optional[JobStatus] = Query(None),
+        limit: int = Query(50, ge=1, le=500)
+    ):
+        """列出摄取任务（按创建时间倒序）"""
+        jobs = await run_in_threadpool(wheel_system.job_queue.list, status, limit)
+        return {"jobs": jobs, "count": len(jobs)}
+    
+    @app.get("/api/v1/jobs/stats", tags=["Jobs"])
+    async def get_job_stats():
+        """按模式统计各状态的任务数"""
+        return {
+            "stats": await run_in_threadpool(wheel_system.job_queue.stats),
+            "workers_running": (
+                wheel_system.ingest_pool is not None
+                and wheel_system.ingest_pool.is_running()
+            )
+        }
+    
+    @app.get("/api/v1/jobs/{job_id}", tags=["Jobs"])
+    async def get_job(job_id: str):
+        """获取摄取任务的状态、进度和结果"""
+        job = await run_in_threadpool(wheel_system.get_job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+        return job
+    
+    # ============ 查询端点 ============
+    
+    @app.post("/api/v1/query", response_model=QueryResponse, tags=["Query"])
+    async def query(request: QueryRequest):
+        """
+        执行查询
+        
+        支持三种处理模式:
+        - efficiency: 快速模式 (100-300ms)
+        - balanced: 平衡模式 (500ms-2s)  
+        - precision: 精确模式 (2-10s)
+        """
+        try:
+            # 检索是阻塞调用，放到线程池执行以免串行化事件循环上的并发请求；
+            # 指定模式只作用于本次查询，并发请求之间互不影响
+            result = await run_in_threadpool(
+                wheel_system.query,
+                query_text=request.query,
+                top_k=request.top_k,
+                use_reranking=request.use_reranking,
+                explain=request.explain,
+                trace=request.trace,
+                unit_id=request.user_id,
+                mode=request.mode
+            )
+            
+            return QueryResponse(**result)
+        
+        except Exception as e:
+            logger.error(f"查询执行失败: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @app.post("/api/v1/query/stream", tags=["Query"])
+    async def query_stream(request: QueryRequest):
+        """流式查询响应"""
+        async def stream_results():
+            try:
+                result = await run_in_threadpool(
+                    wheel_system.query,
+                    query_text=request.query,
+                    top_k=request.top_k,
+                    use_reranking=request.use_reranking,
+                    explain=request.explain,
+                    unit_id=request.user_id,
+                    mode=request.mode
+                )
+                
+                # 流式返回结果
+                yield f"data: {result}\n\n"
+            
+            except Exception as e:
+                yield f"error: {str(e)}\n\n"
+        
+        return StreamingResponse(stream_results(), media_type="text/event-stream")
+    
+    # ============ 模式管理端点 ============
+    
+    @app.get("/api/v1/modes", tags=["Modes"])
+    async def get_modes():
+        """获取所有可用模式"""
+        from core.modes import ModeConfig
+        
+        modes = {}
+        for mode in ProcessingMode:
+            config = ModeConfig.get_config(mode)
+            modes[mode.value] = {
+                "name": config['name'],
+                "description": config['description'],
+                "use_cases": config['target_use_cases'],
+                "metrics": config['metrics']
+            }
+        
+        return modes
+    
+    @app.post("/api/v1/mode/switch", tags=["Modes"])
+    async def switch_mode(mode: ProcessingMode):
+        """切换处理模式"""
+        try:
+            wheel_system.switch_mode(mode)
+            return {
+                "status": "success",
+                "current_mode": mode.value,
+                "message": f"已切换到 {mode.value} 模式"
+            }
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    @app.get("/api/v1/mode/current", tags=["Modes"])
+    async def get_current_mode():
+        """获取当前模式"""
+        return {
+            "current_mode": wheel_system.mode.value,
+            "config": {
+                k: v for k, v in vars(wheel_system.config).items()
+                if k != 'mode_configs'
+            }
+        }
+    
+    # ============ 监控端点 ============
+    
+    @app.get("/api/v1/metrics", tags=["Monitoring"])
+    async def get_metrics():
+        """获取系统性能指标"""
+        return wheel_system.get_metrics()
+    
+    @app.get("/api/v1/traces", tags=["Monitoring"])
+    async def get_traces(
+        limit: int = Query(20, ge=1, le=200),
+        name: Optional[str] = Query(None, description="retrieve或ingest")
+    ):
+        """获取最近采样的请求追踪（各阶段span树）"""
+        traces = wheel_system.get_traces(limit, name)
+        return {"traces": traces, "count": len(traces)}
+    
+    # ============ A/B实验端点 ============
+    
+    @app.get("/api/v1/experiments", tags=["Experiments"])
+    async def list_experiments():
+        """列出A/B实验"""
+        experiments = wheel_system.experiments.list_experiments()
+        return {"experiments": experiments, "count": len(experiments)}
+    
+    @app.post("/api/v1/experiments", status_code=201, tags=["Experiments"])
+    async def create_experiment(request: ExperimentRequest):
+        """
+        创建A/B实验
+        
+        查询按user_id（或查询文本）的哈希确定性分组；主指标显著时实验自动完成，
+        延迟或错误率显著恶化时自动停止，停止后全部流量回到系统默认配置。
+        """
+        try:
+            experiment_id = wheel_system.create_experiment(
+                request.name,
+                request.control,
+                request.treatment,
+                treatment_weight=request.treatment_weight,
+                traffic_fraction=request.traffic_fraction,
+                primary_metric=request.primary_metric,
+                higher_is_better=request.higher_is_better,
+                alpha=request.alpha,
+                min_samples=request.min_samples,
+                max_samples=request.max_samples,
+                duration=timedelta(hours=request.duration_hours)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"experiment_id": experiment_id}
+    
+    @app.get("/api/v1/experiments/{experiment_id}", tags=["Experiments"])
+    async def get_experiment(experiment_id: str):
+        """获取实验结果（各组统计、相对对照组的变化和始终有效p值）"""
+        results = wheel_system.experiments.get_results(experiment_id)
+        if not results:
+            raise HTTPException(status_code=404, detail=f"实验不存在: {experiment_id}")
+        return results
+    
+    @app.post("/api/v1/experiments/{experiment_id}/feedback", tags=["Experiments"])
+    async def record_experiment_feedback(experiment_id: str, feedback: ExperimentFeedback):
+        """记录查询之后到达的质量反馈（如点击、评分）"""
+        if not wheel_system.experiments.record_feedback(experiment_id, feedback.arm, feedback.signals):
+            raise HTTPException(status_code=404, detail=f"实验不存在: {experiment_id}")
+        return {"status": "recorded"}
+    
+    @app.post("/api/v1/experiments/{experiment_id}/stop", tags=["Experiments"])
+    async def stop_experiment(experiment_id: str):
+        """停止实验（之后的流量不再进入实验）"""
+        if not wheel_system.experiments.stop_experiment(experiment_id):
+            raise HTTPException(status_code=404, detail=f"实验不存在: {experiment_id}")
+        return {"status": "stopped"}
+    
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        """Prometheus抓取端点"""
+        if wheel_system.prometheus is None:
+            raise HTTPException(status_code=404, detail="Prometheus指标导出未启用")
+        
+        # 抓取时读取任务队列统计（SQLite查询），放到线程池中执行
+        content, content_type = await run_in_threadpool(wheel_system.prometheus.render)
+        return Response(content=content, media_type=content_type)
+    
+    @app.get("/api/v1/metrics/summary", tags=["Monitoring"])
+    async def get_metrics_summary():
+        """获取指标摘要"""
+        metrics = wheel_system.get_metrics()
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "summary": metrics
+        }
+    
+    # ============ 配置端点 ============
+    
+    @app.get("/api/v1/config", tags=["Config"])
+    async def get_config():
+        """获取系统配置"""
+        return {
+            "mode": wheel_system.mode.value,
+            "llm_provider": wheel_system.config.llm_provider,
+            "llm_model": wheel_system.config.llm_model,
+            "vector_db": wheel_system.config.vector_db_type,
+            "cache_enabled": wheel_system.config.enable_cache,
+            "monitoring_enabled": wheel_system.config.enable_monitoring
+        }
+    
+    # ============ 管理端点 ============
+    
+    @app.post("/api/v1/admin/clear-cache", tags=["Admin"])
+    async def clear_cache():
+        """清除缓存"""
+        try:
+            wheel_system.cache.client.flushdb() if wheel_system.cache.client else None
+            return {"status": "success", "message": "缓存已清除"}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @app.get("/api/v1/admin/stats", tags=["Admin"])
+    async def get_stats():
+        """获取系统统计信息"""
+        return {
+            "mode": wheel_system.mode.value,
+            "health": wheel_system.health_check(),
+            "metrics": wheel_system.get_metrics(),
+            "startup": wheel_system.get_startup_stats(),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    # ============ 根端点 ============
+    
+    @app.get("/", tags=["System"])
+    async def root():
+        """系统信息"""
+        return {
+            "name": "Wheel系统",
+            "version": "1.0.0",
+            "status": "running",
+            "current_mode": wheel_system.mode.value,
+            "docs": "/docs",
+            "api_base": "/api/v1"
+        }
+    
+    return app
@@ -0,0 +1,286 @@
+"""
+合成基准语料 - 按种子确定性生成分块文本、嵌入和带标注的查询
+同一种子和规模在任何机器上生成完全相同的语料，便于不同运行之间对比
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 预设语料规模（分块数）
+CORPUS_SIZES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# 合成词由以下音节拼接而成
+_CONSONANTS = "bcdfghjklmnprstvwz"
+_VOWELS = "aeiou"
+
+
+def parse_size(size: str) -> int:
+    """解析语料规模（预设名或分块数）"""
+    key = size.strip().lower()
+    if key in CORPUS_SIZES:
+        return CORPUS_SIZES[key]
+    return int(key.replace('_', ''))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """按行L2归一化"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return (matrix / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def _make_vocabulary(size: int, rng: np.random.Generator) -> np.ndarray:
+    """生成不重复的合成词表（2-4个音节）"""
+    words = set()
+    while len(words) < size:
+        syllables = rng.integers(2, 5)
+        words.add(''.join(
+            _CONSONANTS[rng.integers(len(_CONSONANTS))] + _VOWELS[rng.integers(len(_VOWELS))]
+            for _ in range(syllables)
+        ))
+    return np.array(sorted(words), dtype=object)
+
+
+@dataclass
+class ChunkBatch:
+    """一批合成分块"""
+    start: int                  # 第一个分块的序号
+    ids: List[str]              # 分块ID（同时作为向量ID）
+    document_ids: List[str]
+    chunk_indices: List[int]    # 分块在文档中的序号
+    texts: List[str]
+    topics: np.ndarray          # 每个分块的主题
+    vectors: np.ndarray         # float32矩阵 [分块数, 维度]，已归一化
+
+
+@dataclass
+class BenchmarkQuery:
+    """带标注的基准查询"""
+    text: str
+    vector: np.ndarray
+    relevant_ids: List[str]     # 相关分块ID（生成查询时的目标分块）
+    topic: int
+
+
+class SyntheticCorpus:
+    """
+    合成分块语料
+
+    每个分块属于一个主题：文本一半取自主题词表、一半按Zipf分布取自全局词表；
+    嵌入为主题中心加随机扰动后归一化，同主题分块相近但彼此可区分。
+    分块按批次生成，每个批次有独立的随机数种子，因此可以只重建任意一个批次，
+    生成百万级语料时内存占用与批大小成正比。
+    """
+
+    def __init__(
+        self,
+        num_chunks: int,
+        dimension: int = 384,
+        seed: int = 42,
+        num_topics: Optional[int] = None,
+        vocab_size: int = 20_000,
+        topic_vocab_size: int = 64,
+        chunk_words: Tuple[int, int] = (40, 120),
+        chunks_per_document: int = 20,
+        spread: float = 1.0,
+        batch_size: int = 1000
+    ):
+        """
+        初始化合成语料
+
+        Args:
+            num_chunks: 分块数
+            dimension: 嵌入维度
+            seed: 随机种子
+            num_topics: 主题数（默认约为sqrt(分块数)/2）
+            vocab_size: 全局词表大小
+            topic_vocab_size: 每个主题的词表大小
+            chunk_words: 每个分块的词数范围 [最少, 最多)
+            chunks_per_document: 每个文档的分块数
+            spread: 分块嵌入相对主题中心的扰动幅度
+            batch_size: 生成批大小
+        """
+        self.num_chunks = num_chunks
+        self.dimension = dimension
+        self.seed = seed
+        self.num_topics = num_topics or max(8, int(np.sqrt(num_chunks) / 2))
+        self.chunk_words = chunk_words
+        self.chunks_per_document = chunks_per_document
+        self.spread = spread
+        self.batch_size = batch_size
+
+        rng = np.random.default_rng(seed)
+        self.vocabulary = _make_vocabulary(vocab_size, rng)
+        self.topic_words = rng.integers(0, vocab_size, (self.num_topics, topic_vocab_size))
+        self.centroids = _normalize(rng.standard_normal((self.num_topics, dimension)))
+
+        # 全局词表的Zipf分布（按累积概率抽样）
+        weights = 1.0 / np.arange(1, vocab_size + 1)
+        self._word_cdf = np.cumsum(weights / weights.sum())
+
+    def __len__(self) -> int:
+        return self.num_chunks
+
+    @property
+    def num_batches(self) -> int:
+        return -(-self.num_chunks // self.batch_size)
+
+    @property
+    def num_documents(self) -> int:
+        return -(-self.num_chunks // self.chunks_per_document)
+
+    def describe(self) -> Dict[str, int]:
+        """语料参数（写入基准结果，用于判断两次运行是否可比）"""
+        return {
+            'num_chunks': self.num_chunks,
+            'dimension': self.dimension,
+            'seed': self.seed,
+            'num_topics': self.num_topics,
+            'vocab_size': len(self.vocabulary),
+            'num_documents': self.num_documents,
+        }
+
+    @staticmethod
+    def chunk_id(index: int) -> str:
+        return f"chunk_{index:08d}"
+
+    def document_id(self, index: int) -> str:
+        return f"doc_{index // self.chunks_per_document:07d}"
+
+    def batch(self, batch_index: int) -> ChunkBatch:
+        """生成第batch_index个批次（确定性）"""
+        start = batch_index * self.batch_size
+        count = min(self.batch_size, self.num_chunks - start)
+        if count <= 0:
+            raise IndexError(f"批次超出范围: {batch_index}")
+
+        rng = np.random.default_rng((self.seed, batch_index))
+        topics = rng.integers(0, self.num_topics, count)
+
+        # 文本：主题词和全局词各占一半，打乱后拼接
+        low, high = self.chunk_words
+        lengths = rng.integers(low, high, count)
+        texts = []
+        for topic, length in zip(topics, lengths):
+            topic_count = length // 2
+            words = np.concatenate([
+                self.topic_words[topic][rng.integers(0, self.topic_words.shape[1], topic_count)],
+                np.searchsorted(self._word_cdf, rng.random(length - topic_count))
+            ])
+            rng.shuffle(words)
+            texts.append(' '.join(self.vocabulary[np.minimum(words, len(self.vocabulary) - 1)]))
+
+        # 嵌入：主题中心 + 扰动
+        noise = rng.standard_normal((count, self.dimension)).astype(np.float32)
+        noise *= self.spread / np.sqrt(self.dimension)
+        vectors = _normalize(self.centroids[topics] + noise)
+
+        indices = range(start, start + count)
+        return ChunkBatch(
+            start=start,
+            ids=[self.chunk_id(i) for i in indices],
+            document_ids=[self.document_id(i) for i in indices],
+            chunk_indices=[i % self.chunks_per_document for i in indices],
+            texts=texts,
+            topics=topics,
+            vectors=vectors
+        )
+
+    def iter_batches(self) -> Iterator[ChunkBatch]:
+        """按顺序生成全部批次"""
+        for batch_index in range(self.num_batches):
+            yield self.batch(batch_index)
+
+
+class QueryGenerator:
+    """
+    基准查询生成器
+
+    每条查询以一个随机分块为目标：查询文本为该分块中的若干个词，
+    查询向量为该分块的嵌入加小幅扰动。目标分块即标注的相关结果。
+    """
+
+    def __init__(
+        self,
+        corpus: SyntheticCorpus,
+        seed: int = 7,
+        noise: float = 0.35,
+        terms: Tuple[int, int] = (3, 7)
+    ):
+        """
+        初始化查询生成器
+
+        Args:
+            corpus: 合成语料
+            seed: 随机种子
+            noise: 查询向量相对目标分块嵌入的扰动幅度
+            terms: 查询词数范围 [最少, 最多)
+        """
+        self.corpus = corpus
+        self.seed = seed
+        self.noise = noise
+        self.terms = terms
+
+    def generate(self, count: int) -> List[BenchmarkQuery]:
+        """生成count条查询（确定性）"""
+        rng = np.random.default_rng((self.corpus.seed, self.seed))
+        targets = rng.integers(0, self.corpus.num_chunks, count)
+
+        # 按批次分组，每个批次只重建一次
+        by_batch: Dict[int, List[int]] = {}
+        for position, target in enumerate(targets):
+            by_batch.setdefault(int(target) // self.corpus.batch_size, []).append(position)
+
+        queries: List[Optional[BenchmarkQuery]] = [None] * count
+        for batch_index, positions in sorted(by_batch.items()):
+            batch = self.corpus.batch(batch_index)
+            for position in positions:
+                row = int(targets[position]) - batch.start
+                words = batch.texts[row].split()
+                distinct = list(dict.fromkeys(words))
+                term_count = min(len(distinct), int(rng.integers(*self.terms)))
+                picked = rng.choice(len(distinct), term_count, replace=False)
+
+                noise = rng.standard_normal(self.corpus.dimension).astype(np.float32)
+                noise *= self.noise / np.sqrt(self.corpus.dimension)
+
+                queries[position] = BenchmarkQuery(
+                    text=' '.join(distinct[i] for i in sorted(picked)),
+                    vector=_normalize(batch.vectors[row] + noise),
+                    relevant_ids=[batch.ids[row]],
+                    topic=int(batch.topics[row])
+                )
+
+        return queries
+
+
+class QueryEmbedder:
+    """
+    基准用的查询嵌入服务
+
+    已生成的查询直接返回其标注向量；其他文本（如HyDE的假设答案）
+    按文本哈希生成确定性的随机向量，不调用任何模型。
+    """
+
+    def __init__(self, queries: List[BenchmarkQuery], dimension: int):
+        self.dimension = dimension
+        self._vectors = {query.text: query.vector for query in queries}
+
+    def embed_query(self, text: str) -> np.ndarray:
+        vector = self._vectors.get(text)
+        if vector is None:
+            seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+            vector = _normalize(np.random.default_rng(seed).standard_normal(self.dimension))
+        return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_query(text)
@@ -0,0 +1,574 @@
+"""
+API负载生成器 - 在进程内通过ASGI传输驱动FastAPI应用（不经过网络）
+支持闭环（固定并发）和开环（泊松到达率）负载、查询/上传混合及模式混合，
+按时间间隔报告吞吐、延迟百分位和错误率，并可逐级加压找出各模式的饱和点；
+模式混合中每个请求由该模式的检索引擎处理（不切换系统模式），查询缓存默认关闭
+
+用法:
+    python benchmarks/loadgen.py --concurrency 16 --duration 30
+    python benchmarks/loadgen.py --rate 50 --upload-ratio 0.1 --modes efficiency:0.5,balanced:0.5
+    python benchmarks/loadgen.py --sweep 1,2,4,8,16,32 --output sweep.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field, asdict, replace
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# 项目结构初始化
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from monitoring.metrics import HdrHistogram
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# 报告的延迟百分位
+PERCENTILES = (50, 95, 99)
+
+# 逐级加压时，吞吐增幅低于该比例（或错误率超过ERROR_LIMIT）即视为饱和
+SATURATION_GAIN = 0.10
+ERROR_LIMIT = 0.01
+
+
+@dataclass
+class LoadProfile:
+    """负载配置"""
+    duration: float = 30.0              # 计时阶段时长（秒）
+    warmup: float = 5.0                 # 预热时长（秒，期间完成的请求不计入结果）
+    concurrency: int = 8                # 闭环：并发用户数
+    arrival_rate: Optional[float] = None  # 开环：平均到达率（请求/秒），设置后忽略concurrency
+    max_in_flight: int = 1000           # 开环：最多同时进行的请求数（超出的到达计为丢弃）
+    upload_ratio: float = 0.0           # 上传请求占比
+    mode_mix: Dict[str, float] = field(default_factory=lambda: {'balanced': 1.0})
+    top_k: int = 5
+    interval: float = 1.0               # 时间序列的统计间隔（秒）
+    timeout: float = 60.0               # 单个请求超时（秒）
+    seed: int = 42
+
+    @property
+    def open_loop(self) -> bool:
+        return self.arrival_rate is not None
+
+
+class _Stats:
+    """一组请求的流式统计"""
+
+    __slots__ = ('histogram', 'requests', 'errors')
+
+    def __init__(self):
+        self.histogram = HdrHistogram(max_seconds=600.0)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds: float, success: bool):
+        self.requests += 1
+        if success:
+            self.histogram.record(seconds)
+        else:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        percentiles = self.histogram.percentiles(PERCENTILES)
+        latency = {f"p{p}": value * 1000 for p, value in percentiles.items()}
+        latency['mean'] = self.histogram.mean * 1000
+        latency['max'] = self.histogram.max * 1000
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.errors / self.requests if self.requests else 0.0,
+            'throughput_rps': (self.requests - self.errors) / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': latency,
+        }
+
+
+class LoadRecorder:
+    """
+    负载结果记录器
+
+    按端点（query/<模式>、upload）和按时间间隔分别聚合，内存只与端点数和间隔数相关；
+    预热阶段结束前完成的请求不记录。事件循环单线程调用，无需加锁。
+    """
+
+    def __init__(self, start: float, warmup: float, interval: float):
+        """
+        初始化记录器
+
+        Args:
+            start: 负载开始时间（perf_counter）
+            warmup: 预热时长（秒）
+            interval: 时间序列的统计间隔（秒）
+        """
+        self.measure_start = start + warmup
+        self.interval = interval
+        self.total = _Stats()
+        self.endpoints: Dict[str, _Stats] = {}
+        self.timeline: Dict[int, _Stats] = {}
+        self.status_codes: Dict[str, int] = {}
+        self.dropped = 0
+
+    def record(self, endpoint: str, started: float, finished: float, status: str, success: bool):
+        """记录一个完成的请求"""
+        if finished < self.measure_start:
+            return
+        seconds = finished - started
+        self.total.record(seconds, success)
+        self.endpoints.setdefault(endpoint, _Stats()).record(seconds, success)
+        slot = int((finished - self.measure_start) // self.interval)
+        self.timeline.setdefault(slot, _Stats()).record(seconds, success)
+        self.status_codes[status] = self.status_codes.get(status, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """
+        生成报告
+
+        Args:
+            elapsed: 计时阶段的实际时长（秒）
+
+        Returns:
+            总体统计、按端点统计、状态码分布和时间序列
+        """
+        timeline = []
+        for slot in sorted(self.timeline):
+            stats = self.timeline[slot].summary(self.interval)
+            timeline.append({
+                't': round(slot * self.interval, 3),
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'throughput_rps': stats['throughput_rps'],
+                **{key: value for key, value in stats['latency_ms'].items() if key.startswith('p')},
+            })
+
+        return {
+            'elapsed_seconds': elapsed,
+            **self.total.summary(elapsed),
+            'dropped': self.dropped,
+            'endpoints': {
+                endpoint: stats.summary(elapsed)
+                for endpoint, stats in sorted(self.endpoints.items())
+            },
+            'status_codes': self.status_codes,
+            'timeline': timeline,
+        }
+
+
+class LoadGenerator:
+    """
+    进程内API负载生成器
+
+    闭环模式下每个虚拟用户收到响应后立即发出下一个请求，测量系统在固定并发下的吞吐；
+    开环模式按泊松过程产生到达，延迟从计划发出时间算起（不因服务变慢而少发请求），
+    能反映超过饱和点后排队造成的延迟增长。
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        queries: List[str],
+        documents: Optional[List[Tuple[str, bytes]]] = None,
+        profile: Optional[LoadProfile] = None
+    ):
+        """
+        初始化负载生成器
+
+        Args:
+            app: ASGI应用（create_app的返回值）
+            queries: 查询文本池
+            documents: 上传文档池 [(文件名, 内容)]
+            profile: 负载配置
+        """
+        if not HTTPX_AVAILABLE:
+            raise RuntimeError("负载生成器需要httpx: pip install httpx")
+        if not queries:
+            raise ValueError("查询文本池为空")
+
+        self.app = app
+        self.queries = queries
+        self.documents = documents or []
+        self.profile = profile or LoadProfile()
+
+        if self.profile.upload_ratio > 0 and not self.documents:
+            raise ValueError("上传占比大于0但上传文档池为空")
+
+        modes = list(self.profile.mode_mix)
+        self._modes = modes
+        self._mode_weights = [self.profile.mode_mix[mode] for mode in modes]
+        self._upload_count = 0
+
+    def _next_request(self, rng: random.Random) -> Tuple[str, str, Dict[str, Any]]:
+        """按工作负载混合比例抽取下一个请求（端点名, 路径, 请求参数）"""
+        mode = rng.choices(self._modes, self._mode_weights)[0]
+
+        if self.documents and rng.random() < self.profile.upload_ratio:
+            name, content = rng.choice(self.documents)
+            # 每次上传使用不同的文件名，避免被摄取清单当作重复文档跳过
+            self._upload_count += 1
+            filename = f"{Path(name).stem}_{self._upload_count:06d}{Path(name).suffix}"
+            return 'upload', '/api/v1/documents/upload', {
+                'params': {'mode': mode},
+                'files': {'file': (filename, content, 'text/plain')},
+            }
+
+        return f"query/{mode}", '/api/v1/query', {
+            'json': {
+                'query': rng.choice(self.queries),
+                'top_k': self.profile.top_k,
+                'mode': mode,
+            }
+        }
+
+    async def _issue(
+        self,
+        client: Any,
+        recorder: LoadRecorder,
+        rng: random.Random,
+        scheduled: float
+    ):
+        """发出一个请求并记录结果"""
+        endpoint, path, kwargs = self._next_request(rng)
+        try:
+            response = await client.post(path, **kwargs)
+            status = str(response.status_code)
+            success = response.status_code < 400
+        except Exception as e:
+            status = type(e).__name__
+            success = False
+        recorder.record(endpoint, scheduled, time.perf_counter(), status, success)
+
+    async def _closed_loop(self, client: Any, recorder: LoadRecorder, rng: random.Random, deadline: float):
+        """闭环负载：concurrency个虚拟用户各自串行发请求"""
+        async def user():
+            while time.perf_counter() < deadline:
+                await self._issue(client, recorder, rng, time.perf_counter())
+
+        await asyncio.gather(*(user() for _ in range(self.profile.concurrency)))
+
+    async def _open_loop(
+        self,
+        client: Any,
+        recorder: LoadRecorder,
+        rng: random.Random,
+        start: float,
+        deadline: float
+    ):
+        """开环负载：按泊松过程产生到达，不等待前一个请求完成"""
+        in_flight = set()
+        scheduled = start
+        while True:
+            scheduled += rng.expovariate(self.profile.arrival_rate)
+            if scheduled >= deadline:
+                break
+
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if len(in_flight) >= self.profile.max_in_flight:
+                if scheduled >= recorder.measure_start:
+                    recorder.dropped += 1
+                continue
+
+            task = asyncio.create_task(self._issue(client, recorder, rng, scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        运行一次负载
+
+        Returns:
+            负载报告（含配置）
+        """
+        profile = self.profile
+        rng = random.Random(profile.seed)
+        transport = httpx.ASGITransport(app=self.app)
+
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://wheel",
+            timeout=profile.timeout
+        ) as client:
+            start = time.perf_counter()
+            deadline = start + profile.warmup + profile.duration
+            recorder = LoadRecorder(start, profile.warmup, profile.interval)
+
+            if profile.open_loop:
+                await self._open_loop(client, recorder, rng, start, deadline)
+            else:
+                await self._closed_loop(client, recorder, rng, deadline)
+
+            elapsed = time.perf_counter() - recorder.measure_start
+
+        return {
+            'loop': 'open' if profile.open_loop else 'closed',
+            'profile': asdict(profile),
+            **recorder.report(elapsed),
+        }
+
+
+def find_saturation(points: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    从逐级加压的结果中找出饱和点
+
+    Args:
+        points: 按负载等级升序的结果 [{level, throughput_rps, error_rate, ...}]
+
+    Returns:
+        {level, throughput_rps, p99_ms}：吞吐不再明显增长（或开始出错）前的最后一个等级
+    """
+    saturated = None
+    for previous, current in zip(points, points[1:]):
+        gain = (
+            (current['throughput_rps'] - previous['throughput_rps']) / previous['throughput_rps']
+            if previous['throughput_rps'] else 0.0
+        )
+        if gain < SATURATION_GAIN or current['error_rate'] > ERROR_LIMIT:
+            saturated = previous
+            break
+
+    if saturated is None and points:
+        saturated = points[-1]
+    if saturated is None:
+        return {}
+    return {
+        'level': saturated['level'],
+        'throughput_rps': saturated['throughput_rps'],
+        'p99_ms': saturated['p99_ms'],
+        'reached': saturated is not points[-1],
+    }
+
+
+async def sweep(
+    app: Any,
+    queries: List[str],
+    documents: List[Tuple[str, bytes]],
+    profile: LoadProfile,
+    levels: List[float]
+) -> Dict[str, Any]:
+    """
+    对每种模式逐级加压
+
+    闭环时等级为并发数，开环时为到达率；每个等级单独运行一次完整的预热和计时。
+
+    Args:
+        app: ASGI应用
+        queries: 查询文本池
+        documents: 上传文档池
+        profile: 基础负载配置（mode_mix中的每种模式分别加压）
+        levels: 负载等级（升序）
+
+    Returns:
+        {模式: {points, saturation}}
+    """
+    results = {}
+    for mode in profile.mode_mix:
+        points = []
+        for level in levels:
+            if profile.open_loop:
+                level_profile = replace(profile, mode_mix={mode: 1.0}, arrival_rate=float(level))
+            else:
+                level_profile = replace(profile, mode_mix={mode: 1.0}, concurrency=int(level))
+
+            report = await LoadGenerator(app, queries, documents, level_profile).run()
+            points.append({
+                'level': level,
+                'throughput_rps': report['throughput_rps'],
+                'error_rate': report['error_rate'],
+                'dropped': report['dropped'],
+                **{f"{key}_ms": value for key, value in report['latency_ms'].items()},
+            })
+            logger.info(
+                f"{mode} @ {level}: {report['throughput_rps']:.1f} rps, "
+                f"p99 {report['latency_ms']['p99']:.1f}ms"
+            )
+
+        results[mode] = {'points': points, 'saturation': find_saturation(points)}
+    return results
+
+
+# ============ 命令行 ============
+
+def _build_workload(
+    num_queries: int,
+    num_documents: int,
+    seed: int
+) -> Tuple[List[str], List[Tuple[str, bytes]], List[Tuple[str, bytes]]]:
+    """由合成语料生成查询池、预加载文档和上传文档池"""
+    from benchmarks.corpus import SyntheticCorpus, QueryGenerator
+
+    corpus = SyntheticCorpus(num_documents * 2 * 20, dimension=8, seed=seed, chunks_per_document=20)
+
+    documents = []
+    for batch in corpus.iter_batches():
+        by_document: Dict[str, List[str]] = {}
+        for doc_id, text in zip(batch.document_ids, batch.texts):
+            by_document.setdefault(doc_id, []).append(text)
+        for doc_id, texts in by_document.items():
+            documents.append((f"{doc_id}.txt", "\n\n".join(texts).encode('utf-8')))
+
+    queries = [query.text for query in QueryGenerator(corpus, seed=seed + 1).generate(num_queries)]
+
+    # 前一半文档预先摄取（查询有内容可检索），后一半作为上传负载
+    return queries, documents[:num_documents], documents[num_documents:]
+
+
+def _print_report(report: Dict[str, Any]):
+    """打印单次负载报告"""
+    latency = report['latency_ms']
+    print(
+        f"\n[{report['loop']}] {report['requests']} 请求 / {report['elapsed_seconds']:.1f}s: "
+        f"{report['throughput_rps']:.1f} rps, 错误率 {report['error_rate']:.2%}, 丢弃 {report['dropped']}"
+    )
+    print(f"  延迟: p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  p99 {latency['p99']:.1f}ms")
+    for endpoint, stats in report['endpoints'].items():
+        print(
+            f"  {endpoint:<20} {stats['requests']:>6} 请求  {stats['throughput_rps']:>7.1f} rps  "
+            f"p99 {stats['latency_ms']['p99']:>8.1f}ms  错误率 {stats['error_rate']:.2%}"
+        )
+    print("  时间序列:")
+    for point in report['timeline']:
+        print(
+            f"    t={point['t']:>6.1f}s  {point['throughput_rps']:>7.1f} rps  "
+            f"p99 {point['p99']:>8.1f}ms  错误 {point['errors']}"
+        )
+
+
+def _print_sweep(results: Dict[str, Any], open_loop: bool):
+    """打印逐级加压结果"""
+    unit = "rps到达" if open_loop else "并发"
+    for mode, result in results.items():
+        print(f"\n[{mode}]")
+        for point in result['points']:
+            print(
+                f"  {unit} {point['level']:>6}  {point['throughput_rps']:>7.1f} rps  "
+                f"p50 {point['p50_ms']:>8.1f}ms  p99 {point['p99_ms']:>8.1f}ms  "
+                f"错误率 {point['error_rate']:.2%}"
+            )
+        saturation = result['saturation']
+        if saturation:
+            label = "饱和点" if saturation['reached'] else "未饱和，最高等级"
+            print(
+                f"  {label}: {unit} {saturation['level']}, "
+                f"{saturation['throughput_rps']:.1f} rps, p99 {saturation['p99_ms']:.1f}ms"
+            )
+
+
+def _parse_mode_mix(spec: str) -> Dict[str, float]:
+    """解析模式混合比例（如 efficiency:0.5,balanced:0.5）"""
+    from core.modes import ProcessingMode
+
+    mix = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition(':')
+        mix[ProcessingMode(name.strip()).value] = float(weight) if weight else 1.0
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="Wheel API负载生成器")
+    parser.add_argument("--duration", type=float, default=30.0, help="计时阶段时长（秒）")
+    parser.add_argument("--warmup", type=float, default=5.0, help="预热时长（秒）")
+    parser.add_argument("--concurrency", type=int, default=8, help="闭环并发用户数")
+    parser.add_argument("--rate", type=float, default=None, help="开环到达率（请求/秒）")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--upload-ratio", type=float, default=0.0, help="上传请求占比")
+    parser.add_argument("--modes", default="balanced", help="模式混合，如 efficiency:0.5,balanced:0.5")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=1.0, help="时间序列统计间隔（秒）")
+    parser.add_argument("--sweep", default=None, help="逐级加压的负载等级（并发数或到达率），逗号分隔")
+    parser.add_argument("--queries", type=int, default=500, help="查询文本池大小")
+    parser.add_argument("--documents", type=int, default=20, help="预先摄取的文档数")
+    parser.add_argument("--cache", action="store_true", help="开启查询缓存（默认关闭，避免测到缓存命中）")
+    parser.add_argument("--ingest-workers", type=int, default=0, help="摄取工作池大小（0为上传只入队）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="结果JSON文件")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from wheel1 import WheelSystem, WheelSystemConfig
+
+    profile = LoadProfile(
+        duration=args.duration,
+        warmup=args.warmup,
+        concurrency=args.concurrency,
+        arrival_rate=args.rate,
+        max_in_flight=args.max_in_flight,
+        upload_ratio=args.upload_ratio,
+        mode_mix=_parse_mode_mix(args.modes),
+        top_k=args.top_k,
+        interval=args.interval,
+        seed=args.seed
+    )
+
+    work_dir = Path(tempfile.mkdtemp(prefix="wheel_loadgen_"))
+    system = WheelSystem(WheelSystemConfig(
+        vector_db_type="local",
+        data_dir=str(work_dir / "data"),
+        enable_cache=args.cache,
+        ingest_workers=args.ingest_workers,
+        ingest_use_processes=False
+    ))
+
+    try:
+        queries, preload, uploads = _build_workload(args.queries, args.documents, args.seed)
+
+        # 预先摄取部分文档，使查询有内容可检索
+        docs_dir = work_dir / "docs"
+        docs_dir.mkdir()
+        for name, content in preload:
+            path = docs_dir / name
+            path.write_bytes(content)
+            system.process_document(str(path), {'source_key': name})
+
+        # ASGI传输不触发应用的生命周期事件，工作池在这里启动
+        app = system.create_api_app()
+        system.start_ingest_workers()
+
+        if args.sweep:
+            levels = sorted(float(level) for level in args.sweep.split(',') if level.strip())
+            if not profile.open_loop:
+                levels = [int(level) for level in levels]
+            results = asyncio.run(sweep(app, queries, uploads, profile, levels))
+            _print_sweep(results, profile.open_loop)
+            output = {'sweep': results, 'profile': asdict(profile)}
+        else:
+            output = asyncio.run(LoadGenerator(app, queries, uploads, profile).run())
+            _print_report(output)
+
+        if args.output:
+            Path(args.output).write_text(json.dumps(output, indent=2, ensure_ascii=False))
+            print(f"\n结果已写入: {args.output}")
+    finally:
+        system.stop_ingest_workers()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
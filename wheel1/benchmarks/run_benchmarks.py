@@ -0,0 +1,528 @@
+"""
+检索基准测试 - 在合成语料上测量摄取吞吐、索引构建时间、查询延迟分布、并发吞吐和内存占用
+结果输出为JSON，可与上一次运行的结果对比以发现性能回退
+
+用法:
+    python benchmarks/run_benchmarks.py --sizes 10k,100k --output results.json
+    python benchmarks/run_benchmarks.py --sizes 10k --compare baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# 项目结构初始化
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.corpus import (
+    SyntheticCorpus, QueryGenerator, QueryEmbedder, BenchmarkQuery, parse_size
+)
+from core.engine import RetrievalEngine
+from core.modes import ProcessingMode
+from storage.cache import CacheManager
+from storage.chunk_store import ChunkTextStore
+from storage.database import DatabaseConnector
+from storage.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# 结果格式版本（字段含义变化时递增，对比时版本不同则拒绝）
+RESULT_VERSION = 1
+
+# 延迟百分位
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class BenchmarkConfig:
+    """基准测试配置"""
+    sizes: List[str] = field(default_factory=lambda: ['10k'])
+    backends: List[str] = field(default_factory=lambda: ['local'])
+    modes: List[str] = field(default_factory=lambda: [mode.value for mode in ProcessingMode])
+    dimension: int = 384
+    seed: int = 42
+    num_queries: int = 200          # 计时的单查询数
+    warmup_queries: int = 20        # 预热查询数（不计时）
+    concurrency: int = 8            # 并发吞吐阶段的线程数
+    top_k: int = 10
+    prefix_dimension: Optional[int] = 256  # 粗排前缀维度（大于等于完整维度时不使用）
+    postgres_host: Optional[str] = None    # 指定时全文索引使用PostgreSQL，否则使用本地SQLite
+    postgres_port: int = 5432
+    work_dir: Optional[str] = None
+
+
+def percentile_summary(values_ms: List[float]) -> Dict[str, float]:
+    """延迟分布摘要（毫秒）"""
+    if not values_ms:
+        return {}
+    values = np.asarray(values_ms)
+    summary = {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+    summary['mean'] = float(values.mean())
+    summary['max'] = float(values.max())
+    return summary
+
+
+def _rss_bytes() -> int:
+    """当前进程的常驻内存"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def _file_bytes(path: Path) -> int:
+    """SQLite数据库文件（含WAL）占用的字节数"""
+    return sum(
+        candidate.stat().st_size
+        for candidate in (path, path.with_name(path.name + '-wal'))
+        if candidate.exists()
+    )
+
+
+def _environment() -> Dict[str, Any]:
+    """运行环境（对比结果时用于判断是否同一硬件）"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def ingest_corpus(
+    corpus: SyntheticCorpus,
+    vector_store: VectorStore,
+    db: DatabaseConnector,
+    chunk_store: ChunkTextStore
+) -> Dict[str, Any]:
+    """
+    摄取合成语料：按批写入向量索引、全文索引和分块文本存储，分别计时
+
+    Args:
+        corpus: 合成语料
+        vector_store: 向量存储
+        db: 数据库连接（全文索引）
+        chunk_store: 分块文本存储
+
+    Returns:
+        摄取吞吐和各索引的构建耗时
+    """
+    timings = {'vector': 0.0, 'fulltext': 0.0, 'text_store': 0.0}
+    generate_seconds = 0.0
+
+    db.insert_documents([
+        {
+            'document_id': f"doc_{index:07d}",
+            'source_file': f"synthetic/doc_{index:07d}.txt",
+            'mode': 'benchmark',
+            'chunk_count': corpus.chunks_per_document,
+            'processed_at': datetime.now().isoformat()
+        }
+        for index in range(corpus.num_documents)
+    ])
+
+    start = time.perf_counter()
+    for batch in corpus.iter_batches():
+        generated = time.perf_counter()
+        generate_seconds += generated - start
+
+        vector_store.add_vectors(
+            batch.ids,
+            batch.vectors,
+            [
+                {'document_id': doc_id, 'chunk_index': index, 'source': f"synthetic/{doc_id}.txt"}
+                for doc_id, index in zip(batch.document_ids, batch.chunk_indices)
+            ]
+        )
+        vectors_done = time.perf_counter()
+
+        db.insert_chunks(
+            [
+                {
+                    'chunk_id': chunk_id,
+                    'document_id': doc_id,
+                    'vector_id': chunk_id,
+                    'chunk_index': index,
+                    'level': None,
+                    'parent_id': None,
+                    'text': text
+                }
+                for chunk_id, doc_id, index, text in zip(
+                    batch.ids, batch.document_ids, batch.chunk_indices, batch.texts
+                )
+            ],
+            bulk=True
+        )
+        fulltext_done = time.perf_counter()
+
+        chunk_store.put_many(zip(batch.ids, batch.texts))
+        start = time.perf_counter()
+
+        timings['vector'] += vectors_done - generated
+        timings['fulltext'] += fulltext_done - vectors_done
+        timings['text_store'] += start - fulltext_done
+
+    total = sum(timings.values())
+    return {
+        'chunks': len(corpus),
+        'seconds': total,
+        'chunks_per_second': len(corpus) / total if total else 0.0,
+        'index_build_seconds': timings,
+        'corpus_generation_seconds': generate_seconds,
+    }
+
+
+class RetrievalBenchmark:
+    """检索基准测试运行器"""
+
+    def __init__(self, config: BenchmarkConfig):
+        """
+        初始化基准测试
+
+        Args:
+            config: 基准测试配置
+        """
+        self.config = config
+
+    def run(self) -> Dict[str, Any]:
+        """运行全部规模 × 后端 × 模式的组合"""
+        runs = []
+        for size in self.config.sizes:
+            for backend in self.config.backends:
+                logger.info(f"基准测试: {size} 分块, 后端 {backend}")
+                try:
+                    runs.append(self.run_one(size, backend))
+                except Exception as e:
+                    logger.error(f"基准测试失败 ({size}, {backend}): {e}")
+                    runs.append({'size': size, 'backend': backend, 'error': str(e)})
+
+        return {
+            'benchmark': 'wheel-retrieval',
+            'version': RESULT_VERSION,
+            'environment': _environment(),
+            'config': asdict(self.config),
+            'runs': runs,
+        }
+
+    def run_one(self, size: str, backend: str) -> Dict[str, Any]:
+        """在一个语料规模和向量后端上运行全部阶段"""
+        config = self.config
+        work_dir = Path(tempfile.mkdtemp(prefix="wheel_bench_", dir=config.work_dir))
+
+        try:
+            # 语料和查询（生成时间单独记录，不计入摄取）
+            start = time.perf_counter()
+            corpus = SyntheticCorpus(parse_size(size), dimension=config.dimension, seed=config.seed)
+            queries = QueryGenerator(corpus, seed=config.seed + 1).generate(
+                config.warmup_queries + config.num_queries
+            )
+            query_seconds = time.perf_counter() - start
+
+            prefix_dimension = config.prefix_dimension
+            if prefix_dimension is not None and prefix_dimension >= config.dimension:
+                prefix_dimension = None
+
+            rss_before = _rss_bytes()
+            vector_store = VectorStore(
+                backend=backend,
+                dimension=config.dimension,
+                prefix_dimension=prefix_dimension
+            )
+            db = DatabaseConnector(
+                host=config.postgres_host or "localhost",
+                port=config.postgres_port,
+                local_path=str(work_dir / "fulltext.db"),
+                use_postgres=config.postgres_host is not None
+            )
+            chunk_store = ChunkTextStore(str(work_dir / "chunk_text.db"))
+
+            ingest = ingest_corpus(corpus, vector_store, db, chunk_store)
+            ingest['query_generation_seconds'] = query_seconds
+
+            memory = {
+                'rss_delta_mb': (_rss_bytes() - rss_before) / 1024 ** 2,
+                'chunk_store_mb': _file_bytes(work_dir / "chunk_text.db") / 1024 ** 2,
+                'fulltext_mb': _file_bytes(work_dir / "fulltext.db") / 1024 ** 2,
+            }
+            if hasattr(vector_store.backend, 'memory_bytes'):
+                memory['vector_index_mb'] = vector_store.backend.memory_bytes() / 1024 ** 2
+
+            embedder = QueryEmbedder(queries, config.dimension)
+            modes = {}
+            for mode in config.modes:
+                engine = RetrievalEngine(
+                    mode=ProcessingMode(mode),
+                    vector_store=vector_store,
+                    cache=CacheManager(enabled=False),
+                    db=db,
+                    embedding_service=embedder,
+                    chunk_store=chunk_store
+                )
+                modes[mode] = self._query_phases(engine, queries)
+
+            db.close()
+            chunk_store.close()
+
+            return {
+                'size': size,
+                'backend': backend,
+                'fulltext_backend': 'postgres' if db.pool is not None else 'sqlite-fts5',
+                'corpus': corpus.describe(),
+                'ingest': ingest,
+                'memory': memory,
+                'modes': modes,
+            }
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _query_phases(self, engine: RetrievalEngine, queries: List[BenchmarkQuery]) -> Dict[str, Any]:
+        """查询阶段：预热、单查询延迟、并发吞吐"""
+        config = self.config
+        warmup, timed = queries[:config.warmup_queries], queries[config.warmup_queries:]
+
+        for query in warmup:
+            engine.retrieve(query.text, top_k=config.top_k)
+
+        latencies = []
+        hits = 0
+        errors = 0
+        for query in timed:
+            start = time.perf_counter()
+            response = engine.retrieve(query.text, top_k=config.top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if 'error' in response:
+                errors += 1
+                continue
+            returned = {result['id'] for result in response['results']}
+            hits += any(relevant in returned for relevant in query.relevant_ids)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+            list(executor.map(
+                lambda query: engine.retrieve(query.text, top_k=config.top_k),
+                timed
+            ))
+        batch_seconds = time.perf_counter() - start
+
+        return {
+            'strategy': engine.strategy.value,
+            'queries': len(timed),
+            'errors': errors,
+            'latency_ms': percentile_summary(latencies),
+            'throughput_qps': len(timed) / batch_seconds if batch_seconds else 0.0,
+            'concurrency': config.concurrency,
+            f'hit_rate_at_{config.top_k}': hits / len(timed) if timed else 0.0,
+        }
+
+
+# ============ 结果对比 ============
+
+# (指标路径, 越大越好)
+COMPARED_METRICS = (
+    (('ingest', 'chunks_per_second'), True),
+    (('memory', 'rss_delta_mb'), False),
+)
+COMPARED_MODE_METRICS = (
+    (('latency_ms', 'p50'), False),
+    (('latency_ms', 'p95'), False),
+    (('latency_ms', 'p99'), False),
+    (('throughput_qps',), True),
+)
+
+
+def _lookup(data: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data if isinstance(data, (int, float)) else None
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 0.10
+) -> List[Dict[str, Any]]:
+    """
+    对比两次基准结果
+
+    Args:
+        baseline: 基线结果
+        current: 本次结果
+        tolerance: 允许的相对变化（超过则视为回退）
+
+    Returns:
+        变化列表 [{size, backend, mode, metric, baseline, current, change, regression}]
+    """
+    if baseline.get('version') != current.get('version'):
+        raise ValueError(
+            f"结果格式版本不同，无法对比: {baseline.get('version')} != {current.get('version')}"
+        )
+
+    baseline_runs = {
+        (run['size'], run['backend']): run for run in baseline.get('runs', []) if 'error' not in run
+    }
+
+    changes = []
+
+    def record(run, mode, path, higher_is_better, old, new):
+        if old is None or new is None or old == 0:
+            return
+        change = (new - old) / old
+        changes.append({
+            'size': run['size'],
+            'backend': run['backend'],
+            'mode': mode,
+            'metric': '.'.join(path),
+            'baseline': old,
+            'current': new,
+            'change': change,
+            'regression': (change < -tolerance) if higher_is_better else (change > tolerance),
+        })
+
+    for run in current.get('runs', []):
+        previous = baseline_runs.get((run['size'], run['backend']))
+        if previous is None or 'error' in run:
+            continue
+
+        for path, higher_is_better in COMPARED_METRICS:
+            record(run, None, path, higher_is_better, _lookup(previous, path), _lookup(run, path))
+
+        for mode, stats in run.get('modes', {}).items():
+            previous_stats = previous.get('modes', {}).get(mode)
+            if previous_stats is None:
+                continue
+            for path, higher_is_better in COMPARED_MODE_METRICS:
+                record(
+                    run, mode, path, higher_is_better,
+                    _lookup(previous_stats, path), _lookup(stats, path)
+                )
+
+    return changes
+
+
+def _print_summary(results: Dict[str, Any]):
+    """打印结果摘要"""
+    for run in results['runs']:
+        if 'error' in run:
+            print(f"[{run['size']} / {run['backend']}] 失败: {run['error']}")
+            continue
+
+        ingest = run['ingest']
+        print(f"\n[{run['size']} / {run['backend']} / {run['fulltext_backend']}]")
+        print(
+            f"  摄取: {ingest['chunks_per_second']:.0f} chunks/s "
+            f"(向量 {ingest['index_build_seconds']['vector']:.2f}s, "
+            f"全文 {ingest['index_build_seconds']['fulltext']:.2f}s, "
+            f"文本 {ingest['index_build_seconds']['text_store']:.2f}s)"
+        )
+        print(f"  内存: RSS +{run['memory']['rss_delta_mb']:.1f}MB")
+        for mode, stats in run['modes'].items():
+            latency = stats['latency_ms']
+            hit_rate = next(value for key, value in stats.items() if key.startswith('hit_rate'))
+            print(
+                f"  {mode:<10} p50 {latency['p50']:.2f}ms  p95 {latency['p95']:.2f}ms  "
+                f"p99 {latency['p99']:.2f}ms  {stats['throughput_qps']:.1f} qps  "
+                f"命中率 {hit_rate:.1%}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="Wheel检索基准测试")
+    parser.add_argument("--sizes", default="10k", help="语料规模，逗号分隔（10k, 100k, 1m或分块数）")
+    parser.add_argument("--backends", default="local", help="向量存储后端，逗号分隔")
+    parser.add_argument(
+        "--modes", default=",".join(mode.value for mode in ProcessingMode),
+        help="处理模式，逗号分隔"
+    )
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--queries", type=int, default=200, help="计时的查询数")
+    parser.add_argument("--warmup", type=int, default=20, help="预热查询数")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--postgres-host", default=None, help="全文索引使用的PostgreSQL主机")
+    parser.add_argument("--work-dir", default=None, help="临时数据目录")
+    parser.add_argument("--output", default=None, help="结果JSON文件")
+    parser.add_argument("--compare", default=None, help="对比的基线结果JSON文件")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="回退判定的相对变化阈值")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = BenchmarkConfig(
+        sizes=[size.strip() for size in args.sizes.split(',') if size.strip()],
+        backends=[backend.strip() for backend in args.backends.split(',') if backend.strip()],
+        modes=[ProcessingMode(mode.strip()).value for mode in args.modes.split(',') if mode.strip()],
+        dimension=args.dimension,
+        seed=args.seed,
+        num_queries=args.queries,
+        warmup_queries=args.warmup,
+        concurrency=args.concurrency,
+        top_k=args.top_k,
+        postgres_host=args.postgres_host,
+        work_dir=args.work_dir
+    )
+
+    results = RetrievalBenchmark(config).run()
+    _print_summary(results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"\n结果已写入: {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        changes = compare_results(baseline, results, args.tolerance)
+        regressions = [change for change in changes if change['regression']]
+        print(f"\n与基线对比: {len(changes)} 项指标, {len(regressions)} 项回退")
+        for change in regressions:
+            print(
+                f"  回退 [{change['size']}/{change['backend']}/{change['mode'] or '-'}] "
+                f"{change['metric']}: {change['baseline']:.3f} -> {change['current']:.3f} "
+                f"({change['change']:+.1%})"
+            )
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+检索质量评估 - 对各模式 × 检索策略测量recall@k、MRR、nDCG和延迟，输出Pareto表
+默认在合成语料（标注为查询的目标分块）上运行，也可指定标注集在已摄取的数据上运行；
+指定基线时检查质量回退，超出允许范围以非零退出码返回
+
+用法:
+    python benchmarks/run_evaluation.py --size 10k --output eval.json
+    python benchmarks/run_evaluation.py --size 10k --baseline eval.json
+    python benchmarks/run_evaluation.py --eval-set labeled_queries.jsonl
+"""
+
+import argparse
+import logging
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+# 项目结构初始化
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.corpus import SyntheticCorpus, QueryGenerator, QueryEmbedder, parse_size
+from benchmarks.run_benchmarks import ingest_corpus, _environment
+from core.engine import RetrievalStrategy
+from core.modes import ProcessingMode
+from monitoring.evaluation import (
+    RetrievalEvaluator, EvaluationQuery, load_evaluation_set, format_pareto_table,
+    check_quality_guardrail, save_evaluation, load_evaluation
+)
+from storage.chunk_store import ChunkTextStore
+from storage.database import DatabaseConnector
+from storage.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def evaluate_synthetic(
+    size: str,
+    num_queries: int,
+    modes: List[ProcessingMode],
+    strategies: List[RetrievalStrategy],
+    k_values: List[int],
+    dimension: int = 384,
+    seed: int = 42,
+    prefix_dimension: Optional[int] = 256
+):
+    """在合成语料上评估（每次运行独立建索引，结束后删除；前缀维度与基准测试一致）"""
+    work_dir = Path(tempfile.mkdtemp(prefix="wheel_eval_"))
+    try:
+        corpus = SyntheticCorpus(parse_size(size), dimension=dimension, seed=seed)
+        generated = QueryGenerator(corpus, seed=seed + 1).generate(num_queries)
+
+        if prefix_dimension is not None and prefix_dimension >= dimension:
+            prefix_dimension = None
+        vector_store = VectorStore(
+            backend="local", dimension=dimension, prefix_dimension=prefix_dimension
+        )
+        db = DatabaseConnector(local_path=str(work_dir / "fulltext.db"), use_postgres=False)
+        chunk_store = ChunkTextStore(str(work_dir / "chunk_text.db"))
+        ingest_corpus(corpus, vector_store, db, chunk_store)
+
+        evaluator = RetrievalEvaluator(
+            vector_store,
+            db,
+            embedding_service=QueryEmbedder(generated, dimension),
+            chunk_store=chunk_store,
+            k_values=k_values
+        )
+        queries = [
+            EvaluationQuery(query.text, {chunk_id: 1.0 for chunk_id in query.relevant_ids})
+            for query in generated
+        ]
+        rows = evaluator.evaluate(queries, modes, strategies)
+
+        db.close()
+        chunk_store.close()
+        return rows, corpus.describe()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="Wheel检索质量评估")
+    parser.add_argument("--size", default="10k", help="合成语料规模（10k, 100k, 1m或分块数）")
+    parser.add_argument("--queries", type=int, default=200, help="合成查询数")
+    parser.add_argument("--eval-set", default=None, help="标注集JSONL（在系统已摄取的数据上评估）")
+    parser.add_argument(
+        "--modes", default=",".join(mode.value for mode in ProcessingMode),
+        help="处理模式，逗号分隔"
+    )
+    parser.add_argument(
+        "--strategies", default=",".join(strategy.value for strategy in RetrievalStrategy),
+        help="检索策略，逗号分隔"
+    )
+    parser.add_argument("--k", default="1,5,10", help="截断位置，逗号分隔")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--prefix-dimension", type=int, default=256,
+        help="粗排前缀维度（0为不建前缀索引，各模式均按完整维度搜索）"
+    )
+    parser.add_argument("--output", default=None, help="结果JSON文件")
+    parser.add_argument("--baseline", default=None, help="基线结果JSON（检查质量回退）")
+    parser.add_argument("--max-drop", type=float, default=0.01, help="允许的质量指标绝对下降量")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    modes = [ProcessingMode(mode.strip()) for mode in args.modes.split(',') if mode.strip()]
+    strategies = [
+        RetrievalStrategy(strategy.strip()) for strategy in args.strategies.split(',') if strategy.strip()
+    ]
+    k_values = sorted(int(k) for k in args.k.split(',') if k.strip())
+
+    if args.eval_set:
+        from wheel1 import WheelSystem
+        system = WheelSystem()
+        rows = system.evaluate(load_evaluation_set(args.eval_set), modes, strategies, k_values)
+        dataset = {'eval_set': args.eval_set}
+    else:
+        rows, dataset = evaluate_synthetic(
+            args.size, args.queries, modes, strategies, k_values, args.dimension, args.seed,
+            args.prefix_dimension or None
+        )
+
+    print(format_pareto_table(rows, k_values))
+    print("\n* Pareto最优（没有其他组合质量更高且延迟更低）")
+
+    if args.output:
+        save_evaluation(rows, args.output, {'environment': _environment(), 'dataset': dataset})
+        print(f"\n结果已写入: {args.output}")
+
+    if args.baseline:
+        metrics = [f'recall@{k_values[-1]}', f'ndcg@{k_values[-1]}', 'mrr']
+        violations = check_quality_guardrail(
+            load_evaluation(args.baseline), rows, metrics, args.max_drop
+        )
+        print(f"\n质量护栏: {len(violations)} 项回退 (允许下降 {args.max_drop})")
+        for violation in violations:
+            print(
+                f"  [{violation['mode']}/{violation['strategy']}] {violation['metric']}: "
+                f"{violation['baseline']:.3f} -> {violation['current']:.3f}"
+            )
+        return 1 if violations else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,420 +1,601 @@
-"""
-检索引擎 - 支持多种检索策略
-包括向量检索、BM25、混合检索、重排等
-"""
-
-import logging
-import time
-from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass
-from enum import Enum
-from core.modes import ProcessingMode, ModeConfig
-logger = logging.getLogger(__name__)
-
-
-@dataclass
-class RetrievalResult:
-    """检索结果"""
-    rank: int
-    doc_id: str
-    text: str
-    score: float
-    source: str
-    metadata: Dict[str, Any]
-class RetrievalStrategy(str, Enum):
-    """检索策略"""
-    BM25_ONLY = "bm25_only"
-    VECTOR_ONLY = "vector_only"
-    HYBRID = "hybrid"
-    ADVANCED_RAG = "advanced_rag"
-class RetrievalEngine:
-    """检索引擎"""
-
-    def __init__(
-        self,
-        mode: ProcessingMode,
-        vector_store: Any,
-        cache: Any,
-        db: Any
-    ):
-        """
-        初始化检索引擎
-        
-        Args:
-            mode: 处理模式
-            vector_store: 向量存储
-            cache: 缓存管理器
-            db: 数据库连接
-        """
-        self.mode = mode
-        self.config = ModeConfig.get_config(mode)
-        self.vector_store = vector_store
-        self.cache = cache
-        self.db = db
-        
-        # 根据配置初始化检索策略
-        retrieval_config = self.config['retrieval']
-        self.strategy = RetrievalStrategy(retrieval_config['strategy'])
-        
-        logger.info(f"初始化检索引擎 - 模式: {mode.value}, 策略: {self.strategy.value}")
-    
-    def retrieve(
-        self,
-        query_text: str,
-        top_k: int = 5,
-        use_reranking: Optional[bool] = None,
-        explain: bool = False
-    ) -> Dict[str, Any]:
-        """
-        执行检索
-        
-        Args:
-            query_text: 查询文本
-            top_k: 返回结果数
-            use_reranking: 是否使用重排（None为按配置）
-            explain: 是否返回推理过程
-        
-        Returns:
-            检索结果
-        """
-        start_time = time.time()
-        
-        # 检查缓存
-        cache_key = self._get_cache_key(query_text, top_k)
-        cached_result = self.cache.get(cache_key)
-        if cached_result:
-            logger.info(f"命中缓存: {query_text[:30]}...")
-            cached_result['from_cache'] = True
-            return cached_result
-        
-        try:
-            # 使用缓存设置的重排选项
-            if use_reranking is None:
-                use_reranking = self.config['processing'].get('use_reranking', False)
-            
-            # 根据策略执行检索
-            if self.strategy == RetrievalStrategy.BM25_ONLY:
-                results = self._retrieve_bm25(query_text, top_k)
-            
-            elif self.strategy == RetrievalStrategy.VECTOR_ONLY:
-                results = self._retrieve_vector(query_text, top_k)
-            
-            elif self.strategy == RetrievalStrategy.HYBRID:
-                results = self._retrieve_hybrid(query_text, top_k)
-            
-            elif self.strategy == RetrievalStrategy.ADVANCED_RAG:
-                results = self._retrieve_advanced_rag(query_text, top_k)
-            
-            else:
-                results = self._retrieve_hybrid(query_text, top_k)
-            
-            # 重排（如配置）
-            if use_reranking and len(results) > 0:
-                results = self._rerank_results(query_text, results)
-            
-            # 构建返回结果
-            latency = time.time() - start_time
-            
-            response = {
-                'query': query_text,
-                'results': results,
-                'count': len(results),
-                'latency_ms': latency * 1000,
-                'strategy': self.strategy.value,
-                'mode': self.mode.value,
-                'from_cache': False
-            }
-            
-            if explain:
-                response['explanation'] = self._generate_explanation(
-                    query_text, results, latency
-                )
-            
-            # 存储到缓存
-            self.cache.set(cache_key, response, ttl=3600)
-            
-            logger.info(
-                f"检索完成: {len(results)} 结果 (延迟: {latency*1000:.1f}ms)"
-            )
-            
-            return response
-        
-        except Exception as e:
-            logger.error(f"检索失败: {e}")
-            return {
-                'query': query_text,
-                'results': [],
-                'error': str(e),
-                'mode': self.mode.value
-            }
-    
-    def _retrieve_bm25(
-        self,
-        query_text: str,
-        top_k: int
-    ) -> List[Dict[str, Any]]:
-        """BM25 关键词检索"""
-        logger.debug(f"执行BM25检索: {query_text[:50]}...")
-        
-        # 分词和BM25评分
-        results = self.db.bm25_search(query_text, top_k)
-        
-        return [
-            {
-                'rank': i + 1,
-                'text': r['text'],
-                'score': r['score'],
-                'source': r['source'],
-                'metadata': r.get('metadata', {})
-            }
-            for i, r in enumerate(results)
-        ]
-    
-    def _retrieve_vector(
-        self,
-        query_text: str,
-        top_k: int
-    ) -> List[Dict[str, Any]]:
-        """向量相似度检索"""
-        logger.debug(f"执行向量检索: {query_text[:50]}...")
-        
-        # 对查询进行嵌入
-        query_embedding = self.vector_store.embed_query(query_text)
-        
-        # 向量相似度搜索
-        similarity_threshold = self.config['retrieval'].get('similarity_threshold', 0.5)
-        results = self.vector_store.search(
-            query_embedding,
-            top_k=top_k,
-            threshold=similarity_threshold
-        )
-        
-        return [
-            {
-                'rank': i + 1,
-                'text': r['text'],
-                'score': r['similarity'],
-                'source': r['source'],
-                'metadata': r.get('metadata', {})
-            }
-            for i, r in enumerate(results)
-        ]
-    
-    def _retrieve_hybrid(
-        self,
-        query_text: str,
-        top_k: int
-    ) -> List[Dict[str, Any]]:
-        """混合检索（向量 + BM25）"""
-        logger.debug(f"执行混合检索: {query_text[:50]}...")
-        
-        # 并行执行两种检索
-        bm25_results = self._retrieve_bm25(query_text, top_k * 2)  # 获取更多候选
-        vector_results = self._retrieve_vector(query_text, top_k * 2)
-        
-        # 融合结果（权重默认各50%）
-        merged = self._merge_results(
-            bm25_results,
-            vector_results,
-            weights=[0.5, 0.5]
-        )
-        
-        # 按融合分数排序并取top-k
-        merged = sorted(merged, key=lambda x: x['score'], reverse=True)[:top_k]
-        
-        # 重新排名
-        for i, result in enumerate(merged):
-            result['rank'] = i + 1
-        
-        return merged
-    
-    def _retrieve_advanced_rag(
-        self,
-        query_text: str,
-        top_k: int
-    ) -> List[Dict[str, Any]]:
-        """
-        高级RAG检索
-        - HyDE（假设型提问）
-        - 知识图谱检索
-        - 多步推理
-        - 自洽性检查
-        """
-        logger.debug(f"执行高级RAG检索: {query_text[:50]}...")
-        
-        # 1. 混合检索基础结果
-        results = self._retrieve_hybrid(query_text, top_k)
-        
-        # 2. HyDE增强：生成假设答案进行检索
-        if self.config['retrieval'].get('hyde', False):
-            hypothetical_results = self._hyde_retrieval(query_text, top_k)
-            results = self._merge_results(results, hypothetical_results, [0.7, 0.3])
-        
-        # 3. 知识图谱检索（如可用）
-        if self.config['retrieval'].get('knowledge_graph', False):
-            kg_results = self._knowledge_graph_retrieval(query_text, top_k)
-            results = self._merge_results(results, kg_results, [0.8, 0.2])
-        
-        # 4. 重排确保高质量
-        results = self._rerank_results(query_text, results)
-        
-        # 5. 自洽性检查（多步验证）
-        if self.config['retrieval'].get('self_consistency', False):
-            results = self._verify_consistency(results)
-        
-        return results[:top_k]
-    
-    def _merge_results(
-        self,
-        results1: List[Dict[str, Any]],
-        results2: List[Dict[str, Any]],
-        weights: List[float] = [0.5, 0.5]
-    ) -> List[Dict[str, Any]]:
-        """
-        融合两组检索结果
-        根据文本ID和权重计算融合分数
-        """
-        # 创建结果映射
-        merged = {}
-        
-        for result in results1:
-            key = result['text'][:100]  # 使用文本前100字符作为key
-            merged[key] = {
-                'text': result['text'],
-                'source': result['source'],
-                'metadata': result['metadata'],
-                'score': result['score'] * weights[0]
-            }
-        
-        for result in results2:
-            key = result['text'][:100]
-            if key in merged:
-                merged[key]['score'] += result['score'] * weights[1]
-            else:
-                merged[key] = {
-                    'text': result['text'],
-                    'source': result['source'],
-                    'metadata': result['metadata'],
-                    'score': result['score'] * weights[1]
-                }
-        
-        return list(merged.values())
-    
-    def _rerank_results(
-        self,
-        query_text: str,
-        results: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
-        """
-        使用重排模型重新评分和排序
-        """
-        if not results:
-            return results
-        
-        # 使用cross-encoder重排
-        # 这里使用mock实现，实际应调用cross-encoder模型
-        
-        reranked = []
-        for i, result in enumerate(results):
-            # 计算相关性分数
-            relevance_score = self._compute_relevance(query_text, result['text'])
-            result['rerank_score'] = relevance_score
-            reranked.append(result)
-        
-        # 按重排分数排序
-        reranked = sorted(reranked, key=lambda x: x['rerank_score'], reverse=True)
-        
-        # 更新rank
-        for i, result in enumerate(reranked):
-            result['rank'] = i + 1
-        
-        return reranked
-    
-    def _compute_relevance(self, query: str, text: str) -> float:
-        """计算查询和文本的相关性（简单实现）"""
-        # 实际应使用cross-encoder模型
-        query_tokens = set(query.lower().split())
-        text_tokens = set(text.lower().split())
-        
-        if not query_tokens or not text_tokens:
-            return 0.0
-        
-        intersection = len(query_tokens & text_tokens)
-        union = len(query_tokens | text_tokens)
-        
-        return intersection / union if union > 0 else 0.0
-    
-    def _hyde_retrieval(
-        self,
-        query_text: str,
-        top_k: int
-    ) -> List[Dict[str, Any]]:
-        """
-        HyDE (Hypothetical Document Embeddings) 检索
-        生成假设答案，以该答案的嵌入进行检索
-        """
-        logger.debug("执行HyDE检索...")
-        
-        # 这里应调用LLM生成假设答案
-        # 本示例中使用mock实现
-        
-        hypothetical_answer = f"关于'{query_text}'的详细解答..."
-        
-        # 对假设答案进行检索
-        return self._retrieve_vector(hypothetical_answer, top_k)
-    
-    def _knowledge_graph_retrieval(
-        self,
-        query_text: str,
-        top_k: int
-    ) -> List[Dict[str, Any]]:
-        """知识图谱检索"""
-        logger.debug("执行知识图谱检索...")
-        
-        # 从知识图谱中检索相关实体和关系
-        # 本示例为mock实现
-        
-        return []  # 实际应返回从KG检索的结果
-    
-    def _verify_consistency(
-        self,
-        results: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
-        """
-        验证结果的一致性
-        多步验证确保高置信度
-        """
-        logger.debug("验证结果一致性...")
-        
-        # 在这里可以添加自洽性检查的逻辑
-        # 例如：多轮提问验证、概念一致性检查等
-        
-        return results
-    
-    def _generate_explanation(
-        self,
-        query: str,
-        results: List[Dict[str, Any]],
-        latency: float
-    ) -> str:
-        """生成检索过程的说明"""
-        explanation = f"""
-        查询: {query}
-        检索策略: {self.strategy.value}
-        处理模式: {self.mode.value}
-        返回结果数: {len(results)}
-        检索延迟: {latency*1000:.1f}ms
-        
-        检索过程:
-        1. 查询预处理和嵌入
-        2. {self.strategy.value.upper()} 检索
-        3. 结果重排和过滤
-        4. 最终排序和返回
-        """
-        return explanation
-    
-    def _get_cache_key(self, query: str, top_k: int) -> str:
-        """生成缓存键"""
-        import hashlib
-        key_str = f"{self.mode.value}:{query}:{top_k}"
-        return hashlib.md5(key_str.encode()).hexdigest()
+"""
+检索引擎 - 支持多种检索策略
+包括向量检索、BM25、混合检索、重排等
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from operator import attrgetter
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from enum import Enum
+from core.modes import ProcessingMode, ModeConfig
+from monitoring.tracing import Tracer, span, traced
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RetrievalResult:
+    """检索结果（响应时由候选物化，每个最终结果只构建一次）"""
+    rank: int
+    doc_id: str
+    text: str
+    score: float
+    source: str
+    metadata: Dict[str, Any]
+    id: Optional[str] = None
+    rerank_score: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为响应字典（不深拷贝元数据）"""
+        result = {
+            'rank': self.rank,
+            'id': self.id,
+            'doc_id': self.doc_id,
+            'text': self.text,
+            'score': self.score,
+            'source': self.source,
+            'metadata': self.metadata
+        }
+        if self.rerank_score is not None:
+            result['rerank_score'] = self.rerank_score
+        return result
+
+
+class Candidate:
+    """
+    检索候选
+    
+    在检索、融合、重排各阶段之间传递，只携带分块ID、分数和对后端结果记录的引用，
+    不复制文本和元数据；文本在需要时（重排或最终结果）才取回。
+    """
+    
+    __slots__ = ('id', 'score', 'rerank_score', 'text', 'record')
+    
+    def __init__(
+        self,
+        id: Optional[str],
+        score: float,
+        record: Dict[str, Any],
+        text: Optional[str] = None
+    ):
+        self.id = id                    # 分块ID（无法归属到分块时为向量ID）
+        self.score = score              # 检索/融合分数
+        self.rerank_score: Optional[float] = None
+        self.text = (record.get('text') or '') if text is None else text
+        self.record = record            # 后端返回的原始结果（只读）
+    
+    @property
+    def key(self) -> str:
+        """融合键：分块ID，缺失时退回文本前100字符"""
+        return self.id or self.text[:100]
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.record.get('metadata') or {}
+    
+    def __repr__(self) -> str:
+        return f"Candidate(id={self.id!r}, score={self.score:.4f})"
+
+
+class RetrievalStrategy(str, Enum):
+    """检索策略"""
+    BM25_ONLY = "bm25_only"
+    VECTOR_ONLY = "vector_only"
+    HYBRID = "hybrid"
+    ADVANCED_RAG = "advanced_rag"
+class RetrievalEngine:
+    """检索引擎"""
+
+    def __init__(
+        self,
+        mode: ProcessingMode,
+        vector_store: Any,
+        cache: Any,
+        db: Any,
+        embedding_service: Optional[Any] = None,
+        chunk_store: Optional[Any] = None,
+        tracer: Optional[Tracer] = None
+    ):
+        """
+        初始化检索引擎
+        
+        Args:
+            mode: 处理模式
+            vector_store: 向量存储
+            cache: 缓存管理器
+            db: 数据库连接
+            embedding_service: 嵌入服务（查询嵌入按查询优先级调度，None时由向量存储生成）
+            chunk_store: 分块文本存储（向量元数据不含文本时按ID取回完整文本）
+            tracer: 追踪器（None时只追踪强制追踪的请求）
+        """
+        self.mode = mode
+        self.config = ModeConfig.get_config(mode)
+        self.vector_store = vector_store
+        self.cache = cache
+        self.db = db
+        self.embedding_service = embedding_service
+        self.chunk_store = chunk_store
+        self.tracer = tracer or Tracer()
+        
+        # 阶段耗时观察者：(模式, 阶段, 秒)，由监控导出器设置
+        self.stage_observer: Optional[Callable[[str, str, float], None]] = None
+        
+        # 查询结果缓存命中统计
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # 根据配置初始化检索策略
+        retrieval_config = self.config['retrieval']
+        self.strategy = RetrievalStrategy(retrieval_config['strategy'])
+        
+        logger.info(f"初始化检索引擎 - 模式: {mode.value}, 策略: {self.strategy.value}")
+    
+    def switch_mode(self, new_mode: ProcessingMode):
+        """切换处理模式（同时切换该模式的检索配置和策略）"""
+        self.mode = new_mode
+        self.config = ModeConfig.get_config(new_mode)
+        self.strategy = RetrievalStrategy(self.config['retrieval']['strategy'])
+        logger.info(f"检索引擎切换模式: {new_mode.value}, 策略: {self.strategy.value}")
+    
+    def retrieve(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        use_reranking: Optional[bool] = None,
+        explain: bool = False,
+        trace: bool = False
+    ) -> Dict[str, Any]:
+        """
+        执行检索
+        
+        Args:
+            query_text: 查询文本
+            top_k: 返回结果数
+            use_reranking: 是否使用重排（None为按配置）
+            explain: 是否返回推理过程
+            trace: 强制追踪本次检索，并在结果的trace字段返回各阶段的span树
+        
+        Returns:
+            检索结果
+        """
+        with self.tracer.trace(
+            'retrieve',
+            force=trace,
+            mode=self.mode.value,
+            strategy=self.strategy.value,
+            top_k=top_k
+        ) as root:
+            response = self._retrieve(query_text, top_k, use_reranking, explain)
+        
+        if trace and root is not None:
+            # 响应可能已写入（本地）缓存，附加追踪时不修改原字典
+            response = {**response, 'trace': root.to_dict()}
+        return response
+    
+    def _retrieve(
+        self,
+        query_text: str,
+        top_k: int,
+        use_reranking: Optional[bool],
+        explain: bool
+    ) -> Dict[str, Any]:
+        """执行检索（retrieve的实现）"""
+        start_time = time.perf_counter()
+        
+        # 未指定时使用模式配置的重排选项
+        if use_reranking is None:
+            use_reranking = self.config['processing'].get('use_reranking', False)
+        
+        # 检查缓存（重排与否的结果分别缓存）
+        cache_key = self._get_cache_key(query_text, top_k, use_reranking)
+        with span('cache_lookup') as lookup:
+            cached_result = self.cache.get(cache_key)
+            if lookup is not None:
+                lookup.set(hit=bool(cached_result))
+        if cached_result:
+            self.cache_hits += 1
+            logger.info(f"命中缓存: {query_text[:30]}...")
+            cached_result['from_cache'] = True
+            return cached_result
+        self.cache_misses += 1
+        
+        try:
+            # 根据策略执行检索
+            if self.strategy == RetrievalStrategy.BM25_ONLY:
+                results = self._retrieve_bm25(query_text, top_k)
+            
+            elif self.strategy == RetrievalStrategy.VECTOR_ONLY:
+                results = self._retrieve_vector(query_text, top_k)
+            
+            elif self.strategy == RetrievalStrategy.HYBRID:
+                results = self._retrieve_hybrid(query_text, top_k)
+            
+            elif self.strategy == RetrievalStrategy.ADVANCED_RAG:
+                results = self._retrieve_advanced_rag(query_text, top_k)
+            
+            else:
+                results = self._retrieve_hybrid(query_text, top_k)
+            
+            # 重排（如配置）
+            if use_reranking and len(results) > 0:
+                results = self._rerank_results(query_text, results)
+            
+            # 只为最终结果取回完整文本并物化
+            with self._stage('fetch_text'):
+                results = self._materialize(self._attach_text(results))
+            
+            # 构建返回结果
+            latency = time.perf_counter() - start_time
+            
+            response = {
+                'query': query_text,
+                'results': [result.to_dict() for result in results],
+                'count': len(results),
+                'latency_ms': latency * 1000,
+                'strategy': self.strategy.value,
+                'mode': self.mode.value,
+                'from_cache': False
+            }
+            
+            if explain:
+                response['explanation'] = self._generate_explanation(
+                    query_text, results, latency
+                )
+            
+            # 存储到缓存
+            self.cache.set(cache_key, response, ttl=3600)
+            
+            logger.info(
+                f"检索完成: {len(results)} 结果 (延迟: {latency*1000:.1f}ms)"
+            )
+            
+            return response
+        
+        except Exception as e:
+            logger.error(f"检索失败: {e}")
+            return {
+                'query': query_text,
+                'results': [],
+                'error': str(e),
+                'mode': self.mode.value
+            }
+    
+    @contextmanager
+    def _stage(self, stage: str) -> Iterator[None]:
+        """记录一个检索阶段的span，并向观察者报告耗时（未设置观察者时不计时）"""
+        observer = self.stage_observer
+        with span(stage):
+            if observer is None:
+                yield
+                return
+            
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                observer(self.mode.value, stage, time.perf_counter() - start)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取查询结果缓存统计"""
+        return {
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
+        }
+    
+    @traced('retrieve_bm25')
+    def _retrieve_bm25(
+        self,
+        query_text: str,
+        top_k: int
+    ) -> List[Candidate]:
+        """BM25 关键词检索（结果自带完整文本）"""
+        logger.debug(f"执行BM25检索: {query_text[:50]}...")
+        
+        # 分词和BM25评分
+        with self._stage('bm25'):
+            results = self.db.bm25_search(query_text, top_k)
+        
+        # 与向量检索结果按分块ID融合
+        return [Candidate(r.get('id'), r['score'], r) for r in results]
+    
+    @traced('retrieve_vector')
+    def _retrieve_vector(
+        self,
+        query_text: str,
+        top_k: int
+    ) -> List[Candidate]:
+        """向量相似度检索"""
+        logger.debug(f"执行向量检索: {query_text[:50]}...")
+        
+        # 对查询进行嵌入
+        with self._stage('embed'):
+            if self.embedding_service is not None:
+                query_embedding = self.embedding_service.embed_query(query_text)
+            else:
+                query_embedding = self.vector_store.embed_query(query_text)
+        
+        # 向量相似度搜索
+        retrieval_config = self.config['retrieval']
+        with self._stage('vector'):
+            results = self.vector_store.search(
+                query_embedding,
+                top_k=top_k,
+                threshold=retrieval_config.get('similarity_threshold', 0.5),
+                search_dimension=retrieval_config.get('search_dimension'),
+                rescore_factor=retrieval_config.get('rescore_factor', 4)
+            )
+        
+        with self._stage('attribute'):
+            return self._attribute(results, top_k)
+    
+    def _attribute(self, results: List[Dict[str, Any]], top_k: int) -> List[Candidate]:
+        """
+        将向量命中展开为引用该向量的各个分块
+        
+        去重后内容相同（或近似）的分块共享一个向量，向量元数据只记录首次产生它的分块；
+        按分块表取回每个引用分块自身的文本、文档和来源。
+        分块表中查不到的向量按向量元数据返回，文本由_attach_text取回。
+        """
+        chunks = self.db.get_chunks_by_vector(r['id'] for r in results) if results else {}
+        
+        candidates = []
+        for r in results:
+            records = chunks.get(r['id'])
+            if not records:
+                candidates.append(Candidate(r['id'], r['similarity'], r))
+            for record in records or ():
+                candidates.append(Candidate(record['id'], r['similarity'], record))
+            if len(candidates) >= top_k:
+                break
+        return candidates[:top_k]
+    
+    @traced('retrieve_hybrid')
+    def _retrieve_hybrid(
+        self,
+        query_text: str,
+        top_k: int
+    ) -> List[Candidate]:
+        """混合检索（向量 + BM25）"""
+        logger.debug(f"执行混合检索: {query_text[:50]}...")
+        
+        # 并行执行两种检索
+        bm25_results = self._retrieve_bm25(query_text, top_k * 2)  # 获取更多候选
+        vector_results = self._retrieve_vector(query_text, top_k * 2)
+        
+        with self._stage('fusion'):
+            # 融合结果（权重默认各50%）
+            merged = self._merge_results(
+                bm25_results,
+                vector_results,
+                weights=[0.5, 0.5]
+            )
+            
+            # 按融合分数排序并取top-k（排名在物化时确定）
+            return sorted(merged, key=attrgetter('score'), reverse=True)[:top_k]
+    
+    @traced('retrieve_advanced_rag')
+    def _retrieve_advanced_rag(
+        self,
+        query_text: str,
+        top_k: int
+    ) -> List[Candidate]:
+        """
+        高级RAG检索
+        - HyDE（假设型提问）
+        - 知识图谱检索
+        - 多步推理
+        - 自洽性检查
+        """
+        logger.debug(f"执行高级RAG检索: {query_text[:50]}...")
+        
+        # 1. 混合检索基础结果
+        results = self._retrieve_hybrid(query_text, top_k)
+        
+        # 2. HyDE增强：生成假设答案进行检索
+        if self.config['retrieval'].get('hyde', False):
+            hypothetical_results = self._hyde_retrieval(query_text, top_k)
+            results = self._merge_results(results, hypothetical_results, [0.7, 0.3])
+        
+        # 3. 知识图谱检索（如可用）
+        if self.config['retrieval'].get('knowledge_graph', False):
+            kg_results = self._knowledge_graph_retrieval(query_text, top_k)
+            results = self._merge_results(results, kg_results, [0.8, 0.2])
+        
+        # 4. 重排确保高质量
+        results = self._rerank_results(query_text, results)
+        
+        # 5. 自洽性检查（多步验证）
+        if self.config['retrieval'].get('self_consistency', False):
+            results = self._verify_consistency(results)
+        
+        return results[:top_k]
+    
+    @traced('merge_results')
+    def _merge_results(
+        self,
+        results1: List[Candidate],
+        results2: List[Candidate],
+        weights: List[float] = [0.5, 0.5]
+    ) -> List[Candidate]:
+        """
+        融合两组检索结果
+        按分块ID合并，根据权重计算融合分数
+        """
+        merged: Dict[str, Candidate] = {}
+        
+        for candidate in results1:
+            merged[candidate.key] = Candidate(
+                candidate.id, candidate.score * weights[0], candidate.record, candidate.text
+            )
+        
+        for candidate in results2:
+            existing = merged.get(candidate.key)
+            if existing is not None:
+                existing.score += candidate.score * weights[1]
+                # 关键词检索结果自带完整文本，向量检索结果可能为空
+                if not existing.text and candidate.text:
+                    existing.text = candidate.text
+                    existing.record = candidate.record
+            else:
+                merged[candidate.key] = Candidate(
+                    candidate.id, candidate.score * weights[1], candidate.record, candidate.text
+                )
+        
+        return list(merged.values())
+    
+    def _attach_text(self, candidates: List[Candidate]) -> List[Candidate]:
+        """为缺少文本的候选从分块文本存储批量取回完整文本"""
+        if self.chunk_store is None:
+            return candidates
+        
+        # 分块文本按向量ID存储
+        missing = [
+            c.metadata.get('vector_id') or c.id for c in candidates if not c.text and c.id
+        ]
+        if missing:
+            texts = self.chunk_store.get_many(missing)
+            for candidate in candidates:
+                if not candidate.text and candidate.id:
+                    candidate.text = texts.get(
+                        candidate.metadata.get('vector_id') or candidate.id, ''
+                    )
+        
+        return candidates
+    
+    @staticmethod
+    def _materialize(candidates: List[Candidate]) -> List[RetrievalResult]:
+        """将最终候选物化为检索结果"""
+        results = []
+        for rank, candidate in enumerate(candidates, 1):
+            metadata = candidate.metadata
+            record = candidate.record
+            results.append(RetrievalResult(
+                rank=rank,
+                doc_id=metadata.get('document_id', ''),
+                text=candidate.text,
+                score=candidate.score,
+                source=record.get('source') or metadata.get('source', ''),
+                metadata=metadata,
+                id=candidate.id,
+                rerank_score=candidate.rerank_score
+            ))
+        return results
+    
+    @traced('rerank_results')
+    def _rerank_results(
+        self,
+        query_text: str,
+        results: List[Candidate]
+    ) -> List[Candidate]:
+        """
+        使用重排模型重新评分和排序
+        """
+        if not results:
+            return results
+        
+        # 重排模型需要完整文本
+        with self._stage('fetch_text'):
+            results = self._attach_text(results)
+        
+        # 使用cross-encoder重排
+        # 这里使用mock实现，实际应调用cross-encoder模型
+        with self._stage('rerank'):
+            for candidate in results:
+                # 计算相关性分数
+                candidate.rerank_score = self._compute_relevance(query_text, candidate.text)
+            
+            # 按重排分数排序
+            return sorted(results, key=attrgetter('rerank_score'), reverse=True)
+    
+    def _compute_relevance(self, query: str, text: str) -> float:
+        """计算查询和文本的相关性（简单实现）"""
+        # 实际应使用cross-encoder模型
+        query_tokens = set(query.lower().split())
+        text_tokens = set(text.lower().split())
+        
+        if not query_tokens or not text_tokens:
+            return 0.0
+        
+        intersection = len(query_tokens & text_tokens)
+        union = len(query_tokens | text_tokens)
+        
+        return intersection / union if union > 0 else 0.0
+    
+    @traced('hyde')
+    def _hyde_retrieval(
+        self,
+        query_text: str,
+        top_k: int
+    ) -> List[Candidate]:
+        """
+        HyDE (Hypothetical Document Embeddings) 检索
+        生成假设答案，以该答案的嵌入进行检索
+        """
+        logger.debug("执行HyDE检索...")
+        
+        # 这里应调用LLM生成假设答案
+        # 本示例中使用mock实现
+        
+        hypothetical_answer = f"关于'{query_text}'的详细解答..."
+        
+        # 对假设答案进行检索
+        return self._retrieve_vector(hypothetical_answer, top_k)
+    
+    @traced('knowledge_graph')
+    def _knowledge_graph_retrieval(
+        self,
+        query_text: str,
+        top_k: int
+    ) -> List[Candidate]:
+        """知识图谱检索"""
+        logger.debug("执行知识图谱检索...")
+        
+        # 从知识图谱中检索相关实体和关系
+        # 本示例为mock实现
+        
+        return []  # 实际应返回从KG检索的结果
+    
+    def _verify_consistency(
+        self,
+        results: List[Candidate]
+    ) -> List[Candidate]:
+        """
+        验证结果的一致性
+        多步验证确保高置信度
+        """
+        logger.debug("验证结果一致性...")
+        
+        # 在这里可以添加自洽性检查的逻辑
+        # 例如：多轮提问验证、概念一致性检查等
+        
+        return results
+    
+    def _generate_explanation(
+        self,
+        query: str,
+        results: List[RetrievalResult],
+        latency: float
+    ) -> str:
+        """生成检索过程的说明"""
+        explanation = f"""
+        查询: {query}
+        检索策略: {self.strategy.value}
+        处理模式: {self.mode.value}
+        返回结果数: {len(results)}
+        检索延迟: {latency*1000:.1f}ms
+        
+        检索过程:
+        1. 查询预处理和嵌入
+        2. {self.strategy.value.upper()} 检索
+        3. 结果重排和过滤
+        4. 最终排序和返回
+        """
+        return explanation
+    
+    def _get_cache_key(self, query: str, top_k: int, use_reranking: bool) -> str:
+        """生成缓存键"""
+        import hashlib
+        key_str = f"{self.mode.value}:{self.strategy.value}:{int(use_reranking)}:{query}:{top_k}"
+        return hashlib.md5(key_str.encode()).hexdigest()
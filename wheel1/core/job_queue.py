@@ -0,0 +1,635 @@
+"""
+摄取任务队列 - 基于SQLite的持久化后台任务队列
+支持多工作进程、任务进度、失败重试（指数退避）和按模式的并发限制
+"""
+
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable
+
+from core.modes import ProcessingMode
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """任务状态"""
+    QUEUED = "queued"          # 等待执行（含等待重试）
+    RUNNING = "running"        # 执行中
+    SUCCEEDED = "succeeded"    # 成功
+    FAILED = "failed"          # 重试耗尽后失败
+
+
+class JobQueue:
+    """
+    SQLite任务队列
+
+    每个进程各自打开连接；任务通过租约领取，租约过期（工作进程崩溃）的任务
+    会被其他工作进程重新领取，尝试次数已用尽的则标记为失败。
+    同一来源标识（即同一文档）的任务不会同时执行。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        mode TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        source_key TEXT NOT NULL,
+        metadata TEXT NOT NULL,
+        delete_after INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL,
+        progress REAL NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        result TEXT,
+        error TEXT,
+        worker_id TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        available_at REAL NOT NULL,
+        lease_expires_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, available_at);
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 60.0,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0
+    ):
+        """
+        初始化任务队列
+
+        Args:
+            path: SQLite数据库文件路径
+            lease_seconds: 任务租约时长（工作进程需在到期前续约）
+            backoff_base: 重试退避基数（秒）
+            backoff_max: 重试退避上限（秒）
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def enqueue(
+        self,
+        file_path: str,
+        mode: ProcessingMode,
+        metadata: Optional[Dict[str, Any]] = None,
+        max_attempts: int = 3,
+        delete_after: bool = False
+    ) -> str:
+        """
+        提交摄取任务
+
+        Args:
+            file_path: 文档文件路径
+            mode: 处理模式
+            metadata: 文档元数据
+            max_attempts: 最大尝试次数
+            delete_after: 任务结束（成功或最终失败）后删除文件
+
+        Returns:
+            任务ID
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (job_id, mode, file_path, source_key, metadata, delete_after,
+                                  status, max_attempts, created_at, updated_at, available_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id,
+                    ProcessingMode(mode).value,
+                    file_path,
+                    (metadata or {}).get('source_key', file_path),
+                    json.dumps(metadata or {}, ensure_ascii=False, default=str),
+                    int(delete_after),
+                    JobStatus.QUEUED.value,
+                    max_attempts,
+                    now,
+                    now,
+                    now
+                )
+            )
+
+        logger.info(f"摄取任务入队: {job_id} ({file_path}, 模式: {ProcessingMode(mode).value})")
+        return job_id
+
+    def claim(
+        self,
+        worker_id: str,
+        mode_limits: Optional[Dict[str, int]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        领取一个可执行的任务
+
+        Args:
+            worker_id: 工作进程标识
+            mode_limits: 每种模式同时运行的任务上限
+
+        Returns:
+            任务字典，无可执行任务时返回None
+        """
+        now = time.time()
+        mode_limits = mode_limits or {}
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = self._fail_exhausted_leases(now)
+                running = {
+                    row['mode']: row['count']
+                    for row in self._conn.execute(
+                        """
+                        SELECT mode, COUNT(*) AS count FROM jobs
+                        WHERE status = ? AND lease_expires_at > ?
+                        GROUP BY mode
+                        """,
+                        (JobStatus.RUNNING.value, now)
+                    )
+                }
+                saturated = [
+                    mode for mode, limit in mode_limits.items()
+                    if running.get(mode, 0) >= limit
+                ]
+                exclude = (
+                    f"AND mode NOT IN ({', '.join('?' * len(saturated))})" if saturated else ""
+                )
+
+                # 同一文档已有任务在执行时跳过该文档的其他任务
+                row = self._conn.execute(
+                    f"""
+                    SELECT * FROM jobs
+                    WHERE ((status = ? AND available_at <= ?)
+                           OR (status = ? AND lease_expires_at <= ?))
+                    AND source_key NOT IN (
+                        SELECT source_key FROM jobs WHERE status = ? AND lease_expires_at > ?
+                    )
+                    {exclude}
+                    ORDER BY available_at
+                    LIMIT 1
+                    """,
+                    (
+                        JobStatus.QUEUED.value, now, JobStatus.RUNNING.value, now,
+                        JobStatus.RUNNING.value, now, *saturated
+                    )
+                ).fetchone()
+
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    _delete_files(expired)
+                    return None
+
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, attempts = attempts + 1, worker_id = ?,
+                                    lease_expires_at = ?, updated_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (
+                        JobStatus.RUNNING.value,
+                        worker_id,
+                        now + self.lease_seconds,
+                        now,
+                        row['job_id']
+                    )
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        _delete_files(expired)
+        job = self._to_dict(row)
+        job['attempts'] += 1
+        job['status'] = JobStatus.RUNNING.value
+        job['worker_id'] = worker_id
+        return job
+
+    def _fail_exhausted_leases(self, now: float) -> List[str]:
+        """
+        将租约过期且尝试次数已用尽的任务标记为失败（调用方持有锁和事务）
+
+        Returns:
+            需要删除的临时文件路径
+        """
+        rows = self._conn.execute(
+            """
+            SELECT job_id, file_path, delete_after FROM jobs
+            WHERE status = ? AND lease_expires_at <= ? AND attempts >= max_attempts
+            """,
+            (JobStatus.RUNNING.value, now)
+        ).fetchall()
+        if not rows:
+            return []
+
+        error = "任务租约过期（工作进程可能已崩溃），尝试次数已用尽"
+        self._conn.executemany(
+            """
+            UPDATE jobs SET status = ?, error = ?, lease_expires_at = NULL, updated_at = ?
+            WHERE job_id = ?
+            """,
+            ((JobStatus.FAILED.value, error, now, row['job_id']) for row in rows)
+        )
+        for row in rows:
+            logger.error(f"摄取任务最终失败: {row['job_id']} - {error}")
+        return [row['file_path'] for row in rows if row['delete_after']]
+
+    def heartbeat(self, job_id: str, progress: Optional[float] = None):
+        """续约任务租约并更新进度"""
+        now = time.time()
+        with self._lock:
+            if progress is None:
+                self._conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+                    "WHERE job_id = ? AND status = ?",
+                    (now + self.lease_seconds, now, job_id, JobStatus.RUNNING.value)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ?, updated_at = ?, progress = ? "
+                    "WHERE job_id = ? AND status = ?",
+                    (now + self.lease_seconds, now, progress, job_id, JobStatus.RUNNING.value)
+                )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """标记任务成功"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, progress = 1.0, result = ?, error = NULL,
+                                lease_expires_at = NULL, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (
+                    JobStatus.SUCCEEDED.value,
+                    json.dumps(result, ensure_ascii=False, default=str),
+                    time.time(),
+                    job_id
+                )
+            )
+
+    def fail(self, job_id: str, error: str) -> bool:
+        """
+        记录任务失败：未达到最大尝试次数时按指数退避重新排队
+
+        Returns:
+            是否会重试
+        """
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return False
+
+            retry = row['attempts'] < row['max_attempts']
+            if retry:
+                delay = min(self.backoff_base * 2 ** (row['attempts'] - 1), self.backoff_max)
+                delay *= random.uniform(0.75, 1.25)
+                status, available_at = JobStatus.QUEUED.value, now + delay
+            else:
+                status, available_at = JobStatus.FAILED.value, now
+
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, error = ?, available_at = ?,
+                                lease_expires_at = NULL, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (status, error, available_at, now, job_id)
+            )
+
+        if retry:
+            logger.warning(f"摄取任务失败，{delay:.1f}s后重试: {job_id} - {error}")
+        else:
+            logger.error(f"摄取任务最终失败: {job_id} - {error}")
+        return retry
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务详情"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(
+        self,
+        status: Optional[JobStatus] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """按创建时间倒序列出任务"""
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                    (JobStatus(status).value, limit)
+                ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """按模式统计各状态的任务数（队列深度）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT mode, status, COUNT(*) AS count FROM jobs GROUP BY mode, status"
+            ).fetchall()
+
+        stats: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            stats.setdefault(row['mode'], {})[row['status']] = row['count']
+        return stats
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """将数据库行转换为任务字典"""
+        job = dict(row)
+        job['metadata'] = json.loads(job['metadata'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['delete_after'] = bool(job['delete_after'])
+        return job
+
+
+def _delete_files(paths: List[str]):
+    """删除任务结束后不再需要的临时文件"""
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            logger.warning(f"临时文件删除失败: {path} - {e}")
+
+
+class _LeaseKeeper:
+    """在任务执行期间定期续约，并节流进度写入"""
+
+    def __init__(self, queue: JobQueue, job_id: str, interval: float):
+        self.queue = queue
+        self.job_id = job_id
+        self.interval = interval
+        self.progress: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "_LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, progress: float):
+        """记录进度（由续约线程写入）"""
+        self.progress = progress
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.queue.heartbeat(self.job_id, self.progress)
+            except Exception as e:
+                logger.warning(f"任务续约失败: {self.job_id} - {e}")
+
+
+def run_worker(
+    queue_path: str,
+    worker_id: str,
+    pipeline_factory: Callable[[ProcessingMode], Any],
+    stop_event: Any,
+    mode_limits: Optional[Dict[str, int]] = None,
+    poll_interval: float = 1.0,
+    lease_seconds: float = 60.0
+):
+    """
+    工作循环：领取任务 -> 执行管道 -> 记录结果
+
+    Args:
+        queue_path: 任务队列数据库路径
+        worker_id: 工作进程标识
+        pipeline_factory: 按模式返回数据处理管道的函数
+        stop_event: 停止信号（threading.Event或multiprocessing.Event）
+        mode_limits: 每种模式同时运行的任务上限
+        poll_interval: 队列为空时的轮询间隔（秒）
+        lease_seconds: 任务租约时长（秒）
+    """
+    queue = JobQueue(queue_path, lease_seconds=lease_seconds)
+    pipelines: Dict[ProcessingMode, Any] = {}
+
+    logger.info(f"摄取工作进程启动: {worker_id}")
+
+    while not stop_event.is_set():
+        job = queue.claim(worker_id, mode_limits)
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+
+        mode = ProcessingMode(job['mode'])
+        if mode not in pipelines:
+            pipelines[mode] = pipeline_factory(mode)
+
+        try:
+            with _LeaseKeeper(queue, job['job_id'], lease_seconds / 3) as lease:
+                result = pipelines[mode].process(
+                    job['file_path'],
+                    job['metadata'],
+                    progress_callback=lease.report
+                )
+            error = result.get('error') if result.get('status') == 'failed' else None
+        except Exception as e:
+            result, error = None, str(e)
+
+        if error is None:
+            queue.complete(job['job_id'], result)
+            finished = True
+        else:
+            finished = not queue.fail(job['job_id'], error)
+
+        if finished and job['delete_after']:
+            _delete_files([job['file_path']])
+
+    queue.close()
+    logger.info(f"摄取工作进程退出: {worker_id}")
+
+
+def _process_worker_main(
+    queue_path: str,
+    worker_id: str,
+    system_config: Any,
+    stop_event: Any,
+    mode_limits: Optional[Dict[str, int]],
+    poll_interval: float,
+    lease_seconds: float
+):
+    """工作进程入口：在子进程内构建独立的Wheel系统"""
+    from wheel1 import WheelSystem
+
+    system = WheelSystem(system_config)
+    run_worker(
+        queue_path,
+        worker_id,
+        system.build_pipeline,
+        stop_event,
+        mode_limits=mode_limits,
+        poll_interval=poll_interval,
+        lease_seconds=lease_seconds
+    )
+
+
+class IngestionWorkerPool:
+    """
+    摄取工作池
+
+    进程模式下每个工作进程构建自己的系统组件，摄取不占用API进程的CPU和事件循环；
+    线程模式下工作线程共享调用方的组件（适用于本地内存向量存储）。
+    工作进程不是守护进程（PDF提取等步骤需要创建子进程），
+    由stop()通过停止信号关闭，解释器退出时自动调用。
+    """
+
+    def __init__(
+        self,
+        queue_path: str,
+        num_workers: int = 2,
+        mode_limits: Optional[Dict[str, int]] = None,
+        use_processes: bool = True,
+        system_config: Any = None,
+        pipeline_factory: Optional[Callable[[ProcessingMode], Any]] = None,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0
+    ):
+        """
+        初始化摄取工作池
+
+        Args:
+            queue_path: 任务队列数据库路径
+            num_workers: 工作进程/线程数
+            mode_limits: 每种模式同时运行的任务上限
+            use_processes: 是否使用独立进程
+            system_config: 系统配置（进程模式下用于在子进程内构建系统）
+            pipeline_factory: 按模式返回管道的函数（线程模式）
+            poll_interval: 队列为空时的轮询间隔（秒）
+            lease_seconds: 任务租约时长（秒）
+        """
+        if use_processes and system_config is None:
+            raise ValueError("进程模式需要提供system_config")
+        if not use_processes and pipeline_factory is None:
+            raise ValueError("线程模式需要提供pipeline_factory")
+
+        self.queue_path = queue_path
+        self.num_workers = num_workers
+        self.mode_limits = mode_limits
+        self.use_processes = use_processes
+        self.system_config = system_config
+        self.pipeline_factory = pipeline_factory
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = None
+        self._workers: List[Any] = []
+
+    def start(self):
+        """启动工作进程/线程"""
+        if self._workers:
+            return
+
+        if self.use_processes:
+            self._stop_event = self._context.Event()
+        else:
+            self._stop_event = threading.Event()
+
+        for i in range(self.num_workers):
+            worker_id = f"{os.getpid()}-{i}"
+
+            if self.use_processes:
+                worker = self._context.Process(
+                    target=_process_worker_main,
+                    args=(
+                        self.queue_path,
+                        worker_id,
+                        self.system_config,
+                        self._stop_event,
+                        self.mode_limits,
+                        self.poll_interval,
+                        self.lease_seconds
+                    ),
+                    name=f"wheel-ingest-{i}"
+                )
+            else:
+                worker = threading.Thread(
+                    target=run_worker,
+                    args=(self.queue_path, worker_id, self.pipeline_factory, self._stop_event),
+                    kwargs={
+                        'mode_limits': self.mode_limits,
+                        'poll_interval': self.poll_interval,
+                        'lease_seconds': self.lease_seconds
+                    },
+                    name=f"wheel-ingest-{i}",
+                    daemon=True
+                )
+
+            worker.start()
+            self._workers.append(worker)
+
+        if self.use_processes:
+            # 非守护进程会阻止解释器退出，退出前先通知其停止
+            atexit.register(self.stop)
+
+        kind = "进程" if self.use_processes else "线程"
+        logger.info(f"摄取工作池已启动: {self.num_workers} 个{kind}")
+
+    def stop(self, timeout: float = 30.0):
+        """通知工作进程在当前任务结束后退出"""
+        if not self._workers:
+            return
+
+        self._stop_event.set()
+        deadline = time.time() + timeout
+        for worker in self._workers:
+            worker.join(max(deadline - time.time(), 0))
+            if self.use_processes and worker.is_alive():
+                logger.warning(f"工作进程未按时退出，强制终止: {worker.name}")
+                worker.terminate()
+
+        if self.use_processes:
+            atexit.unregister(self.stop)
+        self._workers = []
+        logger.info("摄取工作池已停止")
+
+    def is_running(self) -> bool:
+        """是否有存活的工作进程"""
+        return any(worker.is_alive() for worker in self._workers)
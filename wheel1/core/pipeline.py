@@ -1,275 +1,548 @@
-"""
-数据处理管道 - 统一处理文档的各个阶段
-支持多模态输入（文本、图像、视频）
-"""
-
-import logging
-import time
-from typing import Dict, Any, Optional, List
-from pathlib import Path
-from dataclasses import dataclass, field
-from datetime import datetime
-import hashlib
-
-from core.modes import ProcessingMode, ModeConfig
-
-logger = logging.getLogger(__name__)
-
-
-@dataclass
-class ProcessResult:
-    """处理结果数据类"""
-    document_id: str
-    source_file: str
-    mode: str
-    status: str  # 'success', 'partial', 'failed'
-    chunks: List[Dict[str, Any]] = field(default_factory=list)
-    embeddings: List[List[float]] = field(default_factory=list)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    duration: float = 0.0
-    timestamp: datetime = field(default_factory=datetime.now)
-    error: Optional[str] = None
-
-
-class DataProcessingPipeline:
-    """数据处理管道"""
-    
-    def __init__(
-        self,
-        mode: ProcessingMode,
-        doc_processor: Any,
-        embedding_service: Any,
-        vector_store: Any,
-        db: Any
-    ):
-        """
-        初始化处理管道
-        
-        Args:
-            mode: 处理模式
-            doc_processor: 文档处理器
-            embedding_service: 嵌入服务
-            vector_store: 向量存储
-            db: 数据库连接
-        """
-        self.mode = mode
-        self.config = ModeConfig.get_config(mode)
-        self.doc_processor = doc_processor
-        self.embedding_service = embedding_service
-        self.vector_store = vector_store
-        self.db = db
-        
-        logger.info(f"初始化数据处理管道 - 模式: {mode.value}")
-    
-    def process(
-        self,
-        file_path: str,
-        metadata: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """
-        处理文档
-        
-        流程:
-        1. 验证文件
-        2. 提取文本（支持OCR）
-        3. 预处理
-        4. 分块
-        5. 嵌入
-        6. 存储
-        
-        Args:
-            file_path: 文件路径
-            metadata: 文档元数据
-        
-        Returns:
-            处理结果
-        """
-        start_time = time.time()
-        doc_id = self._generate_doc_id(file_path)
-        
-        try:
-            logger.info(f"开始处理文档: {file_path}")
-            
-            # 步骤1: 验证文件
-            self._validate_file(file_path)
-            
-            # 步骤2: 提取文本
-            extracted_text = self.doc_processor.extract_text(
-                file_path,
-                mode=self.mode
-            )
-            
-            # 步骤3: 预处理
-            processed_text = self._preprocess_text(extracted_text)
-            
-            # 步骤4: 分块
-            chunks = self._chunk_text(processed_text, file_path)
-            
-            # 步骤5: 嵌入
-            embeddings = self._embed_chunks(chunks)
-            
-            # 步骤6: 存储
-            self._store_results(doc_id, chunks, embeddings, file_path, metadata)
-            
-            duration = time.time() - start_time
-            
-            result = {
-                "status": "success",
-                "document_id": doc_id,
-                "chunks_count": len(chunks),
-                "duration": duration,
-                "mode": self.mode.value
-            }
-            
-            logger.info(f"文档处理完成: {file_path} ({duration:.2f}s, {len(chunks)} chunks)")
-            return result
-        
-        except Exception as e:
-            duration = time.time() - start_time
-            logger.error(f"文档处理失败: {e}")
-            
-            return {
-                "status": "failed",
-                "document_id": doc_id,
-                "error": str(e),
-                "duration": duration,
-                "mode": self.mode.value
-            }
-    
-    def _generate_doc_id(self, file_path: str) -> str:
-        """生成文档ID"""
-        content = f"{file_path}:{datetime.now().isoformat()}"
-        return hashlib.md5(content.encode()).hexdigest()[:16]
-    
-    def _validate_file(self, file_path: str):
-        """验证文件存在且格式正确"""
-        path = Path(file_path)
-        if not path.exists():
-            raise FileNotFoundError(f"文件不存在: {file_path}")
-        
-        allowed_extensions = {'.pdf', '.docx', '.txt', '.jpg', '.png', '.mp4'}
-        if path.suffix.lower() not in allowed_extensions:
-            raise ValueError(f"不支持的文件格式: {path.suffix}")
-    
-    def _preprocess_text(self, text: str) -> str:
-        """
-        预处理文本
-        - 清理空白
-        - 规范化符号
-        - 移除特殊字符（可选）
-        """
-        # 移除多余空白
-        text = ' '.join(text.split())
-        
-        # 规范化引号
-        text = text.replace('"', '"').replace('"', '"')
-        text = text.replace(''', "'").replace(''', "'")
-        
-        return text
-    
-    def _chunk_text(
-        self,
-        text: str,
-        source: str
-    ) -> List[Dict[str, Any]]:
-        """
-        按照模式配置分块文本
-        
-        根据mode选择不同的分块策略:
-        - EFFICIENCY: 简单固定大小分块
-        - BALANCED: 固定大小 + 语义边界
-        - PRECISION: 分层分块 + 完整上下文
-        """
-        config = self.config['processing']
-        chunk_size = config['chunk_size']
-        chunk_overlap = config['chunk_overlap']
-        
-        chunks = []
-        start = 0
-        chunk_id = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            chunk_text = text[start:end].strip()
-            
-            if not chunk_text:
-                break
-            
-            chunk = {
-                'id': f"{source}_{chunk_id}",
-                'text': chunk_text,
-                'source': source,
-                'start_pos': start,
-                'end_pos': end,
-                'chunk_index': chunk_id
-            }
-            chunks.append(chunk)
-            
-            # 移动窗口
-            start = end - chunk_overlap
-            chunk_id += 1
-        
-        logger.info(f"文本分块完成: {len(chunks)} chunks (大小: {chunk_size}, 重叠: {chunk_overlap})")
-        return chunks
-    
-    def _embed_chunks(self, chunks: List[Dict[str, Any]]) -> List[List[float]]:
-        """
-        为分块文本生成嵌入向量
-        """
-        texts = [chunk['text'] for chunk in chunks]
-        
-        # 批处理嵌入
-        embeddings = self.embedding_service.embed_batch(
-            texts,
-            batch_size=self.config.get('batch_size', 32)
-        )
-        
-        logger.info(f"嵌入生成完成: {len(embeddings)} 向量")
-        return embeddings
-    
-    def _store_results(
-        self,
-        doc_id: str,
-        chunks: List[Dict[str, Any]],
-        embeddings: List[List[float]],
-        file_path: str,
-        metadata: Optional[Dict[str, Any]]
-    ):
-        """
-        存储处理结果
-        - 向量存储: 存储向量
-        - 关系数据库: 存储元数据和chunks
-        """
-        
-        # 存储元数据到数据库
-        doc_metadata = {
-            'document_id': doc_id,
-            'source_file': file_path,
-            'mode': self.mode.value,
-            'chunk_count': len(chunks),
-            'processed_at': datetime.now().isoformat(),
-            **(metadata or {})
-        }
-        
-        self.db.insert_document(doc_metadata)
-        
-        # 存储chunks和向量到向量数据库
-        for i, chunk in enumerate(chunks):
-            self.vector_store.add_vector(
-                vector_id=chunk['id'],
-                vector=embeddings[i],
-                metadata={
-                    'document_id': doc_id,
-                    'chunk_index': i,
-                    'text': chunk['text'][:500],  # 预览文本
-                    'source': file_path
-                }
-            )
-        
-        logger.info(f"结果存储完成: {len(chunks)} vectors")
-    
-    def switch_mode(self, new_mode: ProcessingMode):
-        """切换处理模式"""
-        self.mode = new_mode
-        self.config = ModeConfig.get_config(new_mode)
-        logger.info(f"处理管道切换模式: {new_mode.value}")
+"""
+数据处理管道 - 统一处理文档的各个阶段
+支持多模态输入（文本、图像、视频）
+"""
+
+import logging
+import re
+import time
+from itertools import islice
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Set, Callable
+from pathlib import Path
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+
+import numpy as np
+
+from core.modes import ProcessingMode, ModeConfig
+from processors.chunking import TextChunker
+from processors.dedup import ChunkDeduplicator
+from storage.database import DatabaseError
+from storage.manifest import IngestionManifest
+from monitoring.tracing import Tracer, span
+from utils.helpers import file_sha256, text_sha256
+
+logger = logging.getLogger(__name__)
+
+# 行内连续空白（不含换行）
+_INLINE_SPACE = re.compile(r'[^\S\n]+')
+
+# 两个及以上的空行
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+@dataclass
+class ProcessResult:
+    """处理结果数据类"""
+    document_id: str
+    source_file: str
+    mode: str
+    status: str  # 'success', 'partial', 'failed'
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    embeddings: Optional[np.ndarray] = None  # float32矩阵，形状为[分块数, 维度]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    duration: float = 0.0
+    timestamp: datetime = field(default_factory=datetime.now)
+    error: Optional[str] = None
+
+
+class DataProcessingPipeline:
+    """数据处理管道"""
+    
+    # 支持的文件格式
+    ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.txt', '.jpg', '.png', '.mp4'}
+    
+    # 分块元数据（含全文索引）累积到该行数时以COPY批量写入关系数据库
+    DB_FLUSH_ROWS = 1000
+    
+    def __init__(
+        self,
+        mode: ProcessingMode,
+        doc_processor: Any,
+        embedding_service: Any,
+        vector_store: Any,
+        db: Any,
+        manifest: Optional[IngestionManifest] = None,
+        chunk_store: Optional[Any] = None,
+        tracer: Optional[Tracer] = None
+    ):
+        """
+        初始化处理管道
+        
+        Args:
+            mode: 处理模式
+            doc_processor: 文档处理器
+            embedding_service: 嵌入服务
+            vector_store: 向量存储
+            db: 数据库连接
+            manifest: 摄取清单（用于增量摄取，默认使用内存清单）
+            chunk_store: 分块文本存储（None时完整文本写入向量元数据）
+            tracer: 追踪器（None时只追踪强制追踪的请求）
+        """
+        self.mode = mode
+        self.config = ModeConfig.get_config(mode)
+        self.doc_processor = doc_processor
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.db = db
+        self.manifest = manifest or IngestionManifest()
+        self.chunk_store = chunk_store
+        self.tracer = tracer or Tracer()
+        self._configure_processing()
+        
+        logger.info(f"初始化数据处理管道 - 模式: {mode.value}")
+    
+    def _configure_processing(self):
+        """根据当前模式配置创建分块器和去重器"""
+        processing_config = self.config['processing']
+        self.chunker = TextChunker.from_config(processing_config)
+        
+        # 近似重复分块与共享向量的原文不同，只在分块表能返回各分块自身文本时复用
+        near_duplicate_threshold = processing_config.get('near_duplicate_threshold')
+        if not self.db.stores_chunks:
+            near_duplicate_threshold = None
+        self.deduplicator = ChunkDeduplicator(
+            self.manifest,
+            near_duplicate_threshold=near_duplicate_threshold
+        )
+    
+    def process(
+        self,
+        file_path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        trace: bool = False
+    ) -> Dict[str, Any]:
+        """
+        处理文档
+        
+        流程:
+        1. 验证文件，按内容哈希判断是否需要重新处理
+        2. 提取文本（支持OCR）
+        3. 预处理
+        4. 分块
+        5. 嵌入（仅新增且内容未嵌入过的分块）
+        6. 存储（新增分块写入，消失的分块删除）
+        
+        文档ID由来源标识（metadata['source_key']，默认为文件路径）决定，
+        分块ID由文档ID和分块内容决定，因此重复摄取未变化的文件不会产生任何嵌入。
+        分块和文档记录的来源为metadata['source_file']（默认为文件路径），
+        上传的临时文件以此保留原始文件名。
+        
+        Args:
+            file_path: 文件路径
+            metadata: 文档元数据（可包含source_key、source_file和已计算的content_hash）
+            progress_callback: 进度回调（参数为0-1之间的完成比例）
+            trace: 强制追踪本次处理，并在结果的trace字段返回各步骤的span树
+        
+        Returns:
+            处理结果
+        """
+        with self.tracer.trace('ingest', force=trace, mode=self.mode.value) as root:
+            result = self._process(file_path, metadata, progress_callback)
+        
+        if trace and root is not None:
+            result['trace'] = root.to_dict()
+        return result
+    
+    def _process(
+        self,
+        file_path: str,
+        metadata: Optional[Dict[str, Any]],
+        progress_callback: Optional[Callable[[float], None]]
+    ) -> Dict[str, Any]:
+        """处理文档（process的实现）"""
+        start_time = time.perf_counter()
+        source = (metadata or {}).get('source_file', file_path)
+        source_key = (metadata or {}).get('source_key', file_path)
+        doc_id = self._generate_doc_id(source_key)
+        report = progress_callback or (lambda progress: None)
+        # 本次新增的分块及新建的向量，处理失败时回滚
+        added = {}
+        created = []
+        
+        try:
+            logger.info(f"开始处理文档: {file_path}")
+            
+            # 步骤1: 验证文件并检查是否变化
+            with span('validate'):
+                self._validate_file(file_path)
+                content_hash = (metadata or {}).get('content_hash') or file_sha256(file_path)
+                previous = self.manifest.get_document(doc_id)
+            
+            if (
+                previous
+                and previous['content_hash'] == content_hash
+                and previous['mode'] == self.mode.value
+            ):
+                duration = time.perf_counter() - start_time
+                logger.info(f"文档未变化，跳过处理: {file_path}")
+                return {
+                    "status": "unchanged",
+                    "document_id": doc_id,
+                    "content_hash": content_hash,
+                    "chunks_count": previous['chunk_count'],
+                    "chunks_added": 0,
+                    "chunks_removed": 0,
+                    "vectors_reused": 0,
+                    "duration": duration,
+                    "mode": self.mode.value
+                }
+            
+            known_ids = self.manifest.get_chunk_ids(doc_id) if previous else set()
+            report(0.05)
+            
+            # 步骤2: 提取文本
+            with span('extract'):
+                extracted_text = self.doc_processor.extract_text(
+                    file_path,
+                    mode=self.mode,
+                    content_hash=content_hash
+                )
+            
+            # 步骤3: 预处理
+            with span('preprocess'):
+                processed_text = self._preprocess_text(extracted_text)
+            text_length = max(len(processed_text), 1)
+            report(0.3)
+            
+            # 步骤4-6: 分块、嵌入、存储（按批流式进行，不保留完整分块列表）
+            # 内容已被其他分块嵌入过的分块直接引用已有向量
+            current_ids = set()
+            chunk_rows = []
+            chunks = self._assign_chunk_ids(
+                doc_id, self._chunk_text(processed_text, source)
+            )
+            changed = self._iter_changed(chunks, known_ids, current_ids)
+            batches = self._iter_batches(changed)
+            # 各批次的同名步骤合并为一个span（累计耗时和次数）
+            while True:
+                with span('chunk', merge=True):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                
+                with span('dedup', merge=True):
+                    to_embed, fingerprints = self.deduplicator.resolve(batch)
+                if to_embed:
+                    with span('embed', merge=True):
+                        embeddings = self._embed_chunks(to_embed)
+                    created.extend(chunk['id'] for chunk in to_embed)
+                    with span('store_vectors', merge=True):
+                        self._store_results(doc_id, to_embed, embeddings, source)
+                        self.manifest.add_vectors(fingerprints)
+                for chunk in batch:
+                    added[chunk['id']] = chunk['vector_id']
+                chunk_rows.extend(self._chunk_rows(doc_id, batch))
+                if len(chunk_rows) >= self.DB_FLUSH_ROWS:
+                    with span('db_write', merge=True):
+                        self._write_chunks(chunk_rows)
+                    chunk_rows = []
+                # 分块按文本顺序生成，以已处理的文本位置估算进度
+                report(0.3 + 0.65 * batch[-1]['end_pos'] / text_length)
+            
+            removed = known_ids - current_ids
+            chunk_count = len(current_ids)
+            vectors_reused = sum(
+                1 for chunk_id, vector_id in added.items() if chunk_id != vector_id
+            )
+            
+            # 数据库写入失败时抛出异常，文档不提交到清单，重试时重新处理
+            with span('db_write', merge=True):
+                if chunk_rows:
+                    self._write_chunks(chunk_rows)
+                if not self.db.delete_chunks(removed):
+                    raise DatabaseError(f"分块删除失败: {len(removed)} 条")
+                self._store_document(doc_id, source, chunk_count, metadata)
+            with span('commit'):
+                orphans = self.manifest.commit_document(
+                    doc_id,
+                    source_key,
+                    content_hash,
+                    self.mode.value,
+                    added=added,
+                    removed=removed,
+                    chunk_count=chunk_count
+                )
+                self._delete_vectors(orphans)
+            report(1.0)
+            
+            duration = time.perf_counter() - start_time
+            
+            result = {
+                "status": "success",
+                "document_id": doc_id,
+                "content_hash": content_hash,
+                "chunks_count": chunk_count,
+                "chunks_added": len(added),
+                "chunks_removed": len(removed),
+                "vectors_reused": vectors_reused,
+                "duration": duration,
+                "mode": self.mode.value
+            }
+            
+            logger.info(
+                f"文档处理完成: {file_path} ({duration:.2f}s, {chunk_count} chunks, "
+                f"新增 {len(added)}, 删除 {len(removed)}, 复用向量 {vectors_reused})"
+            )
+            return result
+        
+        except Exception as e:
+            duration = time.perf_counter() - start_time
+            logger.error(f"文档处理失败: {e}")
+            self._rollback(added, created)
+            
+            return {
+                "status": "failed",
+                "document_id": doc_id,
+                "error": str(e),
+                "duration": duration,
+                "mode": self.mode.value
+            }
+    
+    @staticmethod
+    def document_id_for(source_key: str) -> str:
+        """获取来源标识对应的文档ID（可在处理前确定）"""
+        return DataProcessingPipeline._generate_doc_id(source_key)
+    
+    @staticmethod
+    def _generate_doc_id(source_key: str) -> str:
+        """根据来源标识生成稳定的文档ID"""
+        return hashlib.sha256(source_key.encode()).hexdigest()[:16]
+    
+    def _assign_chunk_ids(
+        self,
+        doc_id: str,
+        chunks: Iterable[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        为分块分配内容寻址ID（文档ID + 层级 + 文本哈希）
+        
+        同一文档内重复出现的相同文本按出现次序追加序号，保证ID唯一且稳定。
+        """
+        parent_ids = {}
+        occurrences = {}
+        
+        for chunk in chunks:
+            level = chunk.get('level', 'chunk')
+            digest = text_sha256(f"{level}:{chunk['text']}")[:16]
+            
+            seen = occurrences.get(digest, 0)
+            occurrences[digest] = seen + 1
+            chunk_id = f"{doc_id}_{digest}" if seen == 0 else f"{doc_id}_{digest}_{seen}"
+            
+            if level == 'parent':
+                parent_ids = {chunk['id']: chunk_id}
+            chunk['id'] = chunk_id
+            if chunk.get('parent_id'):
+                chunk['parent_id'] = parent_ids[chunk['parent_id']]
+            
+            yield chunk
+    
+    def _iter_changed(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        known_ids: Set[str],
+        current_ids: Set[str]
+    ) -> Iterator[Dict[str, Any]]:
+        """记录全部分块ID，只返回清单中不存在的分块"""
+        for chunk in chunks:
+            current_ids.add(chunk['id'])
+            if chunk['id'] not in known_ids:
+                yield chunk
+    
+    def _validate_file(self, file_path: str):
+        """验证文件存在且格式正确"""
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        
+        if path.suffix.lower() not in self.ALLOWED_EXTENSIONS:
+            raise ValueError(f"不支持的文件格式: {path.suffix}")
+    
+    def _preprocess_text(self, text: str) -> str:
+        """
+        预处理文本
+        - 清理行内空白，保留换行和段落边界（空行）
+        - 规范化符号
+        - 移除特殊字符（可选）
+        """
+        # 规范化换行并移除行内多余空白
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        text = _INLINE_SPACE.sub(' ', text)
+        text = '\n'.join(line.strip() for line in text.split('\n'))
+        
+        # 连续空行合并为一个段落边界
+        text = _BLANK_LINES.sub('\n\n', text).strip()
+        
+        # 规范化引号
+        text = text.replace('\u201c', '"').replace('\u201d', '"')
+        text = text.replace('\u2018', "'").replace('\u2019', "'")
+        
+        return text
+    
+    def _chunk_text(
+        self,
+        text: str,
+        source: str
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        按照模式配置分块文本（惰性生成）
+        
+        根据mode选择不同的分块策略:
+        - EFFICIENCY: 固定token窗口分块
+        - BALANCED: token预算 + 句子/段落边界
+        - PRECISION: 分层分块（父块保留完整上下文，子块用于精确匹配）
+        """
+        chunker = self.chunker
+        logger.info(
+            f"开始文本分块 (策略: {chunker.strategy.value}, "
+            f"大小: {chunker.chunk_size}, 重叠: {chunker.chunk_overlap} tokens)"
+        )
+        return chunker.iter_chunks(text, source)
+    
+    def _iter_batches(
+        self,
+        chunks: Iterable[Dict[str, Any]]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """将分块流按嵌入批大小分组"""
+        batch_size = self.config.get('batch_size', 32)
+        iterator = iter(chunks)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def _embed_chunks(self, chunks: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        为分块文本生成嵌入向量（float32矩阵，行与分块一一对应）
+        """
+        texts = [chunk['text'] for chunk in chunks]
+        
+        # 批处理嵌入
+        embeddings = self.embedding_service.embed_batch(
+            texts,
+            batch_size=self.config.get('batch_size', 32)
+        )
+        
+        logger.debug(f"嵌入生成完成: {len(embeddings)} 向量")
+        return embeddings
+    
+    def _store_results(
+        self,
+        doc_id: str,
+        chunks: List[Dict[str, Any]],
+        embeddings: np.ndarray,
+        file_path: str
+    ):
+        """
+        存储一批分块的向量到向量数据库（以分块的vector_id为向量ID）
+        
+        整批矩阵直接交给向量存储，不逐行转换；完整文本写入分块文本存储，
+        向量元数据只保留定位信息。
+        """
+        if self.chunk_store is not None:
+            self.chunk_store.put_many(
+                (chunk['vector_id'], chunk['text']) for chunk in chunks
+            )
+        
+        metadatas = []
+        for chunk in chunks:
+            metadata = {
+                'document_id': doc_id,
+                'chunk_index': chunk['chunk_index'],
+                'source': file_path
+            }
+            if self.chunk_store is None:
+                metadata['text'] = chunk['text']
+            if 'level' in chunk:
+                metadata['level'] = chunk['level']
+                metadata['parent_id'] = chunk['parent_id']
+            metadatas.append(metadata)
+        
+        self.vector_store.add_vectors(
+            vector_ids=[chunk['vector_id'] for chunk in chunks],
+            vectors=embeddings,
+            metadatas=metadatas
+        )
+        
+        logger.debug(f"分块存储完成: {len(chunks)} vectors")
+    
+    def _write_chunks(self, chunk_rows: List[Dict[str, Any]]):
+        """写入分块行（失败时抛出DatabaseError）"""
+        if not self.db.insert_chunks(chunk_rows, bulk=True):
+            raise DatabaseError(f"分块写入失败: {len(chunk_rows)} 条")
+    
+    @staticmethod
+    def _chunk_rows(doc_id: str, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """分块 -> 关系数据库中的分块元数据行"""
+        return [
+            {
+                'chunk_id': chunk['id'],
+                'document_id': doc_id,
+                'vector_id': chunk['vector_id'],
+                'chunk_index': chunk['chunk_index'],
+                'level': chunk.get('level'),
+                'parent_id': chunk.get('parent_id'),
+                'text': chunk['text']
+            }
+            for chunk in chunks
+        ]
+    
+    def _rollback(self, added: Dict[str, str], created: List[str]):
+        """
+        回滚未提交文档已写入的分块行和新建向量
+        
+        清单提交前向量和指纹已经写入，不回滚会留下可被检索和去重命中、
+        却没有分块引用的向量。回滚失败只记录日志，不掩盖原始错误。
+        """
+        try:
+            if added and not self.db.delete_chunks(added):
+                logger.warning(f"回滚分块行失败: {len(added)} 条")
+            self._delete_vectors(self.manifest.discard_vectors(created))
+        except Exception as e:
+            logger.error(f"回滚未提交的向量失败: {e}")
+    
+    def _delete_vectors(self, vector_ids: Iterable[str]):
+        """从向量存储中删除不再被任何分块引用的向量（及其分块文本）"""
+        vector_ids = list(vector_ids)
+        if vector_ids:
+            self.vector_store.delete_vectors(vector_ids)
+        if self.chunk_store is not None:
+            self.chunk_store.delete_many(vector_ids)
+        
+        if vector_ids:
+            logger.info(f"删除过期向量: {len(vector_ids)} vectors")
+    
+    def _store_document(
+        self,
+        doc_id: str,
+        file_path: str,
+        chunk_count: int,
+        metadata: Optional[Dict[str, Any]]
+    ):
+        """
+        存储文档元数据到关系数据库
+        """
+        doc_metadata = {
+            'document_id': doc_id,
+            'source_file': file_path,
+            'mode': self.mode.value,
+            'chunk_count': chunk_count,
+            'processed_at': datetime.now().isoformat(),
+            **(metadata or {})
+        }
+        
+        if not self.db.insert_document(doc_metadata):
+            raise DatabaseError(f"文档元数据写入失败: {doc_id}")
+        
+        logger.info(f"结果存储完成: {chunk_count} vectors")
+    
+    def switch_mode(self, new_mode: ProcessingMode):
+        """切换处理模式"""
+        self.mode = new_mode
+        self.config = ModeConfig.get_config(new_mode)
+        self._configure_processing()
+        logger.info(f"处理管道切换模式: {new_mode.value}")
@@ -0,0 +1,612 @@
+"""
+A/B测试 - 按哈希确定性分流、流式聚合各组指标、序贯显著性检验和提前停止
+使用混合序贯概率比检验（mSPRT）的始终有效p值，可以在实验进行中随时查看结果而不增大误报率
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple
+
+from monitoring.metrics import HdrHistogram
+
+logger = logging.getLogger(__name__)
+
+# 按哈希分流时的桶精度（取哈希的前8字节）
+_HASH_SCALE = float(1 << 64)
+
+
+class ExperimentStatus(str, Enum):
+    """实验状态"""
+    RUNNING = "running"
+    STOPPED = "stopped"        # 手动停止或护栏指标恶化
+    COMPLETED = "completed"    # 主指标显著或达到样本/时长上限
+
+
+def hash_bucket(salt: str, unit_id: str) -> float:
+    """
+    将分流单元确定性地映射到[0, 1)
+
+    Args:
+        salt: 盐值（每个实验不同，避免多个实验的分组相关）
+        unit_id: 分流单元（用户、会话或查询）
+
+    Returns:
+        [0, 1)内的值
+    """
+    digest = hashlib.sha256(f"{salt}:{unit_id}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / _HASH_SCALE
+
+
+def msprt_p_value(
+    mean_a: float, variance_a: float, n_a: int,
+    mean_b: float, variance_b: float, n_b: int,
+    mixing_variance: float
+) -> float:
+    """
+    两组均值之差的mSPRT检验p值（单次检查）
+
+    差值估计按正态近似，效应量的混合分布为N(0, mixing_variance)；
+    调用方对多次检查取累积最小值即得到始终有效的p值。
+
+    Args:
+        mean_a, variance_a, n_a: 对照组均值、方差、样本数
+        mean_b, variance_b, n_b: 处理组均值、方差、样本数
+        mixing_variance: 混合分布的方差（与预期效应量的平方同量级）
+
+    Returns:
+        p值（0-1）
+    """
+    if n_a < 2 or n_b < 2 or mixing_variance <= 0:
+        return 1.0
+    variance = variance_a / n_a + variance_b / n_b
+    if variance <= 0:
+        return 1.0 if mean_a == mean_b else 0.0
+
+    delta = mean_b - mean_a
+    total = variance + mixing_variance
+    log_likelihood_ratio = (
+        0.5 * math.log(variance / total)
+        + delta * delta * mixing_variance / (2 * variance * total)
+    )
+    if log_likelihood_ratio <= 0:
+        return 1.0
+    return math.exp(-log_likelihood_ratio) if log_likelihood_ratio < 700 else 0.0
+
+
+class RunningMoments:
+    """流式均值和方差（Welford算法）"""
+
+    __slots__ = ('count', 'mean', '_m2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """样本方差"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+@dataclass
+class Arm:
+    """实验组"""
+    name: str
+    weight: float = 1.0
+    # 查询路径的配置覆盖（mode, strategy, use_reranking, top_k）
+    config: Dict[str, Any] = field(default_factory=dict)
+
+
+class ArmStats:
+    """一个实验组的流式聚合（延迟直方图和各质量信号的均值/方差）"""
+
+    __slots__ = ('requests', 'errors', 'latency', 'signals')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = HdrHistogram(max_seconds=600.0)
+        self.signals: Dict[str, RunningMoments] = {}
+
+    def record(self, latency_seconds: Optional[float], success: bool, signals: Dict[str, float]):
+        self.requests += 1
+        if not success:
+            self.errors += 1
+        if latency_seconds is not None and success:
+            self.latency.record(latency_seconds)
+            self.signal('latency_ms').add(latency_seconds * 1000)
+        self.signal('error_rate').add(0.0 if success else 1.0)
+        for name, value in signals.items():
+            self.signal(name).add(float(value))
+
+    def signal(self, name: str) -> RunningMoments:
+        """获取（不存在时创建）质量信号的聚合"""
+        moments = self.signals.get(name)
+        if moments is None:
+            moments = self.signals[name] = RunningMoments()
+        return moments
+
+    def summary(self) -> Dict[str, Any]:
+        percentiles = self.latency.percentiles((50, 95, 99))
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency_ms': {f"p{p}": value * 1000 for p, value in percentiles.items()},
+            'signals': {
+                name: {'mean': moments.mean, 'std': math.sqrt(moments.variance), 'count': moments.count}
+                for name, moments in sorted(self.signals.items())
+            },
+        }
+
+
+class Experiment:
+    """
+    一个A/B实验
+
+    分流：按(实验ID, 分流单元)的哈希值确定性分组，同一单元始终落在同一组；
+    traffic_fraction之外的流量不进入实验，限制处理组的暴露范围。
+    检验：每次记录后对各处理组与对照组计算主指标和护栏指标的mSPRT p值（累积最小值）；
+    主指标显著时完成实验，护栏指标显著恶化时停止实验，停止后不再分流。
+    """
+
+    def __init__(
+        self,
+        experiment_id: str,
+        name: str,
+        arms: List[Arm],
+        control: str,
+        primary_metric: str = 'latency_ms',
+        higher_is_better: bool = False,
+        guardrails: Optional[Dict[str, bool]] = None,
+        traffic_fraction: float = 1.0,
+        alpha: float = 0.05,
+        min_samples: int = 100,
+        max_samples: Optional[int] = None,
+        expected_effect: float = 0.05,
+        duration: Optional[timedelta] = None
+    ):
+        """
+        初始化实验
+
+        Args:
+            experiment_id: 实验ID（同时作为分流哈希的盐）
+            name: 实验名称
+            arms: 实验组（至少两个）
+            control: 对照组名称
+            primary_metric: 主指标（latency_ms、error_rate或record时提供的质量信号）
+            higher_is_better: 主指标是否越大越好
+            guardrails: 护栏指标 -> 是否越大越好（默认为延迟和错误率）
+            traffic_fraction: 进入实验的流量比例
+            alpha: 显著性水平
+            min_samples: 每组开始检验前的最少样本数
+            max_samples: 每组样本上限（达到后结束实验）
+            expected_effect: 预期的相对效应量（决定mSPRT混合分布的方差）
+            duration: 实验最长持续时间
+        """
+        if len(arms) < 2:
+            raise ValueError("实验至少需要两个组")
+        if control not in {arm.name for arm in arms}:
+            raise ValueError(f"对照组不存在: {control}")
+
+        self.experiment_id = experiment_id
+        self.name = name
+        self.arms = arms
+        self.control = control
+        self.primary_metric = primary_metric
+        self.higher_is_better = higher_is_better
+        self.guardrails = dict(guardrails) if guardrails is not None else {'latency_ms': False, 'error_rate': False}
+        self.guardrails.pop(primary_metric, None)
+        self.traffic_fraction = traffic_fraction
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.expected_effect = expected_effect
+
+        self.created_at = datetime.now()
+        self.end_at = self.created_at + duration if duration else None
+        self.status = ExperimentStatus.RUNNING
+        self.stop_reason: Optional[str] = None
+        self.winner: Optional[str] = None
+
+        total_weight = sum(arm.weight for arm in arms)
+        self._boundaries: List[Tuple[float, Arm]] = []
+        cumulative = 0.0
+        for arm in arms:
+            cumulative += arm.weight / total_weight
+            self._boundaries.append((cumulative, arm))
+
+        self.stats: Dict[str, ArmStats] = {arm.name: ArmStats() for arm in arms}
+        # (处理组, 指标) -> 始终有效p值
+        self.p_values: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        if self.status != ExperimentStatus.RUNNING:
+            return False
+        if self.end_at is not None and datetime.now() >= self.end_at:
+            with self._lock:
+                self._finish(ExperimentStatus.COMPLETED, "达到实验时长上限")
+            return False
+        return True
+
+    def assign(self, unit_id: str) -> Optional[Arm]:
+        """
+        为分流单元分组
+
+        Args:
+            unit_id: 分流单元
+
+        Returns:
+            实验组；不在实验流量内或实验已结束时为None
+        """
+        if not self.active:
+            return None
+
+        bucket = hash_bucket(self.experiment_id, unit_id)
+        if bucket >= self.traffic_fraction:
+            return None
+
+        # 在实验流量内重新归一化，保证各组比例与权重一致
+        position = bucket / self.traffic_fraction
+        for boundary, arm in self._boundaries:
+            if position < boundary:
+                return arm
+        return self._boundaries[-1][1]
+
+    def record(
+        self,
+        arm: str,
+        latency_seconds: Optional[float] = None,
+        success: bool = True,
+        signals: Optional[Dict[str, float]] = None
+    ):
+        """
+        记录一个请求的结果
+
+        Args:
+            arm: 实验组名称
+            latency_seconds: 延迟（秒）
+            success: 是否成功
+            signals: 质量信号（如结果数、最高分、用户反馈）
+        """
+        with self._lock:
+            if self.status != ExperimentStatus.RUNNING:
+                return
+            stats = self.stats.get(arm)
+            if stats is None:
+                logger.warning(f"实验组不存在: {self.experiment_id}/{arm}")
+                return
+            stats.record(latency_seconds, success, signals or {})
+            self._analyze(arm)
+
+    def record_signals(self, arm: str, signals: Dict[str, float]):
+        """
+        记录请求之后到达的质量信号（如用户点击、评分），不计入请求数
+
+        Args:
+            arm: 实验组名称
+            signals: 质量信号
+        """
+        with self._lock:
+            if self.status != ExperimentStatus.RUNNING:
+                return
+            stats = self.stats.get(arm)
+            if stats is None:
+                logger.warning(f"实验组不存在: {self.experiment_id}/{arm}")
+                return
+            for name, value in signals.items():
+                stats.signal(name).add(float(value))
+            self._analyze(arm)
+
+    def _mixing_variance(self, metric: str, control: RunningMoments) -> float:
+        """按对照组的量级设置混合分布方差（对照组均值为0时按标准差）"""
+        scale = abs(control.mean) or math.sqrt(control.variance)
+        if scale == 0 and metric == 'error_rate':
+            scale = 1.0
+        return (self.expected_effect * scale) ** 2
+
+    def _analyze(self, updated: str):
+        """更新受影响处理组的p值并判断是否停止（调用方持有锁）"""
+        control = self.stats[self.control]
+        treatments = [updated] if updated != self.control else [
+            arm.name for arm in self.arms if arm.name != self.control
+        ]
+
+        for treatment in treatments:
+            stats = self.stats[treatment]
+            if min(stats.requests, control.requests) < self.min_samples:
+                continue
+
+            metrics = {self.primary_metric: self.higher_is_better, **self.guardrails}
+            for metric, higher_is_better in metrics.items():
+                a, b = control.signals.get(metric), stats.signals.get(metric)
+                if a is None or b is None:
+                    continue
+                p_value = msprt_p_value(
+                    a.mean, a.variance, a.count,
+                    b.mean, b.variance, b.count,
+                    self._mixing_variance(metric, a)
+                )
+                key = (treatment, metric)
+                p_value = min(self.p_values.get(key, 1.0), p_value)
+                self.p_values[key] = p_value
+                if p_value > self.alpha:
+                    continue
+
+                better = (b.mean > a.mean) == higher_is_better
+                if metric == self.primary_metric:
+                    self.winner = treatment if better else self.control
+                    self._finish(
+                        ExperimentStatus.COMPLETED,
+                        f"主指标{metric}显著 (p={p_value:.4f})"
+                    )
+                    return
+                if not better:
+                    self.winner = self.control
+                    self._finish(
+                        ExperimentStatus.STOPPED,
+                        f"护栏指标{metric}在{treatment}组显著恶化 (p={p_value:.4f})"
+                    )
+                    return
+
+        if self.max_samples is not None and all(
+            stats.requests >= self.max_samples for stats in self.stats.values()
+        ):
+            self._finish(ExperimentStatus.COMPLETED, "达到样本上限，无显著差异")
+
+    def _finish(self, status: ExperimentStatus, reason: str):
+        if self.status != ExperimentStatus.RUNNING:
+            return
+        self.status = status
+        self.stop_reason = reason
+        logger.info(f"实验结束: {self.name} ({self.experiment_id}) - {reason}")
+
+    def stop(self, reason: str = "手动停止"):
+        """停止实验（之后的流量不再进入实验）"""
+        with self._lock:
+            self._finish(ExperimentStatus.STOPPED, reason)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        实验结果
+
+        Returns:
+            状态、各组统计和各处理组相对对照组的指标对比（含始终有效p值）
+        """
+        with self._lock:
+            control = self.stats[self.control]
+            comparisons = {}
+            for arm in self.arms:
+                if arm.name == self.control:
+                    continue
+                stats = self.stats[arm.name]
+                metrics = {}
+                for metric, moments in sorted(stats.signals.items()):
+                    baseline = control.signals.get(metric)
+                    if baseline is None:
+                        continue
+                    p_value = self.p_values.get((arm.name, metric))
+                    metrics[metric] = {
+                        'control': baseline.mean,
+                        'treatment': moments.mean,
+                        'difference': moments.mean - baseline.mean,
+                        # 对照组均值为0时相对变化无意义
+                        'improvement': (
+                            (moments.mean - baseline.mean) / abs(baseline.mean) * 100
+                            if baseline.mean else None
+                        ),
+                        'p_value': p_value,
+                        'significant': p_value is not None and p_value <= self.alpha,
+                    }
+                comparisons[arm.name] = metrics
+
+            return {
+                'experiment_id': self.experiment_id,
+                'experiment': self.name,
+                'status': self.status.value,
+                'stop_reason': self.stop_reason,
+                'winner': self.winner,
+                'created_at': self.created_at.isoformat(),
+                'end_at': self.end_at.isoformat() if self.end_at else None,
+                'primary_metric': self.primary_metric,
+                'traffic_fraction': self.traffic_fraction,
+                'control': self.control,
+                'arms': {
+                    arm.name: {'weight': arm.weight, 'config': arm.config, **self.stats[arm.name].summary()}
+                    for arm in self.arms
+                },
+                'comparisons': comparisons,
+            }
+
+
+class ABTestFramework:
+    """
+    A/B测试框架
+
+    管理实验并为查询分流；同一分流单元只进入一个运行中的实验（按创建顺序），
+    实验之间的流量互不干扰。
+    """
+
+    def __init__(self):
+        """初始化A/B测试框架"""
+        self.experiments: Dict[str, Experiment] = {}
+        self._lock = threading.Lock()
+        logger.info("初始化A/B测试框架")
+
+    def create_experiment(
+        self,
+        name: str,
+        control_config: Dict[str, Any],
+        treatment_config: Dict[str, Any],
+        duration: timedelta = timedelta(days=7),
+        treatment_weight: float = 0.5,
+        **options: Any
+    ) -> str:
+        """
+        创建对照组/处理组两组的A/B实验
+
+        Args:
+            name: 实验名称
+            control_config: 对照组配置（查询路径的覆盖项：mode, strategy, use_reranking, top_k）
+            treatment_config: 处理组配置
+            duration: 实验最长持续时间
+            treatment_weight: 处理组在实验流量中的比例
+            **options: Experiment的其他参数（primary_metric, traffic_fraction, alpha等）
+
+        Returns:
+            实验ID
+        """
+        return self.create_multi_arm_experiment(
+            name,
+            [
+                Arm('control', 1.0 - treatment_weight, control_config),
+                Arm('treatment', treatment_weight, treatment_config),
+            ],
+            control='control',
+            duration=duration,
+            **options
+        )
+
+    def create_multi_arm_experiment(
+        self,
+        name: str,
+        arms: List[Arm],
+        control: str,
+        **options: Any
+    ) -> str:
+        """
+        创建多组实验
+
+        Args:
+            name: 实验名称
+            arms: 实验组
+            control: 对照组名称
+            **options: Experiment的其他参数
+
+        Returns:
+            实验ID
+        """
+        experiment_id = f"exp_{uuid.uuid4().hex[:12]}"
+        experiment = Experiment(experiment_id, name, arms, control, **options)
+        with self._lock:
+            self.experiments[experiment_id] = experiment
+        logger.info(f"创建A/B实验: {name} ({experiment_id})")
+        return experiment_id
+
+    def assign(self, unit_id: str) -> Optional[Tuple[Experiment, Arm]]:
+        """
+        为分流单元选择实验和组
+
+        Args:
+            unit_id: 分流单元
+
+        Returns:
+            (实验, 组)；不进入任何实验时为None
+        """
+        with self._lock:
+            experiments = list(self.experiments.values())
+        for experiment in experiments:
+            arm = experiment.assign(unit_id)
+            if arm is not None:
+                return experiment, arm
+        return None
+
+    def record_result(
+        self,
+        experiment_id: str,
+        group: str,
+        metrics: Optional[Dict[str, float]] = None,
+        latency_seconds: Optional[float] = None,
+        success: bool = True
+    ):
+        """
+        记录实验结果
+
+        Args:
+            experiment_id: 实验ID
+            group: 实验组名称
+            metrics: 质量信号（含latency_ms时作为延迟记录）
+            latency_seconds: 延迟（秒）
+            success: 是否成功
+        """
+        experiment = self.experiments.get(experiment_id)
+        if experiment is None:
+            logger.warning(f"实验不存在: {experiment_id}")
+            return
+
+        signals = dict(metrics or {})
+        if latency_seconds is None and 'latency_ms' in signals:
+            latency_seconds = signals.pop('latency_ms') / 1000
+        experiment.record(group, latency_seconds, success, signals)
+
+    def record_feedback(self, experiment_id: str, group: str, signals: Dict[str, float]) -> bool:
+        """
+        记录延迟到达的质量反馈
+
+        Args:
+            experiment_id: 实验ID
+            group: 实验组名称（查询响应的experiment.arm）
+            signals: 质量信号
+
+        Returns:
+            实验是否存在
+        """
+        experiment = self.experiments.get(experiment_id)
+        if experiment is None:
+            return False
+        experiment.record_signals(group, signals)
+        return True
+
+    def stop_experiment(self, experiment_id: str, reason: str = "手动停止") -> bool:
+        """停止实验"""
+        experiment = self.experiments.get(experiment_id)
+        if experiment is None:
+            return False
+        experiment.stop(reason)
+        return True
+
+    def get_results(self, experiment_id: str) -> Dict[str, Any]:
+        """获取实验结果（两组实验兼容旧字段control_samples、treatment_samples、metrics_comparison）"""
+        experiment = self.experiments.get(experiment_id)
+        if experiment is None:
+            return {}
+
+        results = experiment.summary()
+        treatments = [name for name in results['arms'] if name != experiment.control]
+        if len(treatments) == 1:
+            results['control_samples'] = results['arms'][experiment.control]['requests']
+            results['treatment_samples'] = results['arms'][treatments[0]]['requests']
+            results['metrics_comparison'] = results['comparisons'][treatments[0]]
+        return results
+
+    def list_experiments(self) -> List[Dict[str, Any]]:
+        """列出全部实验的概要"""
+        with self._lock:
+            experiments = list(self.experiments.values())
+        return [
+            {
+                'experiment_id': experiment.experiment_id,
+                'name': experiment.name,
+                'status': experiment.status.value,
+                'winner': experiment.winner,
+                'stop_reason': experiment.stop_reason,
+                'arms': [arm.name for arm in experiment.arms],
+                'traffic_fraction': experiment.traffic_fraction,
+                'requests': sum(stats.requests for stats in experiment.stats.values()),
+            }
+            for experiment in experiments
+        ]
@@ -0,0 +1,436 @@
+"""
+检索质量评估 - 在带标注的查询集上测量各模式、各检索策略的质量和延迟
+计算recall@k、MRR、nDCG和延迟百分位、阶段开销，输出质量-延迟Pareto表，
+并可与基线结果对比作为性能优化的质量护栏
+"""
+
+import json
+import logging
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Sequence
+
+from core.engine import RetrievalEngine, RetrievalStrategy
+from core.modes import ProcessingMode, ModeConfig
+from monitoring.metrics import HdrHistogram
+from storage.cache import CacheManager
+
+logger = logging.getLogger(__name__)
+
+# 默认评估的截断位置
+DEFAULT_K_VALUES = (1, 5, 10)
+
+# Pareto表默认的质量指标
+DEFAULT_QUALITY_METRIC = 'ndcg@10'
+
+
+# ============ 排序指标 ============
+
+def recall_at_k(retrieved: Sequence[str], relevant: Dict[str, float], k: int) -> float:
+    """前k个结果覆盖的相关分块比例"""
+    if not relevant:
+        return 0.0
+    hits = sum(1 for item in retrieved[:k] if relevant.get(item, 0) > 0)
+    return hits / sum(1 for grade in relevant.values() if grade > 0)
+
+
+def precision_at_k(retrieved: Sequence[str], relevant: Dict[str, float], k: int) -> float:
+    """前k个结果中相关分块的比例"""
+    if k <= 0:
+        return 0.0
+    return sum(1 for item in retrieved[:k] if relevant.get(item, 0) > 0) / k
+
+
+def reciprocal_rank(retrieved: Sequence[str], relevant: Dict[str, float], k: Optional[int] = None) -> float:
+    """第一个相关结果排名的倒数（前k个中没有相关结果时为0）"""
+    for rank, item in enumerate(retrieved[:k], start=1):
+        if relevant.get(item, 0) > 0:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(retrieved: Sequence[str], relevant: Dict[str, float], k: int) -> float:
+    """
+    归一化折损累计增益
+
+    Args:
+        retrieved: 检索结果ID（按排名）
+        relevant: 相关分块ID -> 相关度等级（二元标注时为1）
+        k: 截断位置
+
+    Returns:
+        nDCG@k（0-1）
+    """
+    dcg = sum(
+        (2 ** relevant.get(item, 0) - 1) / math.log2(rank + 1)
+        for rank, item in enumerate(retrieved[:k], start=1)
+    )
+    ideal = sorted((grade for grade in relevant.values() if grade > 0), reverse=True)[:k]
+    idcg = sum((2 ** grade - 1) / math.log2(rank + 1) for rank, grade in enumerate(ideal, start=1))
+    return dcg / idcg if idcg else 0.0
+
+
+# ============ 评估集 ============
+
+@dataclass
+class EvaluationQuery:
+    """带标注的评估查询"""
+    query: str
+    relevant: Dict[str, float]          # 相关分块ID -> 相关度等级
+    query_id: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'EvaluationQuery':
+        """从字典构建（relevant可以是ID列表或ID -> 等级的字典）"""
+        relevant = data['relevant']
+        if not isinstance(relevant, dict):
+            relevant = {item: 1.0 for item in relevant}
+        return cls(
+            query=data['query'],
+            relevant={str(key): float(grade) for key, grade in relevant.items()},
+            query_id=data.get('query_id') or data.get('id')
+        )
+
+
+def load_evaluation_set(path: str) -> List[EvaluationQuery]:
+    """
+    加载评估集
+
+    Args:
+        path: JSONL文件，每行 {"query": ..., "relevant": [分块ID, ...] 或 {分块ID: 等级}}
+
+    Returns:
+        评估查询列表
+    """
+    queries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                queries.append(EvaluationQuery.from_dict(json.loads(line)))
+    logger.info(f"加载评估集: {path} ({len(queries)} 条查询)")
+    return queries
+
+
+# ============ 评估 ============
+
+@dataclass
+class _RunStats:
+    """一个(模式, 策略)组合的流式统计"""
+    quality: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    latency: HdrHistogram = field(default_factory=lambda: HdrHistogram(max_seconds=600.0))
+    stage_seconds: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    stage_calls: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    queries: int = 0
+    errors: int = 0
+
+
+class RetrievalEvaluator:
+    """
+    检索质量评估器
+
+    每个(模式, 策略)组合使用独立的检索引擎并关闭结果缓存，
+    质量指标按结果ID与标注比对；开销按检索各阶段的调用次数和耗时统计
+    （embed为查询嵌入，rerank为重排模型调用），用于比较不同组合的成本。
+    """
+
+    def __init__(
+        self,
+        vector_store: Any,
+        db: Any,
+        embedding_service: Optional[Any] = None,
+        chunk_store: Optional[Any] = None,
+        k_values: Sequence[int] = DEFAULT_K_VALUES
+    ):
+        """
+        初始化评估器
+
+        Args:
+            vector_store: 向量存储
+            db: 数据库连接（BM25全文检索）
+            embedding_service: 嵌入服务
+            chunk_store: 分块文本存储
+            k_values: 评估的截断位置
+        """
+        self.vector_store = vector_store
+        self.db = db
+        self.embedding_service = embedding_service
+        self.chunk_store = chunk_store
+        self.k_values = tuple(sorted(k_values))
+
+    def _build_engine(self, mode: ProcessingMode, strategy: RetrievalStrategy) -> RetrievalEngine:
+        engine = RetrievalEngine(
+            mode=mode,
+            vector_store=self.vector_store,
+            cache=CacheManager(enabled=False),
+            db=self.db,
+            embedding_service=self.embedding_service,
+            chunk_store=self.chunk_store
+        )
+        engine.strategy = strategy
+        return engine
+
+    @staticmethod
+    def _result_ids(results: List[Dict[str, Any]]) -> List[str]:
+        """结果ID（向量ID，缺失时取元数据中的chunk_id）"""
+        return [
+            result.get('id') or (result.get('metadata') or {}).get('chunk_id') or ''
+            for result in results
+        ]
+
+    def evaluate(
+        self,
+        queries: Iterable[EvaluationQuery],
+        modes: Optional[Iterable[ProcessingMode]] = None,
+        strategies: Optional[Iterable[RetrievalStrategy]] = None,
+        top_k: Optional[int] = None,
+        configured_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        评估全部(模式, 策略)组合
+
+        Args:
+            queries: 评估查询
+            modes: 评估的模式（默认全部）
+            strategies: 评估的策略（默认全部）
+            top_k: 检索结果数（默认为最大的k）
+            configured_only: 每种模式只评估其配置的检索策略
+
+        Returns:
+            每个组合一行的结果（含质量指标、延迟、开销和模式目标达成情况）
+        """
+        queries = list(queries)
+        modes = list(modes) if modes is not None else list(ProcessingMode)
+        strategies = list(strategies) if strategies is not None else list(RetrievalStrategy)
+        top_k = top_k or self.k_values[-1]
+
+        rows = []
+        for mode in modes:
+            if configured_only:
+                mode_strategies = [
+                    RetrievalStrategy(ModeConfig.get_config(mode)['retrieval']['strategy'])
+                ]
+            else:
+                mode_strategies = strategies
+            for strategy in mode_strategies:
+                logger.info(f"评估: {mode.value} / {strategy.value} ({len(queries)} 条查询)")
+                stats = self._run(self._build_engine(mode, strategy), queries, top_k)
+                rows.append(self._summarize(mode, strategy, stats))
+
+        mark_pareto(rows)
+        return rows
+
+    def _run(self, engine: RetrievalEngine, queries: List[EvaluationQuery], top_k: int) -> _RunStats:
+        """在一个引擎上运行全部查询"""
+        stats = _RunStats()
+
+        def observe(mode: str, stage: str, seconds: float):
+            stats.stage_seconds[stage] += seconds
+            stats.stage_calls[stage] += 1
+
+        engine.stage_observer = observe
+
+        for query in queries:
+            start = time.perf_counter()
+            response = engine.retrieve(query.query, top_k=top_k)
+            elapsed = time.perf_counter() - start
+
+            stats.queries += 1
+            if 'error' in response:
+                stats.errors += 1
+                continue
+            stats.latency.record(elapsed)
+
+            retrieved = self._result_ids(response['results'])
+            for k in self.k_values:
+                stats.quality[f'recall@{k}'] += recall_at_k(retrieved, query.relevant, k)
+                stats.quality[f'precision@{k}'] += precision_at_k(retrieved, query.relevant, k)
+                stats.quality[f'ndcg@{k}'] += ndcg_at_k(retrieved, query.relevant, k)
+            stats.quality['mrr'] += reciprocal_rank(retrieved, query.relevant, top_k)
+
+        return stats
+
+    def _summarize(self, mode: ProcessingMode, strategy: RetrievalStrategy, stats: _RunStats) -> Dict[str, Any]:
+        """汇总一个组合的结果"""
+        answered = stats.queries - stats.errors
+        # 失败的查询按0分计入质量指标
+        quality = {
+            metric: total / stats.queries if stats.queries else 0.0
+            for metric, total in sorted(stats.quality.items())
+        }
+
+        percentiles = stats.latency.percentiles((50, 95, 99))
+        latency = {f"p{p}": value * 1000 for p, value in percentiles.items()}
+        latency['mean'] = stats.latency.mean * 1000
+
+        cost = {
+            f"{stage}_calls": calls / stats.queries if stats.queries else 0.0
+            for stage, calls in sorted(stats.stage_calls.items())
+        }
+        cost.update({
+            f"{stage}_ms": seconds * 1000 / stats.queries if stats.queries else 0.0
+            for stage, seconds in sorted(stats.stage_seconds.items())
+        })
+
+        row = {
+            'mode': mode.value,
+            'strategy': strategy.value,
+            'queries': stats.queries,
+            'errors': stats.errors,
+            'quality': quality,
+            'latency_ms': latency,
+            'cost_per_query': cost,
+        }
+
+        # 模式声明的目标（召回率按该模式的检索结果数计算）
+        config = ModeConfig.get_config(mode)
+        k = config['processing']['num_retrieval']
+        recall_low, _ = config['metrics']['recall']
+        _, latency_high = config['metrics']['latency_ms']
+        recall = quality.get(f'recall@{k}')
+        if recall is None:
+            recall = _recall_from_nearest_k(quality, k)
+        row['targets'] = {
+            'k': k,
+            'recall': recall,
+            'recall_target': recall_low,
+            'recall_met': recall is not None and recall >= recall_low,
+            'latency_p95_met': answered > 0 and latency['p95'] <= latency_high,
+        }
+        return row
+
+
+def _recall_from_nearest_k(quality: Dict[str, float], k: int) -> Optional[float]:
+    """未评估k时取不超过k的最大截断位置的召回率（保守估计）"""
+    candidates = [
+        (int(metric.split('@')[1]), value)
+        for metric, value in quality.items()
+        if metric.startswith('recall@') and int(metric.split('@')[1]) <= k
+    ]
+    return max(candidates)[1] if candidates else None
+
+
+# ============ Pareto表 ============
+
+def mark_pareto(
+    rows: List[Dict[str, Any]],
+    quality_metric: str = DEFAULT_QUALITY_METRIC,
+    latency_metric: str = 'p95'
+) -> List[Dict[str, Any]]:
+    """
+    标记Pareto最优的组合
+
+    一个组合不被支配当且仅当不存在另一个组合质量不低于它、延迟不高于它且至少一项严格更好。
+
+    Args:
+        rows: 评估结果行（原地写入pareto字段）
+        quality_metric: 质量指标（不存在时退回到最大k的nDCG）
+        latency_metric: 延迟指标
+
+    Returns:
+        rows
+    """
+    def point(row):
+        quality = row['quality']
+        if quality_metric in quality:
+            value = quality[quality_metric]
+        else:
+            ndcg = [metric for metric in quality if metric.startswith('ndcg@')]
+            value = quality[max(ndcg, key=lambda metric: int(metric.split('@')[1]))] if ndcg else 0.0
+        return value, row['latency_ms'].get(latency_metric, 0.0)
+
+    points = [point(row) for row in rows]
+    for row, (quality, latency) in zip(rows, points):
+        row['pareto'] = not any(
+            other_quality >= quality and other_latency <= latency
+            and (other_quality > quality or other_latency < latency)
+            for other_quality, other_latency in points
+        )
+    return rows
+
+
+def format_pareto_table(rows: List[Dict[str, Any]], k_values: Sequence[int] = DEFAULT_K_VALUES) -> str:
+    """
+    格式化为按p95延迟排序的文本表（*为Pareto最优）
+
+    Args:
+        rows: 评估结果行
+        k_values: 显示的截断位置
+
+    Returns:
+        表格文本
+    """
+    columns = [f'recall@{k}' for k in k_values] + ['mrr'] + [f'ndcg@{k}' for k in k_values]
+    header = (
+        f"{'':1} {'mode':<10} {'strategy':<13} "
+        + ' '.join(f"{column:>9}" for column in columns)
+        + f" {'p50 ms':>9} {'p95 ms':>9} {'errors':>6}  目标"
+    )
+    lines = [header, '-' * len(header)]
+
+    for row in sorted(rows, key=lambda row: row['latency_ms'].get('p95', 0.0)):
+        targets = row.get('targets', {})
+        met = targets.get('recall_met') and targets.get('latency_p95_met')
+        lines.append(
+            f"{'*' if row.get('pareto') else ' '} {row['mode']:<10} {row['strategy']:<13} "
+            + ' '.join(f"{row['quality'].get(column, 0.0):>9.3f}" for column in columns)
+            + f" {row['latency_ms'].get('p50', 0.0):>9.2f} {row['latency_ms'].get('p95', 0.0):>9.2f}"
+            + f" {row['errors']:>6}  {'达成' if met else '未达成'}"
+        )
+    return '\n'.join(lines)
+
+
+# ============ 质量护栏 ============
+
+def check_quality_guardrail(
+    baseline: List[Dict[str, Any]],
+    current: List[Dict[str, Any]],
+    metrics: Sequence[str] = ('recall@10', 'ndcg@10', 'mrr'),
+    max_drop: float = 0.01
+) -> List[Dict[str, Any]]:
+    """
+    检查质量回退（性能优化前后在同一评估集上对比）
+
+    Args:
+        baseline: 基线评估结果
+        current: 本次评估结果
+        metrics: 检查的质量指标
+        max_drop: 允许的绝对下降量
+
+    Returns:
+        超出允许范围的回退 [{mode, strategy, metric, baseline, current, drop}]
+    """
+    baseline_rows = {(row['mode'], row['strategy']): row for row in baseline}
+
+    violations = []
+    for row in current:
+        previous = baseline_rows.get((row['mode'], row['strategy']))
+        if previous is None:
+            continue
+        for metric in metrics:
+            if metric not in row['quality'] or metric not in previous['quality']:
+                continue
+            drop = previous['quality'][metric] - row['quality'][metric]
+            if drop > max_drop:
+                violations.append({
+                    'mode': row['mode'],
+                    'strategy': row['strategy'],
+                    'metric': metric,
+                    'baseline': previous['quality'][metric],
+                    'current': row['quality'][metric],
+                    'drop': drop,
+                })
+    return violations
+
+
+def save_evaluation(rows: List[Dict[str, Any]], path: str, metadata: Optional[Dict[str, Any]] = None):
+    """保存评估结果（JSON）"""
+    payload = {'metadata': metadata or {}, 'rows': rows}
+    Path(path).write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+def load_evaluation(path: str) -> List[Dict[str, Any]]:
+    """加载save_evaluation保存的评估结果"""
+    return json.loads(Path(path).read_text(encoding='utf-8'))['rows']
@@ -1,340 +1,459 @@
-"""
-监控和评估模块
-收集性能指标、执行A/B测试、评估系统效果
-"""
-
-import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from collections import defaultdict
-import statistics
-
-logger = logging.getLogger(__name__)
-
-
-@dataclass
-class MetricRecord:
-    """指标记录"""
-    timestamp: datetime
-    mode: str
-    metric_type: str  # 'document_processing', 'query', 'embedding'
-    duration: float = 0.0
-    success: bool = True
-    error: Optional[str] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
-
-
-class MetricsCollector:
-    """性能指标收集器"""
-    
-    def __init__(self, window_size: int = 1000):
-        """
-        初始化指标收集器
-        
-        Args:
-            window_size: 保留的最大记录数
-        """
-        self.window_size = window_size
-        self.records: List[MetricRecord] = []
-        self.counters = defaultdict(int)
-        
-        logger.info("初始化性能指标收集器")
-    
-    def record_document_processing(
-        self,
-        mode: str,
-        duration: float = 0.0,
-        success: bool = True,
-        error: Optional[str] = None,
-        **metadata
-    ):
-        """记录文档处理指标"""
-        record = MetricRecord(
-            timestamp=datetime.now(),
-            mode=mode,
-            metric_type='document_processing',
-            duration=duration,
-            success=success,
-            error=error,
-            metadata=metadata
-        )
-        
-        self._add_record(record)
-        self.counters[f"{mode}:doc_processed"] += 1 if success else 0
-        self.counters[f"{mode}:doc_failed"] += 1 if not success else 0
-    
-    def record_query(
-        self,
-        mode: str,
-        latency: float = 0.0,
-        result_count: int = 0,
-        success: bool = True,
-        error: Optional[str] = None,
-        **metadata
-    ):
-        """记录查询指标"""
-        record = MetricRecord(
-            timestamp=datetime.now(),
-            mode=mode,
-            metric_type='query',
-            duration=latency,
-            success=success,
-            error=error,
-            metadata={
-                'result_count': result_count,
-                **metadata
-            }
-        )
-        
-        self._add_record(record)
-        self.counters[f"{mode}:queries"] += 1
-        self.counters[f"{mode}:query_errors"] += 1 if not success else 0
-    
-    def record_embedding(
-        self,
-        mode: str,
-        vector_count: int,
-        duration: float = 0.0,
-        success: bool = True
-    ):
-        """记录嵌入指标"""
-        record = MetricRecord(
-            timestamp=datetime.now(),
-            mode=mode,
-            metric_type='embedding',
-            duration=duration,
-            success=success,
-            metadata={'vector_count': vector_count}
-        )
-        
-        self._add_record(record)
-        self.counters[f"{mode}:embeddings"] += vector_count if success else 0
-    
-    def _add_record(self, record: MetricRecord):
-        """添加记录"""
-        self.records.append(record)
-        
-        # 限制记录数量
-        if len(self.records) > self.window_size:
-            self.records = self.records[-self.window_size:]
-    
-    def get_summary(self) -> Dict[str, Any]:
-        """获取性能指标摘要"""
-        if not self.records:
-            return {}
-        
-        summary = {}
-        
-        # 按模式分组统计
-        records_by_mode = defaultdict(list)
-        for record in self.records:
-            records_by_mode[record.mode].append(record)
-        
-        for mode, mode_records in records_by_mode.items():
-            summary[mode] = self._compute_mode_metrics(mode_records)
-        
-        # 全局统计
-        summary['overall'] = self._compute_global_metrics(self.records)
-        
-        return summary
-    
-    def _compute_mode_metrics(self, records: List[MetricRecord]) -> Dict[str, Any]:
-        """计算模式的指标"""
-        
-        # 分离不同类型的记录
-        doc_records = [r for r in records if r.metric_type == 'document_processing']
-        query_records = [r for r in records if r.metric_type == 'query']
-        embed_records = [r for r in records if r.metric_type == 'embedding']
-        
-        metrics = {
-            'timestamp': datetime.now().isoformat(),
-            'total_records': len(records),
-        }
-        
-        # 文档处理指标
-        if doc_records:
-            success_count = sum(1 for r in doc_records if r.success)
-            durations = [r.duration for r in doc_records if r.duration > 0]
-            
-            metrics['document_processing'] = {
-                'total': len(doc_records),
-                'successful': success_count,
-                'error_rate': 1 - (success_count / len(doc_records)) if doc_records else 0,
-                'avg_duration_ms': statistics.mean(durations) * 1000 if durations else 0,
-                'min_duration_ms': min(durations) * 1000 if durations else 0,
-                'max_duration_ms': max(durations) * 1000 if durations else 0,
-            }
-        
-        # 查询指标
-        if query_records:
-            success_count = sum(1 for r in query_records if r.success)
-            latencies = [r.duration for r in query_records if r.duration > 0]
-            result_counts = [r.metadata.get('result_count', 0) for r in query_records]
-            
-            metrics['query'] = {
-                'total': len(query_records),
-                'successful': success_count,
-                'error_rate': 1 - (success_count / len(query_records)) if query_records else 0,
-                'avg_latency_ms': statistics.mean(latencies) * 1000 if latencies else 0,
-                'p95_latency_ms': self._percentile(latencies, 95) * 1000 if latencies else 0,
-                'p99_latency_ms': self._percentile(latencies, 99) * 1000 if latencies else 0,
-                'avg_result_count': statistics.mean(result_counts) if result_counts else 0,
-            }
-        
-        # 嵌入指标
-        if embed_records:
-            success_count = sum(1 for r in embed_records if r.success)
-            total_vectors = sum(r.metadata.get('vector_count', 0) for r in embed_records)
-            durations = [r.duration for r in embed_records if r.duration > 0]
-            
-            metrics['embedding'] = {
-                'total_vectors': total_vectors,
-                'successful_vectors': sum(
-                    r.metadata.get('vector_count', 0) for r in embed_records if r.success
-                ),
-                'avg_duration_ms': statistics.mean(durations) * 1000 if durations else 0,
-            }
-        
-        return metrics
-    
-    def _compute_global_metrics(self, records: List[MetricRecord]) -> Dict[str, Any]:
-        """计算全局指标"""
-        
-        success_count = sum(1 for r in records if r.success)
-        durations = [r.duration for r in records if r.duration > 0]
-        
-        return {
-            'total_operations': len(records),
-            'successful': success_count,
-            'failed': len(records) - success_count,
-            'overall_success_rate': success_count / len(records) if records else 0,
-            'avg_duration_ms': statistics.mean(durations) * 1000 if durations else 0,
-        }
-    
-    def _percentile(self, data: List[float], percentile: int) -> float:
-        """计算百分位"""
-        if not data:
-            return 0.0
-        
-        sorted_data = sorted(data)
-        index = int((percentile / 100) * len(sorted_data))
-        return sorted_data[min(index, len(sorted_data) - 1)]
-    
-    def get_mode_comparison(self) -> Dict[str, Any]:
-        """获取不同模式的对比"""
-        summary = self.get_summary()
-        
-        comparison = {}
-        for mode in ['efficiency', 'balanced', 'precision']:
-            if mode in summary:
-                comparison[mode] = summary[mode]
-        
-        return comparison
-
-
-class ABTestFramework:
-    """A/B测试框架"""
-    
-    def __init__(self):
-        """初始化A/B测试框架"""
-        self.experiments = {}
-        logger.info("初始化A/B测试框架")
-    
-    def create_experiment(
-        self,
-        name: str,
-        control_config: Dict[str, Any],
-        treatment_config: Dict[str, Any],
-        duration: timedelta = timedelta(days=7)
-    ) -> str:
-        """
-        创建A/B测试实验
-        
-        Args:
-            name: 实验名称
-            control_config: 对照组配置
-            treatment_config: 处理组配置
-            duration: 实验持续时间
-        
-        Returns:
-            实验ID
-        """
-        experiment_id = f"exp_{datetime.now().timestamp()}"
-        
-        self.experiments[experiment_id] = {
-            'name': name,
-            'created_at': datetime.now(),
-            'end_at': datetime.now() + duration,
-            'control': control_config,
-            'treatment': treatment_config,
-            'results': {
-                'control': [],
-                'treatment': []
-            }
-        }
-        
-        logger.info(f"创建A/B实验: {name} ({experiment_id})")
-        return experiment_id
-    
-    def record_result(
-        self,
-        experiment_id: str,
-        group: str,  # 'control' or 'treatment'
-        metrics: Dict[str, float]
-    ):
-        """记录实验结果"""
-        if experiment_id not in self.experiments:
-            logger.warning(f"实验不存在: {experiment_id}")
-            return
-        
-        self.experiments[experiment_id]['results'][group].append({
-            'timestamp': datetime.now(),
-            'metrics': metrics
-        })
-    
-    def get_results(self, experiment_id: str) -> Dict[str, Any]:
-        """获取实验结果"""
-        if experiment_id not in self.experiments:
-            return {}
-        
-        exp = self.experiments[experiment_id]
-        control_results = exp['results']['control']
-        treatment_results = exp['results']['treatment']
-        
-        # 计算统计量
-        control_metrics = self._aggregate_metrics(control_results)
-        treatment_metrics = self._aggregate_metrics(treatment_results)
-        
-        # 计算差异
-        diff = {}
-        for key in control_metrics:
-            if key in treatment_metrics:
-                diff[key] = {
-                    'control': control_metrics[key],
-                    'treatment': treatment_metrics[key],
-                    'improvement': (treatment_metrics[key] - control_metrics[key]) / control_metrics[key] * 100
-                }
-        
-        return {
-            'experiment': exp['name'],
-            'duration': f"{(exp['end_at'] - exp['created_at']).days}d",
-            'control_samples': len(control_results),
-            'treatment_samples': len(treatment_results),
-            'metrics_comparison': diff
-        }
-    
-    def _aggregate_metrics(self, results: List[Dict]) -> Dict[str, float]:
-        """聚合指标"""
-        if not results:
-            return {}
-        
-        aggregated = defaultdict(list)
-        for result in results:
-            for metric, value in result['metrics'].items():
-                aggregated[metric].append(value)
-        
-        return {
-            metric: statistics.mean(values)
-            for metric, values in aggregated.items()
-        }
+"""
+监控和评估模块
+收集性能指标、评估系统效果（A/B测试见ab_test.py）
+"""
+
+import logging
+import threading
+import time
+from array import array
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class HdrHistogram:
+    """
+    HDR风格的延迟直方图
+    
+    按对数-线性分桶记录微秒值：每个2的幂区间再均分为2^(sub_bucket_bits-1)个子桶，
+    相对误差不超过2^-(sub_bucket_bits-1)。内存固定，记录O(1)，
+    百分位通过累计计数得出，无需保存和排序原始样本。非线程安全，由调用方加锁。
+    """
+    
+    def __init__(self, max_seconds: float = 3600.0, sub_bucket_bits: int = 7):
+        """
+        初始化直方图
+        
+        Args:
+            max_seconds: 可记录的最大值（更大的值按最大值计）
+            sub_bucket_bits: 子桶位数（7对应约1.6%的相对误差）
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value = max(int(max_seconds * 1_000_000), 1 << sub_bucket_bits)
+        self._half = 1 << (sub_bucket_bits - 1)
+        self.counts = array('Q', bytes(8 * (self._index(self.max_value) + 1)))
+        self.count = 0
+        self.total = 0
+        self.min_value = 0
+        self.max_recorded = 0
+    
+    def reset(self):
+        """清空直方图"""
+        self.counts = array('Q', bytes(8 * len(self.counts)))
+        self.count = 0
+        self.total = 0
+        self.min_value = 0
+        self.max_recorded = 0
+    
+    def _index(self, value: int) -> int:
+        """微秒值对应的桶下标"""
+        exponent = max(value.bit_length() - self.sub_bucket_bits, 0)
+        return exponent * self._half + (value >> exponent)
+    
+    def _highest_equivalent(self, index: int) -> int:
+        """桶内可能的最大微秒值"""
+        exponent = max((index >> (self.sub_bucket_bits - 1)) - 1, 0)
+        sub_bucket = index - exponent * self._half
+        return ((sub_bucket + 1) << exponent) - 1
+    
+    def record(self, seconds: float):
+        """记录一个值（秒）"""
+        value = min(max(int(seconds * 1_000_000), 0), self.max_value)
+        self.counts[self._index(value)] += 1
+        if self.count == 0 or value < self.min_value:
+            self.min_value = value
+        if value > self.max_recorded:
+            self.max_recorded = value
+        self.count += 1
+        self.total += value
+    
+    def merge(self, other: 'HdrHistogram'):
+        """合并另一个相同配置的直方图"""
+        if not other.count:
+            return
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        if self.count == 0 or other.min_value < self.min_value:
+            self.min_value = other.min_value
+        self.max_recorded = max(self.max_recorded, other.max_recorded)
+        self.count += other.count
+        self.total += other.total
+    
+    def percentiles(self, percentiles: Tuple[float, ...] = (50, 95, 99)) -> Dict[float, float]:
+        """
+        一次遍历计算多个百分位
+        
+        Args:
+            percentiles: 百分位（0-100）
+        
+        Returns:
+            百分位 -> 值（秒）；取覆盖该比例样本的桶上界，并限制在已记录的最小/最大值之间
+        """
+        result = {p: 0.0 for p in percentiles}
+        if not self.count:
+            return result
+        
+        targets = sorted((max(1, -(-self.count * p // 100)), p) for p in percentiles)
+        cumulative = 0
+        position = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            cumulative += count
+            while position < len(targets) and cumulative >= targets[position][0]:
+                value = min(max(self._highest_equivalent(index), self.min_value), self.max_recorded)
+                result[targets[position][1]] = value / 1_000_000
+                position += 1
+            if position == len(targets):
+                break
+        return result
+    
+    def percentile(self, percentile: float) -> float:
+        """计算单个百分位（秒）"""
+        return self.percentiles((percentile,))[percentile]
+    
+    @property
+    def mean(self) -> float:
+        """平均值（秒）"""
+        return self.total / self.count / 1_000_000 if self.count else 0.0
+    
+    @property
+    def min(self) -> float:
+        return self.min_value / 1_000_000
+    
+    @property
+    def max(self) -> float:
+        return self.max_recorded / 1_000_000
+
+
+class RollingWindow:
+    """
+    按时间分桶的滚动窗口
+    
+    窗口划分为固定数量的时间桶（环形复用），每个桶保存自己的计数和直方图，
+    过期的桶在下次写入时重置，读取时合并窗口内仍有效的桶。
+    """
+    
+    def __init__(
+        self,
+        window_seconds: int = 300,
+        bucket_seconds: int = 10,
+        max_seconds: float = 3600.0,
+        sub_bucket_bits: int = 7
+    ):
+        """
+        初始化滚动窗口
+        
+        Args:
+            window_seconds: 窗口长度（秒）
+            bucket_seconds: 每个时间桶的长度（秒）
+            max_seconds: 直方图可记录的最大值
+            sub_bucket_bits: 直方图子桶位数
+        """
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self._histogram_args = (max_seconds, sub_bucket_bits)
+        self._size = max(1, -(-window_seconds // bucket_seconds))
+        self._epochs = [-1] * self._size
+        self._histograms: List[Optional[HdrHistogram]] = [None] * self._size
+        self._operations = [0] * self._size
+        self._failures = [0] * self._size
+    
+    def _slot(self, now: float) -> int:
+        """当前时间对应的桶（过期则重置）"""
+        epoch = int(now // self.bucket_seconds)
+        slot = epoch % self._size
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._operations[slot] = 0
+            self._failures[slot] = 0
+            if self._histograms[slot] is not None:
+                self._histograms[slot].reset()
+        return slot
+    
+    def record(self, duration: float, success: bool, now: Optional[float] = None):
+        """记录一次操作（duration<=0时只计数）"""
+        slot = self._slot(time.time() if now is None else now)
+        self._operations[slot] += 1
+        if not success:
+            self._failures[slot] += 1
+        if duration > 0:
+            if self._histograms[slot] is None:
+                self._histograms[slot] = HdrHistogram(*self._histogram_args)
+            self._histograms[slot].record(duration)
+    
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """汇总窗口内的统计"""
+        current = int((time.time() if now is None else now) // self.bucket_seconds)
+        merged = HdrHistogram(*self._histogram_args)
+        operations = failures = 0
+        for slot, epoch in enumerate(self._epochs):
+            if epoch < 0 or current - epoch >= self._size:
+                continue
+            operations += self._operations[slot]
+            failures += self._failures[slot]
+            if self._histograms[slot] is not None:
+                merged.merge(self._histograms[slot])
+        
+        percentiles = merged.percentiles()
+        return {
+            'window_seconds': self.window_seconds,
+            'operations': operations,
+            'failed': failures,
+            'rate_per_second': operations / self.window_seconds,
+            'avg_duration_ms': merged.mean * 1000,
+            'p50_duration_ms': percentiles[50] * 1000,
+            'p95_duration_ms': percentiles[95] * 1000,
+            'p99_duration_ms': percentiles[99] * 1000,
+        }
+
+
+class StreamStats:
+    """单个（模式, 指标类型）的流式统计"""
+    
+    __slots__ = ('total', 'successful', 'histogram', 'window', 'sums')
+    
+    def __init__(
+        self,
+        window_seconds: int,
+        bucket_seconds: int,
+        max_seconds: float,
+        sub_bucket_bits: int
+    ):
+        self.total = 0
+        self.successful = 0
+        self.histogram = HdrHistogram(max_seconds, sub_bucket_bits)
+        self.window = RollingWindow(window_seconds, bucket_seconds, max_seconds, sub_bucket_bits)
+        self.sums: Dict[str, float] = defaultdict(float)
+    
+    def record(self, duration: float, success: bool, **values: float):
+        """记录一次操作及其附加计数"""
+        self.total += 1
+        if success:
+            self.successful += 1
+        # 失败或未计时的操作不计入耗时分布
+        if duration > 0:
+            self.histogram.record(duration)
+        self.window.record(duration, success)
+        for name, value in values.items():
+            self.sums[name] += value
+
+
+class MetricsCollector:
+    """
+    性能指标收集器
+    
+    每个（模式, 指标类型）维护固定内存的流式聚合：计数、HDR直方图和滚动窗口。
+    记录为O(1)，摘要中的p50/p95/p99直接由直方图得出，无需排序。
+    """
+    
+    def __init__(
+        self,
+        window_seconds: int = 300,
+        bucket_seconds: int = 10,
+        max_latency_seconds: float = 3600.0,
+        sub_bucket_bits: int = 7,
+        max_recent_errors: int = 20
+    ):
+        """
+        初始化指标收集器
+        
+        Args:
+            window_seconds: 滚动窗口长度（秒）
+            bucket_seconds: 滚动窗口时间桶长度（秒）
+            max_latency_seconds: 直方图可记录的最大耗时
+            sub_bucket_bits: 直方图子桶位数（精度）
+            max_recent_errors: 保留的最近错误数
+        """
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.max_latency_seconds = max_latency_seconds
+        self.sub_bucket_bits = sub_bucket_bits
+        
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], StreamStats] = {}
+        self.counters = defaultdict(int)
+        self.recent_errors = deque(maxlen=max_recent_errors)
+        
+        logger.info("初始化性能指标收集器")
+    
+    def record_document_processing(
+        self,
+        mode: str,
+        duration: float = 0.0,
+        success: bool = True,
+        error: Optional[str] = None,
+        **metadata
+    ):
+        """记录文档处理指标"""
+        with self._lock:
+            self._record(mode, 'document_processing', duration, success, error)
+            self.counters[f"{mode}:doc_processed"] += 1 if success else 0
+            self.counters[f"{mode}:doc_failed"] += 1 if not success else 0
+    
+    def record_query(
+        self,
+        mode: str,
+        latency: float = 0.0,
+        result_count: int = 0,
+        success: bool = True,
+        error: Optional[str] = None,
+        **metadata
+    ):
+        """记录查询指标"""
+        with self._lock:
+            self._record(mode, 'query', latency, success, error, result_count=result_count)
+            self.counters[f"{mode}:queries"] += 1
+            self.counters[f"{mode}:query_errors"] += 1 if not success else 0
+    
+    def record_embedding(
+        self,
+        mode: str,
+        vector_count: int,
+        duration: float = 0.0,
+        success: bool = True
+    ):
+        """记录嵌入指标"""
+        with self._lock:
+            self._record(
+                mode, 'embedding', duration, success,
+                vector_count=vector_count,
+                successful_vectors=vector_count if success else 0
+            )
+            self.counters[f"{mode}:embeddings"] += vector_count if success else 0
+    
+    def _record(
+        self,
+        mode: str,
+        metric_type: str,
+        duration: float,
+        success: bool,
+        error: Optional[str] = None,
+        **values: float
+    ):
+        """更新流式统计（调用方持有锁）"""
+        key = (mode, metric_type)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = StreamStats(
+                self.window_seconds,
+                self.bucket_seconds,
+                self.max_latency_seconds,
+                self.sub_bucket_bits
+            )
+        stats.record(duration, success, **values)
+        
+        if error:
+            self.recent_errors.append({
+                'timestamp': datetime.now().isoformat(),
+                'mode': mode,
+                'metric_type': metric_type,
+                'error': error
+            })
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """获取性能指标摘要"""
+        with self._lock:
+            if not self._stats:
+                return {}
+            
+            stats_by_mode = defaultdict(dict)
+            for (mode, metric_type), stats in self._stats.items():
+                stats_by_mode[mode][metric_type] = stats
+            
+            summary = {
+                mode: self._compute_mode_metrics(mode_stats)
+                for mode, mode_stats in stats_by_mode.items()
+            }
+            
+            # 全局统计
+            summary['overall'] = self._compute_global_metrics()
+        
+        return summary
+    
+    def _compute_mode_metrics(self, mode_stats: Dict[str, StreamStats]) -> Dict[str, Any]:
+        """计算模式的指标（调用方持有锁）"""
+        metrics = {
+            'timestamp': datetime.now().isoformat(),
+            'total_records': sum(stats.total for stats in mode_stats.values()),
+        }
+        
+        # 文档处理指标
+        doc_stats = mode_stats.get('document_processing')
+        if doc_stats:
+            histogram = doc_stats.histogram
+            percentiles = histogram.percentiles()
+            metrics['document_processing'] = {
+                'total': doc_stats.total,
+                'successful': doc_stats.successful,
+                'error_rate': 1 - doc_stats.successful / doc_stats.total,
+                'avg_duration_ms': histogram.mean * 1000,
+                'min_duration_ms': histogram.min * 1000,
+                'max_duration_ms': histogram.max * 1000,
+                'p50_duration_ms': percentiles[50] * 1000,
+                'p95_duration_ms': percentiles[95] * 1000,
+                'p99_duration_ms': percentiles[99] * 1000,
+                'recent': doc_stats.window.snapshot(),
+            }
+        
+        # 查询指标
+        query_stats = mode_stats.get('query')
+        if query_stats:
+            histogram = query_stats.histogram
+            percentiles = histogram.percentiles()
+            metrics['query'] = {
+                'total': query_stats.total,
+                'successful': query_stats.successful,
+                'error_rate': 1 - query_stats.successful / query_stats.total,
+                'avg_latency_ms': histogram.mean * 1000,
+                'p50_latency_ms': percentiles[50] * 1000,
+                'p95_latency_ms': percentiles[95] * 1000,
+                'p99_latency_ms': percentiles[99] * 1000,
+                'avg_result_count': query_stats.sums['result_count'] / query_stats.total,
+                'recent': query_stats.window.snapshot(),
+            }
+        
+        # 嵌入指标
+        embed_stats = mode_stats.get('embedding')
+        if embed_stats:
+            metrics['embedding'] = {
+                'total_vectors': int(embed_stats.sums['vector_count']),
+                'successful_vectors': int(embed_stats.sums['successful_vectors']),
+                'avg_duration_ms': embed_stats.histogram.mean * 1000,
+                'recent': embed_stats.window.snapshot(),
+            }
+        
+        return metrics
+    
+    def _compute_global_metrics(self) -> Dict[str, Any]:
+        """计算全局指标（调用方持有锁）"""
+        total = sum(stats.total for stats in self._stats.values())
+        success_count = sum(stats.successful for stats in self._stats.values())
+        timed = sum(stats.histogram.count for stats in self._stats.values())
+        duration_us = sum(stats.histogram.total for stats in self._stats.values())
+        
+        metrics = {
+            'total_operations': total,
+            'successful': success_count,
+            'failed': total - success_count,
+            'overall_success_rate': success_count / total if total else 0,
+            'avg_duration_ms': duration_us / timed / 1000 if timed else 0,
+        }
+        if self.recent_errors:
+            metrics['recent_errors'] = list(self.recent_errors)
+        return metrics
+    
+    def get_mode_comparison(self) -> Dict[str, Any]:
+        """获取不同模式的对比"""
+        summary = self.get_summary()
+        
+        comparison = {}
+        for mode in ['efficiency', 'balanced', 'precision']:
+            if mode in summary:
+                comparison[mode] = summary[mode]
+        
+        return comparison
@@ -0,0 +1,247 @@
+"""
+Prometheus指标导出
+查询延迟、检索阶段耗时、嵌入批大小、摄取吞吐等以Prometheus格式暴露，供/metrics端点抓取
+"""
+
+import logging
+from typing import Any, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+    )
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# 查询端到端延迟分桶（秒），覆盖三种模式的目标延迟
+QUERY_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+# 检索阶段耗时分桶（秒）
+STAGE_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 嵌入批大小分桶
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# 单文档摄取耗时分桶（秒）
+INGEST_DURATION_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class PrometheusExporter:
+    """
+    Prometheus指标导出器
+
+    请求路径上只做直方图/计数器的增量更新；队列深度、缓存命中数等
+    已由各组件维护的状态在抓取时读取，不在每次请求时计算。
+    未安装prometheus_client时导出器处于禁用状态，所有记录方法为空操作。
+    """
+
+    def __init__(self, system: Any = None, namespace: str = "wheel"):
+        """
+        初始化导出器
+
+        Args:
+            system: WheelSystem实例（抓取时读取其已构建组件的状态）
+            namespace: 指标名前缀
+        """
+        self.system = system
+        self.enabled = PROMETHEUS_AVAILABLE
+
+        if not self.enabled:
+            logger.warning("prometheus_client未安装，/metrics端点不可用")
+            return
+
+        # 每个导出器使用独立的注册表，同一进程中可存在多个系统实例
+        self.registry = CollectorRegistry(auto_describe=True)
+
+        self.query_latency = Histogram(
+            "query_latency_seconds",
+            "查询端到端延迟",
+            ["mode", "strategy"],
+            namespace=namespace,
+            buckets=QUERY_LATENCY_BUCKETS,
+            registry=self.registry
+        )
+        self.query_errors = Counter(
+            "query_errors_total",
+            "失败的查询数",
+            ["mode"],
+            namespace=namespace,
+            registry=self.registry
+        )
+        self.stage_latency = Histogram(
+            "retrieval_stage_seconds",
+            "检索各阶段耗时（embed, bm25, vector, attribute, fusion, rerank, fetch_text）",
+            ["mode", "stage"],
+            namespace=namespace,
+            buckets=STAGE_LATENCY_BUCKETS,
+            registry=self.registry
+        )
+        self.embedding_batch_size = Histogram(
+            "embedding_batch_size",
+            "提交给嵌入提供商的批大小",
+            ["priority"],
+            namespace=namespace,
+            buckets=BATCH_SIZE_BUCKETS,
+            registry=self.registry
+        )
+        self.ingest_documents = Counter(
+            "ingest_documents_total",
+            "本进程处理的文档数",
+            ["mode", "status"],
+            namespace=namespace,
+            registry=self.registry
+        )
+        self.ingest_chunks = Counter(
+            "ingest_chunks_total",
+            "本进程摄取的分块数",
+            ["mode"],
+            namespace=namespace,
+            registry=self.registry
+        )
+        self.ingest_duration = Histogram(
+            "ingest_duration_seconds",
+            "单个文档的摄取耗时",
+            ["mode"],
+            namespace=namespace,
+            buckets=INGEST_DURATION_BUCKETS,
+            registry=self.registry
+        )
+
+        if system is not None:
+            self.registry.register(_SystemStateCollector(system, namespace))
+
+        logger.info("初始化Prometheus指标导出器")
+
+    def observe_query(self, mode: str, strategy: str, seconds: float, success: bool = True):
+        """记录一次查询"""
+        if not self.enabled:
+            return
+        if success:
+            self.query_latency.labels(mode, strategy).observe(seconds)
+        else:
+            self.query_errors.labels(mode).inc()
+
+    def observe_stage(self, mode: str, stage: str, seconds: float):
+        """记录一个检索阶段的耗时"""
+        if self.enabled:
+            self.stage_latency.labels(mode, stage).observe(seconds)
+
+    def observe_embedding_batch(self, priority: str, size: int):
+        """记录一个嵌入批次的大小"""
+        if self.enabled:
+            self.embedding_batch_size.labels(priority).observe(size)
+
+    def observe_ingestion(
+        self,
+        mode: str,
+        status: str,
+        seconds: float = 0.0,
+        chunks: int = 0
+    ):
+        """记录一个文档的摄取结果"""
+        if not self.enabled:
+            return
+        self.ingest_documents.labels(mode, status).inc()
+        if chunks:
+            self.ingest_chunks.labels(mode).inc(chunks)
+        if seconds > 0:
+            self.ingest_duration.labels(mode).observe(seconds)
+
+    def render(self) -> Tuple[bytes, str]:
+        """
+        生成Prometheus文本格式的指标
+
+        Returns:
+            (指标内容, Content-Type)
+        """
+        if not self.enabled:
+            return b"# prometheus_client not installed\n", CONTENT_TYPE_LATEST
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+
+class _SystemStateCollector:
+    """抓取时读取系统组件状态（只读取已构建的组件，不触发构建）"""
+
+    def __init__(self, system: Any, namespace: str):
+        self.system = system
+        self.namespace = namespace
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}"
+
+    def collect(self) -> Iterator[Any]:
+        system = self.system
+
+        # 摄取任务队列深度（含工作进程处理的任务，completed计数的增速即摄取吞吐）
+        if system.is_initialized('job_queue'):
+            jobs = GaugeMetricFamily(
+                self._name("ingest_jobs"),
+                "各模式各状态的摄取任务数",
+                labels=["mode", "status"]
+            )
+            try:
+                for mode, counts in system.job_queue.stats().items():
+                    for status, count in counts.items():
+                        jobs.add_metric([mode, status], count)
+            except Exception as e:
+                logger.warning(f"读取任务队列统计失败: {e}")
+            yield jobs
+
+        cache_requests = CounterMetricFamily(
+            self._name("cache_requests"),
+            "缓存查找次数",
+            labels=["cache", "result"]
+        )
+
+        # 查询结果缓存（含指定模式的查询和实验组使用的其他检索引擎）
+        engines = list(system._engines.values())
+        if system.is_initialized('retrieval_engine'):
+            engines.append(system.retrieval_engine)
+        if engines:
+            stats = [engine.get_stats() for engine in engines]
+            cache_requests.add_metric(["query", "hit"], sum(s['cache_hits'] for s in stats))
+            cache_requests.add_metric(["query", "miss"], sum(s['cache_misses'] for s in stats))
+
+        # 嵌入缓存和调度队列
+        if system.is_initialized('embedding_service'):
+            stats = system.embedding_service.get_stats()
+            cache_requests.add_metric(["embedding", "hit"], stats['cache_hits'])
+            cache_requests.add_metric(["embedding", "miss"], stats['cache_misses'])
+
+            pending = GaugeMetricFamily(
+                self._name("embedding_pending_texts"),
+                "等待合批的嵌入文本数",
+                labels=["priority"]
+            )
+            for priority, count in stats['pending'].items():
+                pending.add_metric([priority], count)
+            yield pending
+
+            yield GaugeMetricFamily(
+                self._name("embedding_running_batches"),
+                "正在执行的嵌入批次数",
+                value=stats['running_batches']
+            )
+            yield CounterMetricFamily(
+                self._name("embedding_texts"),
+                "已提交给嵌入提供商的文本数",
+                value=stats['texts_dispatched']
+            )
+
+        yield cache_requests
+
+        # 组件构建耗时
+        startup = GaugeMetricFamily(
+            self._name("component_init_seconds"),
+            "组件构建耗时",
+            labels=["component"]
+        )
+        for name, seconds in list(system.component_init_seconds.items()):
+            startup.add_metric([name], seconds)
+        yield startup
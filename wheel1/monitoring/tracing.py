@@ -0,0 +1,213 @@
+"""
+请求追踪 - 以嵌套span记录查询和摄取各阶段的耗时
+按采样率保留最近的追踪，调试时可强制追踪并在响应中返回span树
+"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Any, Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 当前线程/协程中正在进行的span（不在追踪中时为None）
+_current_span: ContextVar[Optional['Span']] = ContextVar('wheel_current_span', default=None)
+
+
+class Span:
+    """
+    追踪中的一个阶段
+
+    耗时使用单调时钟（perf_counter_ns）；merge=True打开的同名span会累加到
+    同一节点（count记录次数），用于循环中按批执行的步骤。
+    """
+
+    __slots__ = ('name', 'attributes', 'start_ns', 'duration_ns', 'count', 'children')
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_ns = 0
+        self.duration_ns = 0
+        self.count = 0
+        self.children: List['Span'] = []
+
+    def child(self, name: str, attributes: Dict[str, Any], merge: bool) -> 'Span':
+        """获取子span（merge时复用同名子span）"""
+        if merge:
+            for existing in self.children:
+                if existing.name == name:
+                    return existing
+        span = Span(name, attributes)
+        self.children.append(span)
+        return span
+
+    def set(self, **attributes: Any):
+        """设置span属性"""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1_000_000
+
+    def to_dict(self, origin_ns: Optional[int] = None) -> Dict[str, Any]:
+        """
+        转换为span树字典
+
+        Args:
+            origin_ns: 起点时间（默认为本span的开始时间）
+
+        Returns:
+            {name, start_ms, duration_ms, [count], [attributes], [children]}
+        """
+        origin_ns = self.start_ns if origin_ns is None else origin_ns
+        node = {
+            'name': self.name,
+            'start_ms': round((self.start_ns - origin_ns) / 1_000_000, 3),
+            'duration_ms': round(self.duration_ms, 3),
+        }
+        if self.count > 1:
+            node['count'] = self.count
+        if self.attributes:
+            node['attributes'] = self.attributes
+        if self.children:
+            node['children'] = [child.to_dict(origin_ns) for child in self.children]
+        return node
+
+
+@contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    """将span设为当前span并计时"""
+    token = _current_span.set(span)
+    start = time.perf_counter_ns()
+    if span.count == 0:
+        span.start_ns = start
+    try:
+        yield span
+    except BaseException as e:
+        span.attributes['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.duration_ns += time.perf_counter_ns() - start
+        span.count += 1
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, merge: bool = False, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    在当前追踪中打开一个子span（不在追踪中时为空操作，返回None）
+
+    Args:
+        name: 阶段名
+        merge: 与同一父span下的同名span合并（累加耗时和次数）
+        **attributes: span属性
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    with _activate(parent.child(name, attributes, merge)) as child:
+        yield child
+
+
+def traced(name: str) -> Callable:
+    """将函数调用记录为span的装饰器"""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Tracer:
+    """
+    追踪器
+
+    按采样率为请求开启追踪，结束的追踪保存在有界缓冲区中；
+    未被采样的请求只在各阶段做一次上下文变量查找。
+    """
+
+    def __init__(self, sample_rate: float = 0.0, buffer_size: int = 100):
+        """
+        初始化追踪器
+
+        Args:
+            sample_rate: 采样率（0-1，0为只记录强制追踪的请求）
+            buffer_size: 保留的最近追踪数
+        """
+        self.sample_rate = sample_rate
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name: str, force: bool = False, **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        开启一次追踪（已在追踪中时作为子span）
+
+        Args:
+            name: 根span名
+            force: 忽略采样率强制追踪（调试标志）
+            **attributes: 根span属性
+
+        Returns:
+            根span；未采样时为None
+        """
+        if _current_span.get() is not None:
+            with span(name, **attributes) as child:
+                yield child
+            return
+
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            yield None
+            return
+
+        root = Span(name, attributes)
+        trace_id = uuid.uuid4().hex[:16]
+        started_at = datetime.now().isoformat()
+        try:
+            with _activate(root):
+                yield root
+        finally:
+            with self._lock:
+                self._buffer.append((trace_id, started_at, root))
+
+    def recent(self, limit: int = 20, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取最近的追踪（新的在前）
+
+        Args:
+            limit: 最多返回数
+            name: 只返回指定根span名的追踪
+
+        Returns:
+            [{trace_id, timestamp, duration_ms, spans}]
+        """
+        with self._lock:
+            entries = list(self._buffer)
+
+        traces = []
+        for trace_id, started_at, root in reversed(entries):
+            if name is not None and root.name != name:
+                continue
+            traces.append({
+                'trace_id': trace_id,
+                'timestamp': started_at,
+                'duration_ms': round(root.duration_ms, 3),
+                'spans': root.to_dict()
+            })
+            if len(traces) >= limit:
+                break
+        return traces
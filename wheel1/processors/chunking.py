@@ -0,0 +1,368 @@
+"""
+文本分块 - 支持多种分块策略
+按句子/段落边界切分，基于token预算控制分块大小，惰性逐个生成分块
+"""
+
+import logging
+import re
+from collections import deque
+from enum import Enum
+from typing import Dict, Any, Optional, Iterator, Tuple, Deque
+
+logger = logging.getLogger(__name__)
+
+
+# 段落边界：空行
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+
+# 句子结束：中英文句末标点（含紧随的引号/括号）、英文句点后接空白、单个换行
+_SENTENCE_END = re.compile(r'[。！？!?；;…]+[”’"\'）)】]*|\.(?=\s)|\n')
+
+# 近似token切分：CJK单字、英文按最多6个字母、数字按最多3位、其他符号单独计
+_APPROX_TOKEN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]|[A-Za-z]{1,6}|\d{1,3}|[^\sA-Za-z\d]')
+
+# tiktoken分段编码的段长度（字符）
+_SPAN_BLOCK_CHARS = 65536
+
+
+class ChunkStrategy(str, Enum):
+    """分块策略"""
+    FIXED = "fixed"                  # 固定token窗口
+    SEMANTIC = "semantic"            # 句子/段落边界
+    HIERARCHICAL = "hierarchical"    # 父块 + 子块
+
+
+class Tokenizer:
+    """本地分词计数器 - 优先使用tiktoken，未安装时使用正则近似"""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        """
+        初始化分词器
+
+        Args:
+            encoding: tiktoken编码名称
+        """
+        self.encoding_name = encoding
+
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding)
+        except Exception as e:
+            logger.debug(f"tiktoken不可用: {e}，使用近似分词计数")
+            self._encoding = None
+
+    def count(self, text: str) -> int:
+        """计算文本的token数"""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return sum(1 for _ in _APPROX_TOKEN.finditer(text))
+
+    def iter_spans(self, text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """
+        按token返回字符区间（用于超长文本的硬切分）
+
+        有tiktoken时使用编码偏移，与count()的计数一致；否则使用正则近似。
+        多字节字符被拆成多个token时，前面的token返回零宽区间，字符整体归入最后一个token。
+        """
+        if self._encoding is None:
+            for match in _APPROX_TOKEN.finditer(text, start, end):
+                yield match.start(), match.end()
+            return
+
+        # 分段编码，避免一次性为整篇文档生成token列表
+        block_start = start
+        while block_start < end:
+            block_end = _span_block_end(text, block_start, end)
+            block = text[block_start:block_end]
+            tokens = self._encoding.encode(block, disallowed_special=())
+            _, offsets = self._encoding.decode_with_offsets(tokens)
+            offsets.append(len(block))
+            for i in range(len(tokens)):
+                yield block_start + offsets[i], block_start + offsets[i + 1]
+            block_start = block_end
+
+
+def _span_block_end(text: str, start: int, end: int) -> int:
+    """确定分段编码的段终点（尽量落在换行或空格之后）"""
+    limit = start + _SPAN_BLOCK_CHARS
+    if limit >= end:
+        return end
+    cut = text.rfind('\n', start, limit)
+    if cut <= start:
+        cut = text.rfind(' ', start, limit)
+    return cut + 1 if cut > start else limit
+
+
+_default_tokenizer: Optional[Tokenizer] = None
+
+
+def get_default_tokenizer() -> Tokenizer:
+    """获取进程内共享的分词器"""
+    global _default_tokenizer
+    if _default_tokenizer is None:
+        _default_tokenizer = Tokenizer()
+    return _default_tokenizer
+
+
+class TextChunker:
+    """
+    文本分块器
+
+    所有分块以生成器形式返回，调用方可以边分块边嵌入，
+    大文档无需在内存中保留完整的分块列表。
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        chunk_overlap: int = 50,
+        strategy: ChunkStrategy = ChunkStrategy.SEMANTIC,
+        child_chunk_size: Optional[int] = None,
+        child_chunk_overlap: int = 0,
+        min_fill: float = 0.5,
+        tokenizer: Optional[Tokenizer] = None
+    ):
+        """
+        初始化分块器
+
+        Args:
+            chunk_size: 分块token预算（分层策略下为父块预算）
+            chunk_overlap: 相邻分块重叠的token数
+            strategy: 分块策略
+            child_chunk_size: 子块token预算（仅分层策略）
+            child_chunk_overlap: 子块重叠token数（仅分层策略）
+            min_fill: 分块达到预算的该比例后，遇到段落边界即提前结束
+            tokenizer: 分词器（默认使用共享实例）
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size必须为正数: {chunk_size}")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(f"chunk_overlap必须小于chunk_size: {chunk_overlap}")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.strategy = ChunkStrategy(strategy)
+        self.child_chunk_size = child_chunk_size or max(chunk_size // 4, 1)
+        self.child_chunk_overlap = min(child_chunk_overlap, self.child_chunk_size - 1)
+        self.min_fill = min_fill
+        self.tokenizer = tokenizer or get_default_tokenizer()
+
+    @classmethod
+    def from_config(cls, processing_config: Dict[str, Any]) -> "TextChunker":
+        """根据模式的processing配置创建分块器"""
+        return cls(
+            chunk_size=processing_config['chunk_size'],
+            chunk_overlap=processing_config.get('chunk_overlap', 0),
+            strategy=processing_config.get('chunk_strategy', ChunkStrategy.SEMANTIC),
+            child_chunk_size=processing_config.get('child_chunk_size'),
+            child_chunk_overlap=processing_config.get('child_chunk_overlap', 0)
+        )
+
+    def iter_chunks(self, text: str, source: str) -> Iterator[Dict[str, Any]]:
+        """
+        惰性生成分块
+
+        Args:
+            text: 预处理后的文本
+            source: 来源文件
+
+        Yields:
+            分块字典（id, text, source, start_pos, end_pos, chunk_index, token_count；
+            分层策略额外包含level和parent_id）
+        """
+        if self.strategy == ChunkStrategy.FIXED:
+            spans = self._split_long(text, 0, len(text), self.chunk_size, self.chunk_overlap)
+            for index, (start, end, tokens) in enumerate(spans):
+                yield self._make_chunk(text, source, index, start, end, tokens)
+
+        elif self.strategy == ChunkStrategy.SEMANTIC:
+            spans = self._pack(text, 0, len(text), self.chunk_size, self.chunk_overlap)
+            for index, (start, end, tokens) in enumerate(spans):
+                yield self._make_chunk(text, source, index, start, end, tokens)
+
+        else:
+            yield from self._iter_hierarchical(text, source)
+
+    def _iter_hierarchical(self, text: str, source: str) -> Iterator[Dict[str, Any]]:
+        """分层分块：先生成父块，紧接着生成其子块"""
+        index = 0
+        parents = self._pack(text, 0, len(text), self.chunk_size, self.chunk_overlap)
+
+        for start, end, tokens in parents:
+            parent = self._make_chunk(text, source, index, start, end, tokens)
+            parent['level'] = 'parent'
+            parent['parent_id'] = None
+            parent_id = parent['id']  # 调用方可能改写已生成分块的ID
+            index += 1
+            yield parent
+
+            children = self._pack(
+                text, start, end, self.child_chunk_size, self.child_chunk_overlap
+            )
+            for child_start, child_end, child_tokens in children:
+                child = self._make_chunk(
+                    text, source, index, child_start, child_end, child_tokens
+                )
+                child['level'] = 'child'
+                child['parent_id'] = parent_id
+                index += 1
+                yield child
+
+    def _make_chunk(
+        self,
+        text: str,
+        source: str,
+        index: int,
+        start: int,
+        end: int,
+        tokens: int
+    ) -> Dict[str, Any]:
+        """构建分块字典"""
+        return {
+            'id': f"{source}_{index}",
+            'text': text[start:end],
+            'source': source,
+            'start_pos': start,
+            'end_pos': end,
+            'chunk_index': index,
+            'token_count': tokens
+        }
+
+    def _pack(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        budget: int,
+        overlap: int
+    ) -> Iterator[Tuple[int, int, int]]:
+        """
+        将句子贪心装入token预算内的分块
+
+        段落结束且分块已足够满时提前切分；超出预算的单句按token硬切分。
+        """
+        window: Deque[Tuple[int, int, int]] = deque()
+        tokens = 0
+        fresh = 0  # 上次切分后新加入的句子数
+
+        for sent_start, sent_end, paragraph_end in self._iter_sentences(text, start, end):
+            count = self.tokenizer.count(text[sent_start:sent_end])
+
+            if count > budget:
+                if fresh:
+                    yield window[0][0], window[-1][1], tokens
+                window.clear()
+                tokens = fresh = 0
+                yield from self._split_long(text, sent_start, sent_end, budget, overlap)
+                continue
+
+            if fresh and tokens + count > budget:
+                yield window[0][0], window[-1][1], tokens
+                tokens = self._carry_overlap(window, overlap, budget - count)
+                fresh = 0
+
+            window.append((sent_start, sent_end, count))
+            tokens += count
+            fresh += 1
+
+            if paragraph_end and tokens >= budget * self.min_fill:
+                yield window[0][0], window[-1][1], tokens
+                window.clear()
+                tokens = fresh = 0
+
+        if fresh:
+            yield window[0][0], window[-1][1], tokens
+
+    def _carry_overlap(
+        self,
+        window: Deque[Tuple[int, int, int]],
+        overlap: int,
+        room: int
+    ) -> int:
+        """保留窗口尾部不超过overlap（且不超过剩余空间）的句子，返回保留的token数"""
+        limit = min(overlap, room)
+        kept = 0
+        keep_from = len(window)
+
+        while keep_from > 1 and kept + window[keep_from - 1][2] <= limit:
+            keep_from -= 1
+            kept += window[keep_from][2]
+
+        for _ in range(keep_from):
+            window.popleft()
+
+        return kept
+
+    def _split_long(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        budget: int,
+        overlap: int
+    ) -> Iterator[Tuple[int, int, int]]:
+        """按token窗口硬切分文本区间"""
+        step = budget - overlap
+        spans: Deque[Tuple[int, int]] = deque()
+        fresh = 0  # 上次输出后新加入的token数
+
+        for span in self.tokenizer.iter_spans(text, start, end):
+            spans.append(span)
+            fresh += 1
+            if len(spans) == budget:
+                yield spans[0][0], spans[-1][1], len(spans)
+                for _ in range(step):
+                    spans.popleft()
+                fresh = 0
+
+        if fresh:
+            yield spans[0][0], spans[-1][1], len(spans)
+
+    def _iter_sentences(
+        self,
+        text: str,
+        start: int,
+        end: int
+    ) -> Iterator[Tuple[int, int, bool]]:
+        """返回(句子起点, 句子终点, 是否为段落末句)，已去除首尾空白"""
+        para_start = start
+        for match in _PARAGRAPH_BREAK.finditer(text, start, end):
+            yield from self._iter_paragraph(text, para_start, match.start())
+            para_start = match.end()
+        yield from self._iter_paragraph(text, para_start, end)
+
+    def _iter_paragraph(
+        self,
+        text: str,
+        start: int,
+        end: int
+    ) -> Iterator[Tuple[int, int, bool]]:
+        """切分单个段落内的句子"""
+        previous = None
+        pos = start
+
+        for match in _SENTENCE_END.finditer(text, start, end):
+            span = _strip_span(text, pos, match.end())
+            pos = match.end()
+            if span:
+                if previous:
+                    yield previous[0], previous[1], False
+                previous = span
+
+        span = _strip_span(text, pos, end)
+        if span:
+            if previous:
+                yield previous[0], previous[1], False
+            previous = span
+
+        if previous:
+            yield previous[0], previous[1], True
+
+
+def _strip_span(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """去除区间首尾空白，空区间返回None"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
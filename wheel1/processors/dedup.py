@@ -0,0 +1,138 @@
+"""
+分块去重 - 跨文档复用已有嵌入向量
+精确去重基于规范化文本哈希，近似去重基于SimHash
+"""
+
+import hashlib
+import logging
+import re
+import unicodedata
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.helpers import text_sha256
+
+logger = logging.getLogger(__name__)
+
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+# SimHash特征：CJK单字或字母数字串
+_FEATURE_TOKEN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]|[a-z0-9]+')
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：NFKC、小写、合并空白"""
+    text = unicodedata.normalize('NFKC', text).lower()
+    return ' '.join(text.split())
+
+
+def text_fingerprint(text: str) -> str:
+    """规范化文本的哈希（精确去重键）"""
+    return text_sha256(normalize_text(text))
+
+
+def simhash(text: str, bits: int = SIMHASH_BITS) -> int:
+    """计算文本的SimHash（以3-gram词组为特征）"""
+    tokens = _FEATURE_TOKEN.findall(normalize_text(text))
+    if len(tokens) >= 3:
+        features = [' '.join(tokens[i:i + 3]) for i in range(len(tokens) - 2)]
+    else:
+        features = tokens
+
+    weights = [0] * bits
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=bits // 8).digest()
+        value = int.from_bytes(digest, 'big')
+        for i in range(bits):
+            weights[i] += 1 if (value >> i) & 1 else -1
+
+    result = 0
+    for i, weight in enumerate(weights):
+        if weight > 0:
+            result |= 1 << i
+    return result
+
+
+def simhash_bands(value: int) -> Tuple[int, ...]:
+    """将SimHash切分为若干段，用于候选检索（汉明距离 < 段数时必有一段相同）"""
+    mask = (1 << _BAND_BITS) - 1
+    return tuple((value >> (i * _BAND_BITS)) & mask for i in range(SIMHASH_BANDS))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """计算两个哈希的汉明距离"""
+    return bin(a ^ b).count('1')
+
+
+class ChunkDeduplicator:
+    """
+    分块去重器
+
+    为每个分块确定其向量ID：命中已有向量时直接引用，
+    否则以分块ID作为新向量ID，由调用方负责嵌入和存储。
+    复用的向量只共享嵌入，检索时按分块表中的vector_id归属到各个引用分块。
+    """
+
+    def __init__(
+        self,
+        manifest: Any,
+        near_duplicate_threshold: Optional[int] = None
+    ):
+        """
+        初始化分块去重器
+
+        Args:
+            manifest: 摄取清单（存储向量指纹和引用关系）
+            near_duplicate_threshold: 近似去重的最大汉明距离（None为仅精确去重）
+        """
+        if near_duplicate_threshold is not None and near_duplicate_threshold >= SIMHASH_BANDS:
+            raise ValueError(
+                f"近似去重阈值必须小于{SIMHASH_BANDS}: {near_duplicate_threshold}"
+            )
+
+        self.manifest = manifest
+        self.near_duplicate_threshold = near_duplicate_threshold
+
+    def resolve(
+        self,
+        chunks: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str, Optional[int]]]]:
+        """
+        解析一批分块的向量引用
+
+        Args:
+            chunks: 分块列表（会被写入vector_id字段）
+
+        Returns:
+            (需要嵌入的分块, 待登记的向量指纹[(vector_id, 文本哈希, SimHash)])
+        """
+        to_embed = []
+        fingerprints = []
+        pending: Dict[str, str] = {}  # 本批内的新指纹 -> 向量ID
+
+        for chunk in chunks:
+            fingerprint = text_fingerprint(chunk['text'])
+            vector_id = pending.get(fingerprint) or self.manifest.find_vector(fingerprint)
+
+            signature = None
+            if vector_id is None and self.near_duplicate_threshold is not None:
+                signature = simhash(chunk['text'])
+                vector_id = self.manifest.find_similar_vector(
+                    signature, self.near_duplicate_threshold
+                )
+
+            if vector_id is None:
+                vector_id = chunk['id']
+                pending[fingerprint] = vector_id
+                fingerprints.append((vector_id, fingerprint, signature))
+                to_embed.append(chunk)
+
+            chunk['vector_id'] = vector_id
+
+        reused = len(chunks) - len(to_embed)
+        if reused:
+            logger.debug(f"分块去重: {reused}/{len(chunks)} 复用已有向量")
+
+        return to_embed, fingerprints
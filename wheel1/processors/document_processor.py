@@ -1,315 +1,576 @@
-"""
-文档处理器 - 支持多模态输入
-包括文本、PDF、图像、视频处理
-"""
-
-import logging
-from typing import Dict, Any, Optional, List
-from pathlib import Path
-from abc import ABC, abstractmethod
-
-from core.modes import ProcessingMode
-
-logger = logging.getLogger(__name__)
-
-
-class TextExtractor(ABC):
-    """文本提取器基类"""
-    
-    @abstractmethod
-    def extract(self, file_path: str) -> str:
-        """从文件提取文本"""
-        pass
-
-
-class PDFExtractor(TextExtractor):
-    """PDF文本提取"""
-    
-    def extract(self, file_path: str) -> str:
-        """从PDF提取文本"""
-        try:
-            import PyPDF2
-            
-            text = []
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    text.append(page.extract_text())
-            
-            return '\n'.join(text)
-        
-        except ImportError:
-            logger.warning("PyPDF2未安装，使用简单文本提取")
-            return f"[PDF内容] 文件: {file_path}"
-
-
-class DocXExtractor(TextExtractor):
-    """Word文档文本提取"""
-    
-    def extract(self, file_path: str) -> str:
-        """从DOCX提取文本"""
-        try:
-            from docx import Document
-            
-            doc = Document(file_path)
-            text = []
-            for para in doc.paragraphs:
-                text.append(para.text)
-            
-            return '\n'.join(text)
-        
-        except ImportError:
-            logger.warning("python-docx未安装，使用简单文本提取")
-            return f"[Word内容] 文件: {file_path}"
-
-
-class ImageExtractor(TextExtractor):
-    """图像文本提取（OCR）"""
-    
-    def __init__(self, mode: ProcessingMode = ProcessingMode.BALANCED):
-        """
-        初始化图像提取器
-        
-        Args:
-            mode: 处理模式（影响OCR模型选择）
-        """
-        self.mode = mode
-        self._initialize_ocr()
-    
-    def _initialize_ocr(self):
-        """根据模式初始化OCR"""
-        if self.mode == ProcessingMode.EFFICIENCY:
-            # 高效模式：使用轻量级OCR
-            self.ocr_type = 'easyocr'
-        elif self.mode == ProcessingMode.BALANCED:
-            # 中效模式：使用Paddle OCR
-            self.ocr_type = 'paddle'
-        else:  # PRECISION
-            # 低效模式：使用最强OCR（GPT-4V）
-            self.ocr_type = 'gpt4v'
-        
-        logger.info(f"初始化OCR: {self.ocr_type} (模式: {self.mode.value})")
-    
-    def extract(self, file_path: str) -> str:
-        """从图像提取文本"""
-        try:
-            if self.ocr_type == 'easyocr':
-                return self._extract_easyocr(file_path)
-            elif self.ocr_type == 'paddle':
-                return self._extract_paddle_ocr(file_path)
-            else:
-                return self._extract_gpt4v(file_path)
-        
-        except Exception as e:
-            logger.error(f"OCR提取失败: {e}")
-            return f"[图像内容] 文件: {file_path} (OCR失败)"
-    
-    def _extract_easyocr(self, file_path: str) -> str:
-        """使用EasyOCR提取（快速）"""
-        try:
-            import easyocr
-            reader = easyocr.Reader(['ch', 'en'])
-            result = reader.readtext(file_path)
-            return '\n'.join([text[1] for text in result])
-        except ImportError:
-            logger.warning("easyocr未安装")
-            return ""
-    
-    def _extract_paddle_ocr(self, file_path: str) -> str:
-        """使用PaddleOCR提取（平衡）"""
-        try:
-            from paddleocr import PaddleOCR
-            ocr = PaddleOCR(use_angle_cls=True, lang='ch')
-            result = ocr.ocr(file_path, cls=True)
-            return '\n'.join([line[0][1] for line in result if result])
-        except ImportError:
-            logger.warning("paddleocr未安装")
-            return ""
-    
-    def _extract_gpt4v(self, file_path: str) -> str:
-        """使用GPT-4V提取（最精确）"""
-        try:
-            import base64
-            from openai import OpenAI
-            
-            client = OpenAI()
-            
-            # 读取图像并编码
-            with open(file_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
-            
-            # 调用GPT-4V
-            response = client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_data}"
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": "请完整地识别和提取图像中的所有文本内容"
-                            }
-                        ]
-                    }
-                ]
-            )
-            
-            return response.choices[0].message.content
-        
-        except Exception as e:
-            logger.warning(f"GPT-4V提取失败: {e}")
-            return ""
-
-
-class VideoExtractor(TextExtractor):
-    """视频文本提取"""
-    
-    def extract(self, file_path: str) -> str:
-        """从视频提取文本（字幕、语音识别）"""
-        try:
-            # 这里应实现视频处理逻辑
-            # 包括：提取字幕、语音转文字、场景识别等
-            logger.info(f"处理视频文件: {file_path}")
-            return f"[视频内容] 文件: {file_path}\n[需要实现视频处理模块]"
-        
-        except Exception as e:
-            logger.error(f"视频提取失败: {e}")
-            return ""
-
-
-class DocumentProcessor:
-    """统一文档处理器"""
-    
-    # 文件类型到提取器的映射
-    EXTRACTORS = {
-        '.pdf': PDFExtractor,
-        '.docx': DocXExtractor,
-        '.doc': DocXExtractor,
-        '.txt': lambda: None,  # 直接读取
-        '.jpg': ImageExtractor,
-        '.jpeg': ImageExtractor,
-        '.png': ImageExtractor,
-        '.mp4': VideoExtractor,
-        '.avi': VideoExtractor
-    }
-    
-    def __init__(
-        self,
-        mode: ProcessingMode = ProcessingMode.BALANCED,
-        cache: Optional[Any] = None
-    ):
-        """
-        初始化文档处理器
-        
-        Args:
-            mode: 处理模式
-            cache: 缓存管理器（可选）
-        """
-        self.mode = mode
-        self.cache = cache
-        self.extractors = {}
-        
-        logger.info(f"初始化文档处理器 - 模式: {mode.value}")
-    
-    def extract_text(
-        self,
-        file_path: str,
-        mode: Optional[ProcessingMode] = None
-    ) -> str:
-        """
-        从文档提取文本
-        
-        Args:
-            file_path: 文件路径
-            mode: 处理模式（可覆盖默认模式）
-        
-        Returns:
-            提取的文本
-        """
-        mode = mode or self.mode
-        
-        # 检查缓存
-        cache_key = f"extract:{file_path}:{mode.value}"
-        if self.cache:
-            cached = self.cache.get(cache_key)
-            if cached:
-                logger.info(f"使用缓存文本提取: {file_path}")
-                return cached
-        
-        # 确定文件类型和提取器
-        file_path_obj = Path(file_path)
-        ext = file_path_obj.suffix.lower()
-        
-        # 特殊处理：纯文本文件
-        if ext == '.txt':
-            text = self._read_text_file(file_path)
-        else:
-            # 获取或创建提取器
-            extractor = self._get_extractor(ext, mode)
-            
-            if extractor is None:
-                logger.warning(f"不支持的文件类型: {ext}")
-                text = ""
-            else:
-                text = extractor.extract(file_path)
-        
-        # 存储到缓存
-        if self.cache and text:
-            self.cache.set(cache_key, text, ttl=86400)  # 24小时TTL
-        
-        logger.info(f"文本提取完成: {file_path} ({len(text)} 字符)")
-        return text
-    
-    def _get_extractor(
-        self,
-        file_ext: str,
-        mode: ProcessingMode
-    ) -> Optional[TextExtractor]:
-        """获取或创建提取器实例"""
-        
-        cache_key = f"{file_ext}:{mode.value}"
-        
-        if cache_key not in self.extractors:
-            extractor_class = self.EXTRACTORS.get(file_ext)
-            
-            if extractor_class is None:
-                return None
-            
-            # 某些提取器需要mode参数
-            if file_ext in {'.jpg', '.jpeg', '.png'}:
-                self.extractors[cache_key] = extractor_class(mode)
-            else:
-                self.extractors[cache_key] = extractor_class()
-        
-        return self.extractors.get(cache_key)
-    
-    def _read_text_file(self, file_path: str) -> str:
-        """读取纯文本文件"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # 尝试其他编码
-            with open(file_path, 'r', encoding='gbk') as f:
-                return f.read()
-    
-    def batch_extract(
-        self,
-        file_paths: List[str]
-    ) -> Dict[str, str]:
-        """批量提取文本"""
-        results = {}
-        for file_path in file_paths:
-            try:
-                results[file_path] = self.extract_text(file_path)
-            except Exception as e:
-                logger.error(f"批量提取失败: {file_path} - {e}")
-                results[file_path] = None
-        
-        return results
+"""
+文档处理器 - 支持多模态输入
+包括文本、PDF、图像、视频处理
+"""
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, Any, Optional, List, Iterator, NamedTuple, Tuple, Deque
+from pathlib import Path
+from abc import ABC, abstractmethod
+
+from core.modes import ProcessingMode
+from processors.ocr_pool import OCREnginePool, ocr_engine_pool, warmup_ocr_engines
+from storage.cache import ExtractionCache, LocalLRUCache
+from utils.helpers import file_sha256
+
+logger = logging.getLogger(__name__)
+
+
+class Extraction(NamedTuple):
+    """文本提取结果（complete为False时结果不完整，如OCR失败、部分页面失败，不应缓存）"""
+    text: str
+    complete: bool = True
+
+
+class TextExtractor(ABC):
+    """文本提取器基类"""
+    
+    @abstractmethod
+    def extract(self, file_path: str) -> str:
+        """从文件提取文本"""
+        pass
+    
+    def extract_result(self, file_path: str) -> Extraction:
+        """提取文本并标明结果是否完整（默认视为完整）"""
+        return Extraction(self.extract(file_path))
+
+
+class PageResult(NamedTuple):
+    """单页提取结果"""
+    page: int
+    text: str
+    error: Optional[str] = None
+
+
+def _extract_pdf_pages(file_path: str, pages: List[int]) -> List[Tuple[int, str, Optional[str]]]:
+    """
+    提取PDF的指定页面（在工作进程中执行）
+    
+    每个任务只解析一次PDF，单页失败不影响同批其他页面。
+    """
+    import PyPDF2
+    
+    results = []
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for page in pages:
+            try:
+                results.append((page, reader.pages[page].extract_text() or "", None))
+            except Exception as e:
+                results.append((page, "", str(e)))
+    
+    return results
+
+
+class PDFExtractor(TextExtractor):
+    """PDF文本提取 - 按页并行提取，按(文件哈希, 页码)缓存"""
+    
+    # 未提供缓存管理器时，进程内页面缓存保留的最多页数
+    LOCAL_CACHE_PAGES = 1024
+    
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        cache: Optional[Any] = None,
+        parallel_threshold: int = 16,
+        pages_per_task: int = 8
+    ):
+        """
+        初始化PDF提取器
+        
+        Args:
+            max_workers: 进程池大小（默认为CPU核数）
+            cache: 缓存管理器（可选，未提供时使用有界的进程内LRU缓存）
+            parallel_threshold: 待提取页数达到该值才启用进程池
+            pages_per_task: 每个进程任务提取的页数
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache
+        self.parallel_threshold = parallel_threshold
+        self.pages_per_task = pages_per_task
+        self._local_cache = LocalLRUCache(self.LOCAL_CACHE_PAGES)
+    
+    def extract(self, file_path: str) -> str:
+        """从PDF提取文本"""
+        return self.extract_result(file_path).text
+    
+    def extract_result(self, file_path: str) -> Extraction:
+        """从PDF提取文本（有页面提取失败时结果不完整）"""
+        try:
+            import PyPDF2
+        except ImportError:
+            logger.warning("PyPDF2未安装，使用简单文本提取")
+            return Extraction(f"[PDF内容] 文件: {file_path}", complete=False)
+        
+        texts = []
+        failed = []
+        for result in self.extract_pages(file_path):
+            if result.error:
+                failed.append(result.page + 1)
+            else:
+                texts.append(result.text)
+        
+        if failed:
+            logger.warning(f"PDF部分页面提取失败: {file_path} 页码 {failed}")
+        
+        return Extraction('\n\n'.join(texts), complete=not failed)
+    
+    def extract_pages(self, file_path: str) -> Iterator[PageResult]:
+        """
+        按页码顺序流式返回每页的提取结果
+        
+        已缓存的页面直接返回；其余页面分批提交到进程池，
+        只有提取成功的页面会写入缓存，因此重新提取时只会重做失败的页面。
+        """
+        import PyPDF2
+        
+        file_hash = file_sha256(file_path)
+        with open(file_path, 'rb') as f:
+            page_count = len(PyPDF2.PdfReader(f).pages)
+        
+        cached = {}
+        missing = []
+        for page in range(page_count):
+            text = self._cache_get(self._page_key(file_hash, page))
+            if text is None:
+                missing.append(page)
+            else:
+                cached[page] = text
+        
+        if missing:
+            logger.info(
+                f"提取PDF页面: {file_path} ({len(missing)}/{page_count} 页需要提取)"
+            )
+        
+        tasks = [
+            missing[i:i + self.pages_per_task]
+            for i in range(0, len(missing), self.pages_per_task)
+        ]
+        
+        if len(missing) < self.parallel_threshold or self.max_workers <= 1:
+            extracted = map(_extract_pdf_pages, repeat(file_path), tasks)
+            yield from self._merge_pages(file_hash, page_count, cached, extracted)
+            return
+        
+        workers = min(self.max_workers, len(tasks))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            extracted = executor.map(_extract_pdf_pages, repeat(file_path), tasks)
+            yield from self._merge_pages(file_hash, page_count, cached, extracted)
+    
+    def _merge_pages(
+        self,
+        file_hash: str,
+        page_count: int,
+        cached: Dict[int, str],
+        extracted: Iterator[List[Tuple[int, str, Optional[str]]]]
+    ) -> Iterator[PageResult]:
+        """按页码顺序合并缓存页面和新提取的页面（任务结果按页码升序到达）"""
+        pending: Deque[Tuple[int, str, Optional[str]]] = deque()
+        
+        for page in range(page_count):
+            if page in cached:
+                yield PageResult(page, cached.pop(page))
+                continue
+            
+            if not pending:
+                pending.extend(next(extracted))
+            page_no, text, error = pending.popleft()
+            if error is None:
+                self._cache_set(self._page_key(file_hash, page_no), text)
+            else:
+                logger.debug(f"PDF页面提取失败: 第{page_no + 1}页 - {error}")
+            
+            yield PageResult(page_no, text, error)
+    
+    def _page_key(self, file_hash: str, page: int) -> str:
+        """页面缓存键"""
+        return f"pdf_page:{file_hash}:{page}"
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """读取页面缓存"""
+        if self.cache:
+            return self.cache.get(key)
+        return self._local_cache.get(key)
+    
+    def _cache_set(self, key: str, text: str):
+        """写入页面缓存"""
+        if self.cache:
+            self.cache.set(key, text, ttl=86400)
+        else:
+            self._local_cache.set(key, text)
+
+
+class DocXExtractor(TextExtractor):
+    """Word文档文本提取"""
+    
+    def extract(self, file_path: str) -> str:
+        """从DOCX提取文本"""
+        return self.extract_result(file_path).text
+    
+    def extract_result(self, file_path: str) -> Extraction:
+        """从DOCX提取文本（python-docx未安装时结果不完整）"""
+        try:
+            from docx import Document
+            
+            doc = Document(file_path)
+            text = []
+            for para in doc.paragraphs:
+                text.append(para.text)
+            
+            return Extraction('\n'.join(text))
+        
+        except ImportError:
+            logger.warning("python-docx未安装，使用简单文本提取")
+            return Extraction(f"[Word内容] 文件: {file_path}", complete=False)
+
+
+class ImageExtractor(TextExtractor):
+    """图像文本提取（OCR）"""
+    
+    def __init__(
+        self,
+        mode: ProcessingMode = ProcessingMode.BALANCED,
+        engine_pool: Optional[OCREnginePool] = None
+    ):
+        """
+        初始化图像提取器
+        
+        Args:
+            mode: 处理模式（影响OCR模型选择）
+            engine_pool: OCR引擎池（默认使用进程内共享的引擎池）
+        """
+        self.mode = mode
+        self.engine_pool = engine_pool or ocr_engine_pool
+        self._initialize_ocr()
+    
+    def _initialize_ocr(self):
+        """根据模式选择OCR引擎（引擎本身在首次识别时由引擎池加载）"""
+        if self.mode == ProcessingMode.EFFICIENCY:
+            # 高效模式：使用轻量级OCR
+            self.ocr_type = 'easyocr'
+        elif self.mode == ProcessingMode.BALANCED:
+            # 中效模式：使用Paddle OCR
+            self.ocr_type = 'paddle'
+        else:  # PRECISION
+            # 低效模式：使用最强OCR（GPT-4V）
+            self.ocr_type = 'gpt4v'
+        
+        logger.info(f"初始化OCR: {self.ocr_type} (模式: {self.mode.value})")
+    
+    def extract(self, file_path: str) -> str:
+        """从图像提取文本"""
+        return self.extract_result(file_path).text
+    
+    def extract_result(self, file_path: str) -> Extraction:
+        """从图像提取文本（OCR失败时结果不完整）"""
+        return self.extract_batch_results([file_path])[0]
+    
+    def extract_batch(self, file_paths: List[str]) -> List[str]:
+        """批量提取图像文本"""
+        return [result.text for result in self.extract_batch_results(file_paths)]
+    
+    def extract_batch_results(self, file_paths: List[str]) -> List[Extraction]:
+        """
+        批量提取图像文本并标明每张图像的结果是否完整
+        
+        整批图像在一次引擎占用内依次识别；整批失败时逐张重试，
+        使单张损坏的图像不影响其他图像。
+        """
+        if not file_paths:
+            return []
+        
+        try:
+            return [Extraction(text) for text in self._run_ocr(file_paths)]
+        except ImportError as e:
+            logger.warning(f"{self.ocr_type}未安装: {e}")
+            return [Extraction("", complete=False)] * len(file_paths)
+        except Exception as e:
+            if len(file_paths) == 1:
+                logger.error(f"OCR提取失败: {e}")
+                return [Extraction(f"[图像内容] 文件: {file_paths[0]} (OCR失败)", complete=False)]
+            
+            logger.warning(f"批量OCR失败，逐张重试: {e}")
+            return [self.extract_result(file_path) for file_path in file_paths]
+    
+    def _run_ocr(self, file_paths: List[str]) -> List[str]:
+        """使用当前模式的引擎识别一批图像"""
+        if self.ocr_type == 'easyocr':
+            recognize = self._extract_easyocr
+        elif self.ocr_type == 'paddle':
+            recognize = self._extract_paddle_ocr
+        else:
+            recognize = self._extract_gpt4v
+        
+        return self.engine_pool.run(
+            self.ocr_type,
+            lambda engine: [recognize(engine, file_path) for file_path in file_paths]
+        )
+    
+    def _extract_easyocr(self, reader: Any, file_path: str) -> str:
+        """使用EasyOCR提取（快速）"""
+        result = reader.readtext(file_path)
+        return '\n'.join([text[1] for text in result])
+    
+    def _extract_paddle_ocr(self, ocr: Any, file_path: str) -> str:
+        """使用PaddleOCR提取（平衡）"""
+        result = ocr.ocr(file_path, cls=True)
+        return '\n'.join(
+            line[1][0]
+            for page in (result or [])
+            for line in (page or [])
+        )
+    
+    def _extract_gpt4v(self, client: Any, file_path: str) -> str:
+        """使用GPT-4V提取（最精确）"""
+        import base64
+        
+        # 读取图像并编码
+        with open(file_path, 'rb') as f:
+            image_data = base64.b64encode(f.read()).decode('utf-8')
+        
+        # 调用GPT-4V
+        response = client.chat.completions.create(
+            model="gpt-4-vision-preview",
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{image_data}"
+                            }
+                        },
+                        {
+                            "type": "text",
+                            "text": "请完整地识别和提取图像中的所有文本内容"
+                        }
+                    ]
+                }
+            ]
+        )
+        
+        return response.choices[0].message.content
+
+
+class VideoExtractor(TextExtractor):
+    """视频文本提取"""
+    
+    def extract(self, file_path: str) -> str:
+        """从视频提取文本（字幕、语音识别）"""
+        return self.extract_result(file_path).text
+    
+    def extract_result(self, file_path: str) -> Extraction:
+        """从视频提取文本（视频处理模块实现前结果均不完整）"""
+        try:
+            # 这里应实现视频处理逻辑
+            # 包括：提取字幕、语音转文字、场景识别等
+            logger.info(f"处理视频文件: {file_path}")
+            return Extraction(
+                f"[视频内容] 文件: {file_path}\n[需要实现视频处理模块]", complete=False
+            )
+        
+        except Exception as e:
+            logger.error(f"视频提取失败: {e}")
+            return Extraction("", complete=False)
+
+
+class DocumentProcessor:
+    """统一文档处理器"""
+    
+    # 文件类型到提取器的映射
+    EXTRACTORS = {
+        '.pdf': PDFExtractor,
+        '.docx': DocXExtractor,
+        '.doc': DocXExtractor,
+        '.txt': lambda: None,  # 直接读取
+        '.jpg': ImageExtractor,
+        '.jpeg': ImageExtractor,
+        '.png': ImageExtractor,
+        '.mp4': VideoExtractor,
+        '.avi': VideoExtractor
+    }
+    
+    # 使用OCR的图像类型
+    IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+    
+    def __init__(
+        self,
+        mode: ProcessingMode = ProcessingMode.BALANCED,
+        cache: Optional[Any] = None,
+        max_workers: Optional[int] = None,
+        cache_dir: Optional[str] = None
+    ):
+        """
+        初始化文档处理器
+        
+        Args:
+            mode: 处理模式
+            cache: 缓存管理器（可选）
+            max_workers: PDF页面并行提取的进程数（默认为CPU核数）
+            cache_dir: 提取结果磁盘缓存目录（可选，存放压缩后的大文本）
+        """
+        self.mode = mode
+        self.cache = cache
+        self.max_workers = max_workers
+        self.extraction_cache = ExtractionCache(cache, cache_dir=cache_dir)
+        self.extractors = {}
+        
+        logger.info(f"初始化文档处理器 - 模式: {mode.value}")
+    
+    def extract_text(
+        self,
+        file_path: str,
+        mode: Optional[ProcessingMode] = None,
+        content_hash: Optional[str] = None
+    ) -> str:
+        """
+        从文档提取文本
+        
+        提取结果按文件内容哈希缓存：相同内容的文件无论路径如何都会命中，
+        同一路径的文件内容变化后也不会返回过期文本。
+        不完整的结果（OCR失败、部分页面失败、依赖未安装时的占位文本）不写入缓存，
+        下次处理时重新提取。
+        
+        Args:
+            file_path: 文件路径
+            mode: 处理模式（可覆盖默认模式）
+            content_hash: 文件内容SHA-256（调用方已计算时传入，避免重复读取文件）
+        
+        Returns:
+            提取的文本
+        """
+        mode = mode or self.mode
+        content_hash = content_hash or file_sha256(file_path)
+        
+        # 检查缓存
+        cached = self.extraction_cache.get(content_hash, mode.value)
+        if cached:
+            logger.info(f"使用缓存文本提取: {file_path}")
+            return cached
+        
+        # 确定文件类型和提取器
+        file_path_obj = Path(file_path)
+        ext = file_path_obj.suffix.lower()
+        
+        # 特殊处理：纯文本文件
+        if ext == '.txt':
+            result = Extraction(self._read_text_file(file_path))
+        else:
+            # 获取或创建提取器
+            extractor = self._get_extractor(ext, mode)
+            
+            if extractor is None:
+                logger.warning(f"不支持的文件类型: {ext}")
+                result = Extraction("", complete=False)
+            else:
+                result = extractor.extract_result(file_path)
+        
+        # 只缓存完整的提取结果
+        text = result.text
+        if result.complete:
+            self.extraction_cache.set(content_hash, mode.value, text)
+        else:
+            logger.warning(f"提取结果不完整，不写入缓存: {file_path}")
+        
+        logger.info(f"文本提取完成: {file_path} ({len(text)} 字符)")
+        return text
+    
+    def _get_extractor(
+        self,
+        file_ext: str,
+        mode: ProcessingMode
+    ) -> Optional[TextExtractor]:
+        """获取或创建提取器实例"""
+        
+        cache_key = f"{file_ext}:{mode.value}"
+        
+        if cache_key not in self.extractors:
+            extractor_class = self.EXTRACTORS.get(file_ext)
+            
+            if extractor_class is None:
+                return None
+            
+            # 某些提取器需要mode参数
+            if file_ext in self.IMAGE_EXTENSIONS:
+                self.extractors[cache_key] = extractor_class(mode)
+            elif file_ext == '.pdf':
+                self.extractors[cache_key] = extractor_class(
+                    max_workers=self.max_workers,
+                    cache=self.cache
+                )
+            else:
+                self.extractors[cache_key] = extractor_class()
+        
+        return self.extractors.get(cache_key)
+    
+    def _read_text_file(self, file_path: str) -> str:
+        """读取纯文本文件"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except UnicodeDecodeError:
+            # 尝试其他编码
+            with open(file_path, 'r', encoding='gbk') as f:
+                return f.read()
+    
+    def batch_extract(
+        self,
+        file_paths: List[str],
+        ocr_batch_size: int = 16
+    ) -> Dict[str, str]:
+        """
+        批量提取文本
+        
+        未缓存的图像按批交给OCR引擎识别，其他文件逐个提取。
+        """
+        results = {}
+        images = []
+        
+        for file_path in file_paths:
+            try:
+                content_hash = file_sha256(file_path)
+                ext = Path(file_path).suffix.lower()
+                if (
+                    ext in self.IMAGE_EXTENSIONS
+                    and not self.extraction_cache.get(content_hash, self.mode.value)
+                ):
+                    images.append((file_path, content_hash))
+                    continue
+                
+                results[file_path] = self.extract_text(
+                    file_path, content_hash=content_hash
+                )
+            except Exception as e:
+                logger.error(f"批量提取失败: {file_path} - {e}")
+                results[file_path] = None
+        
+        if images:
+            extractor = self._get_extractor(Path(images[0][0]).suffix.lower(), self.mode)
+            for i in range(0, len(images), ocr_batch_size):
+                batch = images[i:i + ocr_batch_size]
+                extracted = extractor.extract_batch_results([file_path for file_path, _ in batch])
+                for (file_path, content_hash), result in zip(batch, extracted):
+                    if result.complete:
+                        self.extraction_cache.set(content_hash, self.mode.value, result.text)
+                    results[file_path] = result.text
+            
+            logger.info(f"批量OCR完成: {len(images)} 张图像")
+        
+        return {file_path: results[file_path] for file_path in file_paths}
+    
+    def warmup_ocr(self, modes: Optional[List[ProcessingMode]] = None) -> Dict[str, bool]:
+        """
+        预加载OCR引擎（服务启动或工作进程初始化时调用）
+        
+        Args:
+            modes: 需要预热的模式（默认为当前模式）
+        """
+        engine_types = {
+            ImageExtractor(mode).ocr_type for mode in (modes or [self.mode])
+        }
+        return warmup_ocr_engines(engine_types)
@@ -1,228 +1,771 @@
-"""
-嵌入服务 - 支持多种嵌入模型
-"""
-
-import logging
-from typing import List, Optional, Dict, Any
-import numpy as np
-from abc import ABC, abstractmethod
-
-logger = logging.getLogger(__name__)
-
-
-class EmbeddingProvider(ABC):
-    """嵌入提供商基类"""
-    
-    @abstractmethod
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        """生成嵌入向量"""
-        pass
-    
-    @abstractmethod
-    def embed_query(self, text: str) -> List[float]:
-        """为单个查询生成嵌入"""
-        pass
-
-
-class OpenAIEmbedding(EmbeddingProvider):
-    """OpenAI嵌入服务"""
-    
-    def __init__(self, model: str = "text-embedding-3-small"):
-        """
-        初始化OpenAI嵌入
-        
-        Args:
-            model: 模型名称
-        """
-        self.model = model
-        
-        try:
-            from openai import OpenAI
-            self.client = OpenAI()
-        except ImportError:
-            logger.warning("openai库未安装")
-            self.client = None
-    
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        """生成嵌入向量"""
-        if not self.client:
-            return [self._dummy_embedding() for _ in texts]
-        
-        try:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=texts
-            )
-            return [item.embedding for item in response.data]
-        except Exception as e:
-            logger.error(f"OpenAI嵌入失败: {e}")
-            return [self._dummy_embedding() for _ in texts]
-    
-    def embed_query(self, text: str) -> List[float]:
-        """为查询生成嵌入"""
-        embeddings = self.embed([text])
-        return embeddings[0] if embeddings else self._dummy_embedding()
-    
-    def _dummy_embedding(self) -> List[float]:
-        """生成虚拟嵌入（用于测试）"""
-        return [0.0] * 1536  # OpenAI默认维度
-
-
-class SentenceTransformerEmbedding(EmbeddingProvider):
-    """Sentence Transformers嵌入"""
-    
-    def __init__(self, model: str = "all-mpnet-base-v2"):
-        """
-        初始化SentenceTransformer嵌入
-        
-        Args:
-            model: 模型名称
-        """
-        self.model_name = model
-        
-        try:
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer(model)
-        except ImportError:
-            logger.warning("sentence-transformers库未安装")
-            self.model = None
-    
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        """生成嵌入向量"""
-        if not self.model:
-            return [self._dummy_embedding() for _ in texts]
-        
-        try:
-            embeddings = self.model.encode(texts, show_progress_bar=False)
-            return [embedding.tolist() for embedding in embeddings]
-        except Exception as e:
-            logger.error(f"SentenceTransformer嵌入失败: {e}")
-            return [self._dummy_embedding() for _ in texts]
-    
-    def embed_query(self, text: str) -> List[float]:
-        """为查询生成嵌入"""
-        embeddings = self.embed([text])
-        return embeddings[0] if embeddings else self._dummy_embedding()
-    
-    def _dummy_embedding(self) -> List[float]:
-        """生成虚拟嵌入"""
-        return [0.0] * 768  # 默认维度
-
-
-class EmbeddingService:
-    """统一嵌入服务"""
-    
-    PROVIDERS = {
-        'openai': OpenAIEmbedding,
-        'sentence-transformers': SentenceTransformerEmbedding,
-    }
-    
-    def __init__(
-        self,
-        provider: str = "openai",
-        model: str = "text-embedding-3-small",
-        cache: Optional[Any] = None,
-        batch_size: int = 32
-    ):
-        """
-        初始化嵌入服务
-        
-        Args:
-            provider: 提供商名称
-            model: 模型名称
-            cache: 缓存管理器
-            batch_size: 批处理大小
-        """
-        self.provider_name = provider
-        self.model = model
-        self.cache = cache
-        self.batch_size = batch_size
-        
-        # 初始化提供商
-        provider_class = self.PROVIDERS.get(provider, OpenAIEmbedding)
-        self.provider = provider_class(model)
-        
-        logger.info(f"初始化嵌入服务: {provider}/{model}")
-    
-    def embed(self, text: str) -> List[float]:
-        """为单个文本生成嵌入"""
-        # 检查缓存
-        cache_key = f"embed:{text[:100]}"
-        if self.cache:
-            cached = self.cache.get(cache_key)
-            if cached:
-                return cached
-        
-        # 生成嵌入
-        embedding = self.provider.embed_query(text)
-        
-        # 存储到缓存
-        if self.cache:
-            self.cache.set(cache_key, embedding, ttl=86400)
-        
-        return embedding
-    
-    def embed_batch(
-        self,
-        texts: List[str],
-        batch_size: Optional[int] = None
-    ) -> List[List[float]]:
-        """批量生成嵌入"""
-        batch_size = batch_size or self.batch_size
-        embeddings = []
-        
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i + batch_size]
-            
-            # 过滤缓存中已有的
-            cached_embeddings = []
-            uncached_texts = []
-            uncached_indices = []
-            
-            if self.cache:
-                for j, text in enumerate(batch_texts):
-                    cache_key = f"embed:{text[:100]}"
-                    cached = self.cache.get(cache_key)
-                    if cached:
-                        cached_embeddings.append((j, cached))
-                    else:
-                        uncached_texts.append(text)
-                        uncached_indices.append(j)
-            else:
-                uncached_texts = batch_texts
-                uncached_indices = list(range(len(batch_texts)))
-            
-            # 生成未缓存的嵌入
-            if uncached_texts:
-                new_embeddings = self.provider.embed(uncached_texts)
-                
-                # 存储到缓存
-                if self.cache:
-                    for text, embedding in zip(uncached_texts, new_embeddings):
-                        cache_key = f"embed:{text[:100]}"
-                        self.cache.set(cache_key, embedding, ttl=86400)
-            else:
-                new_embeddings = []
-            
-            # 合并结果
-            batch_embeddings = [None] * len(batch_texts)
-            
-            for j, cached in cached_embeddings:
-                batch_embeddings[j] = cached
-            
-            for j, idx in enumerate(uncached_indices):
-                batch_embeddings[idx] = new_embeddings[j]
-            
-            embeddings.extend(batch_embeddings)
-        
-        logger.info(f"批量嵌入完成: {len(texts)} 文本")
-        return embeddings
-    
-    def health_check(self) -> bool:
-        """健康检查"""
-        try:
-            test_embedding = self.embed("test")
-            return len(test_embedding) > 0
-        except Exception as e:
-            logger.error(f"嵌入服务健康检查失败: {e}")
-            return False
+"""
+嵌入服务 - 支持多种嵌入模型
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Tuple
+import numpy as np
+from abc import ABC, abstractmethod
+
+from processors.chunking import get_default_tokenizer
+from processors.embedding_scheduler import EmbeddingScheduler, EmbeddingPriority
+from processors.model_registry import get_model_spec, model_dimension
+from utils.helpers import text_sha256, as_float32_matrix, encode_vector, decode_vector
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingError(Exception):
+    """嵌入生成失败（调用方不得以零向量代替结果）"""
+
+
+class EmbeddingProvider(ABC):
+    """
+    嵌入提供商基类
+    
+    embed返回形状为[文本数, 维度]的float32 ndarray，embed_query返回一维float32 ndarray；
+    调用方不应再逐行转换为Python列表。
+    """
+    
+    # 向量维度（子类按模型注册表设置）
+    dimension: int = 768
+    
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """生成嵌入向量"""
+        pass
+    
+    @abstractmethod
+    def embed_query(self, text: str) -> np.ndarray:
+        """为单个查询生成嵌入"""
+        pass
+    
+    def _unavailable(self, library: str) -> EmbeddingError:
+        """依赖库未安装时的错误（不以零向量占位，避免其被写入向量存储并参与去重）"""
+        return EmbeddingError(f"{library}库未安装，无法生成嵌入")
+
+
+class OpenAIEmbedding(EmbeddingProvider):
+    """OpenAI嵌入服务"""
+    
+    def __init__(self, model: str = "text-embedding-3-small"):
+        """
+        初始化OpenAI嵌入
+        
+        Args:
+            model: 模型名称
+        """
+        self.model = model
+        self.dimension = model_dimension(model, 1536)
+        
+        try:
+            from openai import OpenAI
+            self.client = OpenAI()
+        except ImportError:
+            logger.warning("openai库未安装")
+            self.client = None
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """生成嵌入向量"""
+        if not self.client:
+            raise self._unavailable("openai")
+        
+        try:
+            response = self.client.embeddings.create(
+                model=self.model,
+                input=texts
+            )
+            return np.array([item.embedding for item in response.data], dtype=np.float32)
+        except Exception as e:
+            logger.error(f"OpenAI嵌入失败: {e}")
+            raise EmbeddingError(f"OpenAI嵌入失败: {e}") from e
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """为查询生成嵌入"""
+        return self.embed([text])[0]
+
+
+class AsyncTokenBucket:
+    """异步令牌桶限流器"""
+    
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate_per_minute: 每分钟补充的令牌数
+            burst_seconds: 桶容量对应的补充时长（允许的突发量）
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+    
+    async def acquire(self, amount: float = 1.0):
+        """等待直到获得指定数量的令牌（超过容量的请求按容量计）"""
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        # 持锁等待，保证先到的请求先获得令牌
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class AsyncOpenAIEmbedding(EmbeddingProvider):
+    """
+    并发OpenAI嵌入客户端
+    
+    - 按token预算打包请求，多个请求并发执行（受max_in_flight限制）
+    - RPM/TPM令牌桶限流
+    - 可重试错误（429、5xx、连接错误）按带抖动的指数退避重试
+    - 复用HTTP连接池
+    - 失败时抛出EmbeddingError，不返回零向量
+    
+    请求在后台线程的事件循环中执行，同步调用方通过embed()使用，
+    异步调用方可直接使用aembed()（须在该客户端的事件循环之外调用embed）。
+    """
+    
+    # OpenAI单条输入的token上限
+    MAX_INPUT_TOKENS = 8191
+    
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        max_in_flight: int = 8,
+        requests_per_minute: float = 3000,
+        tokens_per_minute: float = 1_000_000,
+        max_batch_tokens: int = 100_000,
+        max_batch_size: int = 512,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 60.0
+    ):
+        """
+        初始化并发OpenAI嵌入客户端
+        
+        Args:
+            model: 模型名称
+            max_in_flight: 同时进行的请求数
+            requests_per_minute: 每分钟请求数上限（RPM）
+            tokens_per_minute: 每分钟token数上限（TPM）
+            max_batch_tokens: 单个请求的token预算
+            max_batch_size: 单个请求的最大文本数
+            max_retries: 可重试错误的最大重试次数
+            backoff_base: 退避基数（秒）
+            backoff_max: 单次退避上限（秒）
+            timeout: 单个请求超时（秒）
+        """
+        self.model = model
+        self.dimension = model_dimension(model, 1536)
+        self.max_in_flight = max_in_flight
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.tokenizer = get_default_tokenizer()
+        
+        self.request_bucket = AsyncTokenBucket(requests_per_minute)
+        self.token_bucket = AsyncTokenBucket(tokens_per_minute)
+        
+        try:
+            import openai
+            self._openai = openai
+        except ImportError:
+            logger.warning("openai库未安装")
+            self._openai = None
+        
+        self.client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """生成嵌入向量（同步接口，在后台事件循环中并发执行）"""
+        if not self._openai:
+            raise self._unavailable("openai")
+        
+        future = asyncio.run_coroutine_threadsafe(self.aembed(texts), self._get_loop())
+        return future.result()
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """为查询生成嵌入"""
+        return self.embed([text])[0]
+    
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        """
+        异步生成嵌入向量
+        
+        Args:
+            texts: 文本列表
+        
+        Returns:
+            float32嵌入矩阵（行顺序与输入一致）
+        
+        Raises:
+            EmbeddingError: openai库未安装或任一请求在重试后仍失败
+        """
+        if not self._openai:
+            raise self._unavailable("openai")
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        self._ensure_client()
+        batches = self._pack(texts)
+        results = await asyncio.gather(
+            *(self._embed_request(batch, tokens) for batch, tokens in batches)
+        )
+        
+        return results[0] if len(results) == 1 else np.concatenate(results)
+    
+    def _pack(self, texts: List[str]) -> List[Tuple[List[str], int]]:
+        """按token预算和文本数上限将文本打包为请求"""
+        batches = []
+        current: List[str] = []
+        current_tokens = 0
+        
+        for text in texts:
+            tokens = self.tokenizer.count(text)
+            if tokens > self.MAX_INPUT_TOKENS:
+                raise EmbeddingError(
+                    f"文本超过模型输入上限: {tokens} > {self.MAX_INPUT_TOKENS} tokens"
+                )
+            
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_size
+            ):
+                batches.append((current, current_tokens))
+                current, current_tokens = [], 0
+            
+            current.append(text)
+            current_tokens += tokens
+        
+        if current:
+            batches.append((current, current_tokens))
+        return batches
+    
+    async def _embed_request(self, texts: List[str], tokens: int) -> np.ndarray:
+        """发送单个嵌入请求（限流 + 重试）"""
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await self.request_bucket.acquire(1)
+                await self.token_bucket.acquire(tokens)
+                
+                try:
+                    response = await self.client.embeddings.create(
+                        model=self.model,
+                        input=texts
+                    )
+                    data = sorted(response.data, key=lambda item: item.index)
+                    return np.array([item.embedding for item in data], dtype=np.float32)
+                
+                except Exception as e:
+                    if attempt >= self.max_retries or not self._is_retryable(e):
+                        logger.error(f"OpenAI嵌入失败 ({len(texts)} 文本): {e}")
+                        raise EmbeddingError(f"OpenAI嵌入失败: {e}") from e
+                    error = e
+                    delay = self._retry_delay(e, attempt)
+            
+            # 退避期间释放并发槽
+            logger.warning(
+                f"OpenAI嵌入请求失败，{delay:.1f}s后重试 "
+                f"({attempt + 1}/{self.max_retries}): {error}"
+            )
+            await asyncio.sleep(delay)
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """判断错误是否可重试（限流、服务端错误、超时和连接错误）"""
+        openai = self._openai
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        
+        status = getattr(error, 'status_code', None)
+        return status in (408, 409, 429) or (status is not None and status >= 500)
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """计算退避时长（优先使用服务端的Retry-After）"""
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.backoff_max)
+        except ValueError:
+            pass
+        
+        # 全抖动：在[0, 指数退避上限]内随机
+        return random.uniform(0, min(self.backoff_base * 2 ** attempt, self.backoff_max))
+    
+    def _ensure_client(self):
+        """在当前事件循环中创建客户端和并发信号量（复用连接池）"""
+        if self.client is not None:
+            return
+        
+        import httpx
+        
+        self.client = self._openai.AsyncOpenAI(
+            max_retries=0,  # 重试由本客户端统一处理
+            timeout=self.timeout,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_in_flight,
+                    max_keepalive_connections=self.max_in_flight
+                ),
+                timeout=self.timeout
+            )
+        )
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """获取后台事件循环（首次调用时启动）"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="wheel-openai-embed",
+                    daemon=True
+                ).start()
+            return self._loop
+
+
+class SentenceTransformerEmbedding(EmbeddingProvider):
+    """Sentence Transformers嵌入"""
+    
+    def __init__(self, model: str = "all-mpnet-base-v2"):
+        """
+        初始化SentenceTransformer嵌入
+        
+        Args:
+            model: 模型名称
+        """
+        self.model_name = model
+        self.dimension = model_dimension(model, 768)
+        
+        try:
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(model)
+        except ImportError:
+            logger.warning("sentence-transformers库未安装")
+            self.model = None
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """生成嵌入向量"""
+        if not self.model:
+            raise self._unavailable("sentence-transformers")
+        
+        try:
+            embeddings = self.model.encode(
+                texts,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+            return embeddings.astype(np.float32, copy=False)
+        except Exception as e:
+            logger.error(f"SentenceTransformer嵌入失败: {e}")
+            raise EmbeddingError(f"SentenceTransformer嵌入失败: {e}") from e
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """为查询生成嵌入"""
+        return self.embed([text])[0]
+
+
+class ONNXEmbedding(EmbeddingProvider):
+    """
+    ONNX Runtime CPU嵌入（支持int8量化模型）
+    
+    - 不依赖PyTorch，直接加载导出的ONNX模型和tokenizers分词器
+    - 可控制推理线程数
+    - 按长度分桶组批，减少填充token的计算浪费
+    - 输出float32 ndarray，不逐行转换为Python列表
+    
+    model为模型目录（包含model.onnx或model_quantized.onnx，以及tokenizer.json）
+    或.onnx文件路径（tokenizer.json位于同一目录）。
+    """
+    
+    def __init__(
+        self,
+        model: str,
+        quantized: bool = False,
+        num_threads: Optional[int] = None,
+        batch_size: int = 32,
+        max_batch_tokens: int = 8192,
+        max_length: int = 512,
+        pooling: Optional[str] = None,
+        normalize: bool = True
+    ):
+        """
+        初始化ONNX嵌入
+        
+        Args:
+            model: 模型目录或.onnx文件路径
+            quantized: 模型目录下优先加载int8量化模型（model_quantized.onnx）
+            num_threads: 单次推理的线程数（默认为CPU核数）
+            batch_size: 单次推理的最大文本数
+            max_batch_tokens: 单次推理的token预算（批大小 × 填充后长度）
+            max_length: 单条文本的最大token数（超出截断）
+            pooling: 池化方式（cls或mean，默认bge系列为cls，其他为mean）
+            normalize: 是否L2归一化
+        """
+        self.model_name = model
+        self.dimension = model_dimension(model, 768)
+        self.batch_size = batch_size
+        self.max_batch_tokens = max(max_batch_tokens, max_length)
+        self.max_length = max_length
+        self.pooling = pooling or ('cls' if 'bge' in model.lower() else 'mean')
+        self.normalize = normalize
+        self.num_threads = num_threads or os.cpu_count() or 1
+        
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+            
+            model_file, tokenizer_file = self._resolve_files(model, quantized)
+            
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.num_threads
+            options.inter_op_num_threads = 1
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            
+            self.session = ort.InferenceSession(
+                str(model_file),
+                sess_options=options,
+                providers=["CPUExecutionProvider"]
+            )
+            self.input_names = {item.name for item in self.session.get_inputs()}
+            
+            self.tokenizer = Tokenizer.from_file(str(tokenizer_file))
+            self.tokenizer.enable_truncation(max_length)
+            self.tokenizer.no_padding()
+            
+            logger.info(
+                f"加载ONNX嵌入模型: {model_file} "
+                f"(线程: {self.num_threads}, 池化: {self.pooling})"
+            )
+        except ImportError:
+            logger.warning("onnxruntime或tokenizers库未安装")
+            self.session = None
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """生成嵌入向量（float32，形状为[文本数, 维度]）"""
+        if self.session is None:
+            raise self._unavailable("onnxruntime或tokenizers")
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        try:
+            encodings = self.tokenizer.encode_batch(texts)
+            result = None
+            
+            for indices in self._length_buckets(encodings):
+                vectors = self._run([encodings[i] for i in indices])
+                if result is None:
+                    result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+                result[indices] = vectors
+            
+            return result
+        except Exception as e:
+            logger.error(f"ONNX嵌入失败: {e}")
+            raise EmbeddingError(f"ONNX嵌入失败: {e}") from e
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """为查询生成嵌入"""
+        return self.embed([text])[0]
+    
+    def _length_buckets(self, encodings: List[Any]) -> List[List[int]]:
+        """按token长度排序后组批，同批文本长度相近，填充最少"""
+        order = sorted(range(len(encodings)), key=lambda i: len(encodings[i].ids))
+        buckets = []
+        current: List[int] = []
+        
+        for i in order:
+            # 已按长度升序，当前文本长度即为加入后批内的填充长度
+            length = len(encodings[i].ids)
+            if current and (
+                len(current) >= self.batch_size
+                or (len(current) + 1) * length > self.max_batch_tokens
+            ):
+                buckets.append(current)
+                current = []
+            current.append(i)
+        
+        if current:
+            buckets.append(current)
+        return buckets
+    
+    def _run(self, encodings: List[Any]) -> np.ndarray:
+        """对一批长度相近的文本执行推理并池化"""
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        token_type_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        
+        for row, encoding in enumerate(encodings):
+            size = len(encoding.ids)
+            input_ids[row, :size] = encoding.ids
+            attention_mask[row, :size] = encoding.attention_mask
+            token_type_ids[row, :size] = encoding.type_ids
+        
+        feed = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feed['token_type_ids'] = token_type_ids
+        
+        output = self.session.run(None, feed)[0]
+        
+        # 部分导出模型已包含池化层，直接输出句向量
+        if output.ndim == 2:
+            vectors = output
+        elif self.pooling == 'cls':
+            vectors = output[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            vectors = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        
+        vectors = vectors.astype(np.float32, copy=False)
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+    
+    @staticmethod
+    def _resolve_files(model: str, quantized: bool) -> Tuple[Path, Path]:
+        """定位模型文件和分词器文件"""
+        path = Path(model)
+        if path.suffix == '.onnx':
+            return path, path.parent / 'tokenizer.json'
+        
+        candidates = ['model_quantized.onnx', 'model.onnx'] if quantized else ['model.onnx']
+        for name in candidates:
+            for model_file in (path / name, path / 'onnx' / name):
+                if model_file.exists():
+                    return model_file, path / 'tokenizer.json'
+        
+        raise FileNotFoundError(f"未找到ONNX模型文件: {model}")
+
+
+def quantize_onnx_model(model_path: str, output_path: Optional[str] = None) -> str:
+    """
+    将ONNX嵌入模型动态量化为int8（CPU推理约提速2-3倍，模型体积约为1/4）
+    
+    Args:
+        model_path: 原始model.onnx路径
+        output_path: 输出路径（默认为同目录下的model_quantized.onnx）
+    
+    Returns:
+        量化模型路径
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    output_path = output_path or str(Path(model_path).with_name('model_quantized.onnx'))
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    
+    logger.info(f"ONNX模型量化完成: {output_path}")
+    return output_path
+
+
+class EmbeddingService:
+    """统一嵌入服务"""
+    
+    PROVIDERS = {
+        'openai': AsyncOpenAIEmbedding,
+        'openai-sync': OpenAIEmbedding,
+        'sentence-transformers': SentenceTransformerEmbedding,
+        'onnx': ONNXEmbedding,
+    }
+    
+    def __init__(
+        self,
+        provider: str = "openai",
+        model: str = "text-embedding-3-small",
+        cache: Optional[Any] = None,
+        batch_size: int = 32,
+        query_max_wait_ms: float = 2.0,
+        bulk_max_wait_ms: float = 20.0,
+        max_concurrent_batches: int = 2
+    ):
+        """
+        初始化嵌入服务
+        
+        查询和摄取的嵌入请求经由共享调度器合并为微批次，查询请求优先。
+        
+        Args:
+            provider: 提供商名称（PROVIDERS中的键，未知名称抛出ValueError）
+            model: 模型名称
+            cache: 缓存管理器
+            batch_size: 单次调用提供商的最大文本数（提供商自行按token预算打包请求时，
+                取其与提供商单请求文本上限max_batch_size中的较大者）
+            query_max_wait_ms: 查询请求最长等待合批时间（毫秒）
+            bulk_max_wait_ms: 批量请求最长等待合批时间（毫秒）
+            max_concurrent_batches: 同时调用提供商的批次数
+        """
+        self.provider_name = provider
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        
+        # 嵌入缓存命中统计
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # 初始化提供商
+        provider_class = self.PROVIDERS.get(provider)
+        if provider_class is None:
+            raise ValueError(
+                f"未知的嵌入提供商: {provider}（可选: {', '.join(self.PROVIDERS)}）"
+            )
+        self.provider = provider_class(model)
+        
+        # 模型规格（维度、归一化、距离度量），未注册的模型以提供商声明的维度为准
+        self.spec = get_model_spec(model)
+        self.dimension = self.spec.dimension if self.spec else self.provider.dimension
+        
+        # 提供商自身支持并发请求时，调度器需要足够的执行槽才能用满其并发度
+        provider_in_flight = getattr(self.provider, 'max_in_flight', 0)
+        # 按token预算打包请求的提供商需要足够大的调度批次，打包才能生效
+        provider_batch_size = getattr(self.provider, 'max_batch_size', 0)
+        self.scheduler = EmbeddingScheduler(
+            self._embed_with_provider,
+            max_batch_size=max(batch_size, provider_batch_size),
+            query_max_wait_ms=query_max_wait_ms,
+            bulk_max_wait_ms=bulk_max_wait_ms,
+            max_concurrent_batches=max(max_concurrent_batches, provider_in_flight + 1)
+        )
+        
+        logger.info(f"初始化嵌入服务: {provider}/{model} ({self.dimension}维)")
+    
+    def _embed_with_provider(self, texts: List[str]) -> np.ndarray:
+        """调用提供商生成嵌入（兼容仍返回List[List[float]]的自定义提供商）"""
+        embeddings = as_float32_matrix(self.provider.embed(texts))
+        if len(embeddings) and embeddings.shape[1] != self.dimension:
+            raise EmbeddingError(
+                f"嵌入维度与模型声明不一致: {embeddings.shape[1]} != {self.dimension} ({self.model})"
+            )
+        return embeddings
+    
+    def embed(self, text: str) -> np.ndarray:
+        """为单个文本生成嵌入（按查询优先级调度）"""
+        # 检查缓存
+        cache_key = self._cache_key(text)
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached:
+                self.cache_hits += 1
+                return decode_vector(cached)
+        self.cache_misses += 1
+        
+        # 生成嵌入
+        embedding = self.scheduler.embed([text], EmbeddingPriority.QUERY)[0]
+        
+        # 存储到缓存
+        self._cache_embedding(cache_key, embedding)
+        
+        return embedding
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """为检索查询生成嵌入"""
+        return self.embed(text)
+    
+    def embed_batch(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        批量生成嵌入（按批量优先级调度）
+        
+        文本交给调度器后与其他并发请求一起合批，batch_size仅为兼容旧调用保留，
+        实际批大小由调度器的max_batch_size决定。
+        
+        Returns:
+            形状为[文本数, 维度]的float32矩阵
+        """
+        cached_rows: Dict[int, np.ndarray] = {}
+        uncached_texts = []
+        uncached_indices = []
+        
+        # 过滤缓存中已有的
+        for i, text in enumerate(texts):
+            cached = self.cache.get(self._cache_key(text)) if self.cache else None
+            if cached:
+                cached_rows[i] = decode_vector(cached)
+            else:
+                uncached_texts.append(text)
+                uncached_indices.append(i)
+        self.cache_hits += len(cached_rows)
+        self.cache_misses += len(uncached_texts)
+        
+        # 生成未缓存的嵌入
+        new_embeddings = (
+            self.scheduler.embed(uncached_texts, EmbeddingPriority.BULK)
+            if uncached_texts else []
+        )
+        
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        # 直接写入预分配的矩阵，不经过Python浮点列表
+        first = new_embeddings[0] if len(new_embeddings) else next(iter(cached_rows.values()))
+        embeddings = np.empty((len(texts), len(first)), dtype=np.float32)
+        
+        for i, row in cached_rows.items():
+            embeddings[i] = row
+        
+        for i, text, embedding in zip(uncached_indices, uncached_texts, new_embeddings):
+            embeddings[i] = embedding
+            
+            # 存储到缓存
+            self._cache_embedding(self._cache_key(text), embedding)
+        
+        logger.info(f"批量嵌入完成: {len(texts)} 文本")
+        return embeddings
+    
+    def _cache_key(self, text: str) -> str:
+        """嵌入缓存键（模型 + 完整文本哈希，避免不同文本共享前缀时冲突）"""
+        return f"embed:{self.model}:{text_sha256(text)}"
+    
+    def _cache_embedding(self, cache_key: str, embedding: np.ndarray):
+        """缓存嵌入（base64编码的float32；零向量不缓存）"""
+        if self.cache and np.any(embedding):
+            self.cache.set(cache_key, encode_vector(embedding), ttl=86400)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取嵌入调度和缓存统计"""
+        return {
+            **self.scheduler.get_stats(),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
+        }
+    
+    def close(self):
+        """停止嵌入调度器"""
+        self.scheduler.close()
+    
+    def health_check(self) -> bool:
+        """健康检查"""
+        try:
+            test_embedding = self.embed("test")
+            return len(test_embedding) > 0
+        except Exception as e:
+            logger.error(f"嵌入服务健康检查失败: {e}")
+            return False
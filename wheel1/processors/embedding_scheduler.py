@@ -0,0 +1,281 @@
+"""
+嵌入调度器 - 将并发的嵌入请求合并为动态微批次
+查询请求优先于批量摄取请求，批大小和最长等待时间可配置
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import IntEnum
+from typing import List, Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingPriority(IntEnum):
+    """嵌入请求优先级（数值越小越优先）"""
+    QUERY = 0    # 在线查询，延迟敏感
+    BULK = 1     # 文档摄取，吞吐优先
+
+
+class EmbeddingScheduler:
+    """
+    自适应微批调度器
+
+    调度线程在有空闲执行槽时按以下条件发出一批：
+    - 待处理文本达到max_batch_size，或
+    - 最早的待处理文本等待时间超过其优先级对应的最长等待时间
+
+    执行槽全部占用时请求继续累积，负载越高批次越大；
+    批量请求最多占用max_concurrent_batches - 1个执行槽，始终为查询保留一个。
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[Any]],
+        max_batch_size: int = 32,
+        query_max_wait_ms: float = 2.0,
+        bulk_max_wait_ms: float = 20.0,
+        max_concurrent_batches: int = 2
+    ):
+        """
+        初始化调度器
+
+        Args:
+            embed_fn: 批量嵌入函数（文本列表 -> 向量列表）
+            max_batch_size: 单批最大文本数
+            query_max_wait_ms: 查询请求最长等待合批时间（毫秒）
+            bulk_max_wait_ms: 批量请求最长等待合批时间（毫秒）
+            max_concurrent_batches: 同时执行的批次数（至少为2时才能为查询保留执行槽）
+        """
+        if max_batch_size <= 0:
+            raise ValueError(f"max_batch_size必须为正数: {max_batch_size}")
+        if max_concurrent_batches <= 0:
+            raise ValueError(f"max_concurrent_batches必须为正数: {max_concurrent_batches}")
+
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = {
+            EmbeddingPriority.QUERY: query_max_wait_ms / 1000,
+            EmbeddingPriority.BULK: bulk_max_wait_ms / 1000,
+        }
+        self.max_concurrent_batches = max_concurrent_batches
+        self.bulk_slots = max(max_concurrent_batches - 1, 1)
+
+        # 每个优先级一个队列，元素为(入队时间, 文本, Future)
+        self._queues: Dict[EmbeddingPriority, Deque[Tuple[float, str, Future]]] = {
+            priority: deque() for priority in EmbeddingPriority
+        }
+        self._condition = threading.Condition()
+        self._running_batches = 0
+        self._running_bulk = 0
+        self._closed = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self.batches_dispatched = 0
+        self.texts_dispatched = 0
+
+        # 批大小观察者：(优先级名, 批内文本数)，由监控导出器设置
+        self.batch_observer: Optional[Callable[[str, int], None]] = None
+
+    def submit(
+        self,
+        texts: List[str],
+        priority: EmbeddingPriority = EmbeddingPriority.BULK
+    ) -> List[Future]:
+        """
+        提交文本，返回每个文本对应的Future
+
+        Args:
+            texts: 文本列表
+            priority: 请求优先级
+
+        Returns:
+            Future列表（结果为嵌入向量）
+        """
+        futures = [Future() for _ in texts]
+        if not texts:
+            return futures
+
+        now = time.monotonic()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("嵌入调度器已关闭")
+            self._ensure_started()
+            self._queues[priority].extend(
+                (now, text, future) for text, future in zip(texts, futures)
+            )
+            self._condition.notify()
+
+        return futures
+
+    def embed(
+        self,
+        texts: List[str],
+        priority: EmbeddingPriority = EmbeddingPriority.BULK,
+        timeout: Optional[float] = None
+    ) -> List[Any]:
+        """
+        提交文本并等待全部结果
+
+        Args:
+            texts: 文本列表
+            priority: 请求优先级
+            timeout: 每个结果的最长等待时间（秒）
+
+        Returns:
+            嵌入向量列表（与输入顺序一致）
+        """
+        return [future.result(timeout) for future in self.submit(texts, priority)]
+
+    def pending(self) -> int:
+        """等待合批的文本数"""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        with self._condition:
+            return {
+                'pending': {
+                    priority.name.lower(): len(queue)
+                    for priority, queue in self._queues.items()
+                },
+                'running_batches': self._running_batches,
+                'batches_dispatched': self.batches_dispatched,
+                'texts_dispatched': self.texts_dispatched,
+                'avg_batch_size': (
+                    self.texts_dispatched / self.batches_dispatched
+                    if self.batches_dispatched else 0.0
+                )
+            }
+
+    def close(self):
+        """停止调度（已提交的请求会被处理完）"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def _ensure_started(self):
+        """首次提交时启动调度线程（调用方持有锁）"""
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent_batches,
+                thread_name_prefix="wheel-embed"
+            )
+            self._thread = threading.Thread(
+                target=self._run, name="wheel-embed-scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """调度循环"""
+        while True:
+            with self._condition:
+                batch = self._wait_for_batch()
+                if batch is None:
+                    return
+
+                priority = batch[0]
+                self._running_batches += 1
+                if priority == EmbeddingPriority.BULK:
+                    self._running_bulk += 1
+
+            self._executor.submit(self._execute, *batch)
+
+    def _wait_for_batch(self) -> Optional[Tuple[EmbeddingPriority, List[Tuple[float, str, Future]]]]:
+        """等待直到可以发出一批（调用方持有锁），关闭且队列为空时返回None"""
+        while True:
+            queue_len = {priority: len(queue) for priority, queue in self._queues.items()}
+
+            if self._closed and not any(queue_len.values()):
+                return None
+
+            if self._running_batches < self.max_concurrent_batches:
+                now = time.monotonic()
+                timeout = None
+
+                for priority in EmbeddingPriority:
+                    queue = self._queues[priority]
+                    if not queue:
+                        continue
+                    if (
+                        priority == EmbeddingPriority.BULK
+                        and self._running_bulk >= self.bulk_slots
+                    ):
+                        continue
+
+                    deadline = queue[0][0] + self.max_wait[priority]
+                    if (
+                        queue_len[priority] >= self.max_batch_size
+                        or deadline <= now
+                        or self._closed
+                    ):
+                        return priority, self._take(priority)
+
+                    remaining = deadline - now
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+
+                self._condition.wait(timeout)
+            else:
+                self._condition.wait()
+
+    def _take(self, priority: EmbeddingPriority) -> List[Tuple[float, str, Future]]:
+        """从指定优先级的队列中取出一批（查询批次不混入批量文本，避免拉长查询延迟）"""
+        queue = self._queues[priority]
+        count = min(len(queue), self.max_batch_size)
+        return [queue.popleft() for _ in range(count)]
+
+    def _execute(
+        self,
+        priority: EmbeddingPriority,
+        items: List[Tuple[float, str, Future]]
+    ):
+        """执行一批嵌入并分发结果"""
+        # 观察者异常不影响本批执行，否则批次的future永远不会完成、执行槽也无法归还
+        observer = self.batch_observer
+        if observer is not None:
+            try:
+                observer(priority.name.lower(), len(items))
+            except Exception as e:
+                logger.warning(f"嵌入批次观察者失败: {e}")
+
+        try:
+            # 同批内相同文本只嵌入一次
+            unique: Dict[str, int] = {}
+            for _, text, _ in items:
+                unique.setdefault(text, len(unique))
+
+            texts = list(unique)
+            embeddings = self.embed_fn(texts)
+            if len(embeddings) != len(texts):
+                raise RuntimeError(
+                    f"嵌入结果数量不匹配: 期望 {len(texts)}, 实际 {len(embeddings)}"
+                )
+
+            for _, text, future in items:
+                future.set_result(embeddings[unique[text]])
+
+        except BaseException as e:
+            logger.error(f"嵌入批次失败 ({len(items)} 文本): {e}")
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+        finally:
+            with self._condition:
+                self._running_batches -= 1
+                if priority == EmbeddingPriority.BULK:
+                    self._running_bulk -= 1
+                self.batches_dispatched += 1
+                self.texts_dispatched += len(items)
+                self._condition.notify()
@@ -0,0 +1,117 @@
+"""
+嵌入模型注册表 - 声明每个嵌入模型的维度、归一化方式和距离度量
+支持Matryoshka（套娃）表示的模型可截取向量前缀用于粗排
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EmbeddingModelSpec:
+    """嵌入模型规格"""
+    name: str
+    dimension: int                          # 完整向量维度
+    normalized: bool = True                 # 输出是否已L2归一化
+    metric: str = "cosine"                  # 距离度量（cosine, dot）
+    matryoshka_dims: Tuple[int, ...] = ()   # 可截取的前缀维度（空为不支持截取）
+    max_input_tokens: int = 512             # 单条输入的token上限
+
+    def supports_prefix(self, dimension: int) -> bool:
+        """是否可以截取指定维度的前缀"""
+        return dimension in self.matryoshka_dims and dimension < self.dimension
+
+
+MODEL_REGISTRY: Dict[str, EmbeddingModelSpec] = {}
+
+
+def register_model(spec: EmbeddingModelSpec) -> EmbeddingModelSpec:
+    """注册嵌入模型（同名覆盖）"""
+    if spec.metric not in ("cosine", "dot"):
+        raise ValueError(f"不支持的距离度量: {spec.metric}")
+    for dimension in spec.matryoshka_dims:
+        if not 0 < dimension <= spec.dimension:
+            raise ValueError(f"无效的Matryoshka维度: {dimension} (完整维度 {spec.dimension})")
+
+    MODEL_REGISTRY[spec.name] = spec
+    return spec
+
+
+def get_model_spec(model: str) -> Optional[EmbeddingModelSpec]:
+    """
+    查找模型规格
+
+    依次按完整名称、去掉组织前缀的名称、本地模型路径的末级目录名匹配。
+
+    Args:
+        model: 模型名称或本地模型路径
+
+    Returns:
+        模型规格，未注册时返回None
+    """
+    if model in MODEL_REGISTRY:
+        return MODEL_REGISTRY[model]
+
+    basename = model.rstrip("/\\").replace("\\", "/").split("/")[-1]
+    for name, spec in MODEL_REGISTRY.items():
+        if name.split("/")[-1] == basename:
+            return spec
+
+    return None
+
+
+def model_dimension(model: str, default: int) -> int:
+    """获取模型的向量维度（未注册时返回默认值）"""
+    spec = get_model_spec(model)
+    return spec.dimension if spec else default
+
+
+# OpenAI
+register_model(EmbeddingModelSpec(
+    name="text-embedding-3-small",
+    dimension=1536,
+    matryoshka_dims=(256, 512, 1024, 1536),
+    max_input_tokens=8191
+))
+register_model(EmbeddingModelSpec(
+    name="text-embedding-3-large",
+    dimension=3072,
+    matryoshka_dims=(256, 1024, 3072),
+    max_input_tokens=8191
+))
+register_model(EmbeddingModelSpec(
+    name="text-embedding-ada-002",
+    dimension=1536,
+    max_input_tokens=8191
+))
+
+# Sentence Transformers
+register_model(EmbeddingModelSpec(
+    name="sentence-transformers/all-MiniLM-L6-v2",
+    dimension=384,
+    normalized=False,
+    max_input_tokens=256
+))
+register_model(EmbeddingModelSpec(
+    name="sentence-transformers/all-mpnet-base-v2",
+    dimension=768,
+    normalized=False,
+    max_input_tokens=384
+))
+
+# BGE中文模型（本地部署）
+register_model(EmbeddingModelSpec(
+    name="BAAI/bge-small-zh-v1.5",
+    dimension=512
+))
+register_model(EmbeddingModelSpec(
+    name="BAAI/bge-base-zh-v1.5",
+    dimension=768
+))
+register_model(EmbeddingModelSpec(
+    name="BAAI/bge-large-zh-v1.5",
+    dimension=1024
+))
@@ -0,0 +1,140 @@
+"""
+OCR引擎池 - 每个进程按需加载一次OCR模型并复用
+支持批量识别和启动预热
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Any, List, Iterable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _create_easyocr() -> Any:
+    """创建EasyOCR识别器（加载模型权重）"""
+    import easyocr
+    return easyocr.Reader(['ch_sim', 'en'])
+
+
+def _create_paddle() -> Any:
+    """创建PaddleOCR识别器（加载模型权重）"""
+    from paddleocr import PaddleOCR
+    return PaddleOCR(use_angle_cls=True, lang='ch')
+
+
+def _create_gpt4v() -> Any:
+    """创建OpenAI客户端（复用HTTP连接）"""
+    from openai import OpenAI
+    return OpenAI()
+
+
+class OCREnginePool:
+    """
+    进程级OCR引擎池
+
+    引擎在首次使用时构建，之后在同一进程内复用；
+    检测到fork后的新进程会重新加载，不复用父进程的模型实例。
+    """
+
+    FACTORIES: Dict[str, Callable[[], Any]] = {
+        'easyocr': _create_easyocr,
+        'paddle': _create_paddle,
+        'gpt4v': _create_gpt4v,
+    }
+
+    def __init__(self):
+        """初始化引擎池"""
+        self._engines: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._pool_lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get(self, engine_type: str) -> Any:
+        """
+        获取OCR引擎（首次调用时加载）
+
+        Args:
+            engine_type: 引擎类型（easyocr, paddle, gpt4v）
+
+        Returns:
+            引擎实例
+        """
+        self._check_pid()
+
+        engine = self._engines.get(engine_type)
+        if engine is not None:
+            return engine
+
+        factory = self.FACTORIES.get(engine_type)
+        if factory is None:
+            raise ValueError(f"不支持的OCR引擎: {engine_type}")
+
+        with self._lock_for(engine_type):
+            engine = self._engines.get(engine_type)
+            if engine is None:
+                logger.info(f"加载OCR引擎: {engine_type} (pid: {self._pid})")
+                engine = factory()
+                self._engines[engine_type] = engine
+
+        return engine
+
+    def run(self, engine_type: str, func: Callable[[Any], Any]) -> Any:
+        """
+        独占使用引擎执行识别（OCR模型的推理不保证线程安全）
+
+        Args:
+            engine_type: 引擎类型
+            func: 接收引擎实例并返回结果的函数
+        """
+        engine = self.get(engine_type)
+        with self._lock_for(engine_type):
+            return func(engine)
+
+    def warmup(self, engine_types: Iterable[str]) -> Dict[str, bool]:
+        """
+        预加载引擎（在服务启动或工作进程初始化时调用）
+
+        Returns:
+            每个引擎是否加载成功
+        """
+        status = {}
+        for engine_type in engine_types:
+            try:
+                self.get(engine_type)
+                status[engine_type] = True
+            except Exception as e:
+                logger.warning(f"OCR引擎预热失败: {engine_type} - {e}")
+                status[engine_type] = False
+        return status
+
+    def loaded_engines(self) -> List[str]:
+        """当前进程已加载的引擎"""
+        self._check_pid()
+        return list(self._engines)
+
+    def _lock_for(self, engine_type: str) -> threading.Lock:
+        """获取引擎对应的锁"""
+        with self._pool_lock:
+            if engine_type not in self._locks:
+                self._locks[engine_type] = threading.Lock()
+            return self._locks[engine_type]
+
+    def _check_pid(self):
+        """fork后丢弃继承自父进程的引擎"""
+        pid = os.getpid()
+        if pid != self._pid:
+            with self._pool_lock:
+                if pid != self._pid:
+                    self._engines = {}
+                    self._locks = {}
+                    self._pid = pid
+
+
+# 进程内共享的引擎池
+ocr_engine_pool = OCREnginePool()
+
+
+def warmup_ocr_engines(engine_types: Iterable[str]) -> Dict[str, bool]:
+    """预热进程内共享的OCR引擎"""
+    return ocr_engine_pool.warmup(engine_types)
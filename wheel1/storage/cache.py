@@ -0,0 +1,339 @@
+"""
+缓存层 - Redis缓存和文本提取结果缓存
+大文本压缩后存入本地磁盘，避免在Redis中传输数MB的JSON字符串
+"""
+
+import logging
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRUCache:
+    """
+    进程内LRU缓存（线程安全）
+
+    条目数超过max_entries时淘汰最久未使用的条目；设置了TTL的条目过期后读取时删除。
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        """
+        初始化本地LRU缓存
+
+        Args:
+            max_entries: 最大条目数
+        """
+        if max_entries <= 0:
+            raise ValueError(f"最大条目数必须为正数: {max_entries}")
+
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取条目（未命中或已过期返回None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """写入条目（ttl为None时不过期）"""
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        """删除条目"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class CacheManager:
+    """缓存管理器 - Redis"""
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        ttl: int = 3600,
+        enabled: bool = True,
+        local_max_entries: int = 4096
+    ):
+        """
+        初始化Redis缓存管理器
+        Args:
+            host: Redis主机
+            port: Redis端口
+            db: Redis数据库号
+            ttl: 默认TTL（秒）
+            enabled: 是否启用缓存
+            local_max_entries: Redis不可用时本地内存缓存的最大条目数
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.ttl = ttl
+        self.enabled = enabled
+        self.local_max_entries = local_max_entries
+        self.client = None
+        if enabled:
+            self._connect()
+    def _connect(self):
+        """连接Redis"""
+        try:
+            import redis
+            self.client = redis.Redis(
+                host=self.host,
+                port=self.port,
+                db=self.db,
+                decode_responses=True
+            )
+            # 测试连接
+            self.client.ping()
+            logger.info(f"Redis连接成功: {self.host}:{self.port}")
+        except Exception as e:
+            logger.warning(f"Redis连接失败: {e}，将使用本地缓存")
+            self.client = None
+            self._init_local_cache()
+    
+    def _init_local_cache(self):
+        """初始化本地内存缓存（有界LRU，遵守TTL）"""
+        self.local_cache = LocalLRUCache(self.local_max_entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存"""
+        if not self.enabled:
+            return None
+        
+        try:
+            if self.client:
+                value = self.client.get(key)
+                if value:
+                    return json.loads(value)
+            else:
+                return self.local_cache.get(key)
+        except Exception as e:
+            logger.debug(f"缓存读取失败: {e}")
+        
+        return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """设置缓存"""
+        if not self.enabled:
+            return False
+        
+        ttl = ttl or self.ttl
+        
+        try:
+            if self.client:
+                self.client.setex(
+                    key,
+                    ttl,
+                    json.dumps(value, default=str)
+                )
+            else:
+                self.local_cache.set(key, value, ttl)
+            
+            return True
+        except Exception as e:
+            logger.debug(f"缓存写入失败: {e}")
+            return False
+    
+    def delete(self, key: str) -> bool:
+        """删除缓存"""
+        try:
+            if self.client:
+                self.client.delete(key)
+            else:
+                self.local_cache.delete(key)
+            return True
+        except Exception as e:
+            logger.debug(f"缓存删除失败: {e}")
+            return False
+
+    def health_check(self) -> bool:
+        """健康检查"""
+        if not self.enabled:
+            return True
+        
+        try:
+            if self.client:
+                self.client.ping()
+                return True
+            else:
+                return True  # 本地缓存总是可用
+        except Exception as e:
+            logger.error(f"缓存健康检查失败: {e}")
+            return False
+
+
+class ExtractionCache:
+    """
+    文本提取结果缓存 - 按文件内容哈希寻址
+
+    小文本存入缓存管理器（Redis/本地内存）；超过阈值的大文本压缩后
+    写入本地磁盘（优先zstd，未安装时使用gzip），磁盘总量超限时淘汰最旧的文件。
+    """
+
+    def __init__(
+        self,
+        cache: Optional[CacheManager] = None,
+        cache_dir: Optional[str] = None,
+        spill_threshold: int = 64 * 1024,
+        max_disk_bytes: int = 2 * 1024 ** 3,
+        ttl: int = 86400
+    ):
+        """
+        初始化提取缓存
+
+        Args:
+            cache: 缓存管理器（小文本层）
+            cache_dir: 磁盘缓存目录（None则不启用磁盘层，全部存入缓存管理器）
+            spill_threshold: 超过该字节数的文本写入磁盘
+            max_disk_bytes: 磁盘层最大占用
+            ttl: 缓存管理器中的TTL（秒）
+        """
+        self.cache = cache
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.spill_threshold = spill_threshold
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+
+        try:
+            import zstandard
+            self._zstd = zstandard
+            self._suffix = ".zst"
+        except ImportError:
+            self._zstd = None
+            self._suffix = ".gz"
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            logger.info(f"初始化提取缓存磁盘层: {self.cache_dir} ({self._suffix})")
+
+    def get(self, content_hash: str, mode: str) -> Optional[str]:
+        """按内容哈希和模式读取提取结果"""
+        if self.cache:
+            text = self.cache.get(self._key(content_hash, mode))
+            if text:
+                return text
+
+        if self.cache_dir:
+            return self._read_disk(content_hash, mode)
+
+        return None
+
+    def set(self, content_hash: str, mode: str, text: str) -> bool:
+        """写入提取结果（只应写入完整的结果，缓存没有失效机制）"""
+        if not text:
+            return False
+
+        if self.cache_dir and len(text.encode('utf-8')) > self.spill_threshold:
+            return self._write_disk(content_hash, mode, text)
+
+        if self.cache:
+            return self.cache.set(self._key(content_hash, mode), text, ttl=self.ttl)
+
+        return False
+
+    def _key(self, content_hash: str, mode: str) -> str:
+        """缓存管理器中的键"""
+        return f"extract:{content_hash}:{mode}"
+
+    def _paths(self, content_hash: str, mode: str) -> List[Path]:
+        """磁盘文件路径（当前压缩格式优先）"""
+        base = self.cache_dir / content_hash[:2] / f"{content_hash}_{mode}.txt"
+        suffixes = [self._suffix] + [s for s in (".zst", ".gz") if s != self._suffix]
+        return [base.with_name(base.name + suffix) for suffix in suffixes]
+
+    def _read_disk(self, content_hash: str, mode: str) -> Optional[str]:
+        """从磁盘层读取"""
+        for path in self._paths(content_hash, mode):
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                continue
+
+            try:
+                if path.suffix == ".zst":
+                    if self._zstd is None:
+                        continue
+                    raw = self._zstd.ZstdDecompressor().decompress(data)
+                else:
+                    raw = gzip.decompress(data)
+                os.utime(path)  # 刷新访问时间，用于淘汰
+                return raw.decode('utf-8')
+            except Exception as e:
+                logger.warning(f"磁盘缓存损坏，已删除: {path} - {e}")
+                path.unlink(missing_ok=True)
+
+        return None
+
+    def _write_disk(self, content_hash: str, mode: str, text: str) -> bool:
+        """压缩后原子写入磁盘层"""
+        path = self._paths(content_hash, mode)[0]
+        raw = text.encode('utf-8')
+
+        try:
+            if self._zstd is not None:
+                data = self._zstd.ZstdCompressor(level=3).compress(raw)
+            else:
+                data = gzip.compress(raw, compresslevel=6)
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            logger.debug(f"提取结果写入磁盘缓存: {path} ({len(raw)} -> {len(data)} bytes)")
+            self._prune()
+            return True
+        except Exception as e:
+            logger.warning(f"磁盘缓存写入失败: {e}")
+            return False
+
+    def _prune(self):
+        """磁盘占用超限时按最近访问时间淘汰"""
+        entries: List[Tuple[float, int, Path]] = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.txt.*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_disk_bytes:
+            return
+
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
@@ -0,0 +1,134 @@
+"""
+分块文本存储 - 按分块ID保存完整分块文本
+向量元数据只保留定位信息，检索结果在确定最终top-k后再按ID批量取回全文
+"""
+
+import logging
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkTextStore:
+    """
+    基于SQLite的分块文本存储
+
+    以向量ID（即首次产生该向量的分块ID）为键，与向量同生共灭；
+    超过compress_threshold字节的文本以zlib压缩存储。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS chunk_texts (
+        chunk_id TEXT PRIMARY KEY,
+        compressed INTEGER NOT NULL,
+        data BLOB NOT NULL
+    ) WITHOUT ROWID;
+    """
+
+    # 单条查询绑定的最多参数数（低于SQLite默认上限）
+    MAX_BATCH = 500
+
+    def __init__(self, path: str = ":memory:", compress_threshold: int = 512):
+        """
+        初始化分块文本存储
+
+        Args:
+            path: SQLite数据库文件路径（默认内存数据库）
+            compress_threshold: 文本UTF-8编码超过该字节数时压缩
+        """
+        self.path = path
+        self.compress_threshold = compress_threshold
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # API进程和摄取工作进程共享同一存储文件：WAL允许读写并发，写锁冲突时等待而不是立即报错
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+        logger.info(f"初始化分块文本存储: {path}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunk_texts").fetchone()[0]
+
+    def _encode(self, text: str) -> Tuple[int, bytes]:
+        """编码文本（较长的文本压缩）"""
+        data = text.encode('utf-8')
+        if len(data) > self.compress_threshold:
+            compressed = zlib.compress(data, 6)
+            if len(compressed) < len(data):
+                return 1, compressed
+        return 0, data
+
+    @staticmethod
+    def _decode(compressed: int, data: bytes) -> str:
+        """解码文本"""
+        if compressed:
+            data = zlib.decompress(data)
+        return bytes(data).decode('utf-8')
+
+    def put_many(self, items: Iterable[Tuple[str, str]]):
+        """
+        批量写入分块文本（已存在则覆盖）
+
+        Args:
+            items: (分块ID, 文本)序列
+        """
+        rows = [(chunk_id, *self._encode(text)) for chunk_id, text in items]
+        if not rows:
+            return
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_texts (chunk_id, compressed, data) VALUES (?, ?, ?)",
+                rows
+            )
+
+    def get_many(self, chunk_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        批量读取分块文本
+
+        Args:
+            chunk_ids: 分块ID列表
+
+        Returns:
+            分块ID -> 文本（不存在的ID不出现在结果中）
+        """
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        texts = {}
+        with self._lock:
+            for start in range(0, len(chunk_ids), self.MAX_BATCH):
+                batch = chunk_ids[start:start + self.MAX_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT chunk_id, compressed, data FROM chunk_texts "
+                    f"WHERE chunk_id IN ({', '.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for chunk_id, compressed, data in rows:
+                    texts[chunk_id] = self._decode(compressed, data)
+        return texts
+
+    def get(self, chunk_id: str) -> str:
+        """读取单个分块文本（不存在时返回空字符串）"""
+        return self.get_many([chunk_id]).get(chunk_id, '')
+
+    def delete_many(self, chunk_ids: Iterable[str]):
+        """批量删除分块文本"""
+        rows = [(chunk_id,) for chunk_id in chunk_ids]
+        if not rows:
+            return
+
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunk_texts WHERE chunk_id = ?", rows)
+
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,874 @@
+"""
+关系数据库 - PostgreSQL文档和分块元数据存储
+同步路径使用线程安全连接池，异步路径使用asyncpg连接池
+分块全文检索在数据库端完成（PostgreSQL tsvector + GIN索引，本地回退为SQLite FTS5）
+"""
+
+import asyncio
+import csv
+import io
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Set, Tuple
+
+from utils.helpers import search_terms
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseError(Exception):
+    """数据库访问失败"""
+    pass
+
+
+# 文档和分块的列（同时用于预编译语句参数、COPY和asyncpg批量写入）
+DOCUMENT_COLUMNS = ('document_id', 'source_file', 'mode', 'chunk_count', 'processed_at')
+CHUNK_COLUMNS = ('chunk_id', 'document_id', 'vector_id', 'chunk_index', 'level', 'parent_id', 'text')
+# 分块行在CHUNK_COLUMNS之后附加检索文本（按search_terms切分、空格连接）
+CHUNK_ROW_COLUMNS = CHUNK_COLUMNS + ('search_text',)
+
+# 单次查询使用的最多词项数
+MAX_QUERY_TERMS = 64
+
+
+def _query_terms(query: str) -> List[str]:
+    """查询词项（去重并保持顺序）"""
+    return list(dict.fromkeys(search_terms(query)))[:MAX_QUERY_TERMS]
+
+
+def _search_result(row: Tuple) -> Dict[str, Any]:
+    """检索结果行(CHUNK_COLUMNS, source_file, score) -> 结果字典"""
+    result = _chunk_record(row[:-1])
+    result['score'] = float(row[-1])
+    return result
+
+
+def _chunk_record(row: Tuple) -> Dict[str, Any]:
+    """分块行(CHUNK_COLUMNS, source_file) -> 结果字典（不含分数）"""
+    chunk = dict(zip(CHUNK_COLUMNS, row))
+    return {
+        'id': chunk['chunk_id'],
+        'text': chunk['text'],
+        'source': row[len(CHUNK_COLUMNS)] or '',
+        'metadata': {
+            'document_id': chunk['document_id'],
+            'vector_id': chunk['vector_id'],
+            'chunk_index': chunk['chunk_index'],
+            'level': chunk['level'],
+            'parent_id': chunk['parent_id']
+        }
+    }
+
+
+class LocalFullTextIndex:
+    """
+    本地分块全文索引（SQLite FTS5，PostgreSQL不可用时的回退）
+
+    分块表与PostgreSQL一致，FTS5表以分块表的rowid关联，按bm25()排序。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS documents (
+        document_id TEXT PRIMARY KEY,
+        source_file TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        chunk_count INTEGER NOT NULL DEFAULT 0,
+        processed_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS chunks (
+        chunk_id TEXT PRIMARY KEY,
+        document_id TEXT NOT NULL,
+        vector_id TEXT,
+        chunk_index INTEGER NOT NULL,
+        level TEXT,
+        parent_id TEXT,
+        text TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document_id);
+    CREATE INDEX IF NOT EXISTS idx_chunks_vector ON chunks (vector_id);
+    CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(search_text, tokenize='unicode61');
+    """
+
+    # 单条查询绑定的最多参数数（低于SQLite默认上限）
+    MAX_BATCH = 500
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        初始化本地全文索引
+
+        Args:
+            path: SQLite数据库文件路径（默认内存数据库）
+        """
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # API进程和摄取工作进程共享同一索引文件：WAL允许读写并发，写锁冲突时等待而不是立即报错
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+        logger.info(f"初始化本地全文索引: {path}")
+
+    def insert_documents(self, rows: List[Tuple]):
+        """写入文档行（已存在则覆盖）"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO documents ({', '.join(DOCUMENT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(DOCUMENT_COLUMNS))})",
+                [
+                    tuple(value.isoformat() if isinstance(value, datetime) else value for value in row)
+                    for row in rows
+                ]
+            )
+
+    def insert_chunks(self, rows: List[Tuple]):
+        """写入分块行（行格式为CHUNK_ROW_COLUMNS，已存在则更新）"""
+        with self._lock, self._conn:
+            for row in rows:
+                self._conn.execute(
+                    f"INSERT INTO chunks ({', '.join(CHUNK_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(CHUNK_COLUMNS))}) "
+                    "ON CONFLICT (chunk_id) DO UPDATE SET "
+                    "vector_id = excluded.vector_id, chunk_index = excluded.chunk_index, "
+                    "level = excluded.level, parent_id = excluded.parent_id, text = excluded.text",
+                    row[:len(CHUNK_COLUMNS)]
+                )
+                rowid = self._conn.execute(
+                    "SELECT rowid FROM chunks WHERE chunk_id = ?", (row[0],)
+                ).fetchone()[0]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO chunks_fts (rowid, search_text) VALUES (?, ?)",
+                    (rowid, row[-1])
+                )
+
+    def delete_chunks(self, chunk_ids: List[str]):
+        """删除分块"""
+        with self._lock, self._conn:
+            for chunk_id in chunk_ids:
+                found = self._conn.execute(
+                    "SELECT rowid FROM chunks WHERE chunk_id = ?", (chunk_id,)
+                ).fetchone()
+                if found:
+                    self._conn.execute("DELETE FROM chunks_fts WHERE rowid = ?", found)
+                    self._conn.execute("DELETE FROM chunks WHERE rowid = ?", found)
+
+    def search(self, terms: List[str], top_k: int) -> List[Tuple]:
+        """
+        BM25检索
+
+        Args:
+            terms: 查询词项（任一匹配即可）
+            top_k: 返回结果数
+
+        Returns:
+            结果行(CHUNK_COLUMNS, source_file, score)，score = s / (s + 1)，s为BM25分数
+        """
+        match = " OR ".join(f'"{term}"' for term in terms)
+        columns = ', '.join(f"c.{column}" for column in CHUNK_COLUMNS)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns}, d.source_file, -bm25(chunks_fts) AS s "
+                "FROM chunks_fts "
+                "JOIN chunks c ON c.rowid = chunks_fts.rowid "
+                "LEFT JOIN documents d ON d.document_id = c.document_id "
+                "WHERE chunks_fts MATCH ? "
+                "ORDER BY bm25(chunks_fts) LIMIT ?",
+                (match, top_k)
+            ).fetchall()
+        # 词项出现在大多数分块中时FTS5的BM25分数可能为负，按0处理
+        return [row[:-1] + (max(row[-1], 0.0) / (max(row[-1], 0.0) + 1),) for row in rows]
+
+    def chunks_by_vector(self, vector_ids: List[str]) -> List[Tuple]:
+        """
+        查找引用给定向量的分块
+
+        Returns:
+            分块行(CHUNK_COLUMNS, source_file)
+        """
+        columns = ', '.join(f"c.{column}" for column in CHUNK_COLUMNS)
+        rows = []
+        with self._lock:
+            for start in range(0, len(vector_ids), self.MAX_BATCH):
+                batch = vector_ids[start:start + self.MAX_BATCH]
+                rows.extend(self._conn.execute(
+                    f"SELECT {columns}, d.source_file "
+                    "FROM chunks c "
+                    "LEFT JOIN documents d ON d.document_id = c.document_id "
+                    f"WHERE c.vector_id IN ({', '.join('?' * len(batch))}) "
+                    "ORDER BY c.document_id, c.chunk_index",
+                    batch
+                ).fetchall())
+        return rows
+
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            self._conn.close()
+
+
+class DatabaseConnector:
+    """
+    数据库连接器 - PostgreSQL
+
+    - 同步调用从ThreadedConnectionPool借出连接，并发请求不再共用同一连接
+    - 连接池满时调用方最多等待checkout_timeout秒，而不是直接报错
+    - 空闲超过health_check_interval的连接借出前先执行SELECT 1，失效连接被丢弃重建
+    - 单条写入使用每个连接上预编译的语句，批量写入使用execute_batch，
+      行数达到copy_threshold时改用COPY写入临时表后合并
+    - 分块表带tsvector列和GIN索引，bm25_search在数据库端完成排序并返回完整分块文本
+    - 数据库不可用时回退到本地SQLite FTS5索引（指定local_path时），否则进入模拟模式
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS documents (
+        document_id TEXT PRIMARY KEY,
+        source_file TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        chunk_count INTEGER NOT NULL DEFAULT 0,
+        processed_at TIMESTAMP NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS chunks (
+        chunk_id TEXT PRIMARY KEY,
+        document_id TEXT NOT NULL,
+        vector_id TEXT,
+        chunk_index INTEGER NOT NULL,
+        level TEXT,
+        parent_id TEXT,
+        text TEXT NOT NULL,
+        tsv TSVECTOR
+    );
+    ALTER TABLE chunks ADD COLUMN IF NOT EXISTS tsv TSVECTOR;
+    CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document_id);
+    CREATE INDEX IF NOT EXISTS idx_chunks_vector ON chunks (vector_id);
+    CREATE INDEX IF NOT EXISTS idx_chunks_tsv ON chunks USING GIN (tsv);
+    """
+
+    # COPY暂存表（与分块行格式一致，合并时计算tsvector）
+    STAGING_SCHEMA = """
+    CREATE TEMP TABLE IF NOT EXISTS wheel_chunks_staging (
+        chunk_id TEXT,
+        document_id TEXT,
+        vector_id TEXT,
+        chunk_index INTEGER,
+        level TEXT,
+        parent_id TEXT,
+        text TEXT,
+        search_text TEXT
+    ) ON COMMIT DELETE ROWS
+    """
+
+    # 预编译语句（名称 -> SQL），在每个连接上首次使用时PREPARE
+    PREPARED_STATEMENTS = {
+        'wheel_upsert_document': """
+            INSERT INTO documents (document_id, source_file, mode, chunk_count, processed_at)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (document_id) DO UPDATE SET
+                source_file = EXCLUDED.source_file,
+                mode = EXCLUDED.mode,
+                chunk_count = EXCLUDED.chunk_count,
+                processed_at = EXCLUDED.processed_at
+        """,
+        'wheel_upsert_chunk': """
+            INSERT INTO chunks (chunk_id, document_id, vector_id, chunk_index, level, parent_id, text, tsv)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, to_tsvector('simple', $8))
+            ON CONFLICT (chunk_id) DO UPDATE SET
+                vector_id = EXCLUDED.vector_id,
+                chunk_index = EXCLUDED.chunk_index,
+                level = EXCLUDED.level,
+                parent_id = EXCLUDED.parent_id,
+                text = EXCLUDED.text,
+                tsv = EXCLUDED.tsv
+        """,
+        'wheel_delete_chunks': """
+            DELETE FROM chunks WHERE chunk_id = ANY($1)
+        """,
+        # ts_rank标志1按文档长度归一化，标志32将分数映射为rank / (rank + 1)
+        'wheel_search_chunks': """
+            SELECT c.chunk_id, c.document_id, c.vector_id, c.chunk_index, c.level, c.parent_id, c.text,
+                   d.source_file, ts_rank(c.tsv, q, 33) AS score
+            FROM chunks c
+            CROSS JOIN to_tsquery('simple', $1) q
+            LEFT JOIN documents d ON d.document_id = c.document_id
+            WHERE c.tsv @@ q
+            ORDER BY score DESC
+            LIMIT $2
+        """,
+        'wheel_chunks_by_vector': """
+            SELECT c.chunk_id, c.document_id, c.vector_id, c.chunk_index, c.level, c.parent_id, c.text,
+                   d.source_file
+            FROM chunks c
+            LEFT JOIN documents d ON d.document_id = c.document_id
+            WHERE c.vector_id = ANY($1)
+            ORDER BY c.document_id, c.chunk_index
+        """,
+    }
+
+    # COPY写入后合并到正式表的语句
+    CHUNK_MERGE_SQL = """
+        INSERT INTO chunks (chunk_id, document_id, vector_id, chunk_index, level, parent_id, text, tsv)
+        SELECT DISTINCT ON (chunk_id) chunk_id, document_id, vector_id, chunk_index, level, parent_id, text,
+               to_tsvector('simple', search_text)
+        FROM wheel_chunks_staging
+        ON CONFLICT (chunk_id) DO UPDATE SET
+            vector_id = EXCLUDED.vector_id,
+            chunk_index = EXCLUDED.chunk_index,
+            level = EXCLUDED.level,
+            parent_id = EXCLUDED.parent_id,
+            text = EXCLUDED.text,
+            tsv = EXCLUDED.tsv
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 5432,
+        database: str = "wheel_db",
+        user: str = "postgres",
+        password: str = "",
+        min_connections: int = 1,
+        max_connections: int = 10,
+        connect_timeout: int = 5,
+        checkout_timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+        copy_threshold: int = 1000,
+        local_path: Optional[str] = None,
+        use_postgres: bool = True
+    ):
+        """
+        初始化数据库连接池
+
+        Args:
+            host: 数据库主机
+            port: 数据库端口
+            database: 数据库名
+            user: 用户名
+            password: 密码
+            min_connections: 连接池保持的最少连接数
+            max_connections: 连接池最大连接数
+            connect_timeout: 建立连接的超时时间（秒）
+            checkout_timeout: 连接池满时借出连接的最长等待时间（秒）
+            health_check_interval: 连接空闲超过该时间（秒）后借出前先检查可用性
+            copy_threshold: 批量写入分块的行数达到该值时使用COPY
+            local_path: PostgreSQL不可用时本地SQLite全文索引的路径（None为模拟模式）
+            use_postgres: 是否连接PostgreSQL（False时直接使用本地全文索引，用于基准测试和开发）
+        """
+        self.host = host
+        self.port = port
+        self.database = database
+        self.user = user
+        self.password = password
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.copy_threshold = copy_threshold
+        self.local_path = local_path
+        self.use_postgres = use_postgres
+
+        self.pool = None
+        self.local: Optional[LocalFullTextIndex] = None
+        # 连接池本身在满时直接报错，用信号量让调用方排队等待
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._state_lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}  # id(连接) -> 最近归还时间
+        self._prepared: Dict[int, Set[str]] = {}  # id(连接) -> 已预编译的语句
+
+        self._async_pool = None
+        self._async_pool_unavailable = False
+
+        self._create_pool()
+
+    # ============ 同步连接池 ============
+
+    def _create_pool(self):
+        """创建连接池并初始化表结构"""
+        if not self.use_postgres:
+            if self.local_path:
+                self.local = LocalFullTextIndex(self.local_path)
+            return
+
+        try:
+            from psycopg2.pool import ThreadedConnectionPool
+            self.pool = ThreadedConnectionPool(
+                self.min_connections,
+                self.max_connections,
+                host=self.host,
+                port=self.port,
+                database=self.database,
+                user=self.user,
+                password=self.password,
+                connect_timeout=self.connect_timeout
+            )
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(self.SCHEMA)
+            logger.info(
+                f"数据库连接池就绪: {self.host}:{self.port}/{self.database} "
+                f"({self.min_connections}-{self.max_connections} 连接)"
+            )
+        except Exception as e:
+            if self.pool is not None:
+                self.pool.closeall()
+            self.pool = None
+            if self.local_path:
+                logger.warning(f"数据库连接失败: {e}，使用本地全文索引")
+                self.local = LocalFullTextIndex(self.local_path)
+            else:
+                logger.warning(f"数据库连接失败: {e}，使用模拟模式")
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        借出一个连接（正常退出时提交，异常时回滚）
+
+        Yields:
+            psycopg2连接
+        """
+        if self.pool is None:
+            raise DatabaseError("数据库未连接")
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise DatabaseError(f"获取数据库连接超时 ({self.checkout_timeout}s)")
+
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.commit()
+        except Exception:
+            if conn is not None:
+                broken = not self._reset(conn)
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn, close=broken or bool(conn.closed))
+            self._slots.release()
+
+    def _checkout(self) -> Any:
+        """从连接池取出一个可用连接（失效连接被关闭并重新获取）"""
+        for _ in range(self.max_connections + 1):
+            conn = self.pool.getconn()
+            if self._is_alive(conn):
+                return conn
+            logger.warning("丢弃失效的数据库连接")
+            self._checkin(conn, close=True)
+
+        raise DatabaseError("无法获取可用的数据库连接")
+
+    def _is_alive(self, conn: Any) -> bool:
+        """检查连接是否可用（最近使用过的连接不重复检查）"""
+        if conn.closed:
+            return False
+
+        with self._state_lock:
+            last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, conn: Any) -> bool:
+        """出错后回滚连接并清除预编译语句，返回连接是否仍可用"""
+        try:
+            conn.rollback()
+            with conn.cursor() as cursor:
+                cursor.execute("DEALLOCATE ALL")
+            conn.commit()
+            with self._state_lock:
+                self._prepared.pop(id(conn), None)
+            return True
+        except Exception:
+            return False
+
+    def _checkin(self, conn: Any, close: bool = False):
+        """归还连接（close为True时关闭连接，连接池按需重建）"""
+        with self._state_lock:
+            if close:
+                self._last_used.pop(id(conn), None)
+                self._prepared.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+
+        try:
+            self.pool.putconn(conn, close=close)
+        except Exception as e:
+            logger.warning(f"归还数据库连接失败: {e}")
+
+    def _execute_prepared(self, cursor: Any, name: str, rows: List[Tuple]):
+        """用预编译语句执行一行或多行（多行合并为一次往返）"""
+        conn = cursor.connection
+        with self._state_lock:
+            prepared = self._prepared.setdefault(id(conn), set())
+            needs_prepare = name not in prepared
+
+        if needs_prepare:
+            cursor.execute(f"PREPARE {name} AS {self.PREPARED_STATEMENTS[name]}")
+            with self._state_lock:
+                prepared.add(name)
+
+        placeholders = ", ".join(["%s"] * len(rows[0]))
+        statement = f"EXECUTE {name} ({placeholders})"
+        if len(rows) == 1:
+            cursor.execute(statement, rows[0])
+        else:
+            from psycopg2.extras import execute_batch
+            execute_batch(cursor, statement, rows, page_size=200)
+
+    # ============ 写入 ============
+
+    @staticmethod
+    def _document_row(metadata: Dict[str, Any]) -> Tuple:
+        """文档元数据 -> 行（processed_at统一为datetime，asyncpg不接受字符串时间）"""
+        row = dict(metadata)
+        if isinstance(row.get('processed_at'), str):
+            row['processed_at'] = datetime.fromisoformat(row['processed_at'])
+        return tuple(row.get(column) for column in DOCUMENT_COLUMNS)
+
+    @staticmethod
+    def _chunk_row(chunk: Dict[str, Any]) -> Tuple:
+        """分块元数据 -> 行（附加检索文本）"""
+        return tuple(chunk.get(column) for column in CHUNK_COLUMNS) + (
+            ' '.join(search_terms(chunk.get('text') or '')),
+        )
+
+    def insert_document(self, metadata: Dict[str, Any]) -> bool:
+        """插入文档元数据"""
+        return self.insert_documents([metadata])
+
+    def insert_documents(self, documents: Iterable[Dict[str, Any]]) -> bool:
+        """
+        批量插入文档元数据（已存在则更新）
+
+        Args:
+            documents: 文档元数据列表（包含DOCUMENT_COLUMNS中的字段）
+
+        Returns:
+            是否成功
+        """
+        rows = [self._document_row(document) for document in documents]
+        if not rows:
+            return True
+
+        if self.pool is None:
+            logger.debug(f"插入文档元数据: {len(rows)} 条")
+            if self.local is not None:
+                self.local.insert_documents(rows)
+            return True
+
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute_prepared(cursor, 'wheel_upsert_document', rows)
+            return True
+        except Exception as e:
+            logger.error(f"插入文档失败: {e}")
+            return False
+
+    def insert_chunks(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        bulk: Optional[bool] = None
+    ) -> bool:
+        """
+        批量插入分块元数据和全文索引（已存在则更新）
+
+        Args:
+            chunks: 分块元数据列表（包含CHUNK_COLUMNS中的字段）
+            bulk: 是否使用COPY写入（None为行数达到copy_threshold时使用）
+
+        Returns:
+            是否成功
+        """
+        rows = [self._chunk_row(chunk) for chunk in chunks]
+        if not rows:
+            return True
+
+        if self.pool is None:
+            logger.debug(f"插入分块元数据: {len(rows)} 条")
+            if self.local is not None:
+                self.local.insert_chunks(rows)
+            return True
+
+        if bulk is None:
+            bulk = len(rows) >= self.copy_threshold
+
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    if bulk:
+                        self._copy_chunks(cursor, rows)
+                    else:
+                        self._execute_prepared(cursor, 'wheel_upsert_chunk', rows)
+            return True
+        except Exception as e:
+            logger.error(f"插入分块失败: {e}")
+            return False
+
+    def _copy_chunks(self, cursor: Any, rows: List[Tuple]):
+        """用COPY写入临时表，再合并到chunks表（COPY本身不支持冲突更新）"""
+        cursor.execute(self.STAGING_SCHEMA)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # CSV格式中未加引号的空字段表示NULL
+            writer.writerow(['' if value is None else value for value in row])
+        buffer.seek(0)
+
+        cursor.copy_expert(
+            f"COPY wheel_chunks_staging ({', '.join(CHUNK_ROW_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+        cursor.execute(self.CHUNK_MERGE_SQL)
+
+    def delete_chunks(self, chunk_ids: Iterable[str]) -> bool:
+        """批量删除分块元数据"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return True
+
+        if self.pool is None:
+            if self.local is not None:
+                self.local.delete_chunks(chunk_ids)
+            return True
+
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute_prepared(cursor, 'wheel_delete_chunks', [(chunk_ids,)])
+            return True
+        except Exception as e:
+            logger.error(f"删除分块失败: {e}")
+            return False
+
+    # ============ 查询 ============
+
+    def bm25_search(self, query: str, top_k: int) -> List[Dict]:
+        """
+        关键词检索（在数据库端排序，返回完整分块文本）
+
+        PostgreSQL使用ts_rank近似BM25，本地回退使用FTS5的bm25()；
+        分数均映射到[0, 1)，便于与向量相似度加权融合。
+
+        Args:
+            query: 查询文本
+            top_k: 返回结果数
+
+        Returns:
+            结果列表（id, text, score, source, metadata）
+        """
+        logger.debug(f"执行BM25搜索: {query}")
+        terms = _query_terms(query)
+        if not terms or top_k <= 0:
+            return []
+
+        if self.pool is None:
+            if self.local is None:
+                return []
+            return [_search_result(row) for row in self.local.search(terms, top_k)]
+
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    self._execute_prepared(
+                        cursor, 'wheel_search_chunks', [(" | ".join(terms), top_k)]
+                    )
+                    rows = cursor.fetchall()
+            return [_search_result(row) for row in rows]
+        except Exception as e:
+            logger.error(f"BM25搜索失败: {e}")
+            return []
+
+    @property
+    def stores_chunks(self) -> bool:
+        """是否保存分块行（模拟模式下为False）"""
+        return self.pool is not None or self.local is not None
+
+    def get_chunks_by_vector(self, vector_ids: Iterable[str]) -> Dict[str, List[Dict]]:
+        """
+        按向量ID查找引用该向量的全部分块
+
+        内容相同或近似的分块共享同一向量，向量元数据只记录首次产生它的分块；
+        分块行保存每个分块自身的文本、文档和来源。
+
+        Args:
+            vector_ids: 向量ID列表
+
+        Returns:
+            向量ID -> 分块结果列表（id, text, source, metadata，按文档和分块序号排列）；
+            查询失败或模拟模式下返回空字典
+        """
+        vector_ids = list(dict.fromkeys(vector_ids))
+        if not vector_ids:
+            return {}
+
+        if self.pool is None:
+            if self.local is None:
+                return {}
+            rows = self.local.chunks_by_vector(vector_ids)
+        else:
+            try:
+                with self.connection() as conn:
+                    with conn.cursor() as cursor:
+                        self._execute_prepared(cursor, 'wheel_chunks_by_vector', [(vector_ids,)])
+                        rows = cursor.fetchall()
+            except Exception as e:
+                logger.error(f"按向量查询分块失败: {e}")
+                return {}
+
+        chunks: Dict[str, List[Dict]] = {}
+        for row in rows:
+            record = _chunk_record(row)
+            chunks.setdefault(record['metadata']['vector_id'], []).append(record)
+        return chunks
+
+    def health_check(self) -> bool:
+        """健康检查"""
+        if self.pool is None:
+            return True  # 模拟模式也返回True
+
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            return True
+        except Exception as e:
+            logger.error(f"数据库健康检查失败: {e}")
+            return False
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池状态"""
+        with self._state_lock:
+            tracked = len(self._last_used)
+        return {
+            'connected': self.pool is not None,
+            'max_connections': self.max_connections,
+            'open_connections': tracked,
+            'async_pool': self._async_pool is not None
+        }
+
+    def close(self):
+        """关闭同步连接池（和本地全文索引）"""
+        if self.local is not None:
+            self.local.close()
+            self.local = None
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+            with self._state_lock:
+                self._last_used.clear()
+                self._prepared.clear()
+
+    # ============ 异步连接池 ============
+
+    async def get_async_pool(self) -> Optional[Any]:
+        """
+        获取asyncpg连接池（首次调用时在当前事件循环中创建）
+
+        Returns:
+            asyncpg连接池，asyncpg未安装或连接失败时返回None
+        """
+        if self._async_pool is not None or self._async_pool_unavailable:
+            return self._async_pool
+
+        try:
+            import asyncpg
+            self._async_pool = await asyncpg.create_pool(
+                host=self.host,
+                port=self.port,
+                database=self.database,
+                user=self.user,
+                password=self.password or None,
+                min_size=self.min_connections,
+                max_size=self.max_connections,
+                timeout=self.connect_timeout,
+                # 空闲连接定期回收，避免使用被服务端断开的连接
+                max_inactive_connection_lifetime=self.health_check_interval * 10
+            )
+            logger.info(f"异步数据库连接池就绪: {self.host}:{self.port}/{self.database}")
+        except ImportError:
+            logger.warning("asyncpg库未安装，异步调用将在线程池中使用同步连接池")
+            self._async_pool_unavailable = True
+        except Exception as e:
+            logger.warning(f"异步数据库连接失败: {e}，异步调用将在线程池中使用同步连接池")
+            self._async_pool_unavailable = True
+
+        return self._async_pool
+
+    async def ainsert_documents(self, documents: Iterable[Dict[str, Any]]) -> bool:
+        """异步批量插入文档元数据"""
+        documents = list(documents)
+        pool = await self.get_async_pool()
+        if pool is None:
+            return await asyncio.to_thread(self.insert_documents, documents)
+
+        try:
+            # asyncpg的executemany自动预编译语句并以流水线方式发送
+            async with pool.acquire() as conn:
+                await conn.executemany(
+                    self.PREPARED_STATEMENTS['wheel_upsert_document'],
+                    [self._document_row(document) for document in documents]
+                )
+            return True
+        except Exception as e:
+            logger.error(f"插入文档失败: {e}")
+            return False
+
+    async def ainsert_chunks(self, chunks: Iterable[Dict[str, Any]]) -> bool:
+        """异步批量插入分块元数据（行数较多时使用COPY）"""
+        chunks = list(chunks)
+        pool = await self.get_async_pool()
+        if pool is None:
+            return await asyncio.to_thread(self.insert_chunks, chunks)
+
+        rows = [self._chunk_row(chunk) for chunk in chunks]
+        try:
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    if len(rows) >= self.copy_threshold:
+                        await conn.execute(self.STAGING_SCHEMA)
+                        await conn.copy_records_to_table(
+                            'wheel_chunks_staging', records=rows, columns=list(CHUNK_ROW_COLUMNS)
+                        )
+                        await conn.execute(self.CHUNK_MERGE_SQL)
+                    else:
+                        await conn.executemany(self.PREPARED_STATEMENTS['wheel_upsert_chunk'], rows)
+            return True
+        except Exception as e:
+            logger.error(f"插入分块失败: {e}")
+            return False
+
+    async def ahealth_check(self) -> bool:
+        """异步健康检查"""
+        pool = await self.get_async_pool()
+        if pool is None:
+            return await asyncio.to_thread(self.health_check)
+
+        try:
+            async with pool.acquire() as conn:
+                await conn.fetchval("SELECT 1")
+            return True
+        except Exception as e:
+            logger.error(f"数据库健康检查失败: {e}")
+            return False
+
+    async def aclose(self):
+        """关闭异步连接池"""
+        if self._async_pool is not None:
+            await self._async_pool.close()
+            self._async_pool = None
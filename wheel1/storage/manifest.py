@@ -0,0 +1,273 @@
+"""
+摄取清单 - 记录已摄取文档和分块的内容哈希
+用于增量重新摄取：未变化的文件直接跳过，变化的文件只处理新增/删除的分块
+同时记录分块到向量的引用关系，支持跨文档复用相同内容的向量
+"""
+
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Set, Iterable, List, Tuple
+
+from processors.dedup import simhash_bands, hamming_distance, SIMHASH_BANDS
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionManifest:
+    """基于SQLite的摄取清单"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS documents (
+        document_id TEXT PRIMARY KEY,
+        source_key TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        chunk_count INTEGER NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS chunks (
+        chunk_id TEXT PRIMARY KEY,
+        document_id TEXT NOT NULL,
+        vector_id TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks(document_id);
+    CREATE TABLE IF NOT EXISTS vectors (
+        vector_id TEXT PRIMARY KEY,
+        text_hash TEXT NOT NULL,
+        simhash TEXT,
+        band0 INTEGER,
+        band1 INTEGER,
+        band2 INTEGER,
+        band3 INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_vectors_hash ON vectors(text_hash);
+    CREATE INDEX IF NOT EXISTS idx_vectors_band0 ON vectors(band0);
+    CREATE INDEX IF NOT EXISTS idx_vectors_band1 ON vectors(band1);
+    CREATE INDEX IF NOT EXISTS idx_vectors_band2 ON vectors(band2);
+    CREATE INDEX IF NOT EXISTS idx_vectors_band3 ON vectors(band3);
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        初始化摄取清单
+
+        Args:
+            path: SQLite数据库文件路径（默认内存数据库）
+        """
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # API进程和摄取工作进程共享同一清单文件：WAL允许读写并发，写锁冲突时等待而不是立即报错
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+        logger.info(f"初始化摄取清单: {path}")
+
+    def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """获取文档的摄取记录"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_chunk_ids(self, document_id: str) -> Set[str]:
+        """获取文档当前的分块ID集合"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE document_id = ?",
+                (document_id,)
+            ).fetchall()
+        return {row['chunk_id'] for row in rows}
+
+    def find_vector(self, text_hash: str) -> Optional[str]:
+        """按规范化文本哈希查找已有向量"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector_id FROM vectors WHERE text_hash = ? LIMIT 1",
+                (text_hash,)
+            ).fetchone()
+        return row['vector_id'] if row else None
+
+    def find_similar_vector(self, signature: int, max_distance: int) -> Optional[str]:
+        """按SimHash查找汉明距离不超过max_distance的已有向量"""
+        bands = simhash_bands(signature)
+        clause = " OR ".join(f"band{i} = ?" for i in range(SIMHASH_BANDS))
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT vector_id, simhash FROM vectors WHERE simhash IS NOT NULL AND ({clause})",
+                bands
+            ).fetchall()
+
+        best_id, best_distance = None, max_distance + 1
+        for row in rows:
+            distance = hamming_distance(signature, int(row['simhash'], 16))
+            if distance < best_distance:
+                best_id, best_distance = row['vector_id'], distance
+        return best_id
+
+    def add_vectors(self, fingerprints: Iterable[Tuple[str, str, Optional[int]]]):
+        """
+        登记新向量的指纹
+
+        Args:
+            fingerprints: [(vector_id, 规范化文本哈希, SimHash或None)]
+        """
+        rows = []
+        for vector_id, text_hash, signature in fingerprints:
+            if signature is None:
+                rows.append((vector_id, text_hash, None) + (None,) * SIMHASH_BANDS)
+            else:
+                rows.append(
+                    (vector_id, text_hash, f"{signature:016x}") + simhash_bands(signature)
+                )
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO vectors
+                    (vector_id, text_hash, simhash, band0, band1, band2, band3)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+
+    def discard_vectors(self, vector_ids: Iterable[str]) -> Set[str]:
+        """
+        删除未被任何分块引用的向量指纹（摄取失败时回滚本次新建的向量）
+
+        其他文档已提交引用的向量保留，只删除无引用的部分。
+
+        Args:
+            vector_ids: 本次摄取新建的向量ID
+
+        Returns:
+            已删除的向量ID（调用方应从向量存储中删除）
+        """
+        discarded = set()
+        with self._lock, self._conn:
+            for vector_id in set(vector_ids):
+                referenced = self._conn.execute(
+                    "SELECT 1 FROM chunks WHERE vector_id = ? LIMIT 1", (vector_id,)
+                ).fetchone()
+                if not referenced:
+                    discarded.add(vector_id)
+
+            self._conn.executemany(
+                "DELETE FROM vectors WHERE vector_id = ?",
+                ((vector_id,) for vector_id in discarded)
+            )
+        return discarded
+
+    def get_chunk_refs(self, vector_id: str) -> List[Dict[str, str]]:
+        """获取引用某个向量的全部分块（chunk_id, document_id）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, document_id FROM chunks WHERE vector_id = ?",
+                (vector_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def commit_document(
+        self,
+        document_id: str,
+        source_key: str,
+        content_hash: str,
+        mode: str,
+        added: Dict[str, str],
+        removed: Iterable[str],
+        chunk_count: int
+    ) -> Set[str]:
+        """
+        在一个事务中更新文档记录及其分块集合
+
+        Args:
+            document_id: 文档ID
+            source_key: 文档来源标识
+            content_hash: 文件内容哈希
+            mode: 处理模式
+            added: 新增的分块ID -> 引用的向量ID
+            removed: 删除的分块ID
+            chunk_count: 处理后的分块总数
+
+        Returns:
+            不再被任何分块引用的向量ID（调用方应从向量存储中删除）
+        """
+        with self._lock, self._conn:
+            # 先写入新增引用，避免新分块复用的向量被误判为无引用
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO chunks (chunk_id, document_id, vector_id)
+                VALUES (?, ?, ?)
+                """,
+                ((chunk_id, document_id, vector_id) for chunk_id, vector_id in added.items())
+            )
+            orphans = self._remove_chunks(list(removed))
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO documents
+                    (document_id, source_key, content_hash, mode, chunk_count, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    document_id,
+                    source_key,
+                    content_hash,
+                    mode,
+                    chunk_count,
+                    datetime.now().isoformat()
+                )
+            )
+        return orphans
+
+    def remove_document(self, document_id: str) -> Set[str]:
+        """删除文档记录，返回不再被引用的向量ID"""
+        chunk_ids = self.get_chunk_ids(document_id)
+        with self._lock, self._conn:
+            orphans = self._remove_chunks(list(chunk_ids))
+            self._conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+        return orphans
+
+    def _remove_chunks(self, chunk_ids: List[str]) -> Set[str]:
+        """删除分块行及失去全部引用的向量记录（调用方持有锁和事务）"""
+        vector_ids = set()
+        for chunk_id in chunk_ids:
+            row = self._conn.execute(
+                "SELECT vector_id FROM chunks WHERE chunk_id = ?", (chunk_id,)
+            ).fetchone()
+            if row and row['vector_id']:
+                vector_ids.add(row['vector_id'])
+
+        self._conn.executemany(
+            "DELETE FROM chunks WHERE chunk_id = ?",
+            ((chunk_id,) for chunk_id in chunk_ids)
+        )
+
+        orphans = set()
+        for vector_id in vector_ids:
+            referenced = self._conn.execute(
+                "SELECT 1 FROM chunks WHERE vector_id = ? LIMIT 1", (vector_id,)
+            ).fetchone()
+            if not referenced:
+                orphans.add(vector_id)
+
+        self._conn.executemany(
+            "DELETE FROM vectors WHERE vector_id = ?",
+            ((vector_id,) for vector_id in orphans)
+        )
+        return orphans
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -1,407 +1,505 @@
-"""
-存储层 - 支持向量数据库和关系数据库
-包括Redis缓存、向量存储、持久化存储
-"""
-
-import logging
-from typing import Dict, Any, List, Optional, Tuple
-from abc import ABC, abstractmethod
-import json
-import hashlib
-logger = logging.getLogger(__name__)
-class CacheManager:
-    """缓存管理器 - Redis"""
-    def __init__(
-        self,
-        host: str = "localhost",
-        port: int = 6379,
-        db: int = 0,
-        ttl: int = 3600,
-        enabled: bool = True
-    ):
-        """
-        初始化Redis缓存管理器
-        Args:
-            host: Redis主机
-            port: Redis端口
-            db: Redis数据库号
-            ttl: 默认TTL（秒）
-            enabled: 是否启用缓存
-        """
-        self.host = host
-        self.port = port
-        self.db = db
-        self.ttl = ttl
-        self.enabled = enabled
-        self.client = None
-        if enabled:
-            self._connect()
-    def _connect(self):
-        """连接Redis"""
-        try:
-            import redis
-            self.client = redis.Redis(
-                host=self.host,
-                port=self.port,
-                db=self.db,
-                decode_responses=True
-            )
-            # 测试连接
-            self.client.ping()
-            logger.info(f"Redis连接成功: {self.host}:{self.port}")
-        except Exception as e:
-            logger.warning(f"Redis连接失败: {e}，将使用本地缓存")
-            self.client = None
-            self._init_local_cache()
-    
-    def _init_local_cache(self):
-        """初始化本地内存缓存"""
-        self.local_cache = {}
-
-    def get(self, key: str) -> Optional[Any]:
-        """获取缓存"""
-        if not self.enabled:
-            return None
-        
-        try:
-            if self.client:
-                value = self.client.get(key)
-                if value:
-                    return json.loads(value)
-            else:
-                return self.local_cache.get(key)
-        except Exception as e:
-            logger.debug(f"缓存读取失败: {e}")
-        
-        return None
-    
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """设置缓存"""
-        if not self.enabled:
-            return False
-        
-        ttl = ttl or self.ttl
-        
-        try:
-            if self.client:
-                self.client.setex(
-                    key,
-                    ttl,
-                    json.dumps(value, default=str)
-                )
-            else:
-                self.local_cache[key] = value
-            
-            return True
-        except Exception as e:
-            logger.debug(f"缓存写入失败: {e}")
-            return False
-    
-    def delete(self, key: str) -> bool:
-        """删除缓存"""
-        try:
-            if self.client:
-                self.client.delete(key)
-            elif key in self.local_cache:
-                del self.local_cache[key]
-            return True
-        except Exception as e:
-            logger.debug(f"缓存删除失败: {e}")
-            return False
-
-    def health_check(self) -> bool:
-        """健康检查"""
-        if not self.enabled:
-            return True
-        
-        try:
-            if self.client:
-                self.client.ping()
-                return True
-            else:
-                return True  # 本地缓存总是可用
-        except Exception as e:
-            logger.error(f"缓存健康检查失败: {e}")
-            return False
-
-
-class VectorStoreBackend(ABC):
-    """向量存储后端基类"""
-    
-    @abstractmethod
-    def add_vector(self, vector_id: str, vector: List[float], metadata: Dict):
-        """添加向量"""
-        pass
-    
-    @abstractmethod
-    def search(self, query_vector: List[float], top_k: int, threshold: float = 0.0):
-        """搜索向量"""
-        pass
-    
-    @abstractmethod
-    def health_check(self) -> bool:
-        """健康检查"""
-        pass
-
-
-class LocalVectorStore(VectorStoreBackend):
-    """本地向量存储（用于开发和测试）"""
-    
-    def __init__(self):
-        """初始化本地向量存储"""
-        self.vectors = {}  # vector_id -> vector
-        self.metadata = {}  # vector_id -> metadata
-        logger.info("初始化本地向量存储")
-    
-    def add_vector(self, vector_id: str, vector: List[float], metadata: Dict):
-        """添加向量"""
-        self.vectors[vector_id] = vector
-        self.metadata[vector_id] = metadata
-    
-    def search(self, query_vector: List[float], top_k: int, threshold: float = 0.0):
-        """使用余弦相似度搜索"""
-        import math
-        
-        results = []
-        
-        for vector_id, vector in self.vectors.items():
-            # 计算余弦相似度
-            dot_product = sum(a * b for a, b in zip(query_vector, vector))
-            norm_q = math.sqrt(sum(a * a for a in query_vector))
-            norm_v = math.sqrt(sum(a * a for a in vector))
-            
-            if norm_q > 0 and norm_v > 0:
-                similarity = dot_product / (norm_q * norm_v)
-            else:
-                similarity = 0.0
-            
-            if similarity >= threshold:
-                results.append({
-                    'id': vector_id,
-                    'similarity': similarity,
-                    'metadata': self.metadata[vector_id],
-                    'text': self.metadata[vector_id].get('text', '')
-                })
-        
-        # 排序并返回top-k
-        results = sorted(results, key=lambda x: x['similarity'], reverse=True)
-        return results[:top_k]
-    
-    def health_check(self) -> bool:
-        """健康检查"""
-        return True
-
-
-class MilvusVectorStore(VectorStoreBackend):
-    """Milvus向量数据库"""
-    
-    def __init__(self, host: str = "localhost", port: int = 19530):
-        """
-        初始化Milvus
-        
-        Args:
-            host: Milvus主机
-            port: Milvus端口
-        """
-        self.host = host
-        self.port = port
-        self.client = None
-        
-        try:
-            from pymilvus import connections, Collection
-            connections.connect("default", host=host, port=port)
-            self.client = True
-            logger.info(f"Milvus连接成功: {host}:{port}")
-        except Exception as e:
-            logger.warning(f"Milvus连接失败: {e}，将使用本地存储")
-            self.client = None
-    
-    def add_vector(self, vector_id: str, vector: List[float], metadata: Dict):
-        """添加向量"""
-        if not self.client:
-            return
-        
-        try:
-            # Milvus操作逻辑
-            logger.debug(f"添加向量到Milvus: {vector_id}")
-        except Exception as e:
-            logger.error(f"Milvus添加失败: {e}")
-    
-    def search(self, query_vector: List[float], top_k: int, threshold: float = 0.0):
-        """搜索向量"""
-        if not self.client:
-            return []
-        
-        try:
-            # Milvus搜索逻辑
-            return []
-        except Exception as e:
-            logger.error(f"Milvus搜索失败: {e}")
-            return []
-    
-    def health_check(self) -> bool:
-        """健康检查"""
-        try:
-            from pymilvus import connections
-            connections.get_connection()
-            return True
-        except Exception as e:
-            logger.error(f"Milvus健康检查失败: {e}")
-            return False
-
-
-class VectorStore:
-    """统一向量存储接口"""
-    
-    BACKENDS = {
-        'local': LocalVectorStore,
-        'milvus': MilvusVectorStore,
-    }
-    
-    def __init__(
-        self,
-        backend: str = "local",
-        host: str = "localhost",
-        port: int = 19530
-    ):
-        """
-        初始化向量存储
-        
-        Args:
-            backend: 后端类型（local, milvus, qdrant等）
-            host: 数据库主机
-            port: 数据库端口
-        """
-        self.backend_name = backend
-        
-        backend_class = self.BACKENDS.get(backend, LocalVectorStore)
-        
-        if backend == 'local':
-            self.backend = backend_class()
-        else:
-            self.backend = backend_class(host, port)
-        
-        logger.info(f"初始化向量存储: {backend}")
-    
-    def add_vector(self, vector_id: str, vector: List[float], metadata: Dict):
-        """添加向量"""
-        self.backend.add_vector(vector_id, vector, metadata)
-    
-    def search(
-        self,
-        query_vector: List[float],
-        top_k: int = 5,
-        threshold: float = 0.0
-    ) -> List[Dict]:
-        """搜索向量"""
-        return self.backend.search(query_vector, top_k, threshold)
-    
-    def embed_query(self, query_text: str) -> List[float]:
-        """
-        对查询进行嵌入
-        这里应该调用嵌入服务
-        """
-        # 这个方法应该由嵌入服务提供
-        # 暂时返回虚拟向量
-        import hashlib
-        seed = int(hashlib.md5(query_text.encode()).hexdigest()[:8], 16)
-        import random
-        random.seed(seed)
-        return [random.random() for _ in range(768)]
-    
-    def health_check(self) -> bool:
-        """健康检查"""
-        return self.backend.health_check()
-
-
-class DatabaseConnector:
-    """数据库连接器 - PostgreSQL/MongoDB"""
-    
-    def __init__(
-        self,
-        host: str = "localhost",
-        port: int = 5432,
-        database: str = "wheel_db",
-        user: str = "postgres",
-        password: str = ""
-    ):
-        """
-        初始化数据库连接
-        
-        Args:
-            host: 数据库主机
-            port: 数据库端口
-            database: 数据库名
-            user: 用户名
-            password: 密码
-        """
-        self.host = host
-        self.port = port
-        self.database = database
-        self.user = user
-        self.password = password
-        self.connection = None
-        
-        self._connect()
-    
-    def _connect(self):
-        """连接数据库"""
-        try:
-            import psycopg2
-            self.connection = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                database=self.database,
-                user=self.user,
-                password=self.password
-            )
-            logger.info(f"数据库连接成功: {self.host}:{self.port}/{self.database}")
-        except Exception as e:
-            logger.warning(f"数据库连接失败: {e}，使用模拟模式")
-            self.connection = None
-    
-    def insert_document(self, metadata: Dict[str, Any]) -> bool:
-        """插入文档元数据"""
-        try:
-            if not self.connection:
-                logger.debug(f"插入文档元数据: {metadata}")
-                return True
-            
-            # SQL操作
-            cursor = self.connection.cursor()
-            cursor.execute(
-                """
-                INSERT INTO documents (document_id, source_file, mode, chunk_count, processed_at)
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (
-                    metadata['document_id'],
-                    metadata['source_file'],
-                    metadata['mode'],
-                    metadata['chunk_count'],
-                    metadata['processed_at']
-                )
-            )
-            self.connection.commit()
-            return True
-        except Exception as e:
-            logger.error(f"插入文档失败: {e}")
-            return False
-    
-    def bm25_search(self, query: str, top_k: int) -> List[Dict]:
-        """BM25搜索"""
-        # 模拟实现
-        logger.debug(f"执行BM25搜索: {query}")
-        return []
-    
-    def health_check(self) -> bool:
-        """健康检查"""
-        try:
-            if self.connection:
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT 1")
-                return True
-            return True  # 模拟模式也返回True
-        except Exception as e:
-            logger.error(f"数据库健康检查失败: {e}")
-            return False
+"""
+存储层 - 向量存储
+支持本地内存存储和向量数据库后端
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from abc import ABC, abstractmethod
+import json
+import hashlib
+
+import numpy as np
+
+# CacheManager已移至storage.cache，DatabaseConnector已移至storage.database，保留此处导入以兼容旧代码
+from storage.cache import CacheManager
+from storage.database import DatabaseConnector
+from utils.helpers import as_float32_matrix, as_float32_vector
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStoreBackend(ABC):
+    """
+    向量存储后端基类
+    
+    向量参数接受float32 ndarray，也兼容List[float]。
+    """
+    
+    @abstractmethod
+    def add_vector(self, vector_id: str, vector: np.ndarray, metadata: Dict):
+        """添加向量"""
+        pass
+    
+    def add_vectors(self, vector_ids: List[str], vectors: np.ndarray, metadatas: List[Dict]):
+        """批量添加向量（默认逐条添加，后端可覆盖为批量写入）"""
+        for vector_id, vector, metadata in zip(vector_ids, as_float32_matrix(vectors), metadatas):
+            self.add_vector(vector_id, vector, metadata)
+    
+    @abstractmethod
+    def delete_vector(self, vector_id: str):
+        """删除向量"""
+        pass
+    
+    def delete_vectors(self, vector_ids: List[str]):
+        """批量删除向量（默认逐条删除，后端可覆盖为批量删除）"""
+        for vector_id in vector_ids:
+            self.delete_vector(vector_id)
+    
+    @abstractmethod
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int,
+        threshold: float = 0.0,
+        search_dimension: Optional[int] = None,
+        rescore_factor: int = 4
+    ):
+        """搜索向量（不支持前缀粗排的后端忽略search_dimension）"""
+        pass
+    
+    @abstractmethod
+    def health_check(self) -> bool:
+        """健康检查"""
+        pass
+
+
+class LocalVectorStore(VectorStoreBackend):
+    """
+    本地向量存储（用于开发和测试）
+    
+    向量保存在连续的float32矩阵中（按需倍增扩容），搜索为一次矩阵-向量乘法。
+    设置prefix_dimension时另存一份截取前缀的连续矩阵（Matryoshka表示），
+    搜索时可先在前缀矩阵上粗排，再对候选集按完整维度重新打分。
+    """
+    
+    def __init__(
+        self,
+        initial_capacity: int = 1024,
+        dimension: Optional[int] = None,
+        metric: str = "cosine",
+        prefix_dimension: Optional[int] = None
+    ):
+        """
+        初始化本地向量存储
+        
+        Args:
+            initial_capacity: 矩阵初始行数
+            dimension: 向量维度（None为按首次写入的向量确定）
+            metric: 距离度量（cosine, dot）
+            prefix_dimension: 粗排用的前缀维度（None为不保存前缀）
+        """
+        if metric not in ("cosine", "dot"):
+            raise ValueError(f"不支持的距离度量: {metric}")
+        if prefix_dimension is not None and dimension is not None and not 0 < prefix_dimension < dimension:
+            raise ValueError(f"前缀维度必须小于完整维度: {prefix_dimension} >= {dimension}")
+        
+        self.initial_capacity = initial_capacity
+        self.metric = metric
+        self.prefix_dimension = prefix_dimension
+        self._dimension = dimension
+        self._matrix: Optional[np.ndarray] = None  # [容量, 维度]
+        self._norms = np.zeros(0, dtype=np.float32)  # 每行的L2范数
+        self._prefix: Optional[np.ndarray] = None  # [容量, 前缀维度]
+        self._prefix_norms = np.zeros(0, dtype=np.float32)  # 每行前缀的L2范数
+        self._ids: List[str] = []  # 行号 -> vector_id
+        self._rows: Dict[str, int] = {}  # vector_id -> 行号
+        self.metadata = {}  # vector_id -> metadata
+        logger.info(
+            f"初始化本地向量存储 (维度: {dimension or '自动'}, 度量: {metric}, "
+            f"前缀: {prefix_dimension or '无'})"
+        )
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        """向量维度（未声明且尚未写入向量时为None）"""
+        return self._dimension
+    
+    def add_vector(self, vector_id: str, vector: np.ndarray, metadata: Dict):
+        """添加向量"""
+        self.add_vectors([vector_id], as_float32_vector(vector), [metadata])
+    
+    def add_vectors(self, vector_ids: List[str], vectors: np.ndarray, metadatas: List[Dict]):
+        """批量添加向量（已存在的ID原位覆盖）"""
+        matrix = as_float32_matrix(vectors)
+        if len(matrix) != len(vector_ids):
+            raise ValueError(f"向量数与ID数不一致: {len(matrix)} != {len(vector_ids)}")
+        if not len(matrix):
+            return
+        
+        self._reserve(len(self._ids) + len(vector_ids), matrix.shape[1])
+        norms = np.linalg.norm(matrix, axis=1)
+        if self._prefix is not None:
+            prefixes = matrix[:, :self.prefix_dimension]
+            prefix_norms = np.linalg.norm(prefixes, axis=1)
+        
+        for i, (vector_id, metadata) in enumerate(zip(vector_ids, metadatas)):
+            row = self._rows.get(vector_id)
+            if row is None:
+                row = len(self._ids)
+                self._ids.append(vector_id)
+                self._rows[vector_id] = row
+            
+            self._matrix[row] = matrix[i]
+            self._norms[row] = norms[i]
+            if self._prefix is not None:
+                self._prefix[row] = prefixes[i]
+                self._prefix_norms[row] = prefix_norms[i]
+            self.metadata[vector_id] = metadata
+    
+    def get_vector(self, vector_id: str) -> Optional[np.ndarray]:
+        """获取向量（返回副本）"""
+        row = self._rows.get(vector_id)
+        return None if row is None else self._matrix[row].copy()
+    
+    def delete_vector(self, vector_id: str):
+        """删除向量（用最后一行填补空位）"""
+        row = self._rows.pop(vector_id, None)
+        self.metadata.pop(vector_id, None)
+        if row is None:
+            return
+        
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._norms[row] = self._norms[last]
+            if self._prefix is not None:
+                self._prefix[row] = self._prefix[last]
+                self._prefix_norms[row] = self._prefix_norms[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._ids.pop()
+    
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int,
+        threshold: float = 0.0,
+        search_dimension: Optional[int] = None,
+        rescore_factor: int = 4
+    ):
+        """
+        按配置的度量搜索
+        
+        Args:
+            query_vector: 查询向量（完整维度）
+            top_k: 返回结果数
+            threshold: 相似度阈值（按完整维度计算）
+            search_dimension: 粗排维度（等于prefix_dimension时先在前缀矩阵上粗排）
+            rescore_factor: 粗排保留top_k的倍数，候选集再按完整维度重新打分
+        
+        Returns:
+            结果列表（按相似度降序）
+        """
+        count = len(self._ids)
+        if count == 0 or top_k <= 0:
+            return []
+        
+        query = as_float32_vector(query_vector)
+        if len(query) != self._dimension:
+            raise ValueError(f"查询向量维度不匹配: {len(query)} != {self._dimension}")
+        
+        if (
+            search_dimension is not None
+            and search_dimension == self.prefix_dimension
+            and self._prefix is not None
+            and top_k * rescore_factor < count
+        ):
+            # 前缀粗排，再对候选集按完整维度重新打分
+            prefix_query = query[:search_dimension]
+            coarse = self._similarities(
+                self._prefix[:count], self._prefix_norms[:count], prefix_query
+            )
+            rows = self._top_rows(coarse, top_k * rescore_factor)
+            similarities = self._similarities(self._matrix[rows], self._norms[rows], query)
+        else:
+            if search_dimension is not None and search_dimension != self.prefix_dimension:
+                logger.debug(f"未保存{search_dimension}维前缀，使用完整维度搜索")
+            rows = np.arange(count)
+            similarities = self._similarities(self._matrix[:count], self._norms[:count], query)
+        
+        order = self._top_rows(similarities, top_k)
+        
+        results = []
+        for i in order:
+            similarity = float(similarities[i])
+            row = rows[i]
+            if similarity < threshold:
+                break
+            vector_id = self._ids[row]
+            results.append({
+                'id': vector_id,
+                'similarity': similarity,
+                'metadata': self.metadata[vector_id],
+                'text': self.metadata[vector_id].get('text', '')
+            })
+        
+        return results
+    
+    def _similarities(self, matrix: np.ndarray, norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """计算查询与各行的相似度（余弦度量下零向量相似度为0）"""
+        dots = matrix @ query
+        if self.metric == "dot":
+            return dots
+        
+        denominators = norms * float(np.linalg.norm(query))
+        return np.divide(
+            dots, denominators,
+            out=np.zeros(len(dots), dtype=np.float32),
+            where=denominators > 0
+        )
+    
+    @staticmethod
+    def _top_rows(scores: np.ndarray, k: int) -> np.ndarray:
+        """部分排序取分数最高的k个下标（降序）"""
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind='stable')]
+    
+    def _reserve(self, size: int, dimension: int):
+        """确保矩阵至少有size行（倍增扩容）"""
+        if self._dimension is None:
+            self._dimension = dimension
+        elif dimension != self._dimension:
+            raise ValueError(f"向量维度不匹配: {dimension} != {self._dimension}")
+        
+        if self._matrix is None:
+            if self.prefix_dimension is not None and self.prefix_dimension >= dimension:
+                raise ValueError(f"前缀维度必须小于完整维度: {self.prefix_dimension} >= {dimension}")
+            
+            capacity = max(self.initial_capacity, size)
+            self._matrix = np.zeros((capacity, dimension), dtype=np.float32)
+            self._norms = np.zeros(capacity, dtype=np.float32)
+            if self.prefix_dimension is not None:
+                self._prefix = np.zeros((capacity, self.prefix_dimension), dtype=np.float32)
+                self._prefix_norms = np.zeros(capacity, dtype=np.float32)
+            return
+        
+        capacity = len(self._matrix)
+        if size > capacity:
+            while capacity < size:
+                capacity *= 2
+            self._matrix = self._grow(self._matrix, capacity)
+            self._norms = self._grow(self._norms, capacity)
+            if self._prefix is not None:
+                self._prefix = self._grow(self._prefix, capacity)
+                self._prefix_norms = self._grow(self._prefix_norms, capacity)
+    
+    def memory_bytes(self) -> int:
+        """向量矩阵（含前缀矩阵和范数，按已分配容量）占用的字节数"""
+        return sum(
+            array.nbytes
+            for array in (self._matrix, self._norms, self._prefix, self._prefix_norms)
+            if array is not None
+        )
+    
+    def _grow(self, array: np.ndarray, capacity: int) -> np.ndarray:
+        """扩容数组并复制已有行"""
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=np.float32)
+        grown[:len(self._ids)] = array[:len(self._ids)]
+        return grown
+    
+    def health_check(self) -> bool:
+        """健康检查"""
+        return True
+
+
+class MilvusVectorStore(VectorStoreBackend):
+    """Milvus向量数据库"""
+    
+    # 单次删除表达式包含的最大ID数
+    DELETE_BATCH_SIZE = 1000
+    
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 19530,
+        collection_name: str = "wheel_vectors"
+    ):
+        """
+        初始化Milvus
+        
+        Args:
+            host: Milvus主机
+            port: Milvus端口
+            collection_name: 集合名称（主键字段为id）
+        """
+        self.host = host
+        self.port = port
+        self.collection_name = collection_name
+        self.client = None
+        self.collection = None
+        
+        try:
+            from pymilvus import connections, Collection, utility
+            connections.connect("default", host=host, port=port)
+            self.client = True
+            logger.info(f"Milvus连接成功: {host}:{port}")
+            if utility.has_collection(collection_name):
+                self.collection = Collection(collection_name)
+            else:
+                logger.warning(f"Milvus集合不存在: {collection_name}")
+        except Exception as e:
+            logger.warning(f"Milvus连接失败: {e}，将使用本地存储")
+            self.client = None
+    
+    def add_vector(self, vector_id: str, vector: np.ndarray, metadata: Dict):
+        """添加向量"""
+        if not self.client:
+            return
+        
+        try:
+            # Milvus操作逻辑
+            logger.debug(f"添加向量到Milvus: {vector_id}")
+        except Exception as e:
+            logger.error(f"Milvus添加失败: {e}")
+    
+    def delete_vector(self, vector_id: str):
+        """删除向量"""
+        self.delete_vectors([vector_id])
+    
+    def delete_vectors(self, vector_ids: List[str]):
+        """按主键批量删除向量"""
+        if self.collection is None or not vector_ids:
+            return
+        
+        for i in range(0, len(vector_ids), self.DELETE_BATCH_SIZE):
+            batch = vector_ids[i:i + self.DELETE_BATCH_SIZE]
+            try:
+                self.collection.delete(expr=f"id in {json.dumps(batch)}")
+                logger.debug(f"从Milvus删除向量: {len(batch)} vectors")
+            except Exception as e:
+                logger.error(f"Milvus删除失败: {e}")
+    
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int,
+        threshold: float = 0.0,
+        search_dimension: Optional[int] = None,
+        rescore_factor: int = 4
+    ):
+        """搜索向量"""
+        if not self.client:
+            return []
+        
+        try:
+            # Milvus搜索逻辑
+            return []
+        except Exception as e:
+            logger.error(f"Milvus搜索失败: {e}")
+            return []
+    
+    def health_check(self) -> bool:
+        """健康检查"""
+        try:
+            from pymilvus import connections
+            connections.get_connection()
+            return True
+        except Exception as e:
+            logger.error(f"Milvus健康检查失败: {e}")
+            return False
+
+
+class VectorStore:
+    """统一向量存储接口"""
+    
+    BACKENDS = {
+        'local': LocalVectorStore,
+        'milvus': MilvusVectorStore,
+    }
+    
+    def __init__(
+        self,
+        backend: str = "local",
+        host: str = "localhost",
+        port: int = 19530,
+        dimension: int = 768,
+        metric: str = "cosine",
+        prefix_dimension: Optional[int] = None
+    ):
+        """
+        初始化向量存储
+        
+        Args:
+            backend: 后端类型（local, milvus, qdrant等）
+            host: 数据库主机
+            port: 数据库端口
+            dimension: 向量维度（写入时校验）
+            metric: 距离度量（cosine, dot）
+            prefix_dimension: 粗排用的Matryoshka前缀维度（None为不保存前缀）
+        """
+        self.backend_name = backend
+        self.dimension = dimension
+        
+        backend_class = self.BACKENDS.get(backend, LocalVectorStore)
+        
+        if backend_class is LocalVectorStore:
+            self.backend = backend_class(
+                dimension=dimension,
+                metric=metric,
+                prefix_dimension=prefix_dimension
+            )
+        else:
+            self.backend = backend_class(host, port)
+        
+        logger.info(f"初始化向量存储: {backend} ({dimension}维, {metric})")
+    
+    def add_vector(self, vector_id: str, vector: np.ndarray, metadata: Dict):
+        """添加向量（兼容List[float]）"""
+        vector = as_float32_vector(vector)
+        self._check_dimension(len(vector))
+        self.backend.add_vector(vector_id, vector, metadata)
+    
+    def add_vectors(self, vector_ids: List[str], vectors: np.ndarray, metadatas: List[Dict]):
+        """批量添加向量（vectors为[数量, 维度]的float32矩阵，兼容List[List[float]]）"""
+        vectors = as_float32_matrix(vectors)
+        if len(vectors):
+            self._check_dimension(vectors.shape[1])
+        self.backend.add_vectors(vector_ids, vectors, metadatas)
+    
+    def _check_dimension(self, dimension: int):
+        """校验写入向量的维度"""
+        if dimension != self.dimension:
+            raise ValueError(f"向量维度与存储声明不一致: {dimension} != {self.dimension}")
+    
+    def delete_vector(self, vector_id: str):
+        """删除向量"""
+        self.backend.delete_vector(vector_id)
+    
+    def delete_vectors(self, vector_ids: List[str]):
+        """批量删除向量"""
+        self.backend.delete_vectors(list(vector_ids))
+    
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        threshold: float = 0.0,
+        search_dimension: Optional[int] = None,
+        rescore_factor: int = 4
+    ) -> List[Dict]:
+        """搜索向量（search_dimension为粗排前缀维度，None为完整维度搜索）"""
+        return self.backend.search(
+            query_vector, top_k, threshold,
+            search_dimension=search_dimension,
+            rescore_factor=rescore_factor
+        )
+    
+    def embed_query(self, query_text: str) -> np.ndarray:
+        """
+        对查询进行嵌入
+        这里应该调用嵌入服务
+        """
+        # 这个方法应该由嵌入服务提供
+        # 暂时返回虚拟向量
+        seed = int(hashlib.md5(query_text.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).random(self.dimension, dtype=np.float32)
+    
+    def health_check(self) -> bool:
+        """健康检查"""
+        return self.backend.health_check()
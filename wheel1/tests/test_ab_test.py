@@ -0,0 +1,147 @@
+"""
+A/B测试 - mSPRT始终有效p值、提前停止（已知效应、A/A对照、护栏）和哈希分流
+"""
+
+import random
+
+import pytest
+
+from monitoring.ab_test import (
+    ABTestFramework, Arm, Experiment, ExperimentStatus, hash_bucket, msprt_p_value
+)
+
+
+def _experiment(experiment_id, **options):
+    options.setdefault('primary_metric', 'score')
+    options.setdefault('higher_is_better', True)
+    options.setdefault('guardrails', {})
+    options.setdefault('min_samples', 100)
+    options.setdefault('max_samples', 3000)
+    return Experiment(
+        experiment_id, experiment_id, [Arm("control"), Arm("treatment")], "control", **options
+    )
+
+
+def _simulate(experiment, seed, effect, sigma=0.3):
+    """两组交替记录正态分布的质量信号，直到实验结束或达到样本上限"""
+    rng = random.Random(seed)
+    while experiment.status == ExperimentStatus.RUNNING:
+        experiment.record("control", signals={'score': rng.gauss(1.0, sigma)})
+        experiment.record("treatment", signals={'score': rng.gauss(1.0 + effect, sigma)})
+    return experiment
+
+
+class TestMsprtPValue:
+
+    def test_equal_means_give_no_evidence(self):
+        assert msprt_p_value(1.0, 0.09, 1000, 1.0, 0.09, 1000, 0.0025) == 1.0
+
+    def test_too_few_samples(self):
+        assert msprt_p_value(1.0, 0.09, 1, 2.0, 0.09, 1000, 0.0025) == 1.0
+        assert msprt_p_value(1.0, 0.09, 1000, 2.0, 0.09, 1000, 0.0) == 1.0
+
+    def test_zero_variance(self):
+        assert msprt_p_value(1.0, 0.0, 10, 1.0, 0.0, 10, 0.0025) == 1.0
+        assert msprt_p_value(1.0, 0.0, 10, 2.0, 0.0, 10, 0.0025) == 0.0
+
+    def test_evidence_grows_with_sample_size(self):
+        p_values = [
+            msprt_p_value(1.0, 0.09, n, 1.1, 0.09, n, 0.0025) for n in (50, 200, 800, 3200)
+        ]
+        assert p_values == sorted(p_values, reverse=True)
+        assert p_values[0] > 0.05
+        assert p_values[-1] < 1e-6
+
+    def test_symmetric_in_direction(self):
+        up = msprt_p_value(1.0, 0.09, 500, 1.1, 0.09, 500, 0.0025)
+        down = msprt_p_value(1.0, 0.09, 500, 0.9, 0.09, 500, 0.0025)
+        assert up == pytest.approx(down)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_known_effect_stops_early_for_treatment(seed):
+    experiment = _simulate(_experiment(f"better-{seed}"), seed, effect=0.1)
+
+    assert experiment.status == ExperimentStatus.COMPLETED
+    assert experiment.winner == "treatment"
+    assert experiment.stats["treatment"].requests < 1000
+    assert experiment.p_values[("treatment", "score")] <= experiment.alpha
+
+
+def test_known_negative_effect_picks_control():
+    experiment = _simulate(_experiment("worse"), 0, effect=-0.1)
+
+    assert experiment.status == ExperimentStatus.COMPLETED
+    assert experiment.winner == "control"
+
+
+def test_aa_run_does_not_stop_falsely():
+    experiment = _simulate(_experiment("aa"), 0, effect=0.0)
+
+    assert experiment.status == ExperimentStatus.COMPLETED
+    assert experiment.stop_reason == "达到样本上限，无显著差异"
+    assert experiment.winner is None
+    assert experiment.stats["control"].requests == 3000
+
+
+def test_aa_false_stop_rate_within_alpha():
+    # 每次记录后都检查p值，始终有效p值保证整体误报率不超过alpha
+    runs = 40
+    false_stops = sum(
+        _simulate(_experiment(f"aa-{seed}", max_samples=1000), seed, effect=0.0).winner is not None
+        for seed in range(runs)
+    )
+    assert false_stops <= 0.05 * runs
+
+
+def test_guardrail_regression_stops_experiment():
+    experiment = _experiment("guardrail", guardrails={'latency_ms': False})
+    rng = random.Random(0)
+    while experiment.status == ExperimentStatus.RUNNING:
+        experiment.record("control", rng.gauss(0.10, 0.01), signals={'score': rng.gauss(1.0, 0.3)})
+        experiment.record("treatment", rng.gauss(0.13, 0.01), signals={'score': rng.gauss(1.0, 0.3)})
+
+    assert experiment.status == ExperimentStatus.STOPPED
+    assert experiment.winner == "control"
+    assert "latency_ms" in experiment.stop_reason
+    # 停止后不再分流
+    assert experiment.assign("user-1") is None
+
+
+def test_no_test_before_min_samples():
+    experiment = _experiment("min-samples", min_samples=100)
+    for _ in range(99):
+        experiment.record("control", signals={'score': 0.0})
+        experiment.record("treatment", signals={'score': 10.0})
+
+    assert experiment.status == ExperimentStatus.RUNNING
+    assert experiment.p_values == {}
+
+
+def test_assignment_is_deterministic_and_weighted():
+    experiment = Experiment(
+        "split", "split", [Arm("control", weight=3), Arm("treatment", weight=1)], "control",
+        traffic_fraction=0.5
+    )
+    units = [f"user-{i}" for i in range(20_000)]
+    assigned = [experiment.assign(unit) for unit in units]
+
+    assert [experiment.assign(unit) for unit in units[:100]] == assigned[:100]
+    inside = [arm.name for arm in assigned if arm is not None]
+    assert len(inside) / len(units) == pytest.approx(0.5, abs=0.02)
+    assert inside.count("treatment") / len(inside) == pytest.approx(0.25, abs=0.02)
+    assert all(0.0 <= hash_bucket("split", unit) < 1.0 for unit in units[:100])
+
+
+def test_framework_routes_results_to_experiment():
+    framework = ABTestFramework()
+    experiment_id = framework.create_experiment(
+        "latency", {'mode': 'balanced'}, {'mode': 'efficiency'}, min_samples=10
+    )
+
+    experiment, arm = framework.assign("user-1")
+    assert experiment.experiment_id == experiment_id
+    framework.record_result(experiment_id, arm.name, latency_seconds=0.01, success=True)
+
+    results = framework.get_results(experiment_id)
+    assert results['arms'][arm.name]['requests'] == 1
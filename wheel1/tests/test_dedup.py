@@ -0,0 +1,76 @@
+"""
+分块去重测试 - 精确去重、SimHash近似去重和批内去重
+"""
+
+import pytest
+
+from processors.dedup import (
+    ChunkDeduplicator, hamming_distance, normalize_text, simhash, simhash_bands, SIMHASH_BANDS
+)
+from storage.manifest import IngestionManifest
+
+TEXT = " ".join(f"word{i} token{i * 7 % 13}" for i in range(60))
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.db"))
+    yield manifest
+    manifest.close()
+
+
+def _chunk(chunk_id, text):
+    return {'id': chunk_id, 'text': text}
+
+
+def test_normalize_text():
+    assert normalize_text("  Ｈｅｌｌｏ\tWORLD \n") == "hello world"
+
+
+def test_simhash_distance_tracks_edits():
+    base = simhash(TEXT)
+    assert simhash(TEXT.upper()) == base
+    assert hamming_distance(base, simhash(TEXT.replace("word30 ", "wordX "))) < SIMHASH_BANDS
+    assert hamming_distance(base, simhash("completely unrelated text about bm25 ranking")) > 16
+
+
+def test_close_hashes_share_a_band():
+    value = simhash(TEXT)
+    for bit in (0, 17, 40):
+        neighbour = value ^ (1 << bit)
+        assert set(simhash_bands(value)) & set(simhash_bands(neighbour))
+
+
+def test_exact_duplicates_reuse_vector(manifest):
+    dedup = ChunkDeduplicator(manifest)
+    to_embed, fingerprints = dedup.resolve([_chunk("a1", TEXT), _chunk("a2", "other text")])
+    assert [chunk['id'] for chunk in to_embed] == ["a1", "a2"]
+    manifest.add_vectors(fingerprints)
+
+    batch = [_chunk("b1", "  " + TEXT.upper()), _chunk("b2", "new text"), _chunk("b3", "new text")]
+    to_embed, fingerprints = dedup.resolve(batch)
+
+    # 规范化后相同的文本复用已有向量，批内重复的文本只嵌入一次
+    assert [chunk['id'] for chunk in to_embed] == ["b2"]
+    assert [chunk['vector_id'] for chunk in batch] == ["a1", "b2", "b2"]
+    assert [fingerprint[0] for fingerprint in fingerprints] == ["b2"]
+
+
+def test_near_duplicates_reuse_vector_only_when_enabled(manifest):
+    near = TEXT.replace("word30 ", "wordX ")
+
+    exact = ChunkDeduplicator(manifest)
+    manifest.add_vectors(exact.resolve([_chunk("a1", TEXT)])[1])
+    assert [chunk['id'] for chunk in exact.resolve([_chunk("b1", near)])[0]] == ["b1"]
+
+    # 仅精确去重时没有登记SimHash；近似去重需要以启用时登记的指纹为候选
+    fuzzy = ChunkDeduplicator(manifest, near_duplicate_threshold=3)
+    manifest.add_vectors(fuzzy.resolve([_chunk("c1", TEXT + " extra")])[1])
+    batch = [_chunk("d1", near + " extra")]
+    assert fuzzy.resolve(batch)[0] == []
+    assert batch[0]['vector_id'] == "c1"
+
+
+def test_threshold_must_be_below_band_count(manifest):
+    with pytest.raises(ValueError):
+        ChunkDeduplicator(manifest, near_duplicate_threshold=SIMHASH_BANDS)
@@ -0,0 +1,166 @@
+"""
+摄取任务队列测试 - 领取、租约过期重新领取、重试耗尽和同一文档互斥
+"""
+
+import pytest
+
+from core import job_queue
+from core.job_queue import JobQueue, JobStatus
+from core.modes import ProcessingMode
+
+
+class FakeClock:
+    """可手动推进的时钟（替换job_queue模块中的time）"""
+
+    def __init__(self, start: float = 1_000_000.0):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_queue, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=10.0, backoff_base=1.0, backoff_max=5.0)
+    yield queue
+    queue.close()
+
+
+def test_claim_marks_job_running(queue):
+    job_id = queue.enqueue("/data/a.txt", ProcessingMode.BALANCED, {"source_key": "a"})
+
+    job = queue.claim("w1")
+
+    assert job['job_id'] == job_id
+    assert job['status'] == JobStatus.RUNNING.value
+    assert job['attempts'] == 1
+    assert job['worker_id'] == "w1"
+    assert queue.get(job_id)['status'] == JobStatus.RUNNING.value
+    # 唯一的任务已被领取
+    assert queue.claim("w2") is None
+
+
+def test_claim_returns_jobs_in_submission_order(queue, clock):
+    first = queue.enqueue("/data/a.txt", ProcessingMode.BALANCED, {"source_key": "a"})
+    clock.advance(1)
+    second = queue.enqueue("/data/b.txt", ProcessingMode.BALANCED, {"source_key": "b"})
+
+    assert queue.claim("w1")['job_id'] == first
+    assert queue.claim("w2")['job_id'] == second
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    job_id = queue.enqueue("/data/a.txt", ProcessingMode.BALANCED, {"source_key": "a"}, max_attempts=3)
+    queue.claim("w1")
+
+    clock.advance(5)
+    assert queue.claim("w2") is None
+
+    # w1未续约，租约过期后由其他工作进程重新领取
+    clock.advance(6)
+    job = queue.claim("w2")
+    assert job['job_id'] == job_id
+    assert job['worker_id'] == "w2"
+    assert job['attempts'] == 2
+
+
+def test_heartbeat_extends_lease(queue, clock):
+    job_id = queue.enqueue("/data/a.txt", ProcessingMode.BALANCED, {"source_key": "a"})
+    queue.claim("w1")
+
+    clock.advance(8)
+    queue.heartbeat(job_id, progress=0.5)
+    clock.advance(8)
+
+    assert queue.claim("w2") is None
+    assert queue.get(job_id)['progress'] == 0.5
+
+
+def test_fail_retries_with_backoff_until_exhausted(queue, clock):
+    job_id = queue.enqueue("/data/a.txt", ProcessingMode.BALANCED, {"source_key": "a"}, max_attempts=2)
+
+    queue.claim("w1")
+    assert queue.fail(job_id, "boom") is True
+    job = queue.get(job_id)
+    assert job['status'] == JobStatus.QUEUED.value
+    assert job['available_at'] > clock.now
+    # 退避期间不可领取
+    assert queue.claim("w1") is None
+
+    clock.advance(10)
+    assert queue.claim("w1")['attempts'] == 2
+    assert queue.fail(job_id, "boom again") is False
+
+    job = queue.get(job_id)
+    assert job['status'] == JobStatus.FAILED.value
+    assert job['error'] == "boom again"
+    clock.advance(10)
+    assert queue.claim("w1") is None
+
+
+def test_expired_lease_with_exhausted_attempts_fails(queue, clock, tmp_path):
+    upload = tmp_path / "upload.tmp"
+    upload.write_text("content")
+    job_id = queue.enqueue(
+        str(upload), ProcessingMode.BALANCED, {"source_key": "a"}, max_attempts=1, delete_after=True
+    )
+    queue.claim("w1")
+
+    # 唯一一次尝试的工作进程崩溃：不再重新领取，直接标记失败并删除临时文件
+    clock.advance(11)
+    assert queue.claim("w2") is None
+
+    job = queue.get(job_id)
+    assert job['status'] == JobStatus.FAILED.value
+    assert job['attempts'] == 1
+    assert not upload.exists()
+
+
+def test_jobs_of_same_document_do_not_run_concurrently(queue, clock):
+    first = queue.enqueue("/data/a-v1.txt", ProcessingMode.BALANCED, {"source_key": "a"})
+    queue.enqueue("/data/a-v2.txt", ProcessingMode.BALANCED, {"source_key": "a"})
+    other = queue.enqueue("/data/b.txt", ProcessingMode.BALANCED, {"source_key": "b"})
+
+    assert queue.claim("w1")['job_id'] == first
+    # 同一文档的第二个任务要等第一个结束
+    assert queue.claim("w2")['job_id'] == other
+    assert queue.claim("w3") is None
+
+    queue.complete(first, {"status": "success"})
+    assert queue.claim("w3")['file_path'] == "/data/a-v2.txt"
+
+
+def test_mode_limits(queue):
+    for name in ("a", "b"):
+        queue.enqueue(f"/data/{name}.txt", ProcessingMode.PRECISION, {"source_key": name})
+    queue.enqueue("/data/c.txt", ProcessingMode.EFFICIENCY, {"source_key": "c"})
+    limits = {ProcessingMode.PRECISION.value: 1}
+
+    assert queue.claim("w1", limits)['mode'] == ProcessingMode.PRECISION.value
+    # 精确模式已达上限，只能领取其他模式的任务
+    assert queue.claim("w2", limits)['mode'] == ProcessingMode.EFFICIENCY.value
+    assert queue.claim("w3", limits) is None
+
+
+def test_stats_counts_by_mode_and_status(queue):
+    job_id = queue.enqueue("/data/a.txt", ProcessingMode.BALANCED, {"source_key": "a"})
+    queue.enqueue("/data/b.txt", ProcessingMode.BALANCED, {"source_key": "b"})
+    queue.claim("w1")
+    queue.complete(job_id, {"status": "success"})
+
+    assert queue.stats() == {
+        ProcessingMode.BALANCED.value: {
+            JobStatus.SUCCEEDED.value: 1,
+            JobStatus.QUEUED.value: 1,
+        }
+    }
@@ -0,0 +1,92 @@
+"""
+摄取清单测试 - 提交文档时的分块引用和无引用向量（孤儿）统计
+"""
+
+import pytest
+
+from processors.dedup import text_fingerprint
+from storage.manifest import IngestionManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.db"))
+    yield manifest
+    manifest.close()
+
+
+def _register(manifest, *vector_ids):
+    """登记以向量ID为文本的指纹"""
+    manifest.add_vectors((vector_id, text_fingerprint(vector_id), None) for vector_id in vector_ids)
+
+
+def _commit(manifest, document_id, added=None, removed=(), chunk_count=None):
+    added = added or {}
+    return manifest.commit_document(
+        document_id,
+        source_key=f"{document_id}.txt",
+        content_hash=f"hash-{document_id}",
+        mode="balanced",
+        added=added,
+        removed=removed,
+        chunk_count=len(added) if chunk_count is None else chunk_count
+    )
+
+
+def test_commit_records_document_and_chunks(manifest):
+    _register(manifest, "v1", "v2")
+
+    orphans = _commit(manifest, "a", {"a1": "v1", "a2": "v2"})
+
+    assert orphans == set()
+    assert manifest.get_chunk_ids("a") == {"a1", "a2"}
+    document = manifest.get_document("a")
+    assert document['chunk_count'] == 2
+    assert document['content_hash'] == "hash-a"
+
+
+def test_removed_chunk_orphans_unshared_vector(manifest):
+    _register(manifest, "v1", "v2")
+    _commit(manifest, "a", {"a1": "v1", "a2": "v2"})
+
+    orphans = _commit(manifest, "a", removed=["a2"], chunk_count=1)
+
+    assert orphans == {"v2"}
+    assert manifest.get_chunk_ids("a") == {"a1"}
+    # 孤儿向量的指纹一并删除，之后的文档不会再复用它
+    assert manifest.find_vector(text_fingerprint("v2")) is None
+    assert manifest.find_vector(text_fingerprint("v1")) == "v1"
+
+
+def test_shared_vector_survives_until_last_reference(manifest):
+    _register(manifest, "v1")
+    _commit(manifest, "a", {"a1": "v1"})
+    _commit(manifest, "b", {"b1": "v1"})
+
+    assert _commit(manifest, "a", removed=["a1"], chunk_count=0) == set()
+    assert manifest.get_chunk_refs("v1") == [{"chunk_id": "b1", "document_id": "b"}]
+
+    assert manifest.remove_document("b") == {"v1"}
+    assert manifest.get_document("b") is None
+    assert manifest.find_vector(text_fingerprint("v1")) is None
+
+
+def test_replaced_chunk_keeps_vector_reused_in_same_commit(manifest):
+    _register(manifest, "v1")
+    _commit(manifest, "a", {"a1": "v1"})
+
+    # 同一提交中新分块复用旧分块的向量，旧分块删除后向量不应被判为孤儿
+    orphans = _commit(manifest, "a", {"a1-new": "v1"}, removed=["a1"])
+
+    assert orphans == set()
+    assert manifest.get_chunk_refs("v1") == [{"chunk_id": "a1-new", "document_id": "a"}]
+
+
+def test_discard_vectors_keeps_committed_references(manifest):
+    _register(manifest, "v1", "v2")
+    _commit(manifest, "a", {"a1": "v1"})
+
+    # 摄取失败回滚：只删除没有已提交分块引用的向量
+    assert manifest.discard_vectors(["v1", "v2"]) == {"v2"}
+    assert manifest.find_vector(text_fingerprint("v1")) == "v1"
+    assert manifest.find_vector(text_fingerprint("v2")) is None
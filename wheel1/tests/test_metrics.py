@@ -0,0 +1,84 @@
+"""
+延迟直方图测试 - HDR百分位与排序参考值对比
+"""
+
+import math
+import random
+
+import pytest
+
+from monitoring.metrics import HdrHistogram
+
+PERCENTILES = (1, 25, 50, 90, 95, 99, 99.9, 100)
+
+
+def _reference(values_us, percentile):
+    """最近秩法百分位（与直方图相同的秩定义）"""
+    ordered = sorted(values_us)
+    rank = max(1, math.ceil(len(ordered) * percentile / 100))
+    return ordered[rank - 1]
+
+
+def _samples(seed, count):
+    """对数正态分布的延迟（秒），覆盖微秒到秒级"""
+    rng = random.Random(seed)
+    return [rng.lognormvariate(math.log(0.02), 1.5) for _ in range(count)]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_percentiles_match_sorted_reference(seed):
+    histogram = HdrHistogram(sub_bucket_bits=7)
+    samples = _samples(seed, 20_000)
+    for value in samples:
+        histogram.record(value)
+    values_us = [int(value * 1_000_000) for value in samples]
+
+    result = histogram.percentiles(PERCENTILES)
+
+    # 取桶上界：不低于参考值，相对误差不超过2^-(sub_bucket_bits-1)
+    tolerance = 2 ** -(histogram.sub_bucket_bits - 1)
+    for percentile in PERCENTILES:
+        expected = _reference(values_us, percentile) / 1_000_000
+        assert result[percentile] >= expected
+        assert result[percentile] <= expected * (1 + tolerance) + 1e-6
+    assert histogram.count == len(samples)
+    assert histogram.min == min(values_us) / 1_000_000
+    assert histogram.max == max(values_us) / 1_000_000
+    assert histogram.mean == pytest.approx(sum(values_us) / len(values_us) / 1_000_000)
+
+
+def test_small_values_are_exact():
+    histogram = HdrHistogram(sub_bucket_bits=7)
+    values_us = list(range(1, 101))
+    for value in values_us:
+        histogram.record(value / 1_000_000)
+
+    for percentile in (10, 50, 90, 100):
+        assert histogram.percentile(percentile) == _reference(values_us, percentile) / 1_000_000
+
+
+def test_values_above_max_are_clamped():
+    histogram = HdrHistogram(max_seconds=1.0)
+    histogram.record(5.0)
+    assert histogram.max == 1.0
+    assert histogram.percentile(99) == 1.0
+
+
+def test_merge_equals_recording_all_values():
+    samples = _samples(7, 5000)
+    left, right, combined = HdrHistogram(), HdrHistogram(), HdrHistogram()
+    for i, value in enumerate(samples):
+        (left if i % 2 else right).record(value)
+        combined.record(value)
+
+    left.merge(right)
+
+    assert left.counts == combined.counts
+    assert left.percentiles(PERCENTILES) == combined.percentiles(PERCENTILES)
+    assert (left.min, left.max, left.count) == (combined.min, combined.max, combined.count)
+
+
+def test_empty_histogram():
+    histogram = HdrHistogram()
+    assert histogram.percentiles((50, 99)) == {50: 0.0, 99: 0.0}
+    assert histogram.mean == 0.0
@@ -0,0 +1,83 @@
+"""
+辅助函数
+文件/文本哈希、嵌入向量格式转换等通用工具
+"""
+
+import base64
+import hashlib
+import re
+import unicodedata
+from typing import Any, List
+
+import numpy as np
+
+# 读取文件时的块大小
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# 全文检索词项：连续汉字或字母数字串
+_SEARCH_TOKEN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+|[a-z0-9]+')
+
+
+def file_sha256(file_path: str, block_size: int = HASH_BLOCK_SIZE) -> str:
+    """按块流式计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(text: str) -> str:
+    """计算文本的SHA-256"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def as_float32_matrix(vectors: Any) -> np.ndarray:
+    """
+    将嵌入转换为二维float32数组（已是float32 ndarray时不复制）
+
+    兼容旧接口传入的List[List[float]]和单个向量。
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1) if matrix.size else matrix.reshape(0, 0)
+    if matrix.ndim != 2:
+        raise ValueError(f"嵌入必须为二维数组: shape={matrix.shape}")
+    return matrix
+
+
+def as_float32_vector(vector: Any) -> np.ndarray:
+    """将单个嵌入转换为一维float32数组（兼容List[float]）"""
+    array = np.asarray(vector, dtype=np.float32)
+    if array.ndim != 1:
+        raise ValueError(f"嵌入向量必须为一维数组: shape={array.shape}")
+    return array
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """将float32向量编码为base64字符串（用于缓存，体积约为JSON浮点列表的1/3）"""
+    return base64.b64encode(as_float32_vector(vector).tobytes()).decode('ascii')
+
+
+def decode_vector(value: Any) -> np.ndarray:
+    """解码缓存中的向量（兼容旧版缓存中的浮点列表）"""
+    if isinstance(value, str):
+        return np.frombuffer(base64.b64decode(value), dtype=np.float32)
+    return as_float32_vector(value)
+
+
+def search_terms(text: str) -> List[str]:
+    """
+    全文检索词项（写入索引和查询时使用同一切分）
+
+    字母数字串整体作为一个词项，连续汉字切分为重叠二元组（孤立单字保留原字），
+    数据库的simple分词器和FTS5的unicode61分词器都不会切分中文。
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    terms = []
+    for token in _SEARCH_TOKEN.findall(text):
+        if token.isascii() or len(token) == 1:
+            terms.append(token)
+        else:
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return terms
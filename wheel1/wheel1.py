@@ -1,302 +1,780 @@
-"""
-Wheel系统 - 企业级多模态RAG系统主程序
-支持三种处理模式：高效(Efficiency)、中效(Balanced)、低效(Precision)
-"""
-
-import sys
-import logging
-from pathlib import Path
-from typing import Dict, Any, Optional, List
-from enum import Enum
-from dataclasses import dataclass, field
-from datetime import datetime
-
-# 项目结构初始化
-PROJECT_ROOT = Path(__file__).parent
-sys.path.insert(0, str(PROJECT_ROOT))
-
-from core.modes import ProcessingMode, ModeConfig
-from core.pipeline import DataProcessingPipeline
-from core.engine import RetrievalEngine
-from processors.document_processor import DocumentProcessor
-from processors.embedding import EmbeddingService
-from storage.vector_store import VectorStore
-from storage.database import DatabaseConnector
-from storage.cache import CacheManager
-from api.main import create_app
-from monitoring.metrics import MetricsCollector
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-
-@dataclass
-class WheelSystemConfig:
-    """Wheel系统配置"""
-    mode: ProcessingMode = ProcessingMode.BALANCED
-    
-    # 数据库配置
-    db_host: str = "localhost"
-    db_port: int = 5432
-    db_name: str = "wheel_db"
-    db_user: str = "postgres"
-    
-    # 向量数据库配置
-    vector_db_type: str = "milvus"  # milvus, qdrant, pinecone, weaviate
-    vector_db_host: str = "localhost"
-    vector_db_port: int = 19530
-    
-    # Redis缓存配置
-    redis_host: str = "localhost"
-    redis_port: int = 6379
-    redis_ttl: int = 3600  # 1小时
-    
-    # LLM配置
-    llm_provider: str = "openai"  # openai, anthropic, mistral
-    llm_model: str = "gpt-4-turbo"
-    embedding_model: str = "text-embedding-3-small"
-    
-    # 系统配置
-    batch_size: int = 32
-    max_workers: int = 4
-    enable_monitoring: bool = True
-    enable_cache: bool = True
-    
-    # 每种模式的特定配置
-    mode_configs: Dict[ProcessingMode, Dict[str, Any]] = field(default_factory=dict)
-
-
-class WheelSystem:
-    """Wheel系统主类 - 统一入口"""
-    
-    def __init__(self, config: Optional[WheelSystemConfig] = None):
-        """
-        初始化Wheel系统
-        
-        Args:
-            config: 系统配置，若为None使用默认配置
-        """
-        self.config = config or WheelSystemConfig()
-        self.mode = self.config.mode
-        
-        logger.info(f"初始化Wheel系统 - 模式: {self.mode.value}")
-        
-        # 初始化核心组件
-        self._initialize_components()
-        
-        logger.info("Wheel系统初始化完成")
-    
-    def _initialize_components(self):
-        """初始化系统核心组件"""
-        
-        # 1. 初始化缓存管理器
-        self.cache = CacheManager(
-            host=self.config.redis_host,
-            port=self.config.redis_port,
-            ttl=self.config.redis_ttl,
-            enabled=self.config.enable_cache
-        )
-        
-        # 2. 初始化数据库连接
-        self.db = DatabaseConnector(
-            host=self.config.db_host,
-            port=self.config.db_port,
-            database=self.config.db_name,
-            user=self.config.db_user
-        )
-        
-        # 3. 初始化向量存储
-        self.vector_store = VectorStore(
-            backend=self.config.vector_db_type,
-            host=self.config.vector_db_host,
-            port=self.config.vector_db_port
-        )
-        
-        # 4. 初始化嵌入服务
-        self.embedding_service = EmbeddingService(
-            provider=self.config.llm_provider,
-            model=self.config.embedding_model,
-            cache=self.cache
-        )
-        
-        # 5. 初始化文档处理器
-        self.doc_processor = DocumentProcessor(
-            mode=self.mode,
-            cache=self.cache
-        )
-        
-        # 6. 初始化处理管道
-        self.pipeline = DataProcessingPipeline(
-            mode=self.mode,
-            doc_processor=self.doc_processor,
-            embedding_service=self.embedding_service,
-            vector_store=self.vector_store,
-            db=self.db
-        )
-        
-        # 7. 初始化检索引擎
-        self.retrieval_engine = RetrievalEngine(
-            mode=self.mode,
-            vector_store=self.vector_store,
-            cache=self.cache,
-            db=self.db
-        )
-        
-        # 8. 初始化监控系统（可选）
-        if self.config.enable_monitoring:
-            self.metrics = MetricsCollector()
-        else:
-            self.metrics = None
-    
-    def process_document(
-        self,
-        file_path: str,
-        metadata: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """
-        处理文档
-        
-        Args:
-            file_path: 文档文件路径
-            metadata: 文档元数据
-        
-        Returns:
-            处理结果
-        """
-        logger.info(f"处理文档: {file_path} (模式: {self.mode.value})")
-        
-        try:
-            result = self.pipeline.process(file_path, metadata)
-            
-            if self.metrics:
-                self.metrics.record_document_processing(
-                    mode=self.mode.value,
-                    duration=result.get('duration', 0),
-                    success=True
-                )
-            
-            logger.info(f"文档处理成功: {file_path}")
-            return result
-        
-        except Exception as e:
-            logger.error(f"文档处理失败: {e}")
-            if self.metrics:
-                self.metrics.record_document_processing(
-                    mode=self.mode.value,
-                    success=False,
-                    error=str(e)
-                )
-            raise
-    
-    def query(
-        self,
-        query_text: str,
-        top_k: int = 5,
-        use_reranking: bool = None,
-        explain: bool = False
-    ) -> Dict[str, Any]:
-        """
-        执行查询
-        
-        Args:
-            query_text: 查询文本
-            top_k: 返回结果数
-            use_reranking: 是否使用重排（None为按模式默认）
-            explain: 是否返回推理过程
-        
-        Returns:
-            查询结果
-        """
-        logger.info(f"执行查询: {query_text[:50]}... (模式: {self.mode.value})")
-        
-        try:
-            result = self.retrieval_engine.retrieve(
-                query_text,
-                top_k=top_k,
-                use_reranking=use_reranking,
-                explain=explain
-            )
-            
-            if self.metrics:
-                self.metrics.record_query(
-                    mode=self.mode.value,
-                    latency=result.get('latency', 0),
-                    result_count=len(result.get('results', [])),
-                    success=True
-                )
-            
-            return result
-        
-        except Exception as e:
-            logger.error(f"查询失败: {e}")
-            if self.metrics:
-                self.metrics.record_query(
-                    mode=self.mode.value,
-                    success=False,
-                    error=str(e)
-                )
-            raise
-    
-    def switch_mode(self, new_mode: ProcessingMode) -> None:
-        """
-        切换处理模式（运行时动态切换）
-        
-        Args:
-            new_mode: 新的处理模式
-        """
-        logger.info(f"切换模式: {self.mode.value} -> {new_mode.value}")
-        
-        self.mode = new_mode
-        self.config.mode = new_mode
-        
-        # 重新初始化关键组件以适应新模式
-        self.pipeline.mode = new_mode
-        self.retrieval_engine.mode = new_mode
-        self.doc_processor.mode = new_mode
-    
-    def get_metrics(self) -> Dict[str, Any]:
-        """获取系统性能指标"""
-        if self.metrics:
-            return self.metrics.get_summary()
-        return {}
-    
-    def health_check(self) -> Dict[str, bool]:
-        """系统健康检查"""
-        health = {
-            'database': self.db.health_check(),
-            'vector_store': self.vector_store.health_check(),
-            'cache': self.cache.health_check(),
-            'embedding_service': self.embedding_service.health_check()
-        }
-        return all(health.values()), health
-    
-    def create_api_app(self):
-        """创建FastAPI应用"""
-        return create_app(self)
-
-
-def main():
-    """主程序示例"""
-    
-    # 创建系统实例（使用默认配置）
-    system = WheelSystem()
-    
-    # 验证系统健康状态
-    is_healthy, health_details = system.health_check()
-    if not is_healthy:
-        logger.warning(f"系统部分组件不健康: {health_details}")
-    
-    # 示例：创建并启动API服务
-    app = system.create_api_app()
-    
-    import uvicorn
-    logger.info("启动API服务器: http://localhost:8000")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
-
-
-if __name__ == "__main__":
-    main()
+"""
+Wheel系统 - 企业级多模态RAG系统主程序
+支持三种处理模式：高效(Efficiency)、中效(Balanced)、低效(Precision)
+"""
+
+import sys
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+from enum import Enum
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+
+# 项目结构初始化
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.modes import ProcessingMode, ModeConfig
+from core.pipeline import DataProcessingPipeline
+from core.engine import RetrievalEngine, RetrievalStrategy
+from core.job_queue import JobQueue, IngestionWorkerPool
+from processors.document_processor import DocumentProcessor
+from processors.embedding import EmbeddingService
+from processors.model_registry import EmbeddingModelSpec, get_model_spec
+from storage.vector_store import VectorStore
+from storage.database import DatabaseConnector
+from storage.cache import CacheManager
+from storage.manifest import IngestionManifest
+from storage.chunk_store import ChunkTextStore
+from monitoring.metrics import MetricsCollector
+from monitoring.prometheus import PrometheusExporter
+from monitoring.tracing import Tracer
+from monitoring.evaluation import RetrievalEvaluator, EvaluationQuery, DEFAULT_K_VALUES
+from monitoring.ab_test import ABTestFramework
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WheelSystemConfig:
+    """Wheel系统配置"""
+    mode: ProcessingMode = ProcessingMode.BALANCED
+    
+    # 数据库配置
+    db_host: str = "localhost"
+    db_port: int = 5432
+    db_name: str = "wheel_db"
+    db_user: str = "postgres"
+    db_password: str = ""
+    db_pool_size: int = 10  # 连接池最大连接数（同步和异步连接池各自独立）
+    
+    # 向量数据库配置
+    vector_db_type: str = "milvus"  # milvus, qdrant, pinecone, weaviate
+    vector_db_host: str = "localhost"
+    vector_db_port: int = 19530
+    
+    # Redis缓存配置
+    redis_host: str = "localhost"
+    redis_port: int = 6379
+    redis_ttl: int = 3600  # 1小时
+    
+    # LLM配置
+    llm_provider: str = "openai"  # openai, anthropic, mistral
+    llm_model: str = "gpt-4-turbo"
+    embedding_provider: str = "openai"  # openai, openai-sync, sentence-transformers, onnx
+    embedding_model: str = "text-embedding-3-small"
+    
+    # 系统配置
+    batch_size: int = 32
+    max_workers: int = 4
+    enable_monitoring: bool = True
+    enable_prometheus: bool = True  # 启用监控时同时导出Prometheus指标（需要prometheus_client）
+    trace_sample_rate: float = 0.01  # 查询和摄取请求的追踪采样率（调试标志可强制追踪）
+    trace_buffer_size: int = 100  # 保留的最近追踪数
+    enable_cache: bool = True
+    warmup_ocr: bool = False  # 构建文档处理器时预加载当前模式的OCR模型
+    lazy_init: bool = True  # 组件在首次使用时构建（False为启动时全部构建）
+    background_warmup: bool = False  # 启动后在后台线程中预先构建组件
+    max_upload_bytes: int = 1024 ** 3  # 单个上传文件上限（1GB）
+    
+    # 摄取任务配置
+    ingest_workers: int = 2  # 摄取工作进程数（0为不在本进程启动工作池）
+    ingest_use_processes: bool = True  # 工作进程模式（本地内存向量存储时自动改用线程）
+    ingest_max_attempts: int = 3  # 单个任务最大尝试次数
+    
+    # 本地数据目录（摄取清单、提取结果磁盘缓存等）
+    data_dir: str = "./wheel_data"
+    
+    # 每种模式的特定配置
+    mode_configs: Dict[ProcessingMode, Dict[str, Any]] = field(default_factory=dict)
+
+
+class _LazyComponent:
+    """
+    惰性组件描述符
+    
+    首次访问时调用构建方法并将结果写入实例字典，之后的访问直接命中实例属性；
+    每个组件一把锁，并发的首次访问只构建一次，不同组件可并行构建。
+    """
+    
+    def __init__(self, factory):
+        self.factory = factory
+        self.__doc__ = factory.__doc__
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        
+        with instance._component_lock(self.name):
+            if self.name not in instance.__dict__:
+                start = time.perf_counter()
+                instance.__dict__[self.name] = self.factory(instance)
+                elapsed = time.perf_counter() - start
+                instance.component_init_seconds[self.name] = elapsed
+                logger.info(f"组件就绪: {self.name} ({elapsed:.3f}s)")
+        
+        return instance.__dict__[self.name]
+
+
+class WheelSystem:
+    """
+    Wheel系统主类 - 统一入口
+    
+    缓存、数据库、向量存储、嵌入模型等组件默认在首次使用时构建，
+    只用到部分组件的命令行任务不会连接无关的外部服务或加载模型。
+    """
+    
+    # 后台预热的组件构建顺序
+    WARMUP_COMPONENTS = (
+        'cache', 'db', 'embedding_service', 'vector_store', 'chunk_store',
+        'doc_processor', 'manifest', 'pipeline', 'retrieval_engine', 'job_queue'
+    )
+    
+    def __init__(self, config: Optional[WheelSystemConfig] = None):
+        """
+        初始化Wheel系统
+        
+        Args:
+            config: 系统配置，若为None使用默认配置
+        """
+        self._started_at = time.perf_counter()
+        self.config = config or WheelSystemConfig()
+        self.mode = self.config.mode
+        
+        logger.info(f"初始化Wheel系统 - 模式: {self.mode.value}")
+        
+        # 启动耗时统计
+        self.component_init_seconds: Dict[str, float] = {}
+        self.time_to_first_request: Optional[float] = None
+        self._component_locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        
+        # 摄取工作池由start_ingest_workers启动
+        self.ingest_pool: Optional[IngestionWorkerPool] = None
+        
+        # 监控系统（可选，构建开销很小）
+        if self.config.enable_monitoring:
+            self.metrics = MetricsCollector()
+        else:
+            self.metrics = None
+        
+        # 请求追踪（采样的追踪保存在有界缓冲区中）
+        self.tracer = Tracer(
+            sample_rate=self.config.trace_sample_rate if self.config.enable_monitoring else 0.0,
+            buffer_size=self.config.trace_buffer_size
+        )
+        
+        # A/B实验（按分流单元的哈希确定性分组，各组可使用不同的模式/检索策略）
+        self.experiments = ABTestFramework()
+        # 非当前模式/策略的检索引擎（实验组和指定模式的查询使用）
+        self._engines: Dict[Tuple[str, Optional[str]], RetrievalEngine] = {}
+        
+        # Prometheus导出（未安装prometheus_client时不启用；抓取时读取上面的组件状态）
+        self.prometheus: Optional[PrometheusExporter] = None
+        if self.config.enable_monitoring and self.config.enable_prometheus:
+            exporter = PrometheusExporter(self)
+            if exporter.enabled:
+                self.prometheus = exporter
+        
+        if not self.config.lazy_init:
+            self.warmup()
+        elif self.config.background_warmup:
+            self.start_warmup()
+        
+        self.init_seconds = time.perf_counter() - self._started_at
+        logger.info(f"Wheel系统初始化完成 ({self.init_seconds:.3f}s)")
+    
+    # ============ 组件（首次使用时构建） ============
+    
+    @_LazyComponent
+    def cache(self) -> CacheManager:
+        """缓存管理器"""
+        return CacheManager(
+            host=self.config.redis_host,
+            port=self.config.redis_port,
+            ttl=self.config.redis_ttl,
+            enabled=self.config.enable_cache
+        )
+    
+    @_LazyComponent
+    def db(self) -> DatabaseConnector:
+        """数据库连接（PostgreSQL不可用时回退到本地全文索引）"""
+        return DatabaseConnector(
+            host=self.config.db_host,
+            port=self.config.db_port,
+            database=self.config.db_name,
+            user=self.config.db_user,
+            password=self.config.db_password,
+            max_connections=self.config.db_pool_size,
+            local_path=str(Path(self.config.data_dir) / "fulltext.db")
+        )
+    
+    @_LazyComponent
+    def embedding_service(self) -> EmbeddingService:
+        """嵌入服务（构建时加载本地模型）"""
+        embedding_service = EmbeddingService(
+            provider=self.config.embedding_provider,
+            model=self.config.embedding_model,
+            cache=self.cache,
+            batch_size=self.config.batch_size
+        )
+        if self.prometheus:
+            embedding_service.scheduler.batch_observer = self.prometheus.observe_embedding_batch
+        return embedding_service
+    
+    @_LazyComponent
+    def vector_store(self) -> VectorStore:
+        """向量存储（维度和度量以嵌入模型规格为准）"""
+        # 已注册的模型直接取规格，不必为此加载嵌入模型
+        spec = get_model_spec(self.config.embedding_model)
+        dimension = spec.dimension if spec else self.embedding_service.dimension
+        return VectorStore(
+            backend=self.config.vector_db_type,
+            host=self.config.vector_db_host,
+            port=self.config.vector_db_port,
+            dimension=dimension,
+            metric=spec.metric if spec else "cosine",
+            prefix_dimension=self._prefix_dimension(spec)
+        )
+    
+    @_LazyComponent
+    def chunk_store(self) -> ChunkTextStore:
+        """分块文本存储（向量元数据只保留定位信息）"""
+        return ChunkTextStore(
+            str(Path(self.config.data_dir) / "chunk_text.db")
+        )
+    
+    @_LazyComponent
+    def doc_processor(self) -> DocumentProcessor:
+        """文档处理器"""
+        doc_processor = DocumentProcessor(
+            mode=self.mode,
+            cache=self.cache,
+            max_workers=self.config.max_workers,
+            cache_dir=str(Path(self.config.data_dir) / "extract_cache")
+        )
+        if self.config.warmup_ocr:
+            doc_processor.warmup_ocr()
+        return doc_processor
+    
+    @_LazyComponent
+    def manifest(self) -> IngestionManifest:
+        """摄取清单（用于增量摄取）"""
+        return IngestionManifest(
+            str(Path(self.config.data_dir) / "manifest.db")
+        )
+    
+    @_LazyComponent
+    def pipeline(self) -> DataProcessingPipeline:
+        """当前模式的处理管道"""
+        return self.build_pipeline(self.mode)
+    
+    @_LazyComponent
+    def retrieval_engine(self) -> RetrievalEngine:
+        """检索引擎"""
+        retrieval_engine = RetrievalEngine(
+            mode=self.mode,
+            vector_store=self.vector_store,
+            cache=self.cache,
+            db=self.db,
+            embedding_service=self.embedding_service,
+            chunk_store=self.chunk_store,
+            tracer=self.tracer
+        )
+        if self.prometheus:
+            retrieval_engine.stage_observer = self.prometheus.observe_stage
+        return retrieval_engine
+    
+    @_LazyComponent
+    def job_queue(self) -> JobQueue:
+        """摄取任务队列"""
+        return JobQueue(
+            str(Path(self.config.data_dir) / "jobs.db")
+        )
+    
+    def _component_lock(self, name: str) -> threading.RLock:
+        """获取组件的构建锁"""
+        with self._locks_guard:
+            lock = self._component_locks.get(name)
+            if lock is None:
+                lock = self._component_locks[name] = threading.RLock()
+            return lock
+    
+    def is_initialized(self, name: str) -> bool:
+        """组件是否已构建（不触发构建）"""
+        return name in self.__dict__
+    
+    def warmup(self, components: Optional[List[str]] = None):
+        """
+        预先构建组件
+        
+        Args:
+            components: 组件名列表（默认为WARMUP_COMPONENTS）
+        """
+        for name in components or self.WARMUP_COMPONENTS:
+            try:
+                getattr(self, name)
+            except Exception as e:
+                logger.error(f"组件预热失败: {name}: {e}")
+    
+    def start_warmup(self, components: Optional[List[str]] = None):
+        """在后台线程中预热组件（先到的请求会等待所需组件构建完成，不会重复构建）"""
+        if self._warmup_thread is not None and self._warmup_thread.is_alive():
+            return
+        
+        self._warmup_thread = threading.Thread(
+            target=self.warmup,
+            args=(components,),
+            name="wheel-warmup",
+            daemon=True
+        )
+        self._warmup_thread.start()
+    
+    def _record_first_request(self, kind: str):
+        """记录从启动到首个请求完成的耗时"""
+        if self.time_to_first_request is not None:
+            return
+        
+        with self._locks_guard:
+            if self.time_to_first_request is None:
+                self.time_to_first_request = time.perf_counter() - self._started_at
+                logger.info(f"首个请求完成 ({kind})，距启动 {self.time_to_first_request:.3f}s")
+    
+    def get_startup_stats(self) -> Dict[str, Any]:
+        """获取启动耗时统计"""
+        return {
+            'init_seconds': self.init_seconds,
+            'time_to_first_request': self.time_to_first_request,
+            'components': dict(self.component_init_seconds),
+            'pending_components': [
+                name for name in self.WARMUP_COMPONENTS
+                if not self.is_initialized(name)
+            ],
+            'warming_up': self._warmup_thread is not None and self._warmup_thread.is_alive()
+        }
+    
+    # ============ 业务接口 ============
+    
+    def process_document(
+        self,
+        file_path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        trace: bool = False
+    ) -> Dict[str, Any]:
+        """
+        处理文档
+        
+        Args:
+            file_path: 文档文件路径
+            metadata: 文档元数据
+            trace: 在结果中返回各处理步骤的span树（调试用）
+        
+        Returns:
+            处理结果
+        """
+        logger.info(f"处理文档: {file_path} (模式: {self.mode.value})")
+        
+        try:
+            result = self.pipeline.process(file_path, metadata, trace=trace)
+            self._record_first_request('process_document')
+            
+            if self.metrics:
+                self.metrics.record_document_processing(
+                    mode=self.mode.value,
+                    duration=result.get('duration', 0),
+                    success=True
+                )
+            if self.prometheus:
+                self.prometheus.observe_ingestion(
+                    self.mode.value,
+                    result.get('status', 'success'),
+                    seconds=result.get('duration', 0),
+                    chunks=result.get('chunks_added', 0)
+                )
+            
+            logger.info(f"文档处理成功: {file_path}")
+            return result
+        
+        except Exception as e:
+            logger.error(f"文档处理失败: {e}")
+            if self.metrics:
+                self.metrics.record_document_processing(
+                    mode=self.mode.value,
+                    success=False,
+                    error=str(e)
+                )
+            if self.prometheus:
+                self.prometheus.observe_ingestion(self.mode.value, 'failed')
+            raise
+    
+    def submit_document(
+        self,
+        file_path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        delete_after: bool = False,
+        mode: Optional[ProcessingMode] = None
+    ) -> str:
+        """
+        提交文档到持久化摄取队列
+        
+        Args:
+            file_path: 文档文件路径
+            metadata: 文档元数据
+            delete_after: 处理结束后删除文件（用于上传的临时文件）
+            mode: 处理模式（默认为提交时的当前模式）
+        
+        Returns:
+            任务ID
+        """
+        job_id = self.job_queue.enqueue(
+            file_path,
+            mode or self.mode,
+            metadata=metadata,
+            max_attempts=self.config.ingest_max_attempts,
+            delete_after=delete_after
+        )
+        self._record_first_request('submit_document')
+        return job_id
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取摄取任务状态"""
+        return self.job_queue.get(job_id)
+    
+    def build_pipeline(self, mode: ProcessingMode) -> DataProcessingPipeline:
+        """创建指定模式的处理管道（与系统共享存储和嵌入组件）"""
+        return DataProcessingPipeline(
+            mode=mode,
+            doc_processor=self.doc_processor,
+            embedding_service=self.embedding_service,
+            vector_store=self.vector_store,
+            db=self.db,
+            manifest=self.manifest,
+            chunk_store=self.chunk_store,
+            tracer=self.tracer
+        )
+    
+    def start_ingest_workers(self):
+        """启动摄取工作池"""
+        if self.ingest_pool is not None or self.config.ingest_workers <= 0:
+            return
+        
+        # 本地向量存储位于进程内存中，独立进程写入的向量对查询不可见
+        use_processes = self.config.ingest_use_processes
+        if use_processes and self.config.vector_db_type == "local":
+            logger.warning("本地向量存储不支持跨进程共享，摄取工作池改用线程模式")
+            use_processes = False
+        
+        # 工作进程按需构建组件，不做后台预热
+        worker_config = replace(self.config, ingest_workers=0, background_warmup=False)
+        mode_limits = {
+            mode.value: ModeConfig.get_config(mode)['processing']['max_concurrent_jobs']
+            for mode in ProcessingMode
+        }
+        
+        self.ingest_pool = IngestionWorkerPool(
+            self.job_queue.path,
+            num_workers=self.config.ingest_workers,
+            mode_limits=mode_limits,
+            use_processes=use_processes,
+            system_config=worker_config,
+            pipeline_factory=self.build_pipeline
+        )
+        self.ingest_pool.start()
+    
+    def stop_ingest_workers(self):
+        """停止摄取工作池（等待进行中的任务结束）"""
+        if self.ingest_pool is not None:
+            self.ingest_pool.stop()
+            self.ingest_pool = None
+    
+    def query(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        use_reranking: bool = None,
+        explain: bool = False,
+        trace: bool = False,
+        unit_id: Optional[str] = None,
+        mode: Optional[ProcessingMode] = None
+    ) -> Dict[str, Any]:
+        """
+        执行查询
+        
+        Args:
+            query_text: 查询文本
+            top_k: 返回结果数
+            use_reranking: 是否使用重排（None为按模式默认）
+            explain: 是否返回推理过程
+            trace: 在结果中返回各检索阶段的span树（调试用）
+            unit_id: A/B实验的分流单元（用户或会话ID，None时按查询文本分流）
+            mode: 本次查询使用的处理模式（None为系统当前模式）；不切换系统模式，
+                指定模式的查询不参与A/B实验
+        
+        Returns:
+            查询结果（进入实验时附带experiment字段）
+        """
+        if mode is None:
+            engine = self.retrieval_engine
+            assignment = self.experiments.assign(unit_id or query_text)
+        else:
+            engine = self._engine_for({'mode': mode})
+            assignment = None
+        if assignment is not None:
+            experiment, arm = assignment
+            engine = self._engine_for(arm.config)
+            top_k = arm.config.get('top_k', top_k)
+            use_reranking = arm.config.get('use_reranking', use_reranking)
+        mode_name = engine.mode.value
+        
+        logger.info(f"执行查询: {query_text[:50]}... (模式: {mode_name})")
+        
+        start = time.perf_counter()
+        try:
+            result = engine.retrieve(
+                query_text,
+                top_k=top_k,
+                use_reranking=use_reranking,
+                explain=explain,
+                trace=trace
+            )
+            self._record_first_request('query')
+            latency = time.perf_counter() - start
+            
+            # 检索引擎以error字段报告失败，不抛出异常
+            error = result.get('error')
+            if self.metrics:
+                self.metrics.record_query(
+                    mode=mode_name,
+                    latency=latency,
+                    result_count=len(result.get('results', [])),
+                    success=error is None,
+                    error=error
+                )
+            if self.prometheus:
+                self.prometheus.observe_query(
+                    mode_name,
+                    result.get('strategy', ''),
+                    latency,
+                    success=error is None
+                )
+            
+            if assignment is not None:
+                results = result.get('results', [])
+                self.experiments.record_result(
+                    experiment.experiment_id,
+                    arm.name,
+                    {
+                        'result_count': len(results),
+                        'top_score': results[0].get('score', 0.0) if results else 0.0
+                    },
+                    latency_seconds=latency,
+                    success=error is None
+                )
+                # 结果可能来自缓存，附加实验信息时不修改原字典
+                result = {
+                    **result,
+                    'experiment': {'experiment_id': experiment.experiment_id, 'arm': arm.name}
+                }
+            
+            return result
+        
+        except Exception as e:
+            logger.error(f"查询失败: {e}")
+            if self.metrics:
+                self.metrics.record_query(
+                    mode=mode_name,
+                    success=False,
+                    error=str(e)
+                )
+            if self.prometheus:
+                self.prometheus.observe_query(mode_name, '', 0.0, success=False)
+            if assignment is not None:
+                self.experiments.record_result(experiment.experiment_id, arm.name, success=False)
+            raise
+    
+    def _engine_for(self, config: Dict[str, Any]) -> RetrievalEngine:
+        """
+        获取配置（mode、strategy）对应的检索引擎
+        
+        与当前模式和策略相同时直接使用系统的检索引擎；其他组合构建共享存储和缓存的引擎。
+        查询缓存键包含模式、策略、是否重排和top_k，配置不同的组不会互相命中缓存。
+        """
+        mode = ProcessingMode(config.get('mode', self.mode))
+        strategy = config.get('strategy')
+        if mode == self.mode and strategy is None:
+            return self.retrieval_engine
+        
+        key = (mode.value, strategy)
+        engine = self._engines.get(key)
+        if engine is not None:
+            return engine
+        
+        with self._component_lock('engines'):
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = RetrievalEngine(
+                    mode=mode,
+                    vector_store=self.vector_store,
+                    cache=self.cache,
+                    db=self.db,
+                    embedding_service=self.embedding_service,
+                    chunk_store=self.chunk_store,
+                    tracer=self.tracer
+                )
+                if strategy is not None:
+                    engine.strategy = RetrievalStrategy(strategy)
+                if self.prometheus:
+                    engine.stage_observer = self.prometheus.observe_stage
+                self._engines[key] = engine
+        return engine
+    
+    def create_experiment(
+        self,
+        name: str,
+        control: Dict[str, Any],
+        treatment: Dict[str, Any],
+        **options: Any
+    ) -> str:
+        """
+        创建A/B实验
+        
+        Args:
+            name: 实验名称
+            control: 对照组的查询配置（mode, strategy, use_reranking, top_k，空字典为系统当前配置）
+            treatment: 处理组的查询配置
+            **options: 实验参数（primary_metric, traffic_fraction, alpha, duration等）
+        
+        Returns:
+            实验ID
+        """
+        for config in (control, treatment):
+            unknown = set(config) - {'mode', 'strategy', 'use_reranking', 'top_k'}
+            if unknown:
+                raise ValueError(f"不支持的实验配置项: {sorted(unknown)}")
+            # 提前校验，避免实验开始后查询才失败
+            if 'mode' in config:
+                ProcessingMode(config['mode'])
+            if config.get('strategy') is not None:
+                RetrievalStrategy(config['strategy'])
+        
+        return self.experiments.create_experiment(name, control, treatment, **options)
+    
+    @staticmethod
+    def _prefix_dimension(spec: Optional[EmbeddingModelSpec]) -> Optional[int]:
+        """各模式检索配置中模型支持截取的最小前缀维度（用于粗排索引）"""
+        dimensions = sorted({
+            ModeConfig.get_config(mode)['retrieval'].get('search_dimension') or 0
+            for mode in ProcessingMode
+        })
+        for dimension in dimensions:
+            if dimension and spec is not None and spec.supports_prefix(dimension):
+                return dimension
+        return None
+    
+    def switch_mode(self, new_mode: ProcessingMode) -> None:
+        """
+        切换处理模式（运行时动态切换）
+        
+        Args:
+            new_mode: 新的处理模式
+        """
+        logger.info(f"切换模式: {self.mode.value} -> {new_mode.value}")
+        
+        self.mode = new_mode
+        self.config.mode = new_mode
+        
+        # 只调整已构建的组件，尚未构建的组件构建时使用新模式
+        if self.is_initialized('pipeline'):
+            self.pipeline.switch_mode(new_mode)
+        if self.is_initialized('retrieval_engine'):
+            self.retrieval_engine.switch_mode(new_mode)
+        if self.is_initialized('doc_processor'):
+            self.doc_processor.mode = new_mode
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取系统性能指标"""
+        if self.metrics:
+            return self.metrics.get_summary()
+        return {}
+    
+    def get_traces(self, limit: int = 20, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取最近的请求追踪（name为retrieve或ingest时只返回对应类型）"""
+        return self.tracer.recent(limit, name)
+    
+    def evaluate(
+        self,
+        queries: List[EvaluationQuery],
+        modes: Optional[List[ProcessingMode]] = None,
+        strategies: Optional[List[RetrievalStrategy]] = None,
+        k_values: List[int] = DEFAULT_K_VALUES
+    ) -> List[Dict[str, Any]]:
+        """
+        在已摄取的数据上评估各模式、各检索策略的质量和延迟
+        
+        Args:
+            queries: 带标注的评估查询（相关结果为分块的向量ID）
+            modes: 评估的模式（默认全部）
+            strategies: 评估的策略（默认全部）
+            k_values: 截断位置
+        
+        Returns:
+            每个(模式, 策略)组合一行的结果（含Pareto标记）
+        """
+        evaluator = RetrievalEvaluator(
+            self.vector_store,
+            self.db,
+            embedding_service=self.embedding_service,
+            chunk_store=self.chunk_store,
+            k_values=k_values
+        )
+        return evaluator.evaluate(queries, modes, strategies)
+    
+    def health_check(self) -> Dict[str, bool]:
+        """系统健康检查"""
+        health = {
+            'database': self.db.health_check(),
+            'vector_store': self.vector_store.health_check(),
+            'cache': self.cache.health_check(),
+            'embedding_service': self.embedding_service.health_check()
+        }
+        return all(health.values()), health
+    
+    def create_api_app(self):
+        """创建FastAPI应用（按需导入FastAPI，命令行任务不承担其导入开销）"""
+        from api.main import create_app
+        return create_app(self)
+
+
+def main():
+    """主程序示例"""
+    
+    # 创建系统实例（API服务在后台预热组件，不阻塞启动）
+    system = WheelSystem(WheelSystemConfig(background_warmup=True))
+    
+    # 验证系统健康状态
+    is_healthy, health_details = system.health_check()
+    if not is_healthy:
+        logger.warning(f"系统部分组件不健康: {health_details}")
+    
+    # 示例：创建并启动API服务
+    app = system.create_api_app()
+    
+    import uvicorn
+    logger.info("启动API服务器: http://localhost:8000")
+    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+
+if __name__ == "__main__":
+    main()